@@ -0,0 +1,435 @@
+"""
+Content-addressed cache for the Control UI's immutable assets.
+
+The Control UI's JS/CSS bundles carry a content hash in their file name
+(e.g. assets/index-BzX1aB2c.js), so a given URL always has the same body.
+AssetCache fetches such an asset from the gateway once, precompresses it
+(gzip, plus brotli when the Brotli package is installed) and serves every
+later request from memory, picking the variant by Accept-Encoding, with
+`Cache-Control: public, max-age=..., immutable` so browsers stop asking at all.
+
+Upstream cache headers are honoured: responses marked no-store/no-cache/private,
+ones setting cookies or varying on more than Accept-Encoding, and non-200 or
+HTML responses (an SPA fallback for an unknown path) are never cached, and an
+upstream max-age shorter than ASSET_CACHE_MAX_AGE bounds how long an entry is
+kept and what browsers are told. Candidates are fetched uncompressed, so the
+ones the policy refuses are compressed per response for clients that accept it.
+
+Memory is an LRU bounded by ASSET_CACHE_MAX_BYTES (all variants counted).
+With ASSET_CACHE_DIR set, entries are also written to disk, bodies named by
+their SHA-256 so identical assets are stored once, and survive restarts; the
+directory is pruned oldest-first to ASSET_CACHE_DISK_MAX_BYTES.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ASSET_CACHE_ENABLED = os.environ.get('ASSET_CACHE_ENABLED', 'true').lower() == 'true'
+# Memory budget for all cached variants, in bytes
+ASSET_CACHE_MAX_BYTES = int(os.environ.get('ASSET_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Larger assets are streamed through uncached
+ASSET_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('ASSET_CACHE_MAX_ENTRY_BYTES', str(8 * 1024 * 1024)))
+# Optional on-disk tier (disabled when empty) and its budget
+ASSET_CACHE_DIR = os.environ.get('ASSET_CACHE_DIR', '')
+ASSET_CACHE_DISK_MAX_BYTES = int(os.environ.get('ASSET_CACHE_DISK_MAX_BYTES', str(512 * 1024 * 1024)))
+# Browser cache lifetime for immutable assets, in seconds
+ASSET_CACHE_MAX_AGE = int(os.environ.get('ASSET_CACHE_MAX_AGE', '31536000'))
+# Paths treated as content-addressed: a hash of 8+ characters (with a digit or an
+# upper-case letter, unlike plain words) before the extension, as Vite emits them
+ASSET_CACHE_PATH_PATTERN = re.compile(os.environ.get(
+    'ASSET_CACHE_PATH_PATTERN',
+    r'[.-](?=[A-Za-z0-9_-]*[0-9A-Z])[A-Za-z0-9_-]{8,}\.(?:js|mjs|css|map|woff2?|ttf|otf|svg|png|jpe?g|gif|webp|avif|ico|wasm)$'
+))
+
+# Smaller bodies are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+COMPRESSIBLE_TYPES = ("text/", "javascript", "json", "xml", "svg", "wasm")
+
+# Content-Encoding -> file suffix / ETag suffix, in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+IDENTITY = "identity"
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding as {coding: q}, lower-cased."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def preferred_encoding(accept_encoding: Optional[str], available=ENCODINGS) -> str:
+    """The client's most preferred of the `available` encodings, or identity."""
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = IDENTITY, 0.0
+    for encoding in ENCODINGS:
+        q = accepted.get(encoding, wildcard)
+        if encoding in available and q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class AssetEntry:
+    """One cached asset: its identity body and precompressed variants."""
+
+    __slots__ = ("digest", "content_type", "variants", "max_age", "immutable", "expires_at")
+
+    def __init__(self, digest: str, content_type: str, variants: Dict[str, bytes],
+                 max_age: int, immutable: bool, expires_at: Optional[float]):
+        self.digest = digest
+        self.content_type = content_type
+        self.variants = variants
+        self.max_age = max_age
+        self.immutable = immutable
+        # Wall-clock expiry (persisted to disk), None for immutable assets
+        self.expires_at = expires_at
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.variants.values())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+    def etag(self, encoding: str) -> str:
+        """Strong ETag of one variant (each encoding is a different representation)."""
+        return f'"{self.digest}"' if encoding == IDENTITY else f'"{self.digest}-{encoding}"'
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        """The best (encoding, body) for an Accept-Encoding header."""
+        best = preferred_encoding(accept_encoding, self.variants)
+        return best, self.variants[best]
+
+    def headers(self, encoding: str) -> dict:
+        """Response headers for a variant."""
+        remaining = self.max_age
+        if self.expires_at is not None:
+            remaining = max(0, min(self.max_age, int(self.expires_at - time.time())))
+        cache_control = f"public, max-age={remaining}" + (", immutable" if self.immutable else "")
+        headers = {
+            "Content-Type": self.content_type,
+            "Cache-Control": cache_control,
+            "ETag": self.etag(encoding),
+            "Vary": "Accept-Encoding",
+        }
+        if encoding != IDENTITY:
+            headers["Content-Encoding"] = encoding
+        return headers
+
+
+def _compress(body: bytes, content_type: str) -> Dict[str, bytes]:
+    """The identity body plus every compressed variant that is actually smaller."""
+    variants = {IDENTITY: body}
+    if len(body) < COMPRESS_MIN_BYTES or not any(kind in content_type for kind in COMPRESSIBLE_TYPES):
+        return variants
+    for encoding in ENCODINGS:
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=11)
+        else:
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            variants[encoding] = compressed
+    return variants
+
+
+def compress_response(body: bytes, encoding: str) -> bytes:
+    """Compress one response body, trading ratio for speed (it is not kept)."""
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class AssetCache:
+    """Memory LRU (with an optional disk tier) of path -> AssetEntry."""
+
+    _entries: "OrderedDict[str, AssetEntry]" = OrderedDict()
+    _bytes = 0
+
+    hits = 0
+    disk_hits = 0
+    misses = 0
+
+    # ---- what may be cached ----
+
+    @staticmethod
+    def candidate(method: str, path: str, headers) -> bool:
+        """Whether a proxied request is for a content-addressed asset we cache."""
+        return (
+            ASSET_CACHE_ENABLED
+            and method == "GET"
+            and "range" not in headers
+            and ASSET_CACHE_PATH_PATTERN.search(path.split("?", 1)[0]) is not None
+        )
+
+    @staticmethod
+    def upstream_headers(headers: dict) -> dict:
+        """
+        Request headers for fetching a candidate: unconditional and uncompressed,
+        so the gateway returns the full body we compress ourselves.
+        """
+        headers = {k: v for k, v in headers.items()
+                   if k.lower() not in ("if-none-match", "if-modified-since", "range", "accept-encoding")}
+        headers["accept-encoding"] = IDENTITY
+        return headers
+
+    @staticmethod
+    def passthrough_encoding(accept_encoding: Optional[str], status: int, headers) -> str:
+        """
+        How to relay a candidate the policy refused: it was fetched uncompressed
+        (see upstream_headers), so compress it for clients that accept it
+        instead of sending a compressible body as identity.
+        """
+        if status != 200 or headers.get("content-encoding", IDENTITY).lower() != IDENTITY:
+            return IDENTITY
+        if not any(kind in headers.get("content-type", "") for kind in COMPRESSIBLE_TYPES):
+            return IDENTITY
+        length = headers.get("content-length", "")
+        if not length.isdigit() or not COMPRESS_MIN_BYTES <= int(length) <= ASSET_CACHE_MAX_ENTRY_BYTES:
+            return IDENTITY
+        return preferred_encoding(accept_encoding)
+
+    @staticmethod
+    def policy(status: int, headers) -> Optional[Tuple[int, bool, Optional[float]]]:
+        """
+        How an upstream response may be cached: (max_age, immutable, expires_at),
+        or None if it must not be.
+        """
+        if status != 200 or "set-cookie" in headers:
+            return None
+        if "text/html" in headers.get("content-type", ""):
+            return None
+        if headers.get("content-encoding", IDENTITY).lower() != IDENTITY:
+            return None
+        vary = {v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()}
+        if vary - {"accept-encoding"}:
+            return None
+        length = headers.get("content-length")
+        if length is not None and length.isdigit() and int(length) > ASSET_CACHE_MAX_ENTRY_BYTES:
+            return None
+
+        directives = {}
+        for part in headers.get("cache-control", "").split(","):
+            name, _, value = part.strip().partition("=")
+            if name:
+                directives[name.lower()] = value.strip('"')
+        if {"no-store", "no-cache", "private"} & directives.keys():
+            return None
+
+        max_age = directives.get("s-maxage", directives.get("max-age"))
+        if "immutable" in directives or max_age is None:
+            return ASSET_CACHE_MAX_AGE, True, None
+        try:
+            max_age = int(max_age)
+        except ValueError:
+            return None
+        if max_age <= 0:
+            return None
+        max_age = min(max_age, ASSET_CACHE_MAX_AGE)
+        return max_age, False, time.time() + max_age
+
+    # ---- lookups ----
+
+    @classmethod
+    async def get(cls, key: str) -> Optional[AssetEntry]:
+        """The cached entry for a path, from memory or disk, or None."""
+        entry = cls._entries.get(key)
+        if entry is not None:
+            if not entry.expired():
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+                return entry
+            cls._discard(key)
+
+        if ASSET_CACHE_DIR:
+            entry = await asyncio.to_thread(cls._disk_load, key)
+            if entry is not None:
+                cls._remember(key, entry)
+                cls.disk_hits += 1
+                return entry
+
+        cls.misses += 1
+        return None
+
+    @classmethod
+    async def put(cls, key: str, body: bytes, content_type: str,
+                  policy: Tuple[int, bool, Optional[float]]) -> AssetEntry:
+        """Hash and precompress a fetched asset (off the event loop) and cache it."""
+        max_age, immutable, expires_at = policy
+        digest, variants = await asyncio.to_thread(
+            lambda: (hashlib.sha256(body).hexdigest(), _compress(body, content_type))
+        )
+        entry = AssetEntry(digest, content_type, variants, max_age, immutable, expires_at)
+        if len(body) <= ASSET_CACHE_MAX_ENTRY_BYTES:
+            cls._remember(key, entry)
+            if ASSET_CACHE_DIR:
+                try:
+                    await asyncio.to_thread(cls._disk_store, key, entry)
+                except OSError as e:
+                    logger.warning(f"[asset-cache] Could not write {key} to {ASSET_CACHE_DIR}: {e}")
+        return entry
+
+    @classmethod
+    def size(cls) -> int:
+        """Bytes held in memory."""
+        return cls._bytes
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop everything held in memory (the disk tier is left alone)."""
+        cls._entries.clear()
+        cls._bytes = 0
+        cls.hits = 0
+        cls.disk_hits = 0
+        cls.misses = 0
+
+    # ---- memory tier ----
+
+    @classmethod
+    def _remember(cls, key: str, entry: AssetEntry) -> None:
+        cls._discard(key)
+        if entry.size > ASSET_CACHE_MAX_BYTES:
+            return
+        cls._entries[key] = entry
+        cls._bytes += entry.size
+        while cls._bytes > ASSET_CACHE_MAX_BYTES:
+            _, evicted = cls._entries.popitem(last=False)
+            cls._bytes -= evicted.size
+
+    @classmethod
+    def _discard(cls, key: str) -> None:
+        entry = cls._entries.pop(key, None)
+        if entry is not None:
+            cls._bytes -= entry.size
+
+    # ---- disk tier ----
+
+    @staticmethod
+    def _index_path(key: str) -> str:
+        return os.path.join(ASSET_CACHE_DIR, "index", hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    @staticmethod
+    def _blob_path(digest: str, encoding: str) -> str:
+        return os.path.join(ASSET_CACHE_DIR, "blobs", f"{digest}.{encoding}")
+
+    @classmethod
+    def _disk_store(cls, key: str, entry: AssetEntry) -> None:
+        for encoding, body in entry.variants.items():
+            path = cls._blob_path(entry.digest, encoding)
+            if not os.path.exists(path):
+                _write_atomic(path, body)
+        meta = {
+            "key": key,
+            "digest": entry.digest,
+            "content_type": entry.content_type,
+            "encodings": sorted(entry.variants),
+            "max_age": entry.max_age,
+            "immutable": entry.immutable,
+            "expires_at": entry.expires_at,
+        }
+        _write_atomic(cls._index_path(key), json.dumps(meta).encode("utf-8"))
+        cls._disk_prune()
+
+    @classmethod
+    def _disk_load(cls, key: str) -> Optional[AssetEntry]:
+        index_path = cls._index_path(key)
+        try:
+            with open(index_path, "rb") as f:
+                meta = json.load(f)
+            if meta.get("key") != key:
+                return None
+            variants = {}
+            for encoding in meta["encodings"]:
+                path = cls._blob_path(meta["digest"], encoding)
+                with open(path, "rb") as f:
+                    variants[encoding] = f.read()
+                # Reads count as use for pruning
+                os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"[asset-cache] Dropping unreadable disk entry for {key}: {e}")
+            variants = None
+        if variants is None or IDENTITY not in variants:
+            cls._disk_drop(index_path)
+            return None
+
+        entry = AssetEntry(meta["digest"], meta["content_type"], variants,
+                           meta["max_age"], meta["immutable"], meta["expires_at"])
+        if entry.expired():
+            cls._disk_drop(index_path)
+            return None
+        return entry
+
+    @staticmethod
+    def _disk_drop(index_path: str) -> None:
+        # Another worker may have dropped the same entry already
+        try:
+            os.unlink(index_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _disk_prune() -> None:
+        """Delete the least recently used blobs until the directory fits its budget."""
+        blob_dir = os.path.join(ASSET_CACHE_DIR, "blobs")
+        blobs = []
+        total = 0
+        with os.scandir(blob_dir) as it:
+            for item in it:
+                if item.is_file() and not item.name.startswith(".tmp-"):
+                    st = item.stat()
+                    blobs.append((st.st_mtime, st.st_size, item.path))
+                    total += st.st_size
+        # Index files pointing at a deleted blob are dropped on their next load
+        for _, size, path in sorted(blobs):
+            if total <= ASSET_CACHE_DISK_MAX_BYTES:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1 @@
+"""Micro-benchmarks for the OpenClaw hosting backend (run as `python -m benchmarks.<name>` from backend/)."""
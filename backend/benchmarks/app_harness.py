@@ -0,0 +1,76 @@
+"""
+In-process harness for benchmarking server.app.
+
+Imports the FastAPI app with safe defaults, patches out auth and gateway
+liveness so the proxy routes can be hit without Mongo or supervisord, and
+serves the app with uvicorn on an ephemeral port.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+
+from benchmarks import common  # noqa: F401  (puts backend/ on sys.path)
+
+os.environ.setdefault('MONGO_URL', 'mongodb://127.0.0.1:27017')
+os.environ.setdefault('ENSURE_PLAYWRIGHT_BROWSERS', 'false')
+
+import uvicorn  # noqa: E402
+
+import server  # noqa: E402
+
+# Per-request INFO lines from httpx would dominate benchmark output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+BENCH_USER = server.User(user_id="user_bench", email="bench@example.com", name="Bench")
+
+
+@contextlib.contextmanager
+def patched_server(gateway_port: int, token: str = "bench-token", **overrides):
+    """
+    Point server.py at a fake gateway and bypass auth/liveness checks.
+
+    Extra keyword arguments are set as module attributes for the duration
+    (e.g. PROXY_STREAMING=False) and restored afterwards.
+    """
+    async def bench_current_user(request):
+        return BENCH_USER
+
+    async def gateway_running():
+        return True
+
+    patches = {
+        "get_current_user": bench_current_user,
+        "check_gateway_running": gateway_running,
+        "MOLTBOT_PORT": gateway_port,
+        **overrides,
+    }
+    saved = {name: getattr(server, name) for name in patches}
+    saved_state = dict(server.gateway_state)
+    for name, value in patches.items():
+        setattr(server, name, value)
+    server.gateway_state.update({"token": token, "owner_user_id": BENCH_USER.user_id})
+    try:
+        yield server
+    finally:
+        for name, value in saved.items():
+            setattr(server, name, value)
+        server.gateway_state.clear()
+        server.gateway_state.update(saved_state)
+
+
+@contextlib.asynccontextmanager
+async def serve_app(app=None):
+    """Serve the app with uvicorn on 127.0.0.1:<ephemeral>; yields the base URL."""
+    config = uvicorn.Config(app or server.app, host="127.0.0.1", port=0, log_level="warning", lifespan="off")
+    uv_server = uvicorn.Server(config)
+    task = asyncio.create_task(uv_server.serve())
+    while not uv_server.started:
+        await asyncio.sleep(0.01)
+    port = uv_server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        uv_server.should_exit = True
+        await task
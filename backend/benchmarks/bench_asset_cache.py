@@ -0,0 +1,69 @@
+"""
+Benchmark: Control UI page loads with and without the immutable asset cache.
+
+Serves server.app with uvicorn in front of a fake gateway (with per-request
+latency) and repeatedly loads a "page" of content-hashed assets in parallel,
+as a browser with a cold cache would. Reports page-load latency, how many
+requests reached the gateway and the bytes sent to the client (gzip when the
+cache is on, identity when off, since the gateway itself does not compress).
+
+    cd backend && python -m benchmarks.bench_asset_cache --loads 50 --assets 20
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import asset_cache
+from asset_cache import AssetCache
+from benchmarks.app_harness import patched_server, serve_app
+from benchmarks.common import print_table, summarize
+from benchmarks.fake_gateway import FakeGateway
+from proxy_client import ProxyClient
+
+
+async def run_case(enabled: bool, args) -> dict:
+    asset_cache.ASSET_CACHE_ENABLED = enabled
+    AssetCache.clear()
+    urls = [f"/api/openclaw/ui/assets/chunk-{i:02d}Ab3xYz.js" for i in range(args.assets)]
+    async with FakeGateway(asset_size=args.asset_kb * 1024, latency=args.latency / 1000) as gateway:
+        with patched_server(gateway.port):
+            async with serve_app() as base_url:
+                async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                             headers={"accept-encoding": "gzip, br"}) as client:
+                    latencies, sent = [], 0
+                    start = time.perf_counter()
+                    for _ in range(args.loads):
+                        load_start = time.perf_counter()
+                        responses = await asyncio.gather(*(client.get(url) for url in urls))
+                        latencies.append(time.perf_counter() - load_start)
+                        sent += sum(len(r.content) if "content-encoding" not in r.headers
+                                    else int(r.headers["content-length"]) for r in responses)
+                    elapsed = time.perf_counter() - start
+                await ProxyClient.close()
+    row = summarize("cache on" if enabled else "cache off", latencies, elapsed,
+                    gateway_requests=gateway.requests,
+                    sent_kb_per_load=round(sent / args.loads / 1024, 1))
+    row.pop("requests")
+    return row
+
+
+async def main(args) -> None:
+    saved = asset_cache.ASSET_CACHE_ENABLED
+    try:
+        rows = [await run_case(False, args), await run_case(True, args)]
+    finally:
+        asset_cache.ASSET_CACHE_ENABLED = saved
+        AssetCache.clear()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--loads", type=int, default=50, help="page loads per case")
+    parser.add_argument("--assets", type=int, default=20, help="assets per page")
+    parser.add_argument("--asset-kb", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=5.0, help="gateway latency per request, ms")
+    asyncio.run(main(parser.parse_args()))
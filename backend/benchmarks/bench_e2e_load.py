@@ -0,0 +1,323 @@
+"""
+Benchmark: end-to-end load on the backend with local stand-ins for everything
+it talks to.
+
+Boots server.app in-process with uvicorn together with
+    - a FakeGateway on MOLTBOT_PORT (Control UI over HTTP, WebSocket echo),
+    - a FakeSupervisord reporting the gateway RUNNING over XML-RPC,
+    - a FakeMongoDatabase seeded with the owner, a session and the gateway config,
+so every request takes the real path: session auth (aggregation + SessionCache),
+gateway liveness, asset cache, single-flight and the HTTP/WebSocket proxies.
+Nothing in server.py is patched except where its collaborators live.
+
+--concurrency workers run for --duration seconds (after --warmup), each
+picking operations by the weights in --mix:
+    asset   GET a Control UI asset (every other one content-hashed, so cacheable)
+    status  GET /api/openclaw/status
+    ws      one round trip of --ws-size bytes over the worker's /api/openclaw/ws
+Reports throughput, p50/p99 latency and errors per operation, and the
+process RSS (client and server share the process). --json writes the
+results; --baseline compares against such a file and exits 1 when
+throughput dropped or p99 rose by more than --tolerance percent.
+
+    cd backend && python -m benchmarks.bench_e2e_load --duration 10 --concurrency 32 \\
+        --mix asset=6,status=3,ws=1 --json e2e-baseline.json
+    cd backend && python -m benchmarks.bench_e2e_load --baseline e2e-baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import random
+import resource
+import secrets
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks.app_harness import serve_app, server
+from benchmarks.common import print_table, summarize
+from benchmarks.fake_gateway import FakeGateway
+from benchmarks.fake_mongo import FakeMongoDatabase
+from benchmarks.fake_supervisord import FakeSupervisord
+
+import supervisor_client
+import supervisor_rpc
+from asset_cache import AssetCache
+from gateway_liveness import GatewayLiveness
+from html_injection import WsOverrideInjector
+from proxy_client import ProxyClient
+from request_timing import TimedDatabase
+from session_cache import SessionCache
+from supervisor_rpc import AsyncSupervisorRPC, SupervisorRPC
+
+OPERATIONS = ("asset", "status", "ws")
+OWNER = {"user_id": "user_e2e", "email": "e2e@example.com", "name": "E2E"}
+
+
+def parse_mix(value: str) -> dict:
+    """'asset=6,status=3,ws=1' -> {'asset': 6.0, 'status': 3.0, 'ws': 1.0}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r} (choose from {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        # Peak instead of current where /proc is unavailable (macOS reports bytes)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+async def seed(db) -> str:
+    """Owner, session and a running gateway config; returns the session token."""
+    token = secrets.token_hex(32)
+    now = datetime.now(timezone.utc)
+    await db.users.insert_one({**OWNER, "created_at": now})
+    await db.user_sessions.insert_one({
+        "user_id": OWNER["user_id"], "session_token": token,
+        "expires_at": now + timedelta(days=1), "created_at": now,
+    })
+    await db.instance_config.insert_one({"_id": "instance_owner", **OWNER})
+    await db.moltbot_configs.insert_one({
+        "_id": "gateway_config", "should_run": True, "owner_user_id": OWNER["user_id"],
+        "provider": "emergent", "started_at": now.isoformat(),
+    })
+    return token
+
+
+@contextlib.contextmanager
+def patched(target, **values):
+    saved = {name: getattr(target, name) for name in values}
+    for name, value in values.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+@contextlib.asynccontextmanager
+async def e2e_environment(args):
+    """Fake gateway, supervisord and database wired into server.py; yields (base_url, session token, fakes)."""
+    fake_db = FakeMongoDatabase(latency=args.db_latency / 1000)
+    token = await seed(fake_db)
+    for cache in (SessionCache, AssetCache, WsOverrideInjector):
+        cache.clear()
+
+    async with contextlib.AsyncExitStack() as stack:
+        gateway = await stack.enter_async_context(
+            FakeGateway(asset_size=args.asset_kb * 1024, latency=args.gateway_latency / 1000)
+        )
+        supervisord = stack.enter_context(FakeSupervisord())
+        supervisord.programs[supervisor_client.SupervisorClient.PROGRAM].update(state="RUNNING", pid=4242)
+
+        stack.enter_context(patched(supervisor_rpc, SUPERVISOR_SOCKET=supervisord.socket_path))
+        stack.enter_context(patched(supervisor_client, SUPERVISOR_BACKEND="xmlrpc"))
+        stack.enter_context(patched(server, db=TimedDatabase(fake_db), MOLTBOT_PORT=gateway.port))
+        stack.enter_context(patched(server, instance_owner_memo={"doc": None}))
+        saved_state = dict(server.gateway_state)
+        server.gateway_state.update(token="e2e-gateway-token", owner_user_id=OWNER["user_id"],
+                                    provider="emergent", started_at=None)
+        stack.callback(lambda: (server.gateway_state.clear(), server.gateway_state.update(saved_state)))
+
+        async def shutdown():
+            await GatewayLiveness.stop()
+            await ProxyClient.close()
+            await AsyncSupervisorRPC.close()
+            SupervisorRPC.close()
+
+        stack.push_async_callback(shutdown)
+        await GatewayLiveness.refresh()
+        GatewayLiveness.start()
+
+        base_url = await stack.enter_async_context(serve_app())
+        yield base_url, token, {"gateway": gateway, "supervisord": supervisord, "db": fake_db}
+
+
+class Worker:
+    """One simulated client: a shared HTTP client and its own WebSocket."""
+
+    def __init__(self, client: httpx.AsyncClient, ws_url: str, token: str, assets: list, args, seed: int):
+        self.client = client
+        self.ws_url = ws_url
+        self.token = token
+        self.assets = assets
+        self.ws_payload = b"w" * args.ws_size
+        self.rng = random.Random(seed)
+        self.websocket = None
+
+    async def asset(self) -> bool:
+        response = await self.client.get(f"/api/openclaw/ui/{self.rng.choice(self.assets)}")
+        return response.status_code == 200
+
+    async def status(self) -> bool:
+        response = await self.client.get("/api/openclaw/status")
+        return response.status_code == 200 and response.json().get("running") is True
+
+    async def ws(self) -> bool:
+        if self.websocket is None:
+            self.websocket = await connect(self.ws_url, max_size=None,
+                                           additional_headers={"Cookie": f"session_token={self.token}"})
+        await self.websocket.send(self.ws_payload)
+        return await self.websocket.recv() == self.ws_payload
+
+    async def close(self) -> None:
+        if self.websocket is not None:
+            await self.websocket.close()
+            self.websocket = None
+
+
+async def drive(workers: list, mix: dict, duration: float) -> tuple:
+    """Run every worker until the deadline; returns ({op: latencies}, {op: errors}, elapsed)."""
+    names, weights = list(mix), list(mix.values())
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    deadline = time.perf_counter() + duration
+
+    async def run(worker: Worker):
+        while time.perf_counter() < deadline:
+            name = worker.rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                ok = await getattr(worker, name)()
+            except Exception:
+                ok = False
+                await worker.close()
+            if ok:
+                latencies[name].append(time.perf_counter() - start)
+            else:
+                errors[name] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(worker) for worker in workers))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_load(args) -> dict:
+    """Boot the environment, warm up, measure; returns the JSON-able report."""
+    rss = {"start_mb": round(rss_mb(), 1)}
+    peak = [rss_mb()]
+    assets = [f"assets/index-{i:02d}Xq7Lm2p.js" if i % 2 == 0 else f"assets/chunk-{i:02d}.js"
+              for i in range(args.assets)]
+
+    async def sample_rss():
+        while True:
+            peak.append(rss_mb())
+            await asyncio.sleep(0.1)
+
+    async with e2e_environment(args) as (base_url, token, fakes):
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, cookies={"session_token": token},
+                                     limits=limits, timeout=60) as client:
+            ws_url = base_url.replace("http://", "ws://") + "/api/openclaw/ws"
+            workers = [Worker(client, ws_url, token, assets, args, seed=i) for i in range(args.concurrency)]
+            sampler = asyncio.create_task(sample_rss())
+            try:
+                if args.warmup > 0:
+                    await drive(workers, args.mix, args.warmup)
+                gateway_before = (fakes["gateway"].requests, fakes["gateway"].ws_messages)
+                db_before = fakes["db"].operations()
+                latencies, errors, elapsed = await drive(workers, args.mix, args.duration)
+            finally:
+                sampler.cancel()
+                await asyncio.gather(*(worker.close() for worker in workers))
+
+        gateway = {
+            "http_requests": fakes["gateway"].requests - gateway_before[0],
+            "ws_messages": fakes["gateway"].ws_messages - gateway_before[1],
+        }
+        db_operations = fakes["db"].operations() - db_before
+
+    rows = [summarize(name, latencies[name], elapsed, errors=errors[name]) for name in args.mix]
+    everything = [value for values in latencies.values() for value in values]
+    rows.append(summarize("total", everything, elapsed, errors=sum(errors.values())))
+    rss.update(peak_mb=round(max(peak), 1), end_mb=round(rss_mb(), 1))
+
+    config = {key: value for key, value in vars(args).items() if key not in ("json", "baseline", "tolerance")}
+    return {
+        "benchmark": "e2e_load",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": config,
+        "results": rows,
+        "rss": rss,
+        "upstream": {**gateway, "db_operations": db_operations},
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Rows comparing a report with a baseline; a row is a regression if past `tolerance` percent."""
+    before = {row["name"]: row for row in baseline["results"]}
+    rows = []
+    for row in report["results"]:
+        old = before.get(row["name"])
+        if old is None:
+            continue
+        throughput = (row["req_per_s"] - old["req_per_s"]) / old["req_per_s"] * 100 if old["req_per_s"] else 0.0
+        p99 = (row["p99_ms"] - old["p99_ms"]) / old["p99_ms"] * 100 if old["p99_ms"] else 0.0
+        rows.append({
+            "name": row["name"],
+            "req_per_s": f"{old['req_per_s']} -> {row['req_per_s']} ({throughput:+.1f}%)",
+            "p99_ms": f"{old['p99_ms']} -> {row['p99_ms']} ({p99:+.1f}%)",
+            "regressed": throughput < -tolerance or p99 > tolerance or row["errors"] > old.get("errors", 0),
+        })
+    return rows
+
+
+async def main(args) -> int:
+    report = await run_load(args)
+    print_table(report["results"])
+    print(f"\nRSS: {report['rss']}  upstream: {report['upstream']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        print(f"\nAgainst {args.baseline} (tolerance {args.tolerance}%):")
+        print_table(rows)
+        if any(row["regressed"] for row in rows):
+            return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds before that")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("asset=6,status=3,ws=1"))
+    parser.add_argument("--assets", type=int, default=20, help="distinct asset paths")
+    parser.add_argument("--asset-kb", type=int, default=32)
+    parser.add_argument("--ws-size", type=int, default=512, help="bytes per WebSocket message")
+    parser.add_argument("--gateway-latency", type=float, default=2.0, help="ms per gateway HTTP request")
+    parser.add_argument("--db-latency", type=float, default=0.5, help="ms per database operation")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare against a report written with --json")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed regression, percent")
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(build_parser().parse_args())))
@@ -0,0 +1,79 @@
+"""
+Benchmark: proxy throughput with a supervisorctl fork per request vs the
+cached GatewayLiveness state.
+
+A fake `supervisorctl` (a Python script, like the real one) is put first on
+PATH so the "before" case pays a realistic fork+exec+interpreter start on every
+proxied request. The app is served in-process with uvicorn in front of a local
+fake gateway.
+
+    cd backend && python -m benchmarks.bench_gateway_liveness --requests 200 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.app_harness import patched_server, serve_app
+from benchmarks.common import Timer, print_table, summarize
+from benchmarks.fake_gateway import FakeGateway
+from benchmarks.fake_supervisord import fake_supervisorctl
+
+import httpx
+
+from gateway_liveness import GatewayLiveness
+from proxy_client import ProxyClient
+from supervisor_client import SupervisorClient
+
+
+async def drive(base_url: str, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(timeout=60) as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(f"{base_url}/api/openclaw/ui/assets/chunk-{i}.js")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        await one(-1)  # warm-up
+        latencies.clear()
+        with Timer() as timer:
+            await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, timer.elapsed
+
+
+async def supervisorctl_status() -> bool:
+    # What every request used to do: fork supervisorctl on the event loop
+    return SupervisorClient.status()
+
+
+async def run_case(name: str, liveness_check, args, background: bool) -> dict:
+    async with FakeGateway(asset_size=4096) as gateway:
+        with patched_server(gateway.port, check_gateway_running=liveness_check):
+            if background:
+                GatewayLiveness.start()
+            try:
+                async with serve_app() as base_url:
+                    latencies, elapsed = await drive(base_url, args.requests, args.concurrency)
+            finally:
+                await GatewayLiveness.stop()
+                await ProxyClient.close()
+    return summarize(name, latencies, elapsed)
+
+
+async def main(args) -> None:
+    with fake_supervisorctl():
+        rows = [
+            await run_case("supervisorctl per request", supervisorctl_status, args, background=False),
+            await run_case("cached liveness", GatewayLiveness.check, args, background=True),
+        ]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
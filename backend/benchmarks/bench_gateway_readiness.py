@@ -0,0 +1,78 @@
+"""
+Benchmark: detected time-to-ready with the old 1-second polling loop vs the
+GatewayReadiness backoff wait.
+
+A fake gateway binds its port after a random boot delay; each strategy waits
+for it and the reported overhead is detection time minus the actual boot time.
+
+    cd backend && python -m benchmarks.bench_gateway_readiness --runs 10
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import time
+
+from benchmarks.common import print_table, summarize
+from benchmarks.fake_gateway import FakeGateway
+
+from gateway_readiness import GatewayReadiness, http_ready
+from proxy_client import ProxyClient
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def sleep_poll(port: int) -> None:
+    """The previous loop: probe, then sleep a whole second."""
+    while not await http_ready(f"http://127.0.0.1:{port}/"):
+        await asyncio.sleep(1)
+
+
+async def backoff(port: int) -> None:
+    await GatewayReadiness.wait(port, timeout=30)
+
+
+async def measure(strategy, boot_delays) -> list:
+    overheads = []
+    for delay in boot_delays:
+        port = free_port()
+        gateway = FakeGateway(port=port)
+
+        async def boot():
+            await asyncio.sleep(delay)
+            await gateway.start()
+
+        start = time.perf_counter()
+        booting = asyncio.create_task(boot())
+        await strategy(port)
+        overheads.append(time.perf_counter() - start - delay)
+        await booting
+        await gateway.stop()
+    return overheads
+
+
+async def main(args) -> None:
+    rng = random.Random(args.seed)
+    boot_delays = [rng.uniform(0.1, args.max_boot) for _ in range(args.runs)]
+    rows = []
+    try:
+        for name, strategy in (("sleep(1) polling", sleep_poll), ("backoff", backoff)):
+            overheads = await measure(strategy, boot_delays)
+            rows.append(summarize(name, overheads, sum(overheads)))
+    finally:
+        await ProxyClient.close()
+    print("p50_ms/p99_ms: detection delay after the gateway actually came up")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-boot", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""
+Benchmark: per-request httpx.AsyncClient vs the shared pooled ProxyClient.
+
+Simulates Control UI page loads (index.html + many assets fetched with a
+browser-like per-host concurrency of 6) against a local fake gateway and reports
+requests/sec, p50/p99 latency and how many upstream TCP connections were opened.
+
+    cd backend && python -m benchmarks.bench_proxy_client --pages 20 --assets 40
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import Timer, print_table, summarize
+from benchmarks.fake_gateway import FakeGateway
+
+import httpx
+
+from proxy_client import ProxyClient
+
+
+async def fetch_fresh(url: str) -> None:
+    """Old behaviour: a new client (and connection pool) per request."""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, timeout=30.0)
+        response.read()
+
+
+async def fetch_pooled(url: str) -> None:
+    """New behaviour: the shared keep-alive client."""
+    response = await ProxyClient.get().get(url)
+    response.read()
+
+
+async def page_load(fetch, base_url: str, assets: int, latencies: list, per_host: int = 6) -> None:
+    semaphore = asyncio.Semaphore(per_host)
+
+    async def timed(url):
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch(url)
+            latencies.append(time.perf_counter() - start)
+
+    await timed(f"{base_url}/")
+    await asyncio.gather(*(timed(f"{base_url}/assets/chunk-{i}.js") for i in range(assets)))
+
+
+async def run_mode(name: str, fetch, args) -> dict:
+    async with FakeGateway(asset_size=args.asset_size) as gateway:
+        latencies = []
+        # Warm-up page load (not measured)
+        await page_load(fetch, gateway.base_url, args.assets, [])
+        gateway.connections = 0
+        with Timer() as timer:
+            for _ in range(args.pages):
+                await page_load(fetch, gateway.base_url, args.assets, latencies)
+        return summarize(name, latencies, timer.elapsed, upstream_connections=gateway.connections)
+
+
+async def main(args) -> None:
+    rows = [await run_mode("fresh client per request", fetch_fresh, args)]
+    ProxyClient.open()
+    try:
+        rows.append(await run_mode("shared pooled client", fetch_pooled, args))
+    finally:
+        await ProxyClient.close()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=20, help="page loads to measure")
+    parser.add_argument("--assets", type=int, default=40, help="assets per page load")
+    parser.add_argument("--asset-size", type=int, default=16384, help="bytes per asset")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+"""
+Benchmark: buffered vs streaming Control UI proxy.
+
+Serves server.app with uvicorn in-process in front of a local fake gateway and
+fetches assets of increasing size through /api/openclaw/ui/. Reports
+time-to-first-byte, total time and the peak Python heap growth (tracemalloc)
+while each response is in flight.
+
+    cd backend && python -m benchmarks.bench_proxy_streaming --sizes 1,16,64
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks.app_harness import patched_server, serve_app
+from benchmarks.common import print_table
+from benchmarks.fake_gateway import FakeGateway
+
+import httpx
+
+from proxy_client import ProxyClient
+
+
+async def fetch_once(client: httpx.AsyncClient, url: str):
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    ttfb = None
+    received = 0
+    async with client.stream("GET", url) as response:
+        async for chunk in response.aiter_raw():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            received += len(chunk)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return ttfb or total, total, received, peak - baseline
+
+
+async def run_case(size_mb: int, streaming: bool) -> dict:
+    async with FakeGateway(asset_size=size_mb * 1024 * 1024) as gateway:
+        with patched_server(gateway.port, PROXY_STREAMING=streaming):
+            async with serve_app() as base_url:
+                async with httpx.AsyncClient(timeout=120) as client:
+                    url = f"{base_url}/api/openclaw/ui/assets/bundle.js"
+                    await fetch_once(client, url)  # warm-up
+                    ttfb, total, received, peak = await fetch_once(client, url)
+                await ProxyClient.close()
+    return {
+        "mode": "streaming" if streaming else "buffered",
+        "asset_mb": size_mb,
+        "ttfb_ms": round(ttfb * 1000, 2),
+        "total_ms": round(total * 1000, 2),
+        "received_mb": round(received / 1024 / 1024, 2),
+        "peak_heap_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+async def main(args) -> None:
+    tracemalloc.start()
+    rows = []
+    for size in args.sizes:
+        for streaming in (False, True):
+            rows.append(await run_case(size, streaming))
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[1, 16, 64],
+                        help="comma-separated asset sizes in MB")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""
+Benchmark: session -> user -> instance-owner resolution against a local mongod.
+
+Compares the old path (three sequential find_one calls: session, user,
+instance owner) with the single aggregation used by load_session, with and
+without the owner memo. Seeds a throwaway database and drops it afterwards.
+Requires a reachable MongoDB (MONGO_URL, default mongodb://127.0.0.1:27017).
+
+    cd backend && python -m benchmarks.bench_session_lookup --iterations 2000
+"""
+
+import argparse
+import asyncio
+import os
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.app_harness import server
+from benchmarks.common import Timer, print_table, summarize
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+async def seed(db) -> str:
+    token = secrets.token_hex(32)
+    now = datetime.now(timezone.utc)
+    await db.users.insert_one({"user_id": "user_bench", "email": "bench@example.com", "name": "Bench", "created_at": now})
+    await db.user_sessions.insert_one({
+        "user_id": "user_bench", "session_token": token,
+        "expires_at": now + timedelta(days=1), "created_at": now,
+    })
+    await db.instance_config.insert_one({"_id": "instance_owner", "user_id": "user_bench", "email": "bench@example.com"})
+    await db.user_sessions.create_index("session_token", unique=True)
+    await db.users.create_index("user_id", unique=True)
+    return token
+
+
+async def three_queries(db, token):
+    session_doc = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
+    await db.users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
+    await db.instance_config.find_one({"_id": "instance_owner"})
+
+
+async def aggregation_with_owner(db, token):
+    await db.user_sessions.aggregate(server.session_lookup_pipeline(token, include_owner=True)).to_list(length=1)
+
+
+async def aggregation_memoized_owner(db, token):
+    await db.user_sessions.aggregate(server.session_lookup_pipeline(token, include_owner=False)).to_list(length=1)
+
+
+async def run_case(name, fn, db, token, iterations) -> dict:
+    for _ in range(20):  # warm-up
+        await fn(db, token)
+    latencies = []
+    with Timer() as timer:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await fn(db, token)
+            latencies.append(time.perf_counter() - start)
+    return summarize(name, latencies, timer.elapsed)
+
+
+async def main(args) -> None:
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://127.0.0.1:27017"))
+    db = client[f"bench_session_lookup_{secrets.token_hex(4)}"]
+    try:
+        token = await seed(db)
+        rows = [
+            await run_case("3x find_one", three_queries, db, token, args.iterations),
+            await run_case("aggregation (+owner)", aggregation_with_owner, db, token, args.iterations),
+            await run_case("aggregation (owner memo)", aggregation_memoized_owner, db, token, args.iterations),
+        ]
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
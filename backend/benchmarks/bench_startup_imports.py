@@ -0,0 +1,96 @@
+"""
+Benchmark: cold import time of server.py, per module.
+
+Each run imports the backend in a fresh interpreter with `python -X importtime`
+(ENSURE_PLAYWRIGHT_BROWSERS=false, so no browser install runs) and reports
+the cumulative import time of every backend module and the slowest
+third-party packages, as the median over the runs. The "with scraper" case
+also imports fb_scraper, which is what every cold start paid before the
+scraper routes imported it lazily.
+
+    cd backend && python -m benchmarks.bench_startup_imports --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BACKEND_DIR, print_table
+
+CASES = {
+    "server only": "import server",
+    "with scraper": "import server, fb_scraper",
+}
+
+
+def backend_modules() -> set:
+    return {name[:-3] for name in os.listdir(BACKEND_DIR) if name.endswith(".py")}
+
+
+def import_times(statement: str) -> tuple:
+    """Run one cold import; returns (wall seconds, {module: cumulative seconds}, playwright loaded)."""
+    env = {**os.environ, "ENSURE_PLAYWRIGHT_BROWSERS": "false"}
+    env.setdefault("MONGO_URL", "mongodb://127.0.0.1:27017")
+    code = f"{statement}; import sys; print('playwright' in sys.modules)"
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - start
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        # Keep top-level packages and backend modules only
+        if "." not in name:
+            times[name] = max(times.get(name, 0.0), int(cumulative) / 1e6)
+    return wall, times, result.stdout.strip().endswith("True")
+
+
+def main(args) -> None:
+    own = backend_modules()
+    summary = []
+    for case, statement in CASES.items():
+        runs = [import_times(statement) for _ in range(args.runs)]
+        walls = [wall for wall, _, _ in runs]
+        modules = {}
+        for _, times, _ in runs:
+            for name, seconds in times.items():
+                modules.setdefault(name, []).append(seconds)
+        medians = {name: statistics.median(values) for name, values in modules.items()}
+
+        summary.append({
+            "name": case,
+            "interpreter_ms": round(statistics.median(walls) * 1000, 1),
+            "server_ms": round(medians.get("server", 0.0) * 1000, 1),
+            "fb_scraper_ms": round(medians.get("fb_scraper", 0.0) * 1000, 1),
+            "playwright_loaded": runs[0][2],
+        })
+
+        print(f"\n{case}: backend modules (cumulative, median of {args.runs})")
+        rows = [{"module": name, "ms": round(seconds * 1000, 2)}
+                for name, seconds in sorted(medians.items(), key=lambda item: -item[1]) if name in own]
+        print_table(rows)
+
+        print(f"\n{case}: slowest third-party packages")
+        rows = [{"package": name, "ms": round(seconds * 1000, 2)}
+                for name, seconds in sorted(medians.items(), key=lambda item: -item[1])
+                if name not in own][:args.top]
+        print_table(rows)
+
+    print()
+    print_table(summary)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    main(parser.parse_args())
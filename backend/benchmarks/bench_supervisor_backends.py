@@ -0,0 +1,73 @@
+"""
+Benchmark: cost of one supervisor status query per backend.
+
+Compares the `supervisorctl` CLI backend (a fake Python supervisorctl on PATH)
+with the blocking and asyncio XML-RPC backends talking to the local fake
+supervisord over a unix socket.
+
+    cd backend && python -m benchmarks.bench_supervisor_backends --calls 200
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import print_table, summarize
+from benchmarks.fake_supervisord import FakeSupervisord, fake_supervisorctl
+
+import supervisor_client
+import supervisor_rpc
+from supervisor_client import SupervisorClient
+from supervisor_rpc import AsyncSupervisorRPC, SupervisorRPC
+
+
+def time_sync(name: str, fn, calls: int) -> dict:
+    latencies = []
+    start_all = time.perf_counter()
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(name, latencies, time.perf_counter() - start_all)
+
+
+async def time_async(name: str, fn, calls: int) -> dict:
+    latencies = []
+    start_all = time.perf_counter()
+    for _ in range(calls):
+        start = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(name, latencies, time.perf_counter() - start_all)
+
+
+def main(args) -> None:
+    rows = []
+    program = SupervisorClient.PROGRAM
+
+    with fake_supervisorctl():
+        supervisor_client.SUPERVISOR_BACKEND = "cli"
+        rows.append(time_sync("cli (supervisorctl)", SupervisorClient.status, min(args.calls, 50)))
+
+    with FakeSupervisord() as fake:
+        fake.programs[program]["state"] = "RUNNING"
+        supervisor_rpc.SUPERVISOR_SOCKET = fake.socket_path
+        supervisor_client.SUPERVISOR_BACKEND = "xmlrpc"
+        rows.append(time_sync("xmlrpc (blocking)", SupervisorClient.status, args.calls))
+        SupervisorRPC.close()
+
+        async def run_async():
+            try:
+                return await time_async("xmlrpc (asyncio)", lambda: AsyncSupervisorRPC.status(program), args.calls)
+            finally:
+                await AsyncSupervisorRPC.close()
+
+        rows.append(asyncio.run(run_async()))
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=200, help="status calls per backend (CLI capped at 50)")
+    main(parser.parse_args())
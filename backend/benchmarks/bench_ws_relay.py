@@ -0,0 +1,116 @@
+"""
+Benchmark: WebSocket relay throughput through /api/openclaw/ws.
+
+A local echo server stands in for the gateway. The client pipelines N messages
+of a given size and reads N echoes back; messages/sec and MB/sec are reported
+for a direct connection to the echo server (ceiling), the previous per-frame
+relay loop, and WebSocketRelay.
+
+    cd backend && python -m benchmarks.bench_ws_relay --messages 20000 --size 1024
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.app_harness import patched_server, serve_app
+from benchmarks.common import print_table
+from benchmarks.fake_ws_gateway import FakeWsGateway
+
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from ws_relay import WebSocketRelay
+
+
+class PerFrameRelay:
+    """The relay loop websocket_proxy used before WebSocketRelay (for comparison)."""
+
+    def __init__(self, client, upstream):
+        self.client = client
+        self.upstream = upstream
+
+    async def run(self) -> None:
+        async def client_to_moltbot():
+            while True:
+                try:
+                    data = await self.client.receive()
+                    if data["type"] == "websocket.receive":
+                        if "text" in data and data["text"] is not None:
+                            await self.upstream.send(data["text"])
+                        elif "bytes" in data:
+                            await self.upstream.send(data["bytes"])
+                    elif data["type"] == "websocket.disconnect":
+                        break
+                except WebSocketDisconnect:
+                    break
+
+        async def moltbot_to_client():
+            try:
+                async for message in self.upstream:
+                    if self.client.client_state == WebSocketState.CONNECTED:
+                        if isinstance(message, str):
+                            await self.client.send_text(message)
+                        else:
+                            await self.client.send_bytes(message)
+            except ConnectionClosed:
+                pass
+
+        tasks = [asyncio.create_task(client_to_moltbot()), asyncio.create_task(moltbot_to_client())]
+        _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+
+
+async def pump(url: str, messages: int, size: int, binary: bool) -> float:
+    payload = b"x" * size if binary else "x" * size
+    async with connect(url, max_size=None) as ws:
+        await ws.send(payload)  # warm-up round trip
+        await ws.recv()
+
+        async def sender():
+            for _ in range(messages):
+                await ws.send(payload)
+
+        start = time.perf_counter()
+        send_task = asyncio.create_task(sender())
+        for _ in range(messages):
+            await ws.recv()
+        elapsed = time.perf_counter() - start
+        await send_task
+    return elapsed
+
+
+def row(name: str, messages: int, size: int, elapsed: float) -> dict:
+    return {
+        "name": name,
+        "messages": messages,
+        "size_b": size,
+        "elapsed_s": round(elapsed, 3),
+        "msg_per_s": round(messages / elapsed, 1),
+        "mb_per_s": round(messages * size / elapsed / 1e6, 2),
+    }
+
+
+async def main(args) -> None:
+    binary = not args.text
+    rows = []
+    async with FakeWsGateway() as gateway:
+        elapsed = await pump(gateway.url, args.messages, args.size, binary)
+        rows.append(row("direct (no proxy)", args.messages, args.size, elapsed))
+        for name, relay_cls in (("per-frame relay", PerFrameRelay), ("WebSocketRelay", WebSocketRelay)):
+            with patched_server(gateway.port, WebSocketRelay=relay_cls):
+                async with serve_app() as base_url:
+                    url = base_url.replace("http://", "ws://") + "/api/openclaw/ws"
+                    elapsed = await pump(url, args.messages, args.size, binary)
+            rows.append(row(name, args.messages, args.size, elapsed))
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--text", action="store_true", help="send text frames instead of binary")
+    asyncio.run(main(parser.parse_args()))
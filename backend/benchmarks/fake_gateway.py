@@ -0,0 +1,185 @@
+"""
+Lightweight stand-in for the clawdbot gateway used by the benchmarks.
+
+Serves a minimal HTTP/1.1 keep-alive endpoint on 127.0.0.1:
+    /               -> small HTML page with a </head> tag (with an optional ETag
+                       honoured by If-None-Match)
+    /assets/<name>  -> opaque asset bytes of a configurable size (with optional
+                       extra response headers, e.g. Cache-Control)
+    /echo           -> the request body, echoed back
+Anything else returns 404. A request with `Upgrade: websocket` (any path) is
+accepted as a WebSocket that echoes every frame back, so one FakeGateway can
+stand in for both halves of the gateway. The number of accepted TCP
+connections is tracked so benchmarks can show connection reuse.
+"""
+
+import asyncio
+
+from websockets.frames import Opcode
+from websockets.server import ServerProtocol
+
+
+INDEX_HTML = (
+    b"<!doctype html><html><head><title>Control UI</title>"
+    b"<link rel=\"stylesheet\" href=\"/assets/index.css\"></head>"
+    b"<body><div id=\"app\"></div><script src=\"/assets/index.js\"></script></body></html>"
+)
+
+
+class FakeGateway:
+    """Minimal asyncio HTTP server imitating the gateway's Control UI."""
+
+    WRITE_CHUNK = 64 * 1024
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, asset_size: int = 16384,
+                 latency: float = 0.0, html_etag: str | None = None, asset_headers: dict | None = None):
+        self.host = host
+        self.port = port
+        self.asset_body = b"x" * asset_size
+        self.latency = latency
+        self.html_etag = html_etag
+        self.asset_headers = asset_headers or {}
+        self.connections = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.ws_connections = 0
+        self.ws_messages = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "FakeGateway":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def route(self, method: str, path: str, body: bytes = b""):
+        """Return (status, content_type, body) for a request."""
+        path = path.split("?", 1)[0]
+        if path == "/echo":
+            return 200, "application/octet-stream", body
+        if path == "/":
+            return 200, "text/html; charset=utf-8", INDEX_HTML
+        if path.startswith("/assets/"):
+            content_type = "text/css" if path.endswith(".css") else "application/javascript"
+            return 200, content_type, self.asset_body
+        return 404, "text/plain", b"not found"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                request_body = b""
+                length = int(headers.get("content-length", "0") or 0)
+                if length:
+                    request_body = await reader.readexactly(length)
+                elif headers.get("transfer-encoding", "").lower() == "chunked":
+                    request_body = await self._read_chunked(reader)
+
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._serve_websocket(reader, writer, head)
+                    break
+
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                status, content_type, body = self.route(method, path, request_body)
+                extra = ""
+                if self.html_etag and content_type.startswith("text/html"):
+                    extra = f"ETag: {self.html_etag}\r\n"
+                    if headers.get("if-none-match") == self.html_etag:
+                        status, body = 304, b""
+                        self.not_modified += 1
+                if path.startswith("/assets/"):
+                    extra += "".join(f"{name}: {value}\r\n" for name, value in self.asset_headers.items())
+                close = headers.get("connection", "").lower() == "close"
+                reason = {200: "OK", 304: "Not Modified"}.get(status, "Not Found")
+                response_head = (
+                    f"HTTP/1.1 {status} {reason}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"{extra}"
+                    f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n"
+                ).encode("latin-1")
+                writer.write(response_head)
+                if method != "HEAD":
+                    # Write in slices so large bodies are paced by the reader
+                    view = memoryview(body)
+                    for offset in range(0, len(view), self.WRITE_CHUNK):
+                        writer.write(view[offset:offset + self.WRITE_CHUNK])
+                        await writer.drain()
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                               head: bytes) -> None:
+        """Complete the handshake for an upgrade request and echo frames until closed."""
+        self.ws_connections += 1
+        protocol = ServerProtocol(max_size=None)
+        protocol.receive_data(head)
+        request = protocol.events_received()[0]
+        protocol.send_response(protocol.accept(request))
+        while True:
+            for data in protocol.data_to_send():
+                if data:
+                    writer.write(data)
+            await writer.drain()
+            if protocol.close_expected():
+                return
+            data = await reader.read(self.WRITE_CHUNK)
+            if not data:
+                protocol.receive_eof()
+                return
+            protocol.receive_data(data)
+            for frame in protocol.events_received():
+                # Pings and the closing handshake are answered by the protocol itself
+                if frame.opcode == Opcode.TEXT:
+                    protocol.send_text(frame.data, fin=frame.fin)
+                elif frame.opcode == Opcode.BINARY:
+                    protocol.send_binary(frame.data, fin=frame.fin)
+                elif frame.opcode == Opcode.CONT:
+                    protocol.send_continuation(frame.data, fin=frame.fin)
+                else:
+                    continue
+                if frame.fin:
+                    self.ws_messages += 1
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        body = bytearray()
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            chunk = await reader.readexactly(size + 2)
+            if size == 0:
+                return bytes(body)
+            body += chunk[:-2]
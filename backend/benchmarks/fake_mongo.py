@@ -0,0 +1,349 @@
+"""
+In-memory stand-in for the Motor database used by server.py.
+
+Implements the subset of AsyncIOMotorDatabase/Collection the backend calls
+(find_one, find, insert_one, update_one/update_many, find_one_and_update, delete_one,
+count_documents, aggregate, index management) with the query operators and
+aggregation stages it uses, so the app can be driven end to end without a
+mongod. An optional `latency` (seconds) is awaited on every operation to
+imitate a network round trip.
+
+    db = TimedDatabase(FakeMongoDatabase(latency=0.0005))
+"""
+
+import asyncio
+import copy
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+_MISSING = object()
+
+
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _compare(value, op: str, operand) -> bool:
+    if op == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if op == "$in":
+        return value is not _MISSING and value in operand
+    if op == "$nin":
+        return value is _MISSING or value not in operand
+    if op == "$ne":
+        return value is _MISSING or value != operand
+    if op == "$eq":
+        return value is not _MISSING and value == operand
+    if value is _MISSING or value is None:
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    raise NotImplementedError(f"FakeMongo does not support {op}")
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    """Whether a document matches a find() filter."""
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            value = _get(doc, key)
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        else:
+            value = _get(doc, key)
+            if value is _MISSING or (value != condition and not (isinstance(value, list) and condition in value)):
+                return False
+    return True
+
+
+def _evaluate(doc: dict, expression):
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1:
+        (op, args), = expression.items()
+        if op == "$arrayElemAt":
+            array, index = (_evaluate(doc, arg) for arg in args)
+            try:
+                return array[index]
+            except (IndexError, TypeError):
+                return _MISSING
+    return expression
+
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    """Apply a find()/$project projection (inclusion, exclusion or expressions)."""
+    if not projection:
+        return copy.deepcopy(doc)
+    include_id = projection.get("_id", 1) not in (0, False)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if all(v in (0, False) for v in fields.values()):
+        result = {k: copy.deepcopy(v) for k, v in doc.items() if k not in fields}
+        if not include_id:
+            result.pop("_id", None)
+        return result
+
+    result = {}
+    if include_id and "_id" in doc:
+        result["_id"] = doc["_id"]
+    for key, spec in fields.items():
+        value = _get(doc, key) if spec in (1, True) else _evaluate(doc, spec)
+        if value is not _MISSING:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+def _parent(doc: dict, path: str):
+    """The (sub)document holding a dotted path's last field, created as needed."""
+    *parents, field = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    return doc, field
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool) -> None:
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for key, value in fields.items():
+            target, field = _parent(doc, key)
+            if op in ("$set", "$setOnInsert"):
+                target[field] = copy.deepcopy(value)
+            elif op == "$unset":
+                target.pop(field, None)
+            elif op == "$inc":
+                target[field] = target.get(field, 0) + value
+            elif op == "$max":
+                target[field] = max(target[field], value) if field in target else value
+            elif op == "$push":
+                target.setdefault(field, []).append(copy.deepcopy(value))
+            else:
+                raise NotImplementedError(f"FakeMongo does not support {op}")
+
+
+class FakeCursor:
+    """Result of find()/aggregate(): sort/skip/limit, then to_list or async iteration."""
+
+    def __init__(self, docs: List[dict], latency: float):
+        self._docs = docs
+        self._latency = latency
+
+    def sort(self, key, direction: int = 1) -> "FakeCursor":
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            def sort_key(doc, field=field):
+                value = _get(doc, field)
+                # Missing fields sort first, like MongoDB's null
+                return (0, 0) if value is _MISSING or value is None else (1, value)
+            self._docs.sort(key=sort_key, reverse=order < 0)
+        return self
+
+    def skip(self, count: int) -> "FakeCursor":
+        self._docs = self._docs[count:]
+        return self
+
+    def limit(self, count: int) -> "FakeCursor":
+        if count:
+            self._docs = self._docs[:count]
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        return self._docs[:length] if length else list(self._docs)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.to_list():
+            yield doc
+
+
+class FakeMongoCollection:
+    """One collection: a list of documents scanned linearly."""
+
+    def __init__(self, database: "FakeMongoDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.docs: List[dict] = []
+        self.indexes: Dict[str, dict] = {"_id_": {"key": [("_id", 1)]}}
+        self.operations = 0
+
+    async def _round_trip(self) -> None:
+        self.operations += 1
+        if self.database.latency:
+            await asyncio.sleep(self.database.latency)
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None, **kwargs):
+        await self._round_trip()
+        for doc in self.docs:
+            if matches(doc, query):
+                return project(doc, projection)
+        return None
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> FakeCursor:
+        self.operations += 1
+        docs = [project(doc, projection) for doc in self.docs if matches(doc, query)]
+        return FakeCursor(docs, self.database.latency)
+
+    async def count_documents(self, query: Optional[dict] = None, **kwargs) -> int:
+        await self._round_trip()
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    async def insert_one(self, document: dict, **kwargs):
+        await self._round_trip()
+        document.setdefault("_id", ObjectId())
+        self.docs.append(copy.deepcopy(document))
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+
+    def _upsert(self, query: dict, update: dict) -> dict:
+        doc = {k: copy.deepcopy(v) for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        _apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        return doc
+
+    async def _update(self, query: dict, update: dict, upsert: bool, many: bool):
+        await self._round_trip()
+        matched = 0
+        for doc in self.docs:
+            if matches(doc, query):
+                _apply_update(doc, update, inserting=False)
+                matched += 1
+                if not many:
+                    break
+        upserted_id = None
+        if not matched and upsert:
+            upserted_id = self._upsert(query, update)["_id"]
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_id=upserted_id,
+                               acknowledged=True)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False, **kwargs):
+        return await self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query: dict, update: dict, upsert: bool = False, **kwargs):
+        return await self._update(query, update, upsert, many=True)
+
+    async def find_one_and_update(self, query: dict, update: dict, projection: Optional[dict] = None,
+                                  upsert: bool = False, return_document: bool = False, **kwargs):
+        """return_document is pymongo's ReturnDocument (False: before the update, True: after)."""
+        await self._round_trip()
+        for doc in self.docs:
+            if matches(doc, query):
+                before = project(doc, projection)
+                _apply_update(doc, update, inserting=False)
+                return project(doc, projection) if return_document else before
+        if upsert:
+            doc = self._upsert(query, update)
+            return project(doc, projection) if return_document else None
+        return None
+
+    async def delete_one(self, query: dict, **kwargs):
+        await self._round_trip()
+        for index, doc in enumerate(self.docs):
+            if matches(doc, query):
+                del self.docs[index]
+                return SimpleNamespace(deleted_count=1, acknowledged=True)
+        return SimpleNamespace(deleted_count=0, acknowledged=True)
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> FakeCursor:
+        """$match, $limit, $skip, $project and $lookup (localField/foreignField or a $match pipeline)."""
+        self.operations += 1
+        docs = [copy.deepcopy(doc) for doc in self.docs]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif name == "$limit":
+                docs = docs[:spec]
+            elif name == "$skip":
+                docs = docs[spec:]
+            elif name == "$project":
+                docs = [project(doc, spec) for doc in docs]
+            elif name == "$lookup":
+                foreign = self.database[spec["from"]]
+                for doc in docs:
+                    if "localField" in spec:
+                        local = _get(doc, spec["localField"])
+                        joined = [copy.deepcopy(other) for other in foreign.docs
+                                  if local is not _MISSING and _get(other, spec["foreignField"]) == local]
+                    else:
+                        joined = [copy.deepcopy(other) for other in foreign.docs]
+                        for sub in spec.get("pipeline", []):
+                            (sub_name, sub_spec), = sub.items()
+                            if sub_name != "$match":
+                                raise NotImplementedError(f"FakeMongo $lookup does not support {sub_name}")
+                            joined = [d for d in joined if matches(d, sub_spec)]
+                    doc[spec["as"]] = joined
+            else:
+                raise NotImplementedError(f"FakeMongo does not support {name}")
+        return FakeCursor(docs, self.database.latency)
+
+    async def create_index(self, keys, name: Optional[str] = None, **kwargs) -> str:
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = name or "_".join(f"{field}_{order}" for field, order in keys)
+        self.indexes[name] = {"key": keys, **kwargs}
+        return name
+
+    async def create_indexes(self, models) -> List[str]:
+        names = []
+        for model in models:
+            document = model.document
+            options = {k: v for k, v in document.items() if k not in ("key", "name")}
+            names.append(await self.create_index(list(document["key"].items()), name=document["name"], **options))
+        return names
+
+    async def index_information(self) -> Dict[str, dict]:
+        return copy.deepcopy(self.indexes)
+
+
+class FakeMongoDatabase:
+    """Collections by name (db.users or db["users"]), created on first use."""
+
+    def __init__(self, name: str = "fake", latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self._collections: Dict[str, FakeMongoCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeMongoCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = FakeMongoCollection(self, name)
+        return collection
+
+    def __getattr__(self, name: str) -> FakeMongoCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, command, *args, **kwargs) -> Dict[str, Any]:
+        if command == "ping" or command == {"ping": 1}:
+            return {"ok": 1.0}
+        raise NotImplementedError(f"FakeMongo does not support command {command!r}")
+
+    def operations(self) -> int:
+        """Total operations across all collections."""
+        return sum(collection.operations for collection in self._collections.values())
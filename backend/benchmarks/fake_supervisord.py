@@ -0,0 +1,200 @@
+"""
+Local stand-in for supervisord's XML-RPC interface on a unix socket.
+
+Implements the subset of the `supervisor.*` namespace that SupervisorRPC and
+AsyncSupervisorRPC use, with supervisord's fault codes, over HTTP/1.1
+keep-alive. Programs are simulated in memory; `start_delay` makes
+startProcess/stopProcess take time like a real process transition. Runs in a
+background thread so both blocking and asyncio clients can use it.
+
+fake_supervisorctl() puts a stand-in `supervisorctl` script (a Python program,
+like the real one) first on PATH for benchmarking the CLI backend.
+"""
+
+import contextlib
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from xmlrpc.server import SimpleXMLRPCDispatcher, SimpleXMLRPCRequestHandler
+
+BAD_NAME = 10
+ALREADY_STARTED = 60
+NOT_RUNNING = 70
+ALREADY_ADDED = 90
+
+
+class _KeepAliveHandler(SimpleXMLRPCRequestHandler):
+    protocol_version = "HTTP/1.1"
+    rpc_paths = ("/RPC2",)
+    disable_nagle_algorithm = False  # TCP_NODELAY is not valid on unix sockets
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+        self.server.open_sockets.add(self.request)
+
+    def finish(self):
+        self.server.open_sockets.discard(self.request)
+        super().finish()
+
+    def address_string(self):
+        return "unix"
+
+
+class _UnixXMLRPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer, SimpleXMLRPCDispatcher):
+    daemon_threads = True
+
+    def __init__(self, path):
+        self.connections = 0
+        self.open_sockets = set()
+        self.logRequests = False
+        SimpleXMLRPCDispatcher.__init__(self, allow_none=True, encoding=None)
+        socketserver.UnixStreamServer.__init__(self, path, _KeepAliveHandler)
+
+
+class FakeSupervisord:
+    """In-memory supervisord exposing XML-RPC on a temporary unix socket."""
+
+    def __init__(self, programs=("clawdbot-gateway",), start_delay: float = 0.0):
+        self._tmpdir = tempfile.mkdtemp(prefix="fake-supervisord-")
+        self.socket_path = os.path.join(self._tmpdir, "supervisor.sock")
+        self.start_delay = start_delay
+        self.programs = {name: {"state": "STOPPED", "pid": 0} for name in programs}
+        # What reloadConfig() reports on the next call: [added, changed, removed]
+        self.pending_config = [[], [], []]
+        self.calls = []
+        self._next_pid = 1000
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def connections(self) -> int:
+        return self._server.connections if self._server else 0
+
+    def start(self) -> "FakeSupervisord":
+        self._server = _UnixXMLRPCServer(self.socket_path)
+        for name in ("getState", "getProcessInfo", "startProcess", "stopProcess", "reloadConfig",
+                     "addProcessGroup", "removeProcessGroup", "stopProcessGroup"):
+            self._server.register_function(self._recording(name), f"supervisor.{name}")
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.rmdir(self._tmpdir)
+
+    def drop_connections(self) -> None:
+        """Close every client connection, as supervisord does with idle ones."""
+        for sock in list(self._server.open_sockets):
+            sock.shutdown(socket.SHUT_RDWR)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _recording(self, name):
+        method = getattr(self, f"_rpc_{name}")
+
+        def wrapper(*params):
+            self.calls.append(name)
+            return method(*params)
+        return wrapper
+
+    def _program(self, name):
+        if name not in self.programs:
+            raise xmlrpc.client.Fault(BAD_NAME, f"BAD_NAME: {name}")
+        return self.programs[name]
+
+    # ---- supervisor.* methods ----
+
+    def _rpc_getState(self):
+        return {"statecode": 1, "statename": "RUNNING"}
+
+    def _rpc_getProcessInfo(self, name):
+        program = self._program(name)
+        return {"name": name, "group": name, "statename": program["state"], "pid": program["pid"]}
+
+    def _rpc_startProcess(self, name, wait=True):
+        program = self._program(name)
+        if program["state"] == "RUNNING":
+            raise xmlrpc.client.Fault(ALREADY_STARTED, f"ALREADY_STARTED: {name}")
+        if self.start_delay:
+            time.sleep(self.start_delay)
+        with self._lock:
+            self._next_pid += 1
+            program.update(state="RUNNING", pid=self._next_pid)
+        return True
+
+    def _rpc_stopProcess(self, name, wait=True):
+        program = self._program(name)
+        if program["state"] != "RUNNING":
+            raise xmlrpc.client.Fault(NOT_RUNNING, f"NOT_RUNNING: {name}")
+        if self.start_delay:
+            time.sleep(self.start_delay)
+        program.update(state="STOPPED", pid=0)
+        return True
+
+    def _rpc_reloadConfig(self):
+        result, self.pending_config = self.pending_config, [[], [], []]
+        return [result]
+
+    def _rpc_addProcessGroup(self, name):
+        if name in self.programs:
+            raise xmlrpc.client.Fault(ALREADY_ADDED, f"ALREADY_ADDED: {name}")
+        self.programs[name] = {"state": "STOPPED", "pid": 0}
+        return True
+
+    def _rpc_removeProcessGroup(self, name):
+        self._program(name)
+        del self.programs[name]
+        return True
+
+    def _rpc_stopProcessGroup(self, name, wait=True):
+        program = self._program(name)
+        program.update(state="STOPPED", pid=0)
+        return []
+
+
+FAKE_SUPERVISORCTL = """#!{python}
+import sys, time
+time.sleep({delay})
+if len(sys.argv) > 1 and sys.argv[1] == "status":
+    print("clawdbot-gateway                 RUNNING   pid 4242, uptime 1:00:00")
+else:
+    print("clawdbot-gateway: " + " ".join(sys.argv[1:]))
+"""
+
+
+@contextlib.contextmanager
+def fake_supervisorctl(delay: float = 0.0):
+    """
+    Put a fake `supervisorctl` first on PATH. `status` always reports RUNNING;
+    every command sleeps `delay` seconds first (e.g. to mimic a slow restart).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "supervisorctl")
+        with open(path, "w") as f:
+            f.write(FAKE_SUPERVISORCTL.format(python=sys.executable, delay=delay))
+        os.chmod(path, 0o755)
+        old_path = os.environ.get("PATH", "")
+        os.environ["PATH"] = f"{tmp}{os.pathsep}{old_path}"
+        try:
+            yield
+        finally:
+            os.environ["PATH"] = old_path
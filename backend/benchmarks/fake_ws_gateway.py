@@ -0,0 +1,110 @@
+"""
+WebSocket stand-in for the clawdbot gateway.
+
+Echoes every message back with its original type (text stays text, binary
+stays binary). With `flood=(count, size)` it also pushes `count` binary frames
+of `size` bytes as soon as a client connects, which is how the benchmarks and
+tests produce a gateway that outpaces the browser.
+
+With `protocol=True` it speaks the gateway's JSON framing instead: each
+{"type": "req"} gets a {"type": "res"} with the same id (a hello for
+`connect`, the params echoed back otherwise), and broadcast() pushes an
+{"type": "event"} to every open connection. With `challenge=True` each
+connection starts with a connect.challenge event, as the real gateway's does,
+and setting `hello_ok = False` makes connect requests fail.
+"""
+
+import json
+
+import asyncio
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+
+class FakeWsGateway:
+    """Local websockets echo server on 127.0.0.1:<ephemeral>."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, flood: tuple | None = None,
+                 protocol: bool = False, challenge: bool = False):
+        self.host = host
+        self.port = port
+        self.flood = flood
+        self.protocol = protocol
+        self.challenge = challenge
+        self.hello_ok = True
+        self.open_connections = set()
+        self.connections = 0
+        self.received = 0
+        self.flood_sent = 0
+        self.headers = []
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/"
+
+    async def _handler(self, connection) -> None:
+        self.connections += 1
+        self.open_connections.add(connection)
+        self.headers.append(connection.request.headers)
+        flooder = None
+        if self.challenge:
+            await connection.send(json.dumps({"type": "event", "event": "connect.challenge",
+                                              "payload": {"nonce": f"n{self.connections}"}}))
+        if self.flood:
+            flooder = asyncio.create_task(self._flood(connection, *self.flood))
+        try:
+            async for message in connection:
+                self.received += 1
+                await connection.send(self._reply(message) if self.protocol else message)
+        except ConnectionClosed:
+            pass
+        finally:
+            self.open_connections.discard(connection)
+            if flooder is not None:
+                flooder.cancel()
+
+    def _reply(self, message):
+        if not isinstance(message, str) or not message.startswith("{"):
+            return message
+        request = json.loads(message)
+        if request.get("method") == "connect" and not self.hello_ok:
+            return json.dumps({"type": "res", "id": request.get("id"), "ok": False,
+                               "error": {"code": "UNAUTHORIZED", "message": "bad token"}})
+        if request.get("method") == "connect":
+            payload = {"type": "hello-ok", "connection": self.connections}
+        else:
+            payload = {"echo": request.get("params")}
+        return json.dumps({"type": "res", "id": request.get("id"), "ok": True, "payload": payload})
+
+    async def broadcast(self, event: str, payload=None) -> None:
+        frame = json.dumps({"type": "event", "event": event, "payload": payload})
+        for connection in list(self.open_connections):
+            await connection.send(frame)
+
+    async def _flood(self, connection, count: int, size: int) -> None:
+        payload = b"f" * size
+        try:
+            for _ in range(count):
+                await connection.send(payload)
+                self.flood_sent += 1
+        except ConnectionClosed:
+            pass
+
+    async def start(self) -> "FakeWsGateway":
+        self._server = await serve(self._handler, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
@@ -0,0 +1,150 @@
+"""
+Async, cached access to the small JSON/env files the backend manages.
+
+clawdbot.json, gateway.env and the WhatsApp creds.json used to be read and
+written with blocking open()/json calls on the event loop, and re-read on
+every use. ConfigStore keeps each parsed JSON file in memory keyed by its
+(mtime, size), so a repeat read is one stat() call; a changed file (e.g.
+rewritten by the gateway) is re-read off the event loop. Writes go to a
+temporary file in the same directory, get their permissions set, and are
+renamed over the target in a worker thread, so readers never see a partial
+file and secrets are never briefly world-readable.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def stat_key(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_json_file(path: str):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _read_text_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _atomic_write(path: str, content: str, mode: Optional[int]) -> Optional[Tuple[int, int]]:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        elif os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        else:
+            # mkstemp creates 0600 files; use the usual default for new files
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return stat_key(path)
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class ConfigStore:
+    """mtime-validated JSON cache with atomic, off-loop writes."""
+
+    # path -> ((mtime_ns, size), parsed JSON)
+    _cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+    hits = 0
+    misses = 0
+
+    @classmethod
+    async def read_json(cls, path: str, default: Any = None, mutable: bool = False) -> Any:
+        """
+        Parsed contents of a JSON file, or `default` if it is missing or invalid.
+
+        The returned object is shared with the cache: pass mutable=True to get
+        a private copy to modify (e.g. before write_json).
+        """
+        key = stat_key(str(path))
+        if key is None:
+            cls._cache.pop(str(path), None)
+            return default
+
+        entry = cls._cache.get(str(path))
+        if entry is not None and entry[0] == key:
+            cls.hits += 1
+            data = entry[1]
+        else:
+            cls.misses += 1
+            try:
+                data = await asyncio.to_thread(_read_json_file, str(path))
+            except FileNotFoundError:
+                return default
+            except (OSError, ValueError) as e:
+                logger.warning(f"[config-store] Could not read {path}: {e}")
+                return default
+            cls._cache[str(path)] = (key, data)
+        return copy.deepcopy(data) if mutable else data
+
+    @classmethod
+    async def write_json(cls, path: str, data: Any, indent: Optional[int] = None, mode: Optional[int] = None) -> None:
+        """Atomically replace a JSON file and update the cache."""
+        content = json.dumps(data, indent=indent)
+        key = await asyncio.to_thread(_atomic_write, str(path), content, mode)
+        if key is not None:
+            cls._cache[str(path)] = (key, copy.deepcopy(data))
+
+    @classmethod
+    async def read_text(cls, path: str) -> Optional[str]:
+        """Contents of a text file (not cached), or None if it does not exist."""
+        return await asyncio.to_thread(_read_text_file, str(path))
+
+    @classmethod
+    async def write_text(cls, path: str, content: str, mode: Optional[int] = None) -> None:
+        """Atomically replace a text file (not cached)."""
+        cls._cache.pop(str(path), None)
+        await asyncio.to_thread(_atomic_write, str(path), content, mode)
+
+    @classmethod
+    async def remove(cls, path: str) -> bool:
+        """Delete a file if it exists. Returns True if something was removed."""
+        cls._cache.pop(str(path), None)
+        return await asyncio.to_thread(_remove, str(path))
+
+    @classmethod
+    def invalidate(cls, path: Optional[str] = None) -> None:
+        """Forget one cached file, or all of them."""
+        if path is None:
+            cls._cache.clear()
+        else:
+            cls._cache.pop(str(path), None)
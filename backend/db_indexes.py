@@ -0,0 +1,102 @@
+"""
+MongoDB index bootstrap for the auth collections (and gateway pool allocations).
+
+Sessions are looked up by token and users by email and user_id on every
+login / authenticated request, and nothing used to expire old sessions. At
+startup ensure_indexes() creates the indexes those queries need plus a TTL
+index that lets mongod delete sessions once `expires_at` has passed, and
+check_indexes() reports declared indexes that are missing or have never been
+used since mongod started.
+"""
+
+import logging
+import os
+from typing import Dict, List
+
+from pymongo import ASCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Set to false to skip index creation at startup (e.g. when a DBA manages indexes)
+DB_INDEX_BOOTSTRAP = os.environ.get('DB_INDEX_BOOTSTRAP', 'true').lower() == 'true'
+
+# collection -> indexes the server relies on
+INDEXES: Dict[str, List[IndexModel]] = {
+    "user_sessions": [
+        IndexModel([("session_token", ASCENDING)], name="session_token_unique", unique=True),
+        # expireAfterSeconds=0: each session is removed once its own expires_at passes
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    # Pool gateways (gateway_pool.py): two workers must never allocate the same port
+    "gateway_pool": [
+        IndexModel([("port", ASCENDING)], name="port_unique", unique=True),
+    ],
+}
+
+
+async def ensure_indexes(db) -> List[str]:
+    """
+    Create the declared indexes (a no-op for ones that already exist).
+
+    Failures are logged per collection and never raised: an index that
+    conflicts with an existing one, or a unique index blocked by duplicate
+    data, must not stop the server from starting.
+    Returns the names of indexes that are in place.
+    """
+    created = []
+    for collection, models in INDEXES.items():
+        try:
+            created += await db[collection].create_indexes(models)
+        except Exception as e:
+            logger.error(f"[db-indexes] Could not create indexes on {collection}: {e}")
+    if created:
+        logger.info(f"[db-indexes] Indexes in place: {', '.join(created)}")
+    return created
+
+
+async def check_indexes(db) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Report declared indexes that are missing, and indexes with no recorded
+    use since mongod started ($indexStats), per collection.
+    """
+    report = {}
+    for collection, models in INDEXES.items():
+        missing, unused = [], []
+        try:
+            existing = await db[collection].index_information()
+            # Match on key pattern so an equivalent index under another name counts
+            existing_keys = [list(info["key"]) for info in existing.values()]
+            missing = [
+                model.document["name"] for model in models
+                if list(model.document["key"].items()) not in existing_keys
+            ]
+
+            stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(length=None)
+            for stat in stats:
+                name = stat["name"]
+                # TTL deletes are not counted as accesses, so a TTL index always looks idle
+                if name == "_id_" or "expireAfterSeconds" in existing.get(name, {}):
+                    continue
+                if stat.get("accesses", {}).get("ops", 0) == 0:
+                    unused.append(name)
+        except Exception as e:
+            logger.warning(f"[db-indexes] Could not inspect indexes on {collection}: {e}")
+            continue
+
+        report[collection] = {"missing": missing, "unused": sorted(unused)}
+        if missing:
+            logger.warning(f"[db-indexes] {collection}: missing indexes {missing}")
+        if unused:
+            logger.info(f"[db-indexes] {collection}: indexes unused since mongod start {sorted(unused)}")
+    return report
+
+
+async def bootstrap_indexes(db) -> Dict[str, Dict[str, List[str]]]:
+    """Startup step: create the declared indexes (unless disabled), then report on them."""
+    if DB_INDEX_BOOTSTRAP:
+        await ensure_indexes(db)
+    return await check_indexes(db)
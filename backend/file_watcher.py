@@ -0,0 +1,111 @@
+"""
+Change notifications for a single file, for background watchers.
+
+watch_file() is an async iterator that yields once per (debounced) change to a
+file, using inotify through watchfiles when it is installed and a cheap
+stat()-polling loop otherwise (or when inotify cannot be set up, e.g. the
+watch limit is exhausted). The file and its directory do not need to exist
+yet: the nearest existing ancestor is watched until they appear.
+
+A burst of writes (the gateway rewriting creds.json several times while it
+saves state) is collapsed into one notification once the file has been quiet
+for the debounce interval.
+"""
+
+import asyncio
+import logging
+import os
+from typing import AsyncIterator
+
+try:
+    from watchfiles import awatch
+except ImportError:  # polling only
+    awatch = None
+
+from config_store import stat_key
+
+logger = logging.getLogger(__name__)
+
+# Quiet period after the last write before a change is reported
+FILE_WATCH_DEBOUNCE_MS = int(os.environ.get('FILE_WATCH_DEBOUNCE_MS', '200'))
+# Interval between stat() calls when polling
+FILE_WATCH_POLL_INTERVAL = float(os.environ.get('FILE_WATCH_POLL_INTERVAL', '2.0'))
+# Set to true to poll even when inotify is available (e.g. network filesystems)
+FILE_WATCH_FORCE_POLLING = os.environ.get('FILE_WATCH_FORCE_POLLING', 'false').lower() == 'true'
+
+
+def _nearest_existing_dir(path: str) -> str:
+    directory = path
+    while not os.path.isdir(directory):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return directory
+
+
+async def _poll(path: str, debounce: float, interval: float) -> AsyncIterator[str]:
+    last = stat_key(path)
+    while True:
+        await asyncio.sleep(interval)
+        key = stat_key(path)
+        if key == last:
+            continue
+        # Wait for the writer to finish
+        while True:
+            await asyncio.sleep(debounce)
+            settled = stat_key(path)
+            if settled == key:
+                break
+            key = settled
+        last = key
+        yield path
+
+
+async def _inotify(path: str, debounce_ms: int) -> AsyncIterator[str]:
+    parent = os.path.dirname(path)
+    while True:
+        anchor = _nearest_existing_dir(parent)
+        direct = anchor == parent
+
+        def interesting(_change, changed: str) -> bool:
+            # The file itself, or (while its directory is missing) a directory on the way to it
+            return changed == path or (not direct and path.startswith(changed + os.sep))
+
+        async for changes in awatch(anchor, watch_filter=interesting, recursive=not direct,
+                                    debounce=debounce_ms, step=min(50, debounce_ms)):
+            if any(changed == path for _, changed in changes):
+                yield path
+            if not direct:
+                break
+        else:
+            # The watched directory went away; wait before re-anchoring
+            await asyncio.sleep(FILE_WATCH_POLL_INTERVAL)
+            continue
+
+        if os.path.exists(path):
+            # Created together with its directory: changes may predate the new watch
+            yield path
+
+
+async def watch_file(path, debounce_ms: int = None, poll_interval: float = None,
+                     force_polling: bool = None) -> AsyncIterator[str]:
+    """Yield the file's path each time it is created, modified or removed."""
+    path = os.path.abspath(str(path))
+    debounce_ms = FILE_WATCH_DEBOUNCE_MS if debounce_ms is None else debounce_ms
+    poll_interval = FILE_WATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+    force_polling = FILE_WATCH_FORCE_POLLING if force_polling is None else force_polling
+
+    if awatch is not None and not force_polling:
+        try:
+            logger.info(f"[file-watch] Watching {path} with inotify")
+            async for changed in _inotify(path, debounce_ms):
+                yield changed
+            return
+        except Exception as e:
+            # Whatever went wrong, polling still works; a dead watcher is never restarted
+            logger.warning(f"[file-watch] inotify failed for {path} ({e!r}), falling back to polling")
+
+    logger.info(f"[file-watch] Polling {path} every {poll_interval}s")
+    async for changed in _poll(path, debounce_ms / 1000, poll_interval):
+        yield changed
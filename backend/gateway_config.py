@@ -5,16 +5,17 @@ This module handles writing secrets (tokens, API keys) to an environment file
 that gets loaded by the supervised gateway wrapper script.
 """
 
-import os
 import stat
-from pathlib import Path
+
+from config_store import ConfigStore
 
 # Path to the gateway environment file
 GATEWAY_ENV_FILE = "/root/.clawdbot/gateway.env"
 GATEWAY_ENV_DIR = "/root/.clawdbot"
 
 
-def write_gateway_env(token: str, api_key: str = None, provider: str = "emergent") -> None:
+async def write_gateway_env(token: str, api_key: str = None, provider: str = "emergent",
+                            env_file: str = None, port: int = None) -> None:
     """
     Write secrets to env file before starting gateway.
 
@@ -25,10 +26,10 @@ def write_gateway_env(token: str, api_key: str = None, provider: str = "emergent
         token: The gateway authentication token
         api_key: Optional API key for the provider
         provider: The provider name ("emergent", "anthropic", or "openai")
+        env_file: File to write (GATEWAY_ENV_FILE by default)
+        port: Port the gateway should listen on, for a wrapper that passes
+            $CLAWDBOT_GATEWAY_PORT to --port (the standby gateway)
     """
-    # Ensure directory exists
-    os.makedirs(GATEWAY_ENV_DIR, exist_ok=True)
-
     # Build environment file content
     lines = [
         f'export CLAWDBOT_GATEWAY_TOKEN="{token}"',
@@ -42,21 +43,40 @@ def write_gateway_env(token: str, api_key: str = None, provider: str = "emergent
             lines.append(f'export OPENAI_API_KEY="{api_key}"')
         # For emergent provider, the API key is in the config file, not env var
 
-    # Write the file
+    if port is not None:
+        lines.append(f'export CLAWDBOT_GATEWAY_PORT="{port}"')
+
+    # Write the file atomically (creating the directory), readable only by owner
     content = "\n".join(lines) + "\n"
 
-    with open(GATEWAY_ENV_FILE, 'w') as f:
-        f.write(content)
+    await ConfigStore.write_text(env_file or GATEWAY_ENV_FILE, content, mode=stat.S_IRUSR | stat.S_IWUSR)  # 0o600
+
+
+async def copy_gateway_env(source: str, target: str, port: int = None) -> bool:
+    """
+    Copy a gateway env file (same token and keys) to another, setting the port.
+
+    Used to start a second gateway with the running one's settings.
+
+    Returns:
+        False if the source file does not exist.
+    """
+    content = await ConfigStore.read_text(source)
+    if content is None:
+        return False
+
+    lines = [line for line in content.splitlines() if line and "CLAWDBOT_GATEWAY_PORT=" not in line]
+    if port is not None:
+        lines.append(f'export CLAWDBOT_GATEWAY_PORT="{port}"')
 
-    # Set secure permissions (readable only by owner)
-    os.chmod(GATEWAY_ENV_FILE, stat.S_IRUSR | stat.S_IWUSR)  # 0o600
+    await ConfigStore.write_text(target, "\n".join(lines) + "\n", mode=stat.S_IRUSR | stat.S_IWUSR)  # 0o600
+    return True
 
 
-def clear_gateway_env() -> None:
+async def clear_gateway_env(env_file: str = None) -> None:
     """
     Clear the gateway environment file.
 
     Called when stopping the gateway to remove sensitive credentials.
     """
-    if os.path.exists(GATEWAY_ENV_FILE):
-        os.remove(GATEWAY_ENV_FILE)
+    await ConfigStore.remove(env_file or GATEWAY_ENV_FILE)
@@ -0,0 +1,126 @@
+"""
+In-process cache of the gateway's supervisor state.
+
+Hot paths (every proxied UI request, /openclaw/status polls, WebSocket
+connects) read the cached state in O(1). A background task refreshes it every
+GATEWAY_LIVENESS_TTL seconds without blocking the event loop, and start/stop/restart
+actions update it immediately, so no request ever forks supervisorctl.
+The state tracked is that of the active gateway slot (see gateway_upstream.py).
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from gateway_upstream import GatewayUpstream
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background refreshes (and max age before an awaited read refreshes)
+GATEWAY_LIVENESS_TTL = float(os.environ.get('GATEWAY_LIVENESS_TTL', '2'))
+
+
+class GatewayLiveness:
+    """Cached RUNNING/PID state of the supervised gateway process."""
+
+    _running: bool = False
+    _pid: int | None = None
+    _checked_at: float | None = None
+    _task: asyncio.Task | None = None
+
+    @classmethod
+    def _store(cls, pid: int | None) -> bool:
+        cls._pid = pid
+        cls._running = pid is not None
+        cls._checked_at = time.monotonic()
+        return cls._running
+
+    @classmethod
+    async def refresh(cls) -> bool:
+        """Query supervisor without blocking the event loop and update the cache."""
+        return cls._store(await GatewayUpstream.active().client.get_pid())
+
+    @classmethod
+    def _is_stale(cls) -> bool:
+        if cls._checked_at is None:
+            return True
+        refresher_alive = cls._task is not None and not cls._task.done()
+        return not refresher_alive and time.monotonic() - cls._checked_at > GATEWAY_LIVENESS_TTL
+
+    @classmethod
+    def is_running(cls) -> bool:
+        """
+        Whether the gateway is RUNNING, from cache only (never queries
+        supervisor; False until the first refresh). Use check() to refresh
+        a stale cache.
+        """
+        return cls._running
+
+    @classmethod
+    async def check(cls) -> bool:
+        """is_running, refreshing an empty or stale cache first (without blocking)."""
+        if cls._is_stale():
+            return await cls.refresh()
+        return cls._running
+
+    @classmethod
+    def get_pid(cls) -> int | None:
+        """PID of the running gateway, from cache only. Use current_pid() to refresh a stale cache."""
+        return cls._pid
+
+    @classmethod
+    async def current_pid(cls) -> int | None:
+        """get_pid, refreshing an empty or stale cache first (without blocking)."""
+        if cls._is_stale():
+            await cls.refresh()
+        return cls._pid
+
+    @classmethod
+    def mark_running(cls, running: bool) -> None:
+        """
+        Record a state change we caused (start/stop) without waiting for the
+        next refresh. The PID is filled in by the following refresh.
+        """
+        cls._running = running
+        if not running:
+            cls._pid = None
+        cls._checked_at = time.monotonic()
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """
+        Force a fresh supervisor query: right away in the background when the
+        refresher is running, otherwise on the next read.
+        """
+        if cls._task is not None and not cls._task.done():
+            asyncio.get_running_loop().create_task(cls.refresh())
+        else:
+            cls._checked_at = None
+
+    @classmethod
+    async def _refresh_loop(cls) -> None:
+        while True:
+            try:
+                await cls.refresh()
+            except Exception as e:
+                logger.warning(f"[gateway-liveness] Refresh failed: {e}")
+            await asyncio.sleep(GATEWAY_LIVENESS_TTL)
+
+    @classmethod
+    def start(cls) -> None:
+        """Start the background refresher (idempotent). Call from startup."""
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls._refresh_loop())
+            logger.info(f"[gateway-liveness] Background refresher started (ttl={GATEWAY_LIVENESS_TTL}s)")
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Stop the background refresher. Call from shutdown."""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
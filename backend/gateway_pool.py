@@ -0,0 +1,506 @@
+"""
+Many OpenClaw gateways on one host, one per user.
+
+The backend normally runs a single gateway (`clawdbot-gateway` on
+MOLTBOT_PORT) locked to the instance owner. With GATEWAY_POOL=true every user
+gets a gateway of their own instead, started the first time they open the
+Control UI (or call /openclaw/start). Each one is allocated:
+
+- a port counted up from GATEWAY_POOL_PORT_BASE, GATEWAY_POOL_PORT_STEP apart
+  (the gateway also listens on ports derived from its own),
+- a home directory GATEWAY_POOL_DIR/<program> holding its clawdbot.json,
+  channel credentials and workspace (HOME points there, so nothing is shared
+  with other users' gateways),
+- a supervisor program written to GATEWAY_POOL_SUPERVISOR_DIR, which
+  supervisord must include:
+
+    [include]
+    files = /etc/supervisor/conf.d/*.conf
+
+Allocations live in the gateway_pool collection, so ports stay stable across
+backend restarts and two workers never hand out the same one. Whether each
+gateway runs is kept there too: a worker trusts its own view of a gateway
+another worker may have evicted for at most GATEWAY_POOL_RUNNING_TTL seconds,
+and the running limit counts every worker's gateways. Each gateway has its own
+WhatsApp credentials under its home directory (PoolGateway.creds_file).
+
+A gateway with nothing in flight (no proxied request, no open WebSocket) for
+GATEWAY_POOL_IDLE_TIMEOUT seconds is stopped to free its memory, and at most
+GATEWAY_POOL_MAX_RUNNING run at once: starting one more first evicts the
+least recently used idle gateway. Files are kept, so the next visit simply
+starts it again. Gateways allocated/running and the resident memory of each
+are exported on /api/metrics.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+from config_store import ConfigStore
+from gateway_config import clear_gateway_env
+from gateway_readiness import GatewayReadiness
+from gateway_upstream import GatewaySlot
+from supervisor_client import AsyncSupervisorClient, SupervisorClient
+
+logger = logging.getLogger(__name__)
+
+# One gateway per user instead of the single owner-locked gateway
+GATEWAY_POOL = os.environ.get('GATEWAY_POOL', 'false').lower() == 'true'
+GATEWAY_POOL_PORT_BASE = int(os.environ.get('GATEWAY_POOL_PORT_BASE', '19000'))
+GATEWAY_POOL_PORT_STEP = int(os.environ.get('GATEWAY_POOL_PORT_STEP', '10'))
+# Gateways that can be allocated on this host (ports reserved)
+GATEWAY_POOL_SIZE = int(os.environ.get('GATEWAY_POOL_SIZE', '50'))
+# Gateways running at once; starting another evicts the least recently used idle one
+GATEWAY_POOL_MAX_RUNNING = int(os.environ.get('GATEWAY_POOL_MAX_RUNNING', '10'))
+# Seconds without requests or open WebSockets before a gateway is stopped
+GATEWAY_POOL_IDLE_TIMEOUT = float(os.environ.get('GATEWAY_POOL_IDLE_TIMEOUT', '900'))
+# Seconds between sweeps (idle eviction, supervisor state, memory readings)
+GATEWAY_POOL_SWEEP_INTERVAL = float(os.environ.get('GATEWAY_POOL_SWEEP_INTERVAL', '30'))
+# Seconds a worker trusts that a gateway it saw running was not stopped by another worker since
+GATEWAY_POOL_RUNNING_TTL = float(os.environ.get('GATEWAY_POOL_RUNNING_TTL', '2'))
+GATEWAY_POOL_DIR = os.environ.get('GATEWAY_POOL_DIR', '/root/.clawdbot/pool')
+GATEWAY_POOL_SUPERVISOR_DIR = os.environ.get('GATEWAY_POOL_SUPERVISOR_DIR', '/etc/supervisor/conf.d')
+GATEWAY_POOL_PROGRAM_PREFIX = os.environ.get('GATEWAY_POOL_PROGRAM_PREFIX', 'clawdbot-gateway-')
+
+PROGRAM_TEMPLATE = """[program:{program}]
+command=/bin/bash -c 'source {env_file} && exec {command} gateway --port "$CLAWDBOT_GATEWAY_PORT" --bind 127.0.0.1'
+directory={home}
+environment=HOME="{home}"
+autostart=false
+autorestart=true
+stopasgroup=true
+killasgroup=true
+redirect_stderr=true
+stdout_logfile={home}/gateway.log
+stdout_logfile_maxbytes=5MB
+stdout_logfile_backups=1
+"""
+
+STARTS_TOTAL = metrics.counter(
+    "openclaw_gateway_pool_starts_total", "Pool gateway starts by outcome", ("outcome",)
+)
+EVICTIONS_TOTAL = metrics.counter(
+    "openclaw_gateway_pool_evictions_total", "Pool gateways stopped to free memory, by reason", ("reason",)
+)
+
+
+class GatewayPoolError(Exception):
+    """A pool gateway could not be started."""
+
+
+class GatewayPoolFull(GatewayPoolError):
+    """No port, or no room to run another gateway, is free on this host."""
+
+
+def program_name(owner_user_id: str) -> str:
+    """Supervisor program of a user's gateway (readable, and unique per user ID)."""
+    slug = re.sub(r"[^a-z0-9]+", "-", owner_user_id.lower()).strip("-")[:32]
+    digest = hashlib.sha1(owner_user_id.encode()).hexdigest()[:8]
+    return f"{GATEWAY_POOL_PROGRAM_PREFIX}{slug}-{digest}"
+
+
+def settings_digest(provider: Optional[str], api_key: Optional[str]) -> str:
+    """Fingerprint of the settings a gateway was started with (the API key itself is not stored)."""
+    return hashlib.sha256(f"{provider or ''}:{api_key or ''}".encode()).hexdigest()
+
+
+def pool_ports() -> range:
+    return range(GATEWAY_POOL_PORT_BASE, GATEWAY_POOL_PORT_BASE + GATEWAY_POOL_SIZE * GATEWAY_POOL_PORT_STEP,
+                 GATEWAY_POOL_PORT_STEP)
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """Resident memory of a process in bytes (Linux /proc), None if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class PoolGateway(GatewaySlot):
+    """One user's gateway: its port, home directory and supervisor program."""
+
+    def __init__(self, owner_user_id: str, port: int, token: Optional[str] = None,
+                 provider: Optional[str] = None):
+        program = program_name(owner_user_id)
+        home = os.path.join(GATEWAY_POOL_DIR, program)
+        sync_client = type("PoolSupervisorClient", (SupervisorClient,), {"PROGRAM": program})
+        client = type("AsyncPoolSupervisorClient", (AsyncSupervisorClient,), {"PROGRAM": program})
+        super().__init__(program, port, os.path.join(home, "gateway.env"), sync_client, client)
+        self.owner_user_id = owner_user_id
+        self.home = home
+        self.config_file = os.path.join(home, ".clawdbot", "clawdbot.json")
+        self.workspace_dir = os.path.join(home, "clawd")
+        # HOME is the gateway's home, so its WhatsApp link lives under it
+        self.creds_file = os.path.join(home, ".clawdbot", "credentials", "whatsapp", "default", "creds.json")
+        self.program_file = os.path.join(GATEWAY_POOL_SUPERVISOR_DIR, f"{program}.conf")
+        self.token = token
+        self.provider = provider
+        # settings_digest() of the provider and API key of the last /openclaw/start
+        self.settings: Optional[str] = None
+        self.started_at: Optional[str] = None
+        # False once the owner stopped it: no lazy start until /openclaw/start
+        self.should_run: Optional[bool] = None
+        self.running = False
+        # When `running` was last read from (or written to) the database, monotonic
+        self.running_checked_at = 0.0
+        self.pid: Optional[int] = None
+        self.rss_bytes: Optional[int] = None
+        # Wall clock, so workers can compare it through the database
+        self.last_used = time.time()
+        self._last_used_saved = 0.0
+        self.lock = asyncio.Lock()
+
+    def touch(self) -> None:
+        self.last_used = time.time()
+
+    def release(self) -> None:
+        # The end of a request or WebSocket counts as activity too
+        super().release()
+        self.touch()
+
+    def idle_for(self, now: Optional[float] = None) -> float:
+        """Seconds since the last activity, 0 while anything is in flight."""
+        if self.in_flight > 0:
+            return 0.0
+        return (now or time.time()) - self.last_used
+
+
+# provision(gateway) writes the gateway's clawdbot.json and env file and
+# returns (token, provider); resolve_command() returns the clawdbot executable
+Provisioner = Callable[[PoolGateway], Awaitable[Tuple[str, str]]]
+CommandResolver = Callable[[], Awaitable[str]]
+
+
+class GatewayPool:
+    """The gateways allocated on this host, by owner user ID."""
+
+    _gateways: Dict[str, PoolGateway] = {}
+    _collection = None
+    _task: Optional[asyncio.Task] = None
+    _reload_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def bind(cls, collection) -> None:
+        """Keep allocations in `collection` (db.gateway_pool). Unbound, they are per-process."""
+        cls._collection = collection
+
+    @classmethod
+    def gateways(cls) -> List[PoolGateway]:
+        return list(cls._gateways.values())
+
+    @classmethod
+    def running(cls) -> List[PoolGateway]:
+        return [gateway for gateway in cls._gateways.values() if gateway.running]
+
+    @classmethod
+    def _remember(cls, doc: dict) -> PoolGateway:
+        gateway = cls._gateways.get(doc["_id"])
+        if gateway is None:
+            gateway = PoolGateway(doc["_id"], doc["port"], token=doc.get("token"), provider=doc.get("provider"))
+            # Last used through another worker, not when this one first heard of it
+            gateway.last_used = doc.get("last_used", gateway.last_used)
+            cls._gateways[doc["_id"]] = gateway
+        gateway.token = gateway.token or doc.get("token")
+        gateway.provider = gateway.provider or doc.get("provider")
+        gateway.started_at = gateway.started_at or doc.get("started_at")
+        gateway.settings = doc.get("settings", gateway.settings)
+        gateway.should_run = doc.get("should_run", gateway.should_run)
+        if "running" in doc:
+            gateway.running, gateway.running_checked_at = doc["running"], time.monotonic()
+        gateway.last_used = max(gateway.last_used, doc.get("last_used", 0))
+        return gateway
+
+    @classmethod
+    async def lookup(cls, owner_user_id: str) -> Optional[PoolGateway]:
+        """The user's gateway if one was allocated (by any worker), without allocating one."""
+        gateway = cls._gateways.get(owner_user_id)
+        if gateway is None and cls._collection is not None:
+            doc = await cls._collection.find_one({"_id": owner_user_id})
+            if doc is not None:
+                gateway = cls._remember(doc)
+        return gateway
+
+    @classmethod
+    async def allocate(cls, owner_user_id: str) -> PoolGateway:
+        """The user's gateway, allocating a port and program for it on first use."""
+        gateway = await cls.lookup(owner_user_id)
+        if gateway is not None:
+            return gateway
+
+        for _ in range(3):
+            if cls._collection is not None:
+                taken = {doc["port"] async for doc in cls._collection.find({}, {"port": 1})}
+            else:
+                taken = {g.port for g in cls._gateways.values()}
+            port = next((p for p in pool_ports() if p not in taken), None)
+            if port is None:
+                raise GatewayPoolFull(f"All {GATEWAY_POOL_SIZE} gateways on this host are allocated")
+
+            doc = {"_id": owner_user_id, "port": port, "program": program_name(owner_user_id),
+                   "created_at": datetime.now(timezone.utc), "last_used": time.time()}
+            if cls._collection is None:
+                return cls._remember(doc)
+            try:
+                await cls._collection.insert_one(doc)
+                logger.info(f"[gateway-pool] Allocated port {port} to {doc['program']}")
+                return cls._remember(doc)
+            except DuplicateKeyError:
+                # Another worker allocated this user, or took the port, first
+                existing = await cls._collection.find_one({"_id": owner_user_id})
+                if existing is not None:
+                    return cls._remember(existing)
+        raise GatewayPoolError("Could not allocate a gateway port")
+
+    @classmethod
+    async def _save_running(cls, gateway: PoolGateway) -> None:
+        """Share whether the gateway runs with the other workers."""
+        if cls._collection is not None:
+            await cls._collection.update_one({"_id": gateway.owner_user_id},
+                                             {"$set": {"running": gateway.running}})
+            gateway.running_checked_at = time.monotonic()
+
+    @classmethod
+    async def _still_running(cls, gateway: PoolGateway) -> bool:
+        """
+        Whether a gateway this worker saw running was not stopped by another worker since.
+
+        Re-read at most every GATEWAY_POOL_RUNNING_TTL seconds, so a burst of
+        proxied requests costs one query rather than one each.
+        """
+        if not gateway.running or cls._collection is None:
+            return gateway.running
+        now = time.monotonic()
+        if now - gateway.running_checked_at < GATEWAY_POOL_RUNNING_TTL:
+            return gateway.running
+        doc = await cls._collection.find_one({"_id": gateway.owner_user_id}, {"running": 1})
+        gateway.running_checked_at = now
+        if doc is not None and doc.get("running") is False:
+            gateway.running, gateway.pid, gateway.rss_bytes = False, None, None
+        return gateway.running
+
+    @classmethod
+    async def ensure_running(cls, owner_user_id: str, provision: Provisioner,
+                             resolve_command: CommandResolver) -> PoolGateway:
+        """The user's gateway, started (and allocated) first if it is not running."""
+        gateway = await cls.allocate(owner_user_id)
+        gateway.touch()
+        if await cls._still_running(gateway):
+            return gateway
+        async with gateway.lock:
+            if gateway.running:
+                return gateway
+            # Another worker may have started it
+            pid = await gateway.client.get_pid()
+            if pid is not None:
+                gateway.running, gateway.pid = True, pid
+                await cls._save_running(gateway)
+                return gateway
+            await cls._start(gateway, provision, resolve_command)
+        return gateway
+
+    @classmethod
+    async def restart(cls, owner_user_id: str, provision: Provisioner,
+                      resolve_command: CommandResolver, settings: Optional[str] = None) -> PoolGateway:
+        """
+        (Re)start the user's gateway with freshly provisioned settings (/openclaw/start).
+
+        With `settings` (a settings_digest()), a gateway already running with
+        the same settings is left running.
+        """
+        gateway = await cls.allocate(owner_user_id)
+        gateway.touch()
+        async with gateway.lock:
+            if settings is not None and settings == gateway.settings and await cls._still_running(gateway):
+                return gateway
+            if gateway.running or await gateway.client.status():
+                await gateway.client.stop()
+                gateway.running = False
+                await cls._save_running(gateway)
+            await cls._start(gateway, provision, resolve_command, settings)
+        return gateway
+
+    @classmethod
+    async def _start(cls, gateway: PoolGateway, provision: Provisioner, resolve_command: CommandResolver,
+                     settings: Optional[str] = None) -> None:
+        await cls._make_room(gateway)
+
+        gateway.token, gateway.provider = await provision(gateway)
+        await cls._write_program(gateway, await resolve_command())
+
+        logger.info(f"[gateway-pool] Starting {gateway.name} on port {gateway.port}...")
+        if not await gateway.client.start():
+            STARTS_TOTAL.inc(1, "failed")
+            raise GatewayPoolError(f"Failed to start {gateway.name} via supervisor")
+        ready = await GatewayReadiness.wait(gateway.port, alive=gateway.client.status)
+        if ready is None:
+            await gateway.client.stop()
+            STARTS_TOTAL.inc(1, "failed")
+            raise GatewayPoolError(f"{gateway.name} did not become ready in time")
+
+        gateway.running = gateway.should_run = True
+        gateway.running_checked_at = time.monotonic()
+        gateway.settings = settings or gateway.settings
+        gateway.pid = await gateway.client.get_pid()
+        gateway.started_at = datetime.now(timezone.utc).isoformat()
+        gateway.touch()
+        STARTS_TOTAL.inc(1, "started")
+        logger.info(f"[gateway-pool] {gateway.name} ready after {ready * 1000:.0f}ms "
+                    f"({len(cls.running())} running)")
+        if cls._collection is not None:
+            await cls._collection.update_one(
+                {"_id": gateway.owner_user_id},
+                {"$set": {"token": gateway.token, "provider": gateway.provider, "settings": gateway.settings,
+                          "should_run": True, "running": True, "started_at": gateway.started_at,
+                          "last_used": gateway.last_used}},
+            )
+
+    @classmethod
+    async def _make_room(cls, gateway: PoolGateway) -> None:
+        """Evict least recently used idle gateways until another one may run."""
+        if cls._collection is not None:
+            # Gateways other workers started (or stopped) count too
+            async for doc in cls._collection.find({}):
+                cls._remember(doc)
+        others = [g for g in cls.running() if g is not gateway]
+        excess = len(others) - GATEWAY_POOL_MAX_RUNNING + 1
+        if excess <= 0:
+            return
+        idle = sorted((g for g in others if g.in_flight <= 0), key=lambda g: g.last_used)
+        if len(idle) < excess:
+            raise GatewayPoolFull(f"All {GATEWAY_POOL_MAX_RUNNING} running gateways are in use")
+        for victim in idle[:excess]:
+            await cls.evict(victim, "capacity")
+
+    @classmethod
+    async def _write_program(cls, gateway: PoolGateway, command: str) -> None:
+        """Install the gateway's supervisor program (once, or when its command changed)."""
+        content = PROGRAM_TEMPLATE.format(program=gateway.name, env_file=gateway.env_file,
+                                          command=command, home=gateway.home)
+        if await ConfigStore.read_text(gateway.program_file) == content:
+            return
+        if cls._reload_lock is None:
+            cls._reload_lock = asyncio.Lock()
+        # Concurrent cold starts each add a program; apply them one reload at a time
+        async with cls._reload_lock:
+            await ConfigStore.write_text(gateway.program_file, content)
+            if not await AsyncSupervisorClient.reload_config():
+                raise GatewayPoolError(f"Supervisor did not load {gateway.program_file}")
+
+    @classmethod
+    async def evict(cls, gateway: PoolGateway, reason: str) -> None:
+        """Stop a gateway to free its memory; it starts again on the next visit."""
+        async with gateway.lock:
+            if not gateway.running:
+                return
+            await gateway.client.stop()
+            gateway.running, gateway.pid, gateway.rss_bytes = False, None, None
+            await cls._save_running(gateway)
+        EVICTIONS_TOTAL.inc(1, reason)
+        logger.info(f"[gateway-pool] Stopped {gateway.name} ({reason}, idle {gateway.idle_for():.0f}s)")
+
+    @classmethod
+    async def stop_gateway(cls, owner_user_id: str) -> bool:
+        """Stop the user's gateway and remove its secrets env file (/openclaw/stop)."""
+        gateway = await cls.lookup(owner_user_id)
+        if gateway is None:
+            return False
+        async with gateway.lock:
+            stopped = await gateway.client.stop()
+            gateway.running, gateway.pid, gateway.rss_bytes = False, None, None
+            gateway.should_run = False
+            await clear_gateway_env(gateway.env_file)
+        if cls._collection is not None:
+            await cls._collection.update_one({"_id": owner_user_id},
+                                             {"$set": {"should_run": False, "running": False}})
+        return stopped
+
+    @classmethod
+    async def sweep(cls) -> None:
+        """
+        Share activity with the other workers, refresh supervisor state and
+        memory readings, and stop gateways idle for GATEWAY_POOL_IDLE_TIMEOUT.
+        """
+        if cls._collection is not None:
+            for gateway in cls.gateways():
+                # An open WebSocket keeps its gateway in use for the other workers too
+                if gateway.in_flight > 0:
+                    gateway.touch()
+                if gateway.last_used > gateway._last_used_saved:
+                    await cls._collection.update_one({"_id": gateway.owner_user_id},
+                                                     {"$max": {"last_used": gateway.last_used}})
+                    gateway._last_used_saved = gateway.last_used
+            # Gateways allocated or used through other workers
+            async for doc in cls._collection.find({}):
+                cls._remember(doc)
+
+        for gateway in cls.gateways():
+            was_running = gateway.running
+            gateway.pid = await gateway.client.get_pid()
+            gateway.running = gateway.pid is not None
+            if gateway.running != was_running:
+                await cls._save_running(gateway)
+        readings = await asyncio.to_thread(lambda: [(g, process_rss(g.pid)) for g in cls.running()])
+        for gateway, rss in readings:
+            gateway.rss_bytes = rss
+
+        now = time.time()
+        for gateway in cls.running():
+            if gateway.idle_for(now) > GATEWAY_POOL_IDLE_TIMEOUT:
+                await cls.evict(gateway, "idle")
+
+    @classmethod
+    async def _sweep_loop(cls) -> None:
+        while True:
+            await asyncio.sleep(GATEWAY_POOL_SWEEP_INTERVAL)
+            try:
+                await cls.sweep()
+            except Exception as e:
+                logger.warning(f"[gateway-pool] Sweep failed: {e}")
+
+    @classmethod
+    def start(cls) -> None:
+        """Start the background sweeper (idempotent). Call from startup."""
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(cls._sweep_loop())
+            logger.info(f"[gateway-pool] Sweeper started (idle timeout {GATEWAY_POOL_IDLE_TIMEOUT}s, "
+                        f"max running {GATEWAY_POOL_MAX_RUNNING})")
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Stop the sweeper. Gateways keep running under supervisor. Call from shutdown."""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    def clear(cls) -> None:
+        """Forget all gateways (tests)."""
+        cls._gateways = {}
+
+
+metrics.gauge(
+    "openclaw_gateway_pool_gateways", "Pool gateways allocated on this host, by state", ("state",),
+    callback=lambda: [(("running",), len(GatewayPool.running())),
+                      (("stopped",), len(GatewayPool.gateways()) - len(GatewayPool.running()))],
+)
+metrics.gauge(
+    "openclaw_gateway_pool_memory_bytes", "Resident memory of each running pool gateway", ("gateway",),
+    callback=lambda: [((g.name,), g.rss_bytes) for g in GatewayPool.running() if g.rss_bytes is not None],
+)
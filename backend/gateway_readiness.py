@@ -0,0 +1,126 @@
+"""
+Detection of the moment the gateway starts accepting requests.
+
+After supervisor reports the gateway RUNNING the Node process still needs a
+while to bind its port. Instead of checking once a second, GatewayReadiness
+probes with exponential backoff starting at a few milliseconds: a plain TCP
+connect until the port opens (cheap, and refused instantly while it is
+closed), then an HTTP GET until the gateway answers 200. Supervisor is asked
+at a slower cadence whether the process is still up, so a crash fails the wait
+right away instead of after the full timeout.
+
+Each wait records its measured time-to-ready in a histogram on /api/metrics.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+import metrics
+from proxy_client import ProxyClient
+
+logger = logging.getLogger(__name__)
+
+# Give up waiting after this many seconds
+GATEWAY_READY_TIMEOUT = float(os.environ.get('GATEWAY_READY_TIMEOUT', '60'))
+# First probe delay and backoff cap, in seconds
+GATEWAY_READY_INITIAL_DELAY = float(os.environ.get('GATEWAY_READY_INITIAL_DELAY', '0.005'))
+GATEWAY_READY_MAX_DELAY = float(os.environ.get('GATEWAY_READY_MAX_DELAY', '0.05'))
+# Seconds between supervisor checks while waiting
+GATEWAY_READY_SUPERVISOR_INTERVAL = float(os.environ.get('GATEWAY_READY_SUPERVISOR_INTERVAL', '1.0'))
+
+TIME_TO_READY = metrics.histogram(
+    "openclaw_gateway_time_to_ready_seconds", "Time from gateway start to its first successful HTTP response",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0),
+)
+WAIT_TOTAL = metrics.counter("openclaw_gateway_ready_waits_total", "Gateway readiness waits by outcome", ("outcome",))
+
+
+async def port_open(host: str, port: int) -> bool:
+    """Whether a TCP connection to host:port is accepted."""
+    try:
+        _, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def http_ready(url: str) -> bool:
+    """Whether the gateway answers the URL with a 200."""
+    try:
+        response = await ProxyClient.get().get(url, timeout=2.0)
+    except httpx.HTTPError:
+        return False
+    return response.status_code == 200
+
+
+class GatewayReadiness:
+    """Backoff-based wait for the gateway to accept requests."""
+
+    # Outcome and duration of the most recent wait
+    last_outcome: Optional[str] = None
+    last_seconds: Optional[float] = None
+
+    @classmethod
+    async def wait(cls, port: int, host: str = "127.0.0.1", timeout: float = None,
+                   alive: Optional[Callable[[], Awaitable[bool]]] = None) -> Optional[float]:
+        """
+        Wait until the gateway on host:port answers HTTP 200.
+
+        Args:
+            port: Gateway port.
+            host: Gateway host.
+            timeout: Seconds to wait (GATEWAY_READY_TIMEOUT by default).
+            alive: Optional supervisor check; when it returns False the wait
+                stops early (the process exited).
+
+        Returns:
+            Seconds until ready, or None on timeout or exit.
+        """
+        timeout = GATEWAY_READY_TIMEOUT if timeout is None else timeout
+        url = f"http://{host}:{port}/"
+        start = time.perf_counter()
+        deadline = start + timeout
+        next_alive_check = start + GATEWAY_READY_SUPERVISOR_INTERVAL
+        delay = GATEWAY_READY_INITIAL_DELAY
+        port_seen = False
+        probes = 0
+
+        while True:
+            probes += 1
+            if not port_seen:
+                port_seen = await port_open(host, port)
+            if port_seen and await http_ready(url):
+                return cls._finish("ready", time.perf_counter() - start, probes)
+
+            now = time.perf_counter()
+            if alive is not None and now >= next_alive_check:
+                if not await alive():
+                    return cls._finish("exited", now - start, probes)
+                next_alive_check = time.perf_counter() + GATEWAY_READY_SUPERVISOR_INTERVAL
+            if now >= deadline:
+                return cls._finish("timeout", now - start, probes)
+
+            await asyncio.sleep(min(delay, max(0.0, deadline - now)))
+            delay = min(delay * 2, GATEWAY_READY_MAX_DELAY)
+
+    @classmethod
+    def _finish(cls, outcome: str, seconds: float, probes: int) -> Optional[float]:
+        cls.last_outcome = outcome
+        cls.last_seconds = seconds
+        WAIT_TOTAL.inc(1, outcome)
+        if outcome == "ready":
+            TIME_TO_READY.observe(seconds)
+            logger.info(f"Gateway ready after {seconds * 1000:.0f}ms ({probes} probes)")
+            return seconds
+        logger.warning(f"Gateway not ready after {seconds:.1f}s: {outcome} ({probes} probes)")
+        return None
@@ -0,0 +1,183 @@
+"""
+Gateway token/owner state shared by every backend worker.
+
+This used to be a module-level dict in server.py, so with several uvicorn
+workers only the worker that handled /openclaw/start knew the owner and token.
+SharedGatewayState is still a dict that request handlers read synchronously
+(no I/O on the hot path), but every change is published to the gateway_config
+document in MongoDB under a version number, and each worker keeps its copy
+current in the background:
+
+- with a change stream on that document when MongoDB is a replica set
+  (other workers see a change within milliseconds),
+- otherwise by re-reading it every GATEWAY_STATE_POLL_INTERVAL seconds.
+
+Checks that would deny a request (not the owner, no token) call refresh()
+first, so a worker that has not seen the latest change yet reads through to
+the database instead of answering from a stale copy.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Seconds between re-reads when change streams are unavailable or disabled
+GATEWAY_STATE_POLL_INTERVAL = float(os.environ.get('GATEWAY_STATE_POLL_INTERVAL', '2'))
+# Watch the document with a change stream (needs a replica set; falls back to polling)
+GATEWAY_STATE_CHANGE_STREAMS = os.environ.get('GATEWAY_STATE_CHANGE_STREAMS', 'true').lower() == 'true'
+# Read-through refreshes within this many seconds of the last one reuse it
+GATEWAY_STATE_REFRESH_MIN_INTERVAL = float(os.environ.get('GATEWAY_STATE_REFRESH_MIN_INTERVAL', '0.5'))
+
+STATE_FIELDS = ("token", "provider", "started_at", "owner_user_id")
+# What workers read back: the state, plus the fields other changes are published with
+# (the blue/green slot, the last logout any worker saw; see server.follow_gateway_config)
+SHARED_PROJECTION = {"state": 1, "state_version": 1, "active_slot": 1, "sessions_revoked_at": 1}
+
+
+class SharedGatewayState(dict):
+    """The gateway's token, provider, start time and owner, mirrored from MongoDB."""
+
+    def __init__(self, doc_id: str = "gateway_config",
+                 on_change: Optional[Callable[[dict], Any]] = None):
+        super().__init__({field: None for field in STATE_FIELDS})
+        self.doc_id = doc_id
+        # Called with the stored document whenever another worker's change is applied
+        self.on_change = on_change
+        self.version = 0
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+        self._refreshed_at: Optional[float] = None
+        self._flights = SingleFlight("gateway-state")
+        self.published = 0
+        self.remote_updates = 0
+
+    def bind(self, collection) -> None:
+        """Share state through `collection` (db.moltbot_configs). Unbound, state stays local."""
+        self._collection = collection
+
+    def _apply(self, doc: Optional[dict], remote: bool = True) -> bool:
+        """Take the state stored in `doc` if it is newer than ours."""
+        version = (doc or {}).get("state_version", 0)
+        if version <= self.version:
+            return False
+        state = doc.get("state") or {}
+        self.update({field: state.get(field) for field in STATE_FIELDS})
+        self.version = version
+        if remote:
+            self.remote_updates += 1
+            if self.on_change is not None:
+                self.on_change(doc)
+        return True
+
+    async def publish(self, active_slot: Optional[str] = None, **fields) -> None:
+        """
+        Change state fields here and for every other worker.
+
+        The local copy changes right away; if the database write fails the
+        change is kept locally and logged, as before state was shared.
+        `active_slot` (blue/green) is stored under the same version bump, so
+        workers that take this change also follow the slot.
+        """
+        unknown = set(fields) - set(STATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown gateway state fields: {sorted(unknown)}")
+        self.update(fields)
+        self.published += 1
+        if self._collection is None:
+            return
+        changes = {f"state.{field}": value for field, value in fields.items()}
+        if active_slot is not None:
+            changes["active_slot"] = active_slot
+        try:
+            doc = await self._collection.find_one_and_update(
+                {"_id": self.doc_id},
+                {"$set": changes, "$inc": {"state_version": 1}},
+                projection=SHARED_PROJECTION,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception as e:
+            logger.warning(f"[gateway-state] Could not publish state change: {e}")
+            return
+        # Our write is the newest; the stored document also carries fields
+        # other workers set concurrently
+        self._apply(doc, remote=False)
+
+    async def _load(self) -> bool:
+        doc = await self._collection.find_one({"_id": self.doc_id}, SHARED_PROJECTION)
+        self._refreshed_at = time.monotonic()
+        return self._apply(doc)
+
+    async def refresh(self, force: bool = False) -> bool:
+        """
+        Re-read the shared state now. Returns whether it had changed.
+
+        Concurrent calls share one read, and unless `force` a read done in
+        the last GATEWAY_STATE_REFRESH_MIN_INTERVAL seconds is reused, so
+        denied requests cannot turn into a query each.
+        """
+        if self._collection is None:
+            return False
+        recent = (self._refreshed_at is not None
+                  and time.monotonic() - self._refreshed_at < GATEWAY_STATE_REFRESH_MIN_INTERVAL)
+        if recent and not force:
+            return False
+        try:
+            changed, _ = await self._flights.do("refresh", self._load)
+        except Exception as e:
+            logger.warning(f"[gateway-state] Could not read shared state: {e}")
+            return False
+        return changed
+
+    async def _watch(self) -> None:
+        """Apply changes from a change stream until it fails."""
+        pipeline = [{"$match": {"documentKey._id": self.doc_id}}]
+        async with self._collection.watch(pipeline, full_document="updateLookup") as stream:
+            logger.info("[gateway-state] Watching shared state with a change stream")
+            # Changes made before the stream opened
+            await self.refresh(force=True)
+            async for change in stream:
+                self._apply(change.get("fullDocument"))
+
+    async def _poll(self) -> None:
+        while True:
+            await self.refresh(force=True)
+            await asyncio.sleep(GATEWAY_STATE_POLL_INTERVAL)
+
+    async def _run(self) -> None:
+        while GATEWAY_STATE_CHANGE_STREAMS:
+            try:
+                await self._watch()
+            except OperationFailure as e:
+                # Standalone mongod: change streams need a replica set
+                logger.info(f"[gateway-state] Change streams unavailable ({e}), polling instead")
+                break
+            except Exception as e:
+                logger.warning(f"[gateway-state] Change stream failed: {e}")
+            await asyncio.sleep(GATEWAY_STATE_POLL_INTERVAL)
+        logger.info(f"[gateway-state] Polling shared state every {GATEWAY_STATE_POLL_INTERVAL}s")
+        await self._poll()
+
+    def start(self) -> None:
+        """Keep the local copy current in the background (idempotent). Call from startup."""
+        if self._collection is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop following changes. Call from shutdown."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
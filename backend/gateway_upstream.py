@@ -0,0 +1,223 @@
+"""
+Which gateway process the proxy talks to, and blue/green restarts.
+
+The gateway normally runs as one supervisor program (`clawdbot-gateway` on
+MOLTBOT_PORT), and a restart leaves the Control UI down until Node has booted
+again. With GATEWAY_BLUE_GREEN=true a second program is used as a warm
+standby: a restart starts it on GATEWAY_STANDBY_PORT with the new (or the
+current) settings, waits until it answers, and then switches the proxy over
+by replacing one reference. New HTTP requests and WebSocket connections go to
+the new process; ones already in flight finish on the old process, which is
+stopped once they have drained (or after GATEWAY_DRAIN_TIMEOUT seconds, which
+closes long-lived WebSockets so the Control UI reconnects to the new
+process). The next restart switches back the other way.
+
+The standby needs its own supervisor program whose wrapper script loads
+GATEWAY_STANDBY_ENV_FILE and passes $CLAWDBOT_GATEWAY_PORT to --port, e.g.:
+
+    [program:clawdbot-gateway-standby]
+    command=/bin/bash -c 'source /root/.clawdbot/gateway-standby.env &&
+        exec clawdbot gateway --port "$CLAWDBOT_GATEWAY_PORT" --bind 127.0.0.1'
+    autostart=false
+    autorestart=true
+
+Both processes share clawdbot.json and the channel credentials, so during the
+short overlap a channel such as WhatsApp may briefly see two sessions.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Optional, Type
+
+import metrics
+from gateway_config import GATEWAY_ENV_FILE, copy_gateway_env, write_gateway_env
+from gateway_readiness import GatewayReadiness
+from supervisor_client import AsyncSupervisorClient, SupervisorClient
+
+logger = logging.getLogger(__name__)
+
+# Restart by switching to a warm standby instead of restarting in place
+GATEWAY_BLUE_GREEN = os.environ.get('GATEWAY_BLUE_GREEN', 'false').lower() == 'true'
+GATEWAY_PRIMARY_PORT = int(os.environ.get('GATEWAY_PRIMARY_PORT', '18789'))
+GATEWAY_STANDBY_PROGRAM = os.environ.get('GATEWAY_STANDBY_PROGRAM', 'clawdbot-gateway-standby')
+GATEWAY_STANDBY_PORT = int(os.environ.get('GATEWAY_STANDBY_PORT', '18790'))
+GATEWAY_STANDBY_ENV_FILE = os.environ.get('GATEWAY_STANDBY_ENV_FILE', '/root/.clawdbot/gateway-standby.env')
+# Seconds to let requests and WebSockets on the old process finish before stopping it
+GATEWAY_DRAIN_TIMEOUT = float(os.environ.get('GATEWAY_DRAIN_TIMEOUT', '30'))
+
+SWITCH_TOTAL = metrics.counter(
+    "openclaw_gateway_switchovers_total", "Blue/green gateway switch-overs by outcome", ("outcome",)
+)
+
+
+class StandbySupervisorClient(SupervisorClient):
+    """SupervisorClient for the standby gateway program."""
+
+    PROGRAM = GATEWAY_STANDBY_PROGRAM
+
+
+class AsyncStandbySupervisorClient(AsyncSupervisorClient):
+    """AsyncSupervisorClient for the standby gateway program."""
+
+    PROGRAM = GATEWAY_STANDBY_PROGRAM
+
+
+class GatewaySlot:
+    """One of the two gateway programs, with its connections in flight."""
+
+    def __init__(self, name: str, port: int, env_file: str,
+                 sync_client: Type[SupervisorClient], client: Type[AsyncSupervisorClient]):
+        self.name = name
+        self.port = port
+        self.env_file = env_file
+        self.sync_client = sync_client
+        self.client = client
+        self.in_flight = 0
+        self._drained: Optional[asyncio.Event] = None
+
+    def acquire(self) -> None:
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self.in_flight <= 0 and self._drained is not None:
+            self._drained.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait until nothing is in flight. Returns False on timeout."""
+        if self.in_flight <= 0:
+            return True
+        self._drained = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._drained = None
+
+    def __repr__(self) -> str:
+        return f"<GatewaySlot {self.name} :{self.port} in_flight={self.in_flight}>"
+
+
+class GatewayUpstream:
+    """The active gateway slot, switched atomically on blue/green restarts."""
+
+    PRIMARY = GatewaySlot("primary", GATEWAY_PRIMARY_PORT, GATEWAY_ENV_FILE,
+                          SupervisorClient, AsyncSupervisorClient)
+    STANDBY = GatewaySlot("standby", GATEWAY_STANDBY_PORT, GATEWAY_STANDBY_ENV_FILE,
+                          StandbySupervisorClient, AsyncStandbySupervisorClient)
+
+    _active: GatewaySlot = PRIMARY
+    # Guards this process only; server.restart_gateway holds a lease so one worker switches at a time
+    _switching: bool = False
+    _drain_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def active(cls) -> GatewaySlot:
+        return cls._active
+
+    @classmethod
+    def inactive(cls) -> GatewaySlot:
+        return cls.STANDBY if cls._active is cls.PRIMARY else cls.PRIMARY
+
+    @classmethod
+    def set_active(cls, name: Optional[str]) -> GatewaySlot:
+        """Select the active slot by name (e.g. recovered from the database at startup)."""
+        cls._active = cls.STANDBY if name == cls.STANDBY.name else cls.PRIMARY
+        return cls._active
+
+    @classmethod
+    @contextlib.contextmanager
+    def hold(cls, slot: GatewaySlot = None):
+        """
+        Count a request or connection against a slot (the active one by
+        default) so a switch-over waits for it before stopping that process.
+        """
+        slot = slot or cls._active
+        slot.acquire()
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    @classmethod
+    async def switch_over(cls, token: str = None, api_key: str = None, provider: str = "emergent") -> bool:
+        """
+        Start the inactive slot, switch to it once it answers and drain the old one.
+
+        With a token, the new process gets freshly written settings; without
+        one it copies the active process's env file (a plain restart).
+
+        Returns:
+            True if traffic now goes to the new process. On False nothing
+            changed and the caller should restart in place.
+        """
+        if cls._switching:
+            logger.warning("[blue-green] Switch-over already in progress")
+            return False
+        cls._switching = True
+        old, new = cls._active, cls.inactive()
+        try:
+            # A previous drain of this slot may still be running
+            if cls._drain_task is not None and not cls._drain_task.done():
+                await cls._drain_task
+
+            if token:
+                await write_gateway_env(token=token, api_key=api_key, provider=provider,
+                                        env_file=new.env_file, port=new.port)
+            elif not await copy_gateway_env(old.env_file, new.env_file, port=new.port):
+                logger.warning(f"[blue-green] No env file at {old.env_file} to start the {new.name} gateway with")
+                SWITCH_TOTAL.inc(1, "failed")
+                return False
+
+            logger.info(f"[blue-green] Starting {new.name} gateway on port {new.port}...")
+            await new.client.stop()
+            if not await new.client.start():
+                SWITCH_TOTAL.inc(1, "failed")
+                return False
+
+            ready = await GatewayReadiness.wait(new.port, alive=new.client.status)
+            if ready is None:
+                logger.error(f"[blue-green] {new.name} gateway did not become ready, keeping {old.name}")
+                await new.client.stop()
+                SWITCH_TOTAL.inc(1, "failed")
+                return False
+
+            cls._active = new
+            SWITCH_TOTAL.inc(1, "switched")
+            logger.info(f"[blue-green] Switched to {new.name} gateway after {ready * 1000:.0f}ms; draining {old.name}")
+            cls._drain_task = asyncio.create_task(cls._retire(old))
+            return True
+        finally:
+            cls._switching = False
+
+    @classmethod
+    async def _retire(cls, slot: GatewaySlot) -> None:
+        drained = await slot.drain(GATEWAY_DRAIN_TIMEOUT)
+        if not drained:
+            logger.info(f"[blue-green] {slot.in_flight} connections still on {slot.name} after "
+                        f"{GATEWAY_DRAIN_TIMEOUT}s, stopping it anyway")
+        if slot is cls._active:
+            return
+        await slot.client.stop()
+        logger.info(f"[blue-green] Stopped {slot.name} gateway")
+
+    @classmethod
+    def retire_inactive(cls) -> None:
+        """Stop the inactive gateway in the background (e.g. one left running by an interrupted drain)."""
+        if cls._drain_task is None or cls._drain_task.done():
+            cls._drain_task = asyncio.create_task(cls._retire(cls.inactive()))
+
+    @classmethod
+    async def stop_draining(cls) -> None:
+        """Cancel a pending drain (shutdown). The old process is left to supervisor."""
+        if cls._drain_task is not None:
+            cls._drain_task.cancel()
+            try:
+                await cls._drain_task
+            except asyncio.CancelledError:
+                pass
+            cls._drain_task = None
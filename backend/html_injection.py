@@ -0,0 +1,185 @@
+"""
+WebSocket-override injection for proxied Control UI HTML.
+
+The Control UI connects its WebSocket straight to the gateway port, so the
+proxy injects a small script into every HTML page that rewrites those URLs to
+/api/openclaw/ws. This module builds that script once per gateway token,
+splices it into the page at the byte level, and caches transformed pages by
+their upstream validator (ETag / Last-Modified) so repeat loads skip the
+rewrite entirely. Snippets and pages are kept per token: in pool mode every
+user's gateway has its own.
+"""
+
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of transformed HTML pages kept in memory
+HTML_CACHE_MAX_ENTRIES = 64
+# Maximum number of per-token override scripts kept in memory
+HTML_SNIPPET_MAX_ENTRIES = 64
+
+_TOKEN_PLACEHOLDER = "__MOLTBOT_TOKEN_PLACEHOLDER__"
+
+WS_OVERRIDE_TEMPLATE = '''
+<script>
+// OpenClaw Proxy Configuration
+window.__MOLTBOT_PROXY_TOKEN__ = "__MOLTBOT_TOKEN_PLACEHOLDER__";
+window.__MOLTBOT_PROXY_WS_URL__ = (window.location.protocol === 'https:' ? 'wss:' : 'ws:') + '//' + window.location.host + '/api/openclaw/ws';
+
+// Override WebSocket to use proxy path
+(function() {
+    const originalWS = window.WebSocket;
+    const proxyWsUrl = window.__MOLTBOT_PROXY_WS_URL__;
+
+    window.WebSocket = function(url, protocols) {
+        let finalUrl = url;
+
+        // Rewrite any OpenClaw gateway URLs to use our proxy
+        if (url.includes('127.0.0.1:18789') ||
+            url.includes('localhost:18789') ||
+            url.includes('0.0.0.0:18789') ||
+            (url.includes(':18789') && !url.includes('/api/openclaw/'))) {
+            finalUrl = proxyWsUrl;
+        }
+
+        // If it's a relative URL or same-origin, redirect to proxy
+        try {
+            const urlObj = new URL(url, window.location.origin);
+            if (urlObj.port === '18789' || urlObj.pathname === '/' && !url.startsWith(proxyWsUrl)) {
+                finalUrl = proxyWsUrl;
+            }
+        } catch (e) {}
+
+        console.log('[OpenClaw Proxy] WebSocket:', url, '->', finalUrl);
+        return new originalWS(finalUrl, protocols);
+    };
+
+    // Copy static properties
+    window.WebSocket.prototype = originalWS.prototype;
+    window.WebSocket.CONNECTING = originalWS.CONNECTING;
+    window.WebSocket.OPEN = originalWS.OPEN;
+    window.WebSocket.CLOSING = originalWS.CLOSING;
+    window.WebSocket.CLOSED = originalWS.CLOSED;
+})();
+</script>
+'''
+
+
+# Response headers kept with a cached page and replayed on later hits: its
+# validators and content description, never per-response ones (Date, Set-Cookie)
+CACHED_PAGE_HEADERS = ("content-type", "content-language", "cache-control", "vary",
+                       "etag", "last-modified", "expires")
+
+
+def find_injection_offset(content: bytes) -> int:
+    """Byte offset to insert the script at: before </head>, after <body>, or 0."""
+    offset = content.find(b"</head>")
+    if offset != -1:
+        return offset
+    offset = content.find(b"<body>")
+    if offset != -1:
+        return offset + len(b"<body>")
+    return 0
+
+
+class WsOverrideInjector:
+    """Builds, splices and caches the WebSocket-override script for proxied HTML."""
+
+    # token -> encoded override script
+    _snippets: "OrderedDict[str, bytes]" = OrderedDict()
+
+    # (token, path) -> (validator, transformed body, response headers)
+    _pages: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def snippet(cls, token: str | None) -> bytes:
+        """
+        The encoded override script for a token.
+
+        Built once per token, the least recently used dropped past
+        HTML_SNIPPET_MAX_ENTRIES.
+        """
+        token = token or ""
+        snippet = cls._snippets.get(token)
+        if snippet is None:
+            snippet = WS_OVERRIDE_TEMPLATE.replace(_TOKEN_PLACEHOLDER, token).encode("utf-8")
+            cls._snippets[token] = snippet
+            while len(cls._snippets) > HTML_SNIPPET_MAX_ENTRIES:
+                cls._snippets.popitem(last=False)
+        cls._snippets.move_to_end(token)
+        return snippet
+
+    @classmethod
+    def inject(cls, content: bytes, token: str | None) -> bytes:
+        """Splice the override script into an HTML body without decoding it."""
+        offset = find_injection_offset(content)
+        return b"".join((content[:offset], cls.snippet(token), content[offset:]))
+
+    @staticmethod
+    def validator(headers) -> str | None:
+        """The upstream cache validator for a response (ETag preferred)."""
+        etag = headers.get("etag")
+        if etag:
+            return f"etag:{etag}"
+        last_modified = headers.get("last-modified")
+        if last_modified:
+            return f"lm:{last_modified}"
+        return None
+
+    @classmethod
+    def conditional_headers(cls, path: str, token: str | None) -> dict:
+        """
+        Upstream revalidation headers for a page we already hold transformed.
+
+        Empty if nothing usable is cached for this path and token.
+        """
+        entry = cls._pages.get((token or "", path))
+        if not entry:
+            return {}
+        validator = entry[0]
+        if validator.startswith("etag:"):
+            return {"if-none-match": validator[len("etag:"):]}
+        return {"if-modified-since": validator[len("lm:"):]}
+
+    @classmethod
+    def cached(cls, path: str, token: str | None, validator: str | None = None):
+        """
+        Cached (body, headers) for a path, or None.
+
+        When a validator is given it must match the cached one; without one
+        (an upstream 304) any entry for the current token is returned.
+        """
+        key = (token or "", path)
+        entry = cls._pages.get(key)
+        if entry and (validator is None or entry[0] == validator):
+            cls._pages.move_to_end(key)
+            cls.hits += 1
+            return entry[1], entry[2]
+        cls.misses += 1
+        return None
+
+    @classmethod
+    def transform(cls, path: str, content: bytes, token: str | None, headers: dict, validator: str | None) -> bytes:
+        """Inject the script and remember the result when the page has a validator."""
+        transformed = cls.inject(content, token)
+        if validator:
+            kept = {k: v for k, v in headers.items() if k.lower() in CACHED_PAGE_HEADERS}
+            key = (token or "", path)
+            cls._pages[key] = (validator, transformed, kept)
+            cls._pages.move_to_end(key)
+            while len(cls._pages) > HTML_CACHE_MAX_ENTRIES:
+                cls._pages.popitem(last=False)
+        return transformed
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all cached snippets and pages."""
+        cls._snippets.clear()
+        cls._pages.clear()
+        cls.hits = 0
+        cls.misses = 0
@@ -0,0 +1,172 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are registered at import time by the modules
+that own them and rendered by GET /api/metrics. Counters and gauges can also
+be computed at scrape time from a callback, which is how live state (active
+connections, queue depth, cache counters) is reported without bookkeeping on
+the hot path.
+Label values are passed positionally in the order the metric declares them.
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond relay hops to slow connects
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: Dict[str, "Metric"] = {}
+_lock = threading.Lock()
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """(suffix, label text, value) for each exposed sample."""
+        return ()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _Valued(Metric):
+    """
+    A value per label set, or one computed at scrape time by a callback
+    returning a number or an iterable of (label values tuple, number).
+    """
+
+    def __init__(self, name, help_text, labels=(), callback: Optional[Callable] = None):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[tuple, float] = {}
+        self.callback = callback
+
+    def inc(self, amount: float = 1, *label_values) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        if self.callback is not None:
+            result = self.callback()
+            items = [((), result)] if isinstance(result, (int, float)) else result
+        else:
+            # An unlabelled series is always exposed, starting at 0
+            items = list(self._values.items()) or ([((), 0)] if not self.labels else [])
+        for label_values, value in items:
+            yield "", _label_text(self.labels, label_values), value
+
+
+class Counter(_Valued):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+
+class Gauge(_Valued):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *label_values) -> None:
+        self._values[label_values] = value
+
+    def dec(self, amount: float = 1, *label_values) -> None:
+        self.inc(-amount, *label_values)
+
+
+class Histogram(Metric):
+    """Cumulative bucketed distribution (plus _sum and _count) per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        state = self._values.get(label_values)
+        if state is None:
+            state = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def count(self, *label_values) -> int:
+        state = self._values.get(label_values)
+        return sum(state[:-1]) if state else 0
+
+    def samples(self):
+        for label_values, state in list(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield "_bucket", _label_text(self.labels, label_values, le), cumulative
+            yield "_sum", _label_text(self.labels, label_values), state[-1]
+            yield "_count", _label_text(self.labels, label_values), cumulative
+
+
+def _register(metric: Metric) -> Metric:
+    with _lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            # Re-imports (e.g. in tests) keep the original series
+            return existing
+        _registry[metric.name] = metric
+    return metric
+
+
+def counter(name: str, help_text: str, labels: Sequence[str] = (), callback: Optional[Callable] = None) -> Counter:
+    return _register(Counter(name, help_text, labels, callback))
+
+
+def gauge(name: str, help_text: str, labels: Sequence[str] = (), callback: Optional[Callable] = None) -> Gauge:
+    return _register(Gauge(name, help_text, labels, callback))
+
+
+def histogram(name: str, help_text: str, labels: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help_text, labels, buckets))
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text format."""
+    lines = []
+    for metric in list(_registry.values()):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
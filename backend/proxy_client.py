@@ -0,0 +1,120 @@
+"""
+Shared HTTP client for proxying requests to the clawdbot gateway.
+
+This module owns a single long-lived, pooled httpx.AsyncClient so that the
+Control UI proxy reuses keep-alive connections to the gateway instead of
+opening a new TCP connection (and a new pool) for every asset. It also holds
+the header/body helpers used to stream requests and responses through the proxy.
+"""
+
+import os
+import logging
+from typing import AsyncIterator, Optional
+
+import httpx
+from starlette.requests import Request
+
+logger = logging.getLogger(__name__)
+
+# Pool tuning (overridable via environment)
+PROXY_MAX_CONNECTIONS = int(os.environ.get('MOLTBOT_PROXY_MAX_CONNECTIONS', '100'))
+PROXY_MAX_KEEPALIVE = int(os.environ.get('MOLTBOT_PROXY_MAX_KEEPALIVE', '20'))
+PROXY_KEEPALIVE_EXPIRY = float(os.environ.get('MOLTBOT_PROXY_KEEPALIVE_EXPIRY', '30'))
+PROXY_TIMEOUT = float(os.environ.get('MOLTBOT_PROXY_TIMEOUT', '30'))
+
+# Relay non-HTML responses chunk by chunk instead of buffering them
+PROXY_STREAMING = os.environ.get('MOLTBOT_PROXY_STREAMING', 'true').lower() == 'true'
+
+# Hop-by-hop headers that must not be forwarded in either direction
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade"
+}
+
+
+class ProxyClient:
+    """Holder for the shared pooled client used by every gateway proxy route."""
+
+    _client: httpx.AsyncClient | None = None
+
+    @classmethod
+    def _build(cls) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=PROXY_MAX_CONNECTIONS,
+            max_keepalive_connections=PROXY_MAX_KEEPALIVE,
+            keepalive_expiry=PROXY_KEEPALIVE_EXPIRY
+        )
+        return httpx.AsyncClient(limits=limits, timeout=PROXY_TIMEOUT)
+
+    @classmethod
+    def open(cls) -> httpx.AsyncClient:
+        """
+        Create the shared client. Called once at application startup.
+
+        Returns:
+            The shared client.
+        """
+        if cls._client is None or cls._client.is_closed:
+            cls._client = cls._build()
+            logger.info(
+                f"Proxy client opened (max_connections={PROXY_MAX_CONNECTIONS}, "
+                f"max_keepalive={PROXY_MAX_KEEPALIVE})"
+            )
+        return cls._client
+
+    @classmethod
+    def get(cls) -> httpx.AsyncClient:
+        """
+        Get the shared client, creating it lazily if startup has not run
+        (e.g. when the app is driven directly in tests).
+        """
+        if cls._client is None or cls._client.is_closed:
+            return cls.open()
+        return cls._client
+
+    @classmethod
+    async def close(cls) -> None:
+        """Close the shared client and its pooled connections. Called at shutdown."""
+        if cls._client is not None and not cls._client.is_closed:
+            await cls._client.aclose()
+            logger.info("Proxy client closed")
+        cls._client = None
+
+
+def forward_request_headers(request: Request) -> dict:
+    """Headers to send upstream: everything except Host and hop-by-hop headers."""
+    headers = dict(request.headers)
+    headers.pop("host", None)
+    for name in HOP_BY_HOP_HEADERS:
+        headers.pop(name, None)
+    return headers
+
+
+def request_body_stream(request: Request) -> Optional[AsyncIterator[bytes]]:
+    """
+    Stream the incoming request body upstream instead of buffering it.
+
+    Returns None for requests that carry no body so httpx does not switch a
+    plain GET to chunked transfer encoding.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is None and "transfer-encoding" not in request.headers:
+        return None
+    if content_length == "0":
+        return None
+    return request.stream()
+
+
+def filter_response_headers(headers: httpx.Headers, decoded: bool) -> dict:
+    """
+    Response headers to relay to the browser.
+
+    Args:
+        headers: Upstream response headers.
+        decoded: True if the body was read (and decompressed) by httpx, in which
+            case Content-Encoding/Content-Length no longer describe it.
+    """
+    exclude = set(HOP_BY_HOP_HEADERS)
+    if decoded:
+        exclude |= {"content-encoding", "content-length"}
+    return {k: v for k, v in headers.items() if k.lower() not in exclude}
@@ -0,0 +1,194 @@
+"""
+Per-request latency breakdown for the FastAPI app.
+
+RequestTimingMiddleware (pure ASGI, so streamed responses are not buffered)
+opens a timing context for each HTTP request. Code that talks to MongoDB,
+supervisord or the gateway wraps the call in `timed(phase)`, which adds the
+elapsed time to that request's phase totals. When the response starts, the
+totals go out in a `Server-Timing` header (visible in browser devtools); when
+it finishes, the overall duration and each phase are recorded in per-route
+histograms exported on /api/metrics.
+
+MongoDB calls are timed by wrapping the motor database with TimedDatabase, so
+call sites stay unchanged.
+"""
+
+import contextlib
+import inspect
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import metrics
+
+# Set to false to stop sending the Server-Timing header (histograms are still recorded)
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+
+PHASE_MONGO = "mongo"
+PHASE_SUPERVISOR = "supervisor"
+PHASE_UPSTREAM = "upstream"
+
+REQUEST_DURATION = metrics.histogram(
+    "openclaw_http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route", "status"),
+)
+PHASE_DURATION = metrics.histogram(
+    "openclaw_http_phase_duration_seconds", "Time spent in MongoDB, supervisor and gateway calls per request",
+    ("route", "phase"),
+)
+
+# phase -> accumulated seconds for the request being handled
+_phases: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_phases", default=None)
+
+
+@contextlib.contextmanager
+def timed(phase: str):
+    """Add the time spent in the block to the current request's `phase` total."""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+def current_phases() -> Dict[str, float]:
+    """Phase totals of the request being handled so far (empty outside a request)."""
+    return dict(_phases.get() or {})
+
+
+def server_timing_value(phases: Dict[str, float], total: float) -> str:
+    """Format phase totals (seconds) as a Server-Timing header value (milliseconds)."""
+    entries = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in phases.items()]
+    entries.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestTimingMiddleware:
+    """ASGI middleware recording per-route latency and a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases: Dict[str, float] = {}
+        token = _phases.set(phases)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_HEADER:
+                    value = server_timing_value(phases, time.perf_counter() - start)
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _phases.reset(token)
+            route = _route_label(scope)
+            REQUEST_DURATION.observe(time.perf_counter() - start, scope["method"], route, status)
+            for phase, seconds in phases.items():
+                PHASE_DURATION.observe(seconds, route, phase)
+
+
+class _TimedCursor:
+    """Motor cursor whose fetches count as MongoDB time."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name == "to_list":
+            async def to_list(*args, **kwargs):
+                with timed(PHASE_MONGO):
+                    return await attr(*args, **kwargs)
+            return to_list
+        if callable(attr) and name in ("sort", "skip", "limit", "batch_size"):
+            def chain(*args, **kwargs):
+                attr(*args, **kwargs)
+                return self
+            return chain
+        return attr
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        with timed(PHASE_MONGO):
+            return await self._cursor.__anext__()
+
+
+async def _timed_await(awaitable, phase: str):
+    with timed(phase):
+        return await awaitable
+
+
+class TimedCollection:
+    """Motor collection whose calls count as MongoDB time for the current request."""
+
+    _CURSOR_METHODS = ("find", "aggregate", "list_indexes")
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+        if name in self._CURSOR_METHODS:
+            def cursor_method(*args, **kwargs):
+                return _TimedCursor(attr(*args, **kwargs))
+            return cursor_method
+
+        def method(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if inspect.isawaitable(result):
+                return _timed_await(result, PHASE_MONGO)
+            return result
+        return method
+
+
+class TimedDatabase:
+    """Motor database handing out TimedCollection wrappers (db.users, db["users"])."""
+
+    def __init__(self, database):
+        self._database = database
+        self._collections: Dict[str, TimedCollection] = {}
+
+    def _collection(self, name: str) -> TimedCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = TimedCollection(self._database[name])
+        return collection
+
+    def __getitem__(self, name: str) -> TimedCollection:
+        return self._collection(name)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attr = getattr(type(self._database), name, None)
+        if attr is not None:
+            # Database-level API (name, command, drop_collection, ...)
+            return getattr(self._database, name)
+        return self._collection(name)
@@ -1,37 +1,62 @@
-from fastapi import FastAPI, APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Request, Response, UploadFile, File, BackgroundTasks
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, WebSocket, Request, Response, UploadFile, File, BackgroundTasks
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from starlette.websockets import WebSocketState
+from starlette.background import BackgroundTask
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
-import json
 import secrets
+import socket
 import subprocess
 import asyncio
+import time
 import httpx
 import websockets
 import csv
-from websockets.exceptions import ConnectionClosed
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
 
-# Lead scraper imports
+# Lead scraper imports (fb_scraper pulls in Playwright, so the scraper routes import it on first use)
 from industry_config import get_all_industries, detect_industry, matches_industry
-from fb_scraper import (
-    scrape_facebook_group, load_cookies, save_cookies, 
-    delete_cookies, cookies_exist, SCRAPE_DIR, check_browser_availability
-)
 
 # WhatsApp monitoring
-from whatsapp_monitor import get_whatsapp_status, fix_registered_flag
+from whatsapp_monitor import (
+    CREDS_FILE, WhatsAppStatusCache, etag_matches, fix_registered_flag, get_whatsapp_status, status_etag,
+)
 # Gateway management (supervisor-based)
 from gateway_config import write_gateway_env, clear_gateway_env
-from supervisor_client import SupervisorClient
+from config_store import ConfigStore
+from file_watcher import watch_file
+from supervisor_client import AsyncSupervisorClient
+from gateway_liveness import GatewayLiveness
+from gateway_readiness import GatewayReadiness
+from gateway_upstream import GATEWAY_BLUE_GREEN, GATEWAY_PRIMARY_PORT, GatewayUpstream
+from gateway_pool import (
+    GATEWAY_POOL, GATEWAY_POOL_SWEEP_INTERVAL, GatewayPool, GatewayPoolError, GatewayPoolFull, PoolGateway,
+    settings_digest,
+)
+from startup_graph import StartupGraph
+from proxy_client import (
+    ProxyClient, PROXY_STREAMING, forward_request_headers,
+    request_body_stream, filter_response_headers
+)
+from html_injection import WsOverrideInjector
+from asset_cache import IDENTITY, AssetCache, compress_response
+from single_flight import SingleFlight
+from gateway_state import SharedGatewayState
+from session_cache import SessionCache
+from ws_relay import WebSocketRelay
+from ws_mux import WS_MULTIPLEX, MuxPool
+import metrics
+from request_timing import (
+    RequestTimingMiddleware, TimedDatabase, timed, PHASE_UPSTREAM
+)
+from db_indexes import bootstrap_indexes
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -39,7 +64,8 @@ load_dotenv(ROOT_DIR / '.env')
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'moltbot_app')]
+# Wrapped so MongoDB time shows up in per-request timings
+db = TimedDatabase(client[os.environ.get('DB_NAME', 'moltbot_app')])
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -97,27 +123,34 @@ def ensure_playwright_browsers():
         return False
 
 
-# Run browser check on module load (runs once at startup)
-# Only run in production-like environments (not during import for testing)
-if os.environ.get('ENSURE_PLAYWRIGHT_BROWSERS', 'true').lower() == 'true':
-    ensure_playwright_browsers()
+# Browser check/install, run once before the first scraper use rather than on
+# module load, so deployments that only host the gateway never pay for it
+# (disabled during import for testing)
+ENSURE_PLAYWRIGHT_BROWSERS = os.environ.get('ENSURE_PLAYWRIGHT_BROWSERS', 'true').lower() == 'true'
+playwright_browsers_task: Optional[asyncio.Task] = None
+
+
+async def ensure_scraper_browsers() -> None:
+    """Run ensure_playwright_browsers once (off the event loop); later callers wait for that run."""
+    global playwright_browsers_task
+    if not ENSURE_PLAYWRIGHT_BROWSERS:
+        return
+    if playwright_browsers_task is None:
+        playwright_browsers_task = asyncio.create_task(asyncio.to_thread(ensure_playwright_browsers))
+    await asyncio.shield(playwright_browsers_task)
 
 
 # Moltbot Gateway Management
-MOLTBOT_PORT = 18789
+MOLTBOT_PORT = GATEWAY_PRIMARY_PORT
 MOLTBOT_CONTROL_PORT = 18791
 CONFIG_DIR = os.path.expanduser("~/.clawdbot")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "clawdbot.json")
 WORKSPACE_DIR = os.path.expanduser("~/clawd")
 
-# Global state for gateway (per-user)
+# Global state for gateway (per-user), shared with the other backend workers
+# through MongoDB (see gateway_state.py). Change it with `await gateway_state.publish(...)`.
 # Note: Process is managed by supervisor, we only track metadata here
-gateway_state = {
-    "token": None,
-    "provider": None,
-    "started_at": None,
-    "owner_user_id": None  # Track which user owns this instance
-}
+gateway_state = SharedGatewayState("gateway_config")
 
 # Configure logging
 logging.basicConfig(
@@ -181,10 +214,22 @@ EMERGENT_AUTH_URL = "https://demobackend.emergentagent.com/auth/v1/env/oauth/ses
 SESSION_EXPIRY_DAYS = 7
 
 
+# The owner document never changes once the instance is locked, so it is kept
+# in-process after the first time it is seen
+instance_owner_memo: Dict[str, Any] = {"doc": None}
+
+
+def remember_instance_owner(doc: Optional[dict]) -> None:
+    """Memoize the instance owner document (ignored while the instance is unlocked)."""
+    if doc:
+        instance_owner_memo["doc"] = doc
+
+
 async def get_instance_owner() -> Optional[dict]:
-    """Get the instance owner from database. Returns None if not locked yet."""
-    doc = await db.instance_config.find_one({"_id": "instance_owner"})
-    return doc
+    """Get the instance owner (memoized once locked). Returns None if not locked yet."""
+    if instance_owner_memo["doc"] is None:
+        remember_instance_owner(await db.instance_config.find_one({"_id": "instance_owner"}))
+    return instance_owner_memo["doc"]
 
 
 async def set_instance_owner(user: User) -> None:
@@ -201,10 +246,15 @@ async def set_instance_owner(user: User) -> None:
         },
         upsert=True
     )
+    # Re-read on next access: the upsert is a no-op if someone else locked it first
+    instance_owner_memo["doc"] = None
 
 
 async def check_instance_access(user: User) -> bool:
     """Check if user is allowed to access this instance. Returns True if allowed."""
+    if GATEWAY_POOL:
+        # Every user gets a gateway of their own: the instance is never locked
+        return True
     owner = await get_instance_owner()
     if not owner:
         # Instance not locked yet - anyone can access
@@ -216,6 +266,7 @@ async def get_current_user(request: Request) -> Optional[User]:
     """
     Get current user from session token.
     Checks cookie first, then Authorization header as fallback.
+    Resolved sessions are served from SessionCache.
     Returns None if not authenticated.
     """
     session_token = None
@@ -232,14 +283,44 @@ async def get_current_user(request: Request) -> Optional[User]:
     if not session_token:
         return None
 
-    # Look up session in database
-    session_doc = await db.user_sessions.find_one(
-        {"session_token": session_token},
-        {"_id": 0}
-    )
+    return await SessionCache.get_or_load(session_token, load_session)
+
+
+def session_lookup_pipeline(session_token: str, include_owner: bool) -> List[dict]:
+    """
+    Aggregation resolving a session, its user and (optionally) the instance
+    owner in a single round trip.
+    """
+    pipeline = [
+        {"$match": {"session_token": session_token}},
+        {"$limit": 1},
+        {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "user_id", "as": "user"}},
+    ]
+    projection = {"_id": 0, "expires_at": 1, "user": {"$arrayElemAt": ["$user", 0]}}
+    if include_owner:
+        pipeline.append({
+            "$lookup": {"from": "instance_config", "pipeline": [{"$match": {"_id": "instance_owner"}}], "as": "owner"}
+        })
+        projection["owner"] = {"$arrayElemAt": ["$owner", 0]}
+    pipeline.append({"$project": projection})
+    return pipeline
 
-    if not session_doc:
+
+async def load_session(session_token: str):
+    """
+    Resolve a session token from the database in one aggregation.
+    Also memoizes the instance owner if it is not known yet.
+    Returns (User, expires_at), or None if the session is unknown, expired or orphaned.
+    """
+    include_owner = instance_owner_memo["doc"] is None
+    cursor = db.user_sessions.aggregate(session_lookup_pipeline(session_token, include_owner))
+    docs = await cursor.to_list(length=1)
+
+    if not docs:
         return None
+    session_doc = docs[0]
+    if include_owner:
+        remember_instance_owner(session_doc.get("owner"))
 
     # Check expiry
     expires_at = session_doc.get("expires_at")
@@ -251,16 +332,11 @@ async def get_current_user(request: Request) -> Optional[User]:
     if expires_at < datetime.now(timezone.utc):
         return None
 
-    # Get user
-    user_doc = await db.users.find_one(
-        {"user_id": session_doc["user_id"]},
-        {"_id": 0}
-    )
-
+    user_doc = session_doc.get("user")
     if not user_doc:
         return None
 
-    return User(**user_doc)
+    return User(**user_doc), expires_at
 
 
 async def require_auth(request: Request) -> User:
@@ -321,8 +397,8 @@ async def create_session(request: SessionRequest, response: Response):
         if not email:
             raise HTTPException(status_code=400, detail="No email in auth response")
 
-        # Check if instance is locked to another user
-        owner = await get_instance_owner()
+        # Check if instance is locked to another user (in pool mode every user has a gateway of their own)
+        owner = None if GATEWAY_POOL else await get_instance_owner()
         if owner and owner.get("email") != email:
             logger.warning(f"Blocked login attempt from {email} - instance locked to {owner.get('email')}")
             raise HTTPException(
@@ -340,6 +416,7 @@ async def create_session(request: SessionRequest, response: Response):
                 {"user_id": user_id},
                 {"$set": {"name": name, "picture": picture}}
             )
+            SessionCache.invalidate_user(user_id)
         else:
             # Create new user
             user_id = f"user_{uuid.uuid4().hex[:12]}"
@@ -404,6 +481,8 @@ async def logout(request: Request, response: Response):
 
     if session_token:
         await db.user_sessions.delete_one({"session_token": session_token})
+        SessionCache.invalidate(session_token)
+        await publish_session_revocation()
 
     response.delete_cookie(
         key="session_token",
@@ -479,7 +558,8 @@ def generate_token():
     return secrets.token_hex(32)
 
 
-def create_moltbot_config(token: str = None, api_key: str = None, provider: str = "emergent", force_new_token: bool = False):
+async def create_moltbot_config(token: str = None, api_key: str = None, provider: str = "emergent", force_new_token: bool = False,
+                                config_file: str = None, port: int = None, workspace_dir: str = None):
     """Update clawdbot.json with gateway config and provider settings
 
     Args:
@@ -487,21 +567,20 @@ def create_moltbot_config(token: str = None, api_key: str = None, provider: str
         api_key: Optional API key for provider.
         provider: The LLM provider - "emergent", "openai", or "anthropic".
         force_new_token: If True, always generates a new token (triggers gateway restart).
+        config_file, port, workspace_dir: Another gateway's config file, port
+            and workspace (a pool gateway); the main gateway's by default.
 
     Returns:
         The token being used (existing or new).
     """
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    os.makedirs(WORKSPACE_DIR, exist_ok=True)
+    config_file = config_file or CONFIG_FILE
+    workspace_dir = workspace_dir or WORKSPACE_DIR
+    await asyncio.to_thread(os.makedirs, workspace_dir, exist_ok=True)
 
-    # Load existing config if present
-    existing_config = {}
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, "r") as f:
-                existing_config = json.load(f)
-        except:
-            pass
+    # Load existing config if present (private copy, modified below)
+    existing_config = await ConfigStore.read_json(config_file, {}, mutable=True)
+    if not isinstance(existing_config, dict):
+        existing_config = {}
 
     # Reuse existing token if available (to avoid triggering gateway restart)
     existing_token = None
@@ -519,7 +598,7 @@ def create_moltbot_config(token: str = None, api_key: str = None, provider: str
     # Gateway config to merge
     gateway_config = {
         "mode": "local",
-        "port": MOLTBOT_PORT,
+        "port": port or MOLTBOT_PORT,
         "bind": "lan",
         "auth": {
             "mode": "token",
@@ -546,7 +625,7 @@ def create_moltbot_config(token: str = None, api_key: str = None, provider: str
         existing_config["agents"] = {"defaults": {}}
     if "defaults" not in existing_config["agents"]:
         existing_config["agents"]["defaults"] = {}
-    existing_config["agents"]["defaults"]["workspace"] = WORKSPACE_DIR
+    existing_config["agents"]["defaults"]["workspace"] = workspace_dir
 
     # Configure providers based on selection
     if provider == "emergent":
@@ -701,38 +780,51 @@ def create_moltbot_config(token: str = None, api_key: str = None, provider: str
             "primary": "anthropic/claude-opus-4-5-20251101"
         }
 
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(existing_config, f, indent=2)
+    await ConfigStore.write_json(config_file, existing_config, indent=2)
 
-    logger.info(f"Updated Moltbot config at {CONFIG_FILE} for provider: {provider}")
+    logger.info(f"Updated Moltbot config at {config_file} for provider: {provider}")
     return final_token  # Return the token being used
 
 
+async def read_gateway_token(config_file: str = None) -> Optional[str]:
+    """Gateway auth token from clawdbot.json (the main gateway's by default), or None if unset or unreadable."""
+    config = await ConfigStore.read_json(config_file or CONFIG_FILE, {})
+    try:
+        return config.get("gateway", {}).get("auth", {}).get("token")
+    except AttributeError:
+        return None
+
+
 async def start_gateway_process(api_key: str, provider: str, owner_user_id: str):
     """Start the Moltbot gateway process via supervisor (persistent, survives backend restarts)"""
     global gateway_state
 
-    # Check if already running via supervisor
-    if SupervisorClient.status():
+    # Check if already running via supervisor (authoritative, refreshes the liveness cache)
+    if await GatewayLiveness.refresh():
         logger.info("Gateway already running via supervisor, recovering state...")
 
         # Recover token from config
-        token = None
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-            token = config.get("gateway", {}).get("auth", {}).get("token")
-        except:
-            pass
+        token = await read_gateway_token()
 
         if not token:
             token = generate_token()
-            create_moltbot_config(token=token, api_key=api_key, provider=provider, force_new_token=True)
-
-        gateway_state["token"] = token
-        gateway_state["provider"] = provider
-        gateway_state["started_at"] = datetime.now(timezone.utc).isoformat()
-        gateway_state["owner_user_id"] = owner_user_id
+            await create_moltbot_config(token=token, api_key=api_key, provider=provider, force_new_token=True)
+
+        await gateway_state.refresh()
+        previous_provider = gateway_state.get("provider")
+        if GATEWAY_BLUE_GREEN and previous_provider and previous_provider != provider:
+            # Provider switch: bring up a gateway with the new settings next to the running one
+            logger.info(f"Switching provider {previous_provider} -> {provider} via standby gateway...")
+            await create_moltbot_config(token=token, api_key=api_key, provider=provider)
+            if not await restart_gateway(token=token, api_key=api_key, provider=provider):
+                raise HTTPException(status_code=500, detail="Failed to restart gateway with the new provider")
+
+        await gateway_state.publish(
+            token=token,
+            provider=provider,
+            started_at=datetime.now(timezone.utc).isoformat(),
+            owner_user_id=owner_user_id,
+        )
 
         # Update database
         await db.moltbot_configs.update_one(
@@ -755,72 +847,287 @@ async def start_gateway_process(api_key: str, provider: str, owner_user_id: str)
     # Ensure clawdbot is installed
     clawdbot_cmd = get_clawdbot_command()
     if not clawdbot_cmd:
-        if not ensure_moltbot_installed():
+        if not await asyncio.to_thread(ensure_moltbot_installed):
             raise HTTPException(status_code=500, detail="OpenClaw (clawdbot) is not installed. Please contact support.")
         clawdbot_cmd = get_clawdbot_command()
         if not clawdbot_cmd:
             raise HTTPException(status_code=500, detail="Failed to find clawdbot after installation")
 
     # Create config (reuses existing token to avoid gateway restarts)
-    token = create_moltbot_config(api_key=api_key, provider=provider)
+    token = await create_moltbot_config(api_key=api_key, provider=provider)
 
     # Write environment file for supervisor wrapper to load
-    write_gateway_env(token=token, api_key=api_key, provider=provider)
+    await write_gateway_env(token=token, api_key=api_key, provider=provider)
 
     logger.info(f"Starting Moltbot gateway via supervisor on port {MOLTBOT_PORT}...")
 
+    # A fresh start always uses the primary program (blue/green alternates only on restarts)
+    GatewayUpstream.set_active(GatewayUpstream.PRIMARY.name)
+
     # Start via supervisor (will auto-restart on crash, survives backend restarts)
-    if not SupervisorClient.start():
+    if not await AsyncSupervisorClient.start():
         raise HTTPException(status_code=500, detail="Failed to start gateway via supervisor")
+    GatewayLiveness.mark_running(True)
+
+    # Update shared state (and the slot other workers proxy to, under the same version)
+    await gateway_state.publish(
+        token=token,
+        provider=provider,
+        started_at=datetime.now(timezone.utc).isoformat(),
+        owner_user_id=owner_user_id,
+        active_slot=GatewayUpstream.PRIMARY.name,
+    )
 
-    # Update in-memory state
-    gateway_state["token"] = token
-    gateway_state["provider"] = provider
-    gateway_state["started_at"] = datetime.now(timezone.utc).isoformat()
-    gateway_state["owner_user_id"] = owner_user_id
+    # Wait for gateway to accept requests (backoff from a few ms; fails fast if the process exits)
+    ready_seconds = await GatewayReadiness.wait(MOLTBOT_PORT, alive=GatewayLiveness.refresh)
+    if ready_seconds is not None:
+        logger.info("Moltbot gateway is ready!")
 
-    # Wait for gateway to be ready
-    max_wait = 60
-    start_time = asyncio.get_event_loop().time()
+        # Store config in database for persistence (with should_run flag)
+        await db.moltbot_configs.update_one(
+            {"_id": "gateway_config"},
+            {
+                "$set": {
+                    "should_run": True,
+                    "owner_user_id": owner_user_id,
+                    "provider": provider,
+                    "token": token,
+                    "started_at": gateway_state["started_at"],
+                    "updated_at": datetime.now(timezone.utc)
+                }
+            },
+            upsert=True
+        )
 
-    async with httpx.AsyncClient() as http_client:
-        while asyncio.get_event_loop().time() - start_time < max_wait:
-            try:
-                response = await http_client.get(f"http://127.0.0.1:{MOLTBOT_PORT}/", timeout=2.0)
-                if response.status_code == 200:
-                    logger.info("Moltbot gateway is ready!")
-
-                    # Store config in database for persistence (with should_run flag)
-                    await db.moltbot_configs.update_one(
-                        {"_id": "gateway_config"},
-                        {
-                            "$set": {
-                                "should_run": True,
-                                "owner_user_id": owner_user_id,
-                                "provider": provider,
-                                "token": token,
-                                "started_at": gateway_state["started_at"],
-                                "updated_at": datetime.now(timezone.utc)
-                            }
-                        },
-                        upsert=True
-                    )
-
-                    return token
-            except Exception:
-                pass
-            await asyncio.sleep(1)
+        return token
 
     # Check supervisor status if not ready
-    if not SupervisorClient.status():
+    if not await GatewayLiveness.refresh():
         raise HTTPException(status_code=500, detail="Gateway failed to start via supervisor")
 
     raise HTTPException(status_code=500, detail="Gateway did not become ready in time")
 
 
-def check_gateway_running():
-    """Check if the gateway process is still running via supervisor"""
-    return SupervisorClient.status()
+# Identifies this worker as the holder of a lease on gateway_config
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+# Seconds a worker may take to restart (or switch over) the gateway before another one may start a restart
+GATEWAY_RESTART_LEASE = float(os.environ.get('GATEWAY_RESTART_LEASE', '120'))
+# Seconds the WhatsApp watcher of one worker stays the one that fixes credentials (renewed on every check)
+WHATSAPP_WATCHER_LEASE = float(os.environ.get('WHATSAPP_WATCHER_LEASE', '300'))
+
+
+async def claim_gateway_lease(name: str, seconds: float, renew: bool = False) -> bool:
+    """
+    Take the `name` lease on gateway_config for `seconds` (with `renew`, also
+    extend it if this worker already holds it).
+
+    Leases give one worker at a time the right to act on the single gateway
+    (auto-start, restart, fix the WhatsApp credentials). Returns whether this
+    worker now holds the lease.
+    """
+    now = datetime.now(timezone.utc)
+    until, holder = f"{name}_until", f"{name}_holder"
+    available = [{until: {"$exists": False}}, {until: {"$lt": now}}]
+    if renew:
+        available.append({holder: WORKER_ID})
+    try:
+        # The lease needs a document to live on
+        await db.moltbot_configs.update_one({"_id": "gateway_config"}, {"$setOnInsert": {"should_run": False}},
+                                            upsert=True)
+        doc = await db.moltbot_configs.find_one_and_update(
+            {"_id": "gateway_config",
+             "$or": available},
+            {"$set": {until: now + timedelta(seconds=seconds), holder: WORKER_ID}},
+            projection={"_id": 1},
+        )
+    except Exception as e:
+        # Without the database nothing can be shared anyway: act here, as before
+        logger.warning(f"Could not take the gateway {name} lease: {e}")
+        return True
+    return doc is not None
+
+
+async def release_gateway_lease(name: str) -> None:
+    """Give up the `name` lease if this worker holds it"""
+    try:
+        await db.moltbot_configs.update_one(
+            {"_id": "gateway_config", f"{name}_holder": WORKER_ID},
+            {"$unset": {f"{name}_until": "", f"{name}_holder": ""}}
+        )
+    except Exception as e:
+        logger.warning(f"Could not release the gateway {name} lease: {e}")
+
+
+async def restart_gateway(token: str = None, api_key: str = None, provider: str = "emergent",
+                          stop_first: bool = False) -> bool:
+    """Restart the gateway: a blue/green switch-over when enabled, else a supervisor restart.
+
+    Only one worker restarts at a time (the restart lease); a restart requested
+    while another worker's is running is skipped and returns False.
+
+    Args:
+        token, api_key, provider: New settings for the restarted gateway. Without
+            a token the running gateway's settings are reused.
+        stop_first: Stop the gateway before starting it again, so two processes
+            never run at once (even in blue/green mode)
+    """
+    if not await claim_gateway_lease("restart", GATEWAY_RESTART_LEASE):
+        logger.warning("Another worker is restarting the gateway, not restarting it here")
+        return False
+    try:
+        return await _restart_gateway(token, api_key, provider, stop_first)
+    finally:
+        await release_gateway_lease("restart")
+
+
+async def _restart_gateway(token: Optional[str], api_key: Optional[str], provider: str, stop_first: bool) -> bool:
+    if GATEWAY_BLUE_GREEN and not stop_first:
+        if await GatewayUpstream.switch_over(token=token, api_key=api_key, provider=provider):
+            GatewayLiveness.invalidate()
+            await db.moltbot_configs.update_one(
+                {"_id": "gateway_config"},
+                # The version bump makes the other workers follow the switch (see follow_gateway_config)
+                {"$set": {"active_slot": GatewayUpstream.active().name, "updated_at": datetime.now(timezone.utc)},
+                 "$inc": {"state_version": 1}},
+                upsert=True
+            )
+            return True
+        logger.warning("Blue/green switch-over failed, restarting the gateway in place")
+
+    slot = GatewayUpstream.active()
+    if token:
+        await write_gateway_env(token=token, api_key=api_key, provider=provider, env_file=slot.env_file,
+                                port=None if slot is GatewayUpstream.PRIMARY else slot.port)
+    if stop_first:
+        if GATEWAY_BLUE_GREEN:
+            # An old process still draining from a switch-over counts too
+            await GatewayUpstream.stop_draining()
+            await GatewayUpstream.inactive().client.stop()
+        await slot.client.stop()
+        restarted = await slot.client.start()
+    else:
+        restarted = await slot.client.restart()
+    GatewayLiveness.invalidate()
+    return restarted
+
+
+def gateway_port(slot=None) -> int:
+    """Port of a gateway slot (the active one by default)"""
+    slot = slot or GatewayUpstream.active()
+    return MOLTBOT_PORT if slot is GatewayUpstream.PRIMARY else slot.port
+
+
+async def check_gateway_running():
+    """
+    Check if the gateway process is running (cached supervisor state, no subprocess).
+
+    Waits for startup to finish recovering the gateway first (a no-op
+    afterwards), so requests arriving during startup do not see it as stopped.
+    """
+    await wait_for_gateway_recovery()
+    return await GatewayLiveness.check()
+
+
+async def is_gateway_owner(user) -> bool:
+    """Whether `user` owns the gateway, re-reading shared state before saying no"""
+    # Until startup has recovered it, the owner is not known yet
+    await wait_for_gateway_recovery()
+    if user and gateway_state["owner_user_id"] == user.user_id:
+        return True
+    # Another worker may have started the gateway since this one last heard
+    await gateway_state.refresh()
+    return bool(user) and gateway_state["owner_user_id"] == user.user_id
+
+
+# The last logout seen in the shared gateway_config document
+sessions_revoked_at = None
+
+
+async def publish_session_revocation() -> None:
+    """Make every worker drop its cached sessions, which would outlive a logout by up to SESSION_CACHE_TTL"""
+    try:
+        await db.moltbot_configs.update_one(
+            {"_id": "gateway_config"},
+            {"$set": {"sessions_revoked_at": datetime.now(timezone.utc)}, "$inc": {"state_version": 1}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"Could not publish the logout to the other workers: {e}")
+
+
+def follow_gateway_config(doc: dict) -> None:
+    """Apply another worker's change: follow its blue/green switch, forget sessions after a logout"""
+    global sessions_revoked_at
+    slot = doc.get("active_slot")
+    if GATEWAY_BLUE_GREEN and slot and slot != GatewayUpstream.active().name:
+        GatewayUpstream.set_active(slot)
+        GatewayLiveness.invalidate()
+        logger.info(f"Following gateway switch-over to slot {slot}")
+    revoked_at = doc.get("sessions_revoked_at")
+    if revoked_at is not None and revoked_at != sessions_revoked_at:
+        sessions_revoked_at = revoked_at
+        SessionCache.invalidate_all()
+
+
+# ============== Gateway Pool (one gateway per user, GATEWAY_POOL) ==============
+
+async def provision_pool_gateway(gateway: PoolGateway, api_key: str = None, provider: str = None):
+    """Write a pool gateway's clawdbot.json (when new or given new settings) and its env file.
+
+    Returns:
+        (token, provider) the gateway runs with.
+    """
+    provider = provider or gateway.provider or "emergent"
+    token = await read_gateway_token(gateway.config_file)
+    if api_key or not token or provider != gateway.provider:
+        token = await create_moltbot_config(
+            token=token or gateway.token, api_key=api_key, provider=provider,
+            config_file=gateway.config_file, port=gateway.port, workspace_dir=gateway.workspace_dir
+        )
+    await write_gateway_env(token=token, api_key=api_key, provider=provider,
+                            env_file=gateway.env_file, port=gateway.port)
+    return token, provider
+
+
+async def pool_gateway_command() -> str:
+    """clawdbot executable for pool gateways (installed on first use)"""
+    clawdbot_cmd = await asyncio.to_thread(get_clawdbot_command)
+    if not clawdbot_cmd and await asyncio.to_thread(ensure_moltbot_installed):
+        clawdbot_cmd = await asyncio.to_thread(get_clawdbot_command)
+    if not clawdbot_cmd:
+        raise GatewayPoolError("OpenClaw (clawdbot) is not installed. Please contact support.")
+    return clawdbot_cmd
+
+
+async def user_gateway(user: User, api_key: str = None, provider: str = None, restart: bool = False) -> PoolGateway:
+    """The user's own gateway, started if it is not running (with `restart`, restarted unless
+    it already runs with these settings)"""
+    if not restart:
+        known = await GatewayPool.lookup(user.user_id)
+        if known is not None and known.should_run is False:
+            # Stopped by its owner: only /openclaw/start brings it back
+            raise HTTPException(status_code=503, detail="OpenClaw not running")
+
+    async def provision(gateway):
+        return await provision_pool_gateway(gateway, api_key=api_key, provider=provider)
+
+    try:
+        if restart:
+            return await GatewayPool.restart(user.user_id, provision, pool_gateway_command,
+                                             settings=settings_digest(provider, api_key))
+        return await GatewayPool.ensure_running(user.user_id, provision, pool_gateway_command)
+    except GatewayPoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except GatewayPoolError as e:
+        logger.error(f"Failed to start gateway for {user.user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def slot_token(slot) -> Optional[str]:
+    """Auth token of the gateway in `slot` (pool gateways each have their own)"""
+    if isinstance(slot, PoolGateway):
+        return slot.token
+    return gateway_state.get("token")
 
 
 # ============== Moltbot API Endpoints (Protected) ==============
@@ -830,6 +1137,55 @@ async def root():
     return {"message": "OpenClaw Hosting API"}
 
 
+# Bearer token for /api/metrics (the endpoint is disabled when unset)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+metrics.counter(
+    "openclaw_session_cache_lookups_total", "get_current_user session cache lookups", ("result",),
+    callback=lambda: [(("hit",), SessionCache.hits), (("miss",), SessionCache.misses),
+                      (("coalesced",), SessionCache.coalesced)],
+)
+metrics.counter(
+    "openclaw_html_injection_cache_lookups_total", "Transformed Control UI HTML cache lookups", ("result",),
+    callback=lambda: [(("hit",), WsOverrideInjector.hits), (("miss",), WsOverrideInjector.misses)],
+)
+metrics.counter(
+    "openclaw_proxy_single_flight_requests_total", "Control UI GETs that fetched upstream (leader) or shared a fetch",
+    ("role",),
+    callback=lambda: [(("leader",), proxy_flights.leaders), (("coalesced",), proxy_flights.coalesced)],
+)
+PROXY_COALESCE_FALLBACKS = metrics.counter(
+    "openclaw_proxy_single_flight_fallbacks_total",
+    "Coalesced Control UI GETs that fetched again because the shared response was streamed",
+)
+metrics.counter(
+    "openclaw_asset_cache_lookups_total", "Immutable Control UI asset cache lookups", ("result",),
+    callback=lambda: [(("memory",), AssetCache.hits), (("disk",), AssetCache.disk_hits),
+                      (("miss",), AssetCache.misses)],
+)
+metrics.counter(
+    "openclaw_gateway_state_updates_total", "Gateway state changes made by this worker or picked up from others",
+    ("source",),
+    callback=lambda: [(("local",), gateway_state.published), (("remote",), gateway_state.remote_updates)],
+)
+metrics.gauge(
+    "openclaw_asset_cache_bytes", "Bytes of cached Control UI assets held in memory",
+    callback=lambda: [((), AssetCache.size())],
+)
+
+
+@api_router.get("/metrics")
+async def get_metrics(request: Request):
+    """Prometheus-style metrics for the proxy (WebSocket relay, caches)"""
+    # Per-user gateway names, memory and traffic: never served without a token
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=403, detail="Metrics are disabled (set METRICS_TOKEN)")
+    authorization = request.headers.get("Authorization", "")
+    if not secrets.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @api_router.post("/openclaw/start", response_model=OpenClawStartResponse)
 async def start_moltbot(request: OpenClawStartRequest, req: Request):
     """Start the Moltbot gateway with Emergent provider (requires auth)"""
@@ -842,8 +1198,21 @@ async def start_moltbot(request: OpenClawStartRequest, req: Request):
     if request.provider in ["anthropic", "openai"] and (not request.apiKey or len(request.apiKey) < 10):
         raise HTTPException(status_code=400, detail="API key required for anthropic/openai providers")
 
+    if GATEWAY_POOL:
+        # (Re)start the user's own gateway with these settings (left running if unchanged)
+        gateway = await user_gateway(user, api_key=request.apiKey, provider=request.provider, restart=True)
+        return OpenClawStartResponse(
+            ok=True,
+            controlUrl="/api/openclaw/ui/",
+            token=gateway.token,
+            message="OpenClaw started successfully with Emergent provider"
+        )
+
+    # Owner and token of a running gateway are recovered in the background at startup
+    await wait_for_gateway_recovery()
+
     # Check if Moltbot is already running by another user
-    if check_gateway_running() and gateway_state["owner_user_id"] != user.user_id:
+    if await check_gateway_running() and not await is_gateway_owner(user):
         raise HTTPException(
             status_code=403,
             detail="OpenClaw is already running by another user. Please wait for them to stop it."
@@ -873,13 +1242,29 @@ async def start_moltbot(request: OpenClawStartRequest, req: Request):
 async def get_moltbot_status(request: Request):
     """Get the current status of the Moltbot gateway"""
     user = await get_current_user(request)
-    running = check_gateway_running()
+
+    if GATEWAY_POOL:
+        # An evicted gateway still counts as running: it starts again on the next visit
+        gateway = await GatewayPool.lookup(user.user_id) if user else None
+        if gateway is None or not gateway.should_run:
+            return OpenClawStatusResponse(running=False)
+        return OpenClawStatusResponse(
+            running=True,
+            pid=gateway.pid,
+            provider=gateway.provider,
+            started_at=gateway.started_at,
+            controlUrl="/api/openclaw/ui/",
+            owner_user_id=user.user_id,
+            is_owner=True
+        )
+
+    running = await check_gateway_running()
 
     if running:
-        is_owner = user and gateway_state["owner_user_id"] == user.user_id
+        is_owner = await is_gateway_owner(user)
         return OpenClawStatusResponse(
             running=True,
-            pid=SupervisorClient.get_pid(),
+            pid=await GatewayLiveness.current_pid(),
             provider=gateway_state["provider"],
             started_at=gateway_state["started_at"],
             controlUrl="/api/openclaw/ui/",
@@ -891,9 +1276,24 @@ async def get_moltbot_status(request: Request):
 
 
 @api_router.get("/openclaw/whatsapp/status")
-async def get_whatsapp_connection_status():
-    """Get basic WhatsApp connection status. Auto-fix handled by background watcher."""
-    return get_whatsapp_status()
+async def get_whatsapp_connection_status(request: Request):
+    """Get basic WhatsApp connection status. Auto-fix handled by background watcher.
+
+    Served from memory with an ETag; polling clients sending If-None-Match get a 304.
+    In pool mode each user sees the link of their own gateway.
+    """
+    if GATEWAY_POOL:
+        user = await require_auth(request)
+        gateway = await GatewayPool.lookup(user.user_id)
+        status = (await get_whatsapp_status(gateway.creds_file) if gateway is not None
+                  else {"linked": False, "phone": None, "registered": False})
+        etag = status_etag(status)
+    else:
+        status, etag = await WhatsAppStatusCache.get()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(status, headers=headers)
 
 
 @api_router.post("/openclaw/stop")
@@ -903,7 +1303,12 @@ async def stop_moltbot(request: Request):
 
     global gateway_state
 
-    if not check_gateway_running():
+    if GATEWAY_POOL:
+        await GatewayPool.stop_gateway(user.user_id)
+        return {"ok": True, "message": "OpenClaw stopped"}
+
+    await wait_for_gateway_recovery()
+    if not await check_gateway_running():
         # Clear should_run flag even if not running
         await db.moltbot_configs.update_one(
             {"_id": "gateway_config"},
@@ -912,15 +1317,24 @@ async def stop_moltbot(request: Request):
         return {"ok": True, "message": "OpenClaw is not running"}
 
     # Check if user is the owner
-    if gateway_state["owner_user_id"] != user.user_id:
+    if not await is_gateway_owner(user):
         raise HTTPException(status_code=403, detail="Only the owner can stop OpenClaw")
 
     # Stop via supervisor
-    if not SupervisorClient.stop():
+    if await GatewayUpstream.active().client.stop():
+        GatewayLiveness.mark_running(False)
+    else:
         logger.error("Failed to stop gateway via supervisor")
+        GatewayLiveness.invalidate()
+
+    if GATEWAY_BLUE_GREEN:
+        # Also stop a previous gateway that is still draining
+        await GatewayUpstream.stop_draining()
+        await GatewayUpstream.inactive().client.stop()
+        await clear_gateway_env(GatewayUpstream.STANDBY.env_file)
 
     # Clear the gateway env file
-    clear_gateway_env()
+    await clear_gateway_env()
 
     # Clear should_run flag in database
     await db.moltbot_configs.update_one(
@@ -928,11 +1342,8 @@ async def stop_moltbot(request: Request):
         {"$set": {"should_run": False, "updated_at": datetime.now(timezone.utc)}}
     )
 
-    # Clear in-memory state
-    gateway_state["token"] = None
-    gateway_state["provider"] = None
-    gateway_state["started_at"] = None
-    gateway_state["owner_user_id"] = None
+    # Clear shared state
+    await gateway_state.publish(token=None, provider=None, started_at=None, owner_user_id=None)
 
     return {"ok": True, "message": "OpenClaw stopped"}
 
@@ -942,11 +1353,17 @@ async def get_moltbot_token(request: Request):
     """Get the current gateway token for authentication (only owner)"""
     user = await require_auth(request)
 
-    if not check_gateway_running():
+    if GATEWAY_POOL:
+        gateway = await GatewayPool.lookup(user.user_id)
+        if gateway is None or not gateway.should_run or not gateway.token:
+            raise HTTPException(status_code=404, detail="OpenClaw not running")
+        return {"token": gateway.token}
+
+    if not await check_gateway_running():
         raise HTTPException(status_code=404, detail="OpenClaw not running")
 
     # Only owner can get the token
-    if gateway_state["owner_user_id"] != user.user_id:
+    if not await is_gateway_owner(user):
         raise HTTPException(status_code=403, detail="Only the owner can access the token")
 
     return {"token": gateway_state.get("token")}
@@ -954,126 +1371,285 @@ async def get_moltbot_token(request: Request):
 
 # ============== Moltbot Proxy (Protected) ==============
 
+# Coalesce identical concurrent Control UI GETs into one upstream fetch
+PROXY_COALESCE = os.environ.get('MOLTBOT_PROXY_COALESCE', 'true').lower() == 'true'
+# Non-HTML bodies up to this size are buffered when coalescing so they can be shared
+PROXY_COALESCE_MAX_BYTES = int(os.environ.get('MOLTBOT_PROXY_COALESCE_MAX_BYTES', str(256 * 1024)))
+proxy_flights = SingleFlight("proxy")
+
+GATEWAY_NOT_RUNNING_HTML = "<html><body><h1>OpenClaw not running</h1><p>Please start OpenClaw first.</p><a href='/'>Go to setup</a></body></html>"
+ACCESS_DENIED_HTML = "<html><body><h1>Access Denied</h1><p>This OpenClaw instance is owned by another user.</p><a href='/'>Go back</a></body></html>"
+
 @api_router.api_route("/openclaw/ui/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"])
 async def proxy_moltbot_ui(request: Request, path: str = ""):
     """Proxy requests to the Moltbot Control UI (only owner can access)"""
     user = await get_current_user(request)
 
-    if not check_gateway_running():
-        return HTMLResponse(
-            content="<html><body><h1>OpenClaw not running</h1><p>Please start OpenClaw first.</p><a href='/'>Go to setup</a></body></html>",
-            status_code=503
-        )
+    gateway = None
+    if GATEWAY_POOL:
+        # Each user reaches their own gateway, started on first access
+        if not user:
+            return HTMLResponse(content=ACCESS_DENIED_HTML, status_code=403)
+        known = await GatewayPool.lookup(user.user_id)
+        if known is not None and known.should_run is False:
+            return HTMLResponse(content=GATEWAY_NOT_RUNNING_HTML, status_code=503)
+        gateway = await user_gateway(user)
+    elif not await check_gateway_running():
+        return HTMLResponse(content=GATEWAY_NOT_RUNNING_HTML, status_code=503)
 
     # Check if user is the owner
-    if not user or gateway_state["owner_user_id"] != user.user_id:
-        return HTMLResponse(
-            content="<html><body><h1>Access Denied</h1><p>This OpenClaw instance is owned by another user.</p><a href='/'>Go back</a></body></html>",
-            status_code=403
-        )
+    elif not await is_gateway_owner(user):
+        return HTMLResponse(content=ACCESS_DENIED_HTML, status_code=403)
+
+    # Content-addressed assets already fetched are served without reaching the gateway
+    if AssetCache.candidate(request.method, path, request.headers):
+        entry = await AssetCache.get(proxy_cache_key(request, path))
+        if entry is not None:
+            return asset_response(request, entry)
+
+    # Requests in flight keep the gateway they started on through a blue/green switch
+    # (and keep a pool gateway from being evicted)
+    with GatewayUpstream.hold(gateway) as slot:
+        return await forward_to_gateway(request, path, slot)
+
+
+def proxy_cache_key(request: Request, path: str) -> str:
+    """Cache key of a proxied Control UI path (with its query string)."""
+    return f"{path}?{request.query_params}" if request.query_params else path
+
+
+def asset_response(request: Request, entry) -> Response:
+    """Serve a cached asset in the encoding the client prefers (304 if it already has it)."""
+    encoding, body = entry.negotiate(request.headers.get("accept-encoding"))
+    headers = entry.headers(encoding)
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, headers=headers, media_type=entry.content_type)
+
+
+async def compressed_response(response: httpx.Response, encoding: str) -> Response:
+    """Relay an uncompressed upstream response compressed with `encoding`."""
+    try:
+        with timed(PHASE_UPSTREAM):
+            content = await response.aread()
+    except httpx.RequestError as e:
+        logger.error(f"Proxy error: {e}")
+        raise HTTPException(status_code=502, detail="Failed to connect to OpenClaw")
+    finally:
+        await response.aclose()
+    headers = filter_response_headers(response.headers, decoded=True)
+    vary = [v.strip() for v in headers.pop("vary", "").split(",") if v.strip()]
+    if "accept-encoding" not in {v.lower() for v in vary}:
+        vary.append("Accept-Encoding")
+    headers["vary"] = ", ".join(vary)
+    headers["content-encoding"] = encoding
+    body = await asyncio.to_thread(compress_response, content, encoding)
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+# Headers that change the response to an otherwise identical GET
+COALESCE_VARY_HEADERS = ("accept-encoding", "range", "if-none-match", "if-modified-since", "if-range")
+
+
+def coalesce_key(request: Request, path: str):
+    """Single-flight key of a safe request without a body, or None if it must not be shared."""
+    if request.method not in ("GET", "HEAD") or request_body_stream(request) is not None:
+        return None
+    return (request.method, proxy_cache_key(request, path),
+            tuple(request.headers.get(name) for name in COALESCE_VARY_HEADERS))
+
+
+def share_response(response: Response) -> Response:
+    """A copy of a buffered response for another caller of the same single-flight fetch."""
+    shared = Response(content=response.body, status_code=response.status_code)
+    shared.raw_headers = list(response.raw_headers)
+    return shared
 
-    target_url = f"http://127.0.0.1:{MOLTBOT_PORT}/{path}"
+
+async def discard_response(response: Response) -> None:
+    """Close the upstream body of a streamed response nobody will relay (and release its slot)."""
+    if isinstance(response, StreamingResponse) and response.background is not None:
+        await response.background()
+
+
+async def forward_to_gateway(request: Request, path: str, slot) -> Response:
+    """
+    Forward a Control UI request to the gateway in `slot`, coalescing identical
+    concurrent GETs into one upstream fetch.
+    """
+    if not PROXY_COALESCE:
+        return await fetch_from_gateway(request, path, slot)
+    key = coalesce_key(request, path)
+    if key is None:
+        return await fetch_from_gateway(request, path, slot)
+    # Never share a response between gateways (pool gateways serve different users)
+    key = (slot.name,) + key
+
+    response, shared = await proxy_flights.do(key, lambda: fetch_from_gateway(request, path, slot, shareable=True),
+                                              discard=discard_response)
+    if not shared:
+        return response
+    if isinstance(response, StreamingResponse):
+        # A streamed body can only be relayed once: fetch our own
+        PROXY_COALESCE_FALLBACKS.inc()
+        return await fetch_from_gateway(request, path, slot)
+    return share_response(response)
+
+
+async def fetch_from_gateway(request: Request, path: str, slot, shareable: bool = False) -> Response:
+    """
+    Fetch a Control UI request from the gateway in `slot`, injecting the WebSocket override into HTML.
+
+    With `shareable`, small non-HTML bodies are buffered instead of streamed
+    so that coalesced callers can be served the same response.
+    """
+    target_url = f"http://127.0.0.1:{gateway_port(slot)}/{path}"
 
     # Handle query string
     if request.query_params:
         target_url += f"?{request.query_params}"
 
-    async with httpx.AsyncClient() as client:
-        try:
-            # Forward the request
-            headers = dict(request.headers)
-            headers.pop("host", None)
-            headers.pop("content-length", None)
-
-            body = await request.body()
-
-            response = await client.request(
-                method=request.method,
-                url=target_url,
-                headers=headers,
-                content=body,
-                timeout=30.0
-            )
-
-            # Filter response headers
-            exclude_headers = {"content-encoding", "content-length", "transfer-encoding", "connection"}
-            response_headers = {
-                k: v for k, v in response.headers.items()
-                if k.lower() not in exclude_headers
-            }
+    client = ProxyClient.get()
+    current_token = slot_token(slot)
+    upstream_headers = forward_request_headers(request)
+    cache_key = proxy_cache_key(request, path)
+    # Transformed HTML embeds the token: keep each pool gateway's pages apart
+    page_key = f"{slot.name}:{cache_key}" if isinstance(slot, PoolGateway) else cache_key
+
+    # Fetch cacheable assets whole and uncompressed, to compress and keep them once
+    cache_asset = AssetCache.candidate(request.method, path, request.headers)
+    if cache_asset:
+        upstream_headers = AssetCache.upstream_headers(upstream_headers)
+
+    # Revalidate HTML we already hold transformed instead of re-downloading it
+    revalidating = False
+    if request.method == "GET" and not ("if-none-match" in request.headers or "if-modified-since" in request.headers):
+        conditional = WsOverrideInjector.conditional_headers(page_key, current_token)
+        if conditional:
+            upstream_headers.update(conditional)
+            revalidating = True
 
-            # Get content and rewrite WebSocket URLs if HTML
-            content = response.content
-            content_type = response.headers.get("content-type", "")
-
-            # Get the current gateway token
-            current_token = gateway_state.get("token", "")
-
-            # If it's HTML, rewrite any WebSocket URLs to use our proxy
-            if "text/html" in content_type:
-                content_str = content.decode('utf-8', errors='ignore')
-                # Inject WebSocket URL override script with token
-                ws_override = f'''
-<script>
-// OpenClaw Proxy Configuration
-window.__MOLTBOT_PROXY_TOKEN__ = "{current_token}";
-window.__MOLTBOT_PROXY_WS_URL__ = (window.location.protocol === 'https:' ? 'wss:' : 'ws:') + '//' + window.location.host + '/api/openclaw/ws';
-
-// Override WebSocket to use proxy path
-(function() {{
-    const originalWS = window.WebSocket;
-    const proxyWsUrl = window.__MOLTBOT_PROXY_WS_URL__;
-
-    window.WebSocket = function(url, protocols) {{
-        let finalUrl = url;
-
-        // Rewrite any OpenClaw gateway URLs to use our proxy
-        if (url.includes('127.0.0.1:18789') ||
-            url.includes('localhost:18789') ||
-            url.includes('0.0.0.0:18789') ||
-            (url.includes(':18789') && !url.includes('/api/openclaw/'))) {{
-            finalUrl = proxyWsUrl;
-        }}
-
-        // If it's a relative URL or same-origin, redirect to proxy
-        try {{
-            const urlObj = new URL(url, window.location.origin);
-            if (urlObj.port === '18789' || urlObj.pathname === '/' && !url.startsWith(proxyWsUrl)) {{
-                finalUrl = proxyWsUrl;
-            }}
-        }} catch (e) {{}}
-
-        console.log('[OpenClaw Proxy] WebSocket:', url, '->', finalUrl);
-        return new originalWS(finalUrl, protocols);
-    }};
-
-    // Copy static properties
-    window.WebSocket.prototype = originalWS.prototype;
-    window.WebSocket.CONNECTING = originalWS.CONNECTING;
-    window.WebSocket.OPEN = originalWS.OPEN;
-    window.WebSocket.CLOSING = originalWS.CLOSING;
-    window.WebSocket.CLOSED = originalWS.CLOSED;
-}})();
-</script>
-'''
-                # Insert before </head> or at start of <body>
-                if '</head>' in content_str:
-                    content_str = content_str.replace('</head>', ws_override + '</head>')
-                elif '<body>' in content_str:
-                    content_str = content_str.replace('<body>', '<body>' + ws_override)
-                else:
-                    content_str = ws_override + content_str
-                content = content_str.encode('utf-8')
+    try:
+        # Forward the request, streaming the body upstream
+        upstream_request = client.build_request(
+            method=request.method,
+            url=target_url,
+            headers=upstream_headers,
+            content=request_body_stream(request)
+        )
+        with timed(PHASE_UPSTREAM):
+            response = await client.send(upstream_request, stream=True)
+
+        if revalidating and response.status_code == 304:
+            await response.aclose()
+            cached = WsOverrideInjector.cached(page_key, current_token)
+            if cached:
+                cached_content, cached_headers = cached
+                return Response(
+                    content=cached_content,
+                    status_code=200,
+                    headers=cached_headers,
+                    media_type=cached_headers.get("content-type")
+                )
+            # Evicted while revalidating - fetch the full page again
+            with timed(PHASE_UPSTREAM):
+                response = await client.send(
+                    client.build_request("GET", target_url, headers=forward_request_headers(request)),
+                    stream=True
+                )
+    except httpx.RequestError as e:
+        logger.error(f"Proxy error: {e}")
+        if isinstance(slot, PoolGateway):
+            # Possibly stopped by another worker: check supervisor on the next request
+            slot.running = False
+        raise HTTPException(status_code=502, detail="Failed to connect to OpenClaw")
+
+    content_type = response.headers.get("content-type", "")
+
+    policy = AssetCache.policy(response.status_code, response.headers) if cache_asset else None
+    if policy is not None:
+        try:
+            with timed(PHASE_UPSTREAM):
+                content = await response.aread()
+        except httpx.RequestError as e:
+            logger.error(f"Proxy error: {e}")
+            raise HTTPException(status_code=502, detail="Failed to connect to OpenClaw")
+        finally:
+            await response.aclose()
+        entry = await AssetCache.put(cache_key, content, content_type or "application/octet-stream", policy)
+        return asset_response(request, entry)
+    if cache_asset:
+        encoding = AssetCache.passthrough_encoding(
+            request.headers.get("accept-encoding"), response.status_code, response.headers
+        )
+        if encoding != IDENTITY:
+            return await compressed_response(response, encoding)
 
+    # Relay non-HTML responses chunk by chunk, still encoded as the gateway sent them
+    if PROXY_STREAMING and "text/html" not in content_type:
+        content_length = response.headers.get("content-length", "")
+        if shareable and content_length.isdigit() and int(content_length) <= PROXY_COALESCE_MAX_BYTES:
+            try:
+                with timed(PHASE_UPSTREAM):
+                    content = b"".join([chunk async for chunk in response.aiter_raw()])
+            except httpx.RequestError as e:
+                logger.error(f"Proxy error: {e}")
+                raise HTTPException(status_code=502, detail="Failed to connect to OpenClaw")
+            finally:
+                await response.aclose()
             return Response(
                 content=content,
                 status_code=response.status_code,
-                headers=response_headers,
-                media_type=response.headers.get("content-type")
+                headers=filter_response_headers(response.headers, decoded=False)
             )
-        except httpx.RequestError as e:
-            logger.error(f"Proxy error: {e}")
-            raise HTTPException(status_code=502, detail="Failed to connect to OpenClaw")
+
+        # The body outlives this handler: keep the slot held until it has been relayed
+        slot.acquire()
+
+        async def close_upstream():
+            try:
+                await response.aclose()
+            finally:
+                slot.release()
+
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers=filter_response_headers(response.headers, decoded=False),
+            background=BackgroundTask(close_upstream)
+        )
+
+    # HTML needs the full body for script injection (everything, in buffered mode)
+    try:
+        with timed(PHASE_UPSTREAM):
+            content = await response.aread()
+    except httpx.RequestError as e:
+        logger.error(f"Proxy error: {e}")
+        raise HTTPException(status_code=502, detail="Failed to connect to OpenClaw")
+    finally:
+        await response.aclose()
+
+    response_headers = filter_response_headers(response.headers, decoded=True)
+
+    # If it's HTML, inject the WebSocket override script (reusing the cached
+    # transformed page when the upstream validator has not changed)
+    if "text/html" in content_type:
+        validator = None
+        if request.method == "GET" and response.status_code == 200:
+            validator = WsOverrideInjector.validator(response.headers)
+        cached = WsOverrideInjector.cached(page_key, current_token, validator) if validator else None
+        if cached:
+            content = cached[0]
+        else:
+            content = WsOverrideInjector.transform(page_key, content, current_token, response_headers, validator)
+
+    return Response(
+        content=content,
+        status_code=response.status_code,
+        headers=response_headers,
+        media_type=response.headers.get("content-type")
+    )
 
 
 # Root proxy for Moltbot UI (handles /api/moltbot/ui without trailing path)
@@ -1087,86 +1663,95 @@ async def proxy_moltbot_ui_root(request: Request):
 
 
 # WebSocket proxy for Moltbot (Protected)
+def connect_gateway_ws(slot=None):
+    """Open a WebSocket to the gateway (await it, or use it as an async context manager)."""
+    # Moltbot expects WebSocket connection with optional auth in query params
+    moltbot_ws_url = f"ws://127.0.0.1:{gateway_port(slot)}/"
+    logger.info(f"WebSocket proxy connecting to: {moltbot_ws_url}")
+
+    # Additional headers for connection
+    extra_headers = {}
+    token = slot_token(slot or GatewayUpstream.active())
+    if token:
+        extra_headers["X-Auth-Token"] = token
+
+    return websockets.connect(
+        moltbot_ws_url,
+        ping_interval=20,
+        ping_timeout=20,
+        close_timeout=10,
+        additional_headers=extra_headers if extra_headers else None
+    )
+
+
+WS_ACTIVE_CONNECTIONS = metrics.gauge(
+    "openclaw_ws_active_connections", "Browser WebSocket connections open on the proxy"
+)
+WS_UPSTREAM_CONNECT_SECONDS = metrics.histogram(
+    "openclaw_ws_upstream_connect_seconds", "Time to open the gateway WebSocket for a dedicated relay"
+)
+WS_UPSTREAM_CONNECT_FAILURES = metrics.counter(
+    "openclaw_ws_upstream_connect_failures_total", "Gateway WebSocket connections that could not be opened"
+)
+
+
 @api_router.websocket("/openclaw/ws")
 async def websocket_proxy(websocket: WebSocket):
     """WebSocket proxy for Moltbot Control UI"""
     await websocket.accept()
 
-    if not check_gateway_running():
+    if GATEWAY_POOL:
+        # Route to the session user's own gateway
+        user = await get_current_user(websocket)
+        if not user:
+            await websocket.close(code=1008, reason="Not authenticated")
+            return
+        try:
+            slot = await user_gateway(user)
+        except HTTPException as e:
+            await websocket.close(code=1013, reason=str(e.detail)[:120])
+            return
+    elif not await check_gateway_running():
         await websocket.close(code=1013, reason="OpenClaw not running")
         return
+    else:
+        # Note: WebSocket auth is handled by the token in the connection itself
+        # The Control UI passes the token in the connect message
 
-    # Note: WebSocket auth is handled by the token in the connection itself
-    # The Control UI passes the token in the connect message
-
-    # Get the token from state
-    token = gateway_state.get("token")
-
-    # Moltbot expects WebSocket connection with optional auth in query params
-    moltbot_ws_url = f"ws://127.0.0.1:{MOLTBOT_PORT}/"
-
-    logger.info(f"WebSocket proxy connecting to: {moltbot_ws_url}")
-
+        # The connection stays on this gateway through a blue/green switch until it closes
+        slot = GatewayUpstream.active()
+    slot.acquire()
+    WS_ACTIVE_CONNECTIONS.inc()
     try:
-        # Additional headers for connection
-        extra_headers = {}
-        if token:
-            extra_headers["X-Auth-Token"] = token
-
-        async with websockets.connect(
-            moltbot_ws_url,
-            ping_interval=20,
-            ping_timeout=20,
-            close_timeout=10,
-            additional_headers=extra_headers if extra_headers else None
-        ) as moltbot_ws:
-
-            async def client_to_moltbot():
-                try:
-                    while True:
-                        try:
-                            data = await websocket.receive()
-                            if data["type"] == "websocket.receive":
-                                if "text" in data:
-                                    await moltbot_ws.send(data["text"])
-                                elif "bytes" in data:
-                                    await moltbot_ws.send(data["bytes"])
-                            elif data["type"] == "websocket.disconnect":
-                                break
-                        except WebSocketDisconnect:
-                            break
-                except Exception as e:
-                    logger.error(f"Client to Moltbot error: {e}")
-
-            async def moltbot_to_client():
-                try:
-                    async for message in moltbot_ws:
-                        if websocket.client_state == WebSocketState.CONNECTED:
-                            if isinstance(message, str):
-                                await websocket.send_text(message)
-                            else:
-                                await websocket.send_bytes(message)
-                except ConnectionClosed as e:
-                    logger.info(f"Moltbot WebSocket closed: {e}")
-                except Exception as e:
-                    logger.error(f"Moltbot to client error: {e}")
-
-            # Run both directions concurrently
-            done, pending = await asyncio.wait(
-                [
-                    asyncio.create_task(client_to_moltbot()),
-                    asyncio.create_task(moltbot_to_client())
-                ],
-                return_when=asyncio.FIRST_COMPLETED
+        first_frame = None
+        if WS_MULTIPLEX:
+            # Share a gateway connection with other tabs when the client allows it
+            handled, first_frame = await MuxPool.serve(
+                websocket, slot_token(slot), lambda: connect_gateway_ws(slot), gateway=slot.name
             )
+            if handled:
+                return
+
+        connect_started = time.perf_counter()
+        try:
+            moltbot_ws = await connect_gateway_ws(slot)
+        except Exception:
+            WS_UPSTREAM_CONNECT_FAILURES.inc()
+            raise
+        WS_UPSTREAM_CONNECT_SECONDS.observe(time.perf_counter() - connect_started)
+
+        async with moltbot_ws:
+            if first_frame is not None:
+                await moltbot_ws.send(first_frame)
 
-            # Cancel pending tasks
-            for task in pending:
-                task.cancel()
+            # Relay both directions with bounded, watermark-controlled buffers
+            await WebSocketRelay(websocket, moltbot_ws).run()
 
     except Exception as e:
         logger.error(f"WebSocket proxy error: {e}")
     finally:
+        WS_ACTIVE_CONNECTIONS.dec()
+        slot.release()
         try:
             if websocket.client_state == WebSocketState.CONNECTED:
                 await websocket.close(code=1011, reason="Proxy connection ended")
@@ -1333,7 +1918,7 @@ async def detect_industry_endpoint(request: DetectIndustryRequest):
 @api_router.get("/scraper/cookies/status")
 async def get_cookies_status():
     """Check if Facebook cookies are configured and their expiration status"""
-    from fb_scraper import check_cookie_expiration
+    from fb_scraper import check_cookie_expiration, cookies_exist
     
     configured = cookies_exist()
     if not configured:
@@ -1351,6 +1936,8 @@ async def get_cookies_status():
 async def get_browser_status():
     """Check if Playwright browser is available for scraping"""
     try:
+        await ensure_scraper_browsers()
+        from fb_scraper import check_browser_availability
         result = await check_browser_availability()
         return result
     except Exception as e:
@@ -1364,6 +1951,8 @@ async def get_browser_status():
 @api_router.post("/scraper/cookies/save")
 async def save_cookies_endpoint(request: SaveCookiesRequest):
     """Save Facebook cookies"""
+    from fb_scraper import save_cookies
+
     if not request.cookies:
         raise HTTPException(status_code=400, detail="No cookies provided")
     
@@ -1376,6 +1965,8 @@ async def save_cookies_endpoint(request: SaveCookiesRequest):
 @api_router.delete("/scraper/cookies")
 async def delete_cookies_endpoint():
     """Delete saved Facebook cookies"""
+    from fb_scraper import delete_cookies
+
     if delete_cookies():
         return {'success': True, 'message': 'Cookies deleted'}
     else:
@@ -1384,6 +1975,7 @@ async def delete_cookies_endpoint():
 
 async def run_scraper_job(job_id: str, urls: List[str], industry: str):
     """Background task to run the scraper - OPTIMIZED FOR LONG RUNNING JOBS"""
+    from fb_scraper import scrape_facebook_group
     
     job_start = datetime.now(timezone.utc)
     last_heartbeat = job_start
@@ -1470,6 +2062,7 @@ async def update_job_in_db(job_id: str, status: Dict):
 @api_router.post("/scraper/start")
 async def start_scraper(request: ScraperStartRequest, background_tasks: BackgroundTasks):
     """Start a new scraping job"""
+    from fb_scraper import check_browser_availability, cookies_exist
     
     if not request.urls:
         raise HTTPException(status_code=400, detail="No URLs provided")
@@ -1477,7 +2070,8 @@ async def start_scraper(request: ScraperStartRequest, background_tasks: Backgrou
     if not cookies_exist():
         raise HTTPException(status_code=400, detail="Facebook cookies not configured")
     
-    # Check browser availability before starting
+    # Check browser availability before starting (installing browsers on first use)
+    await ensure_scraper_browsers()
     browser_check = await check_browser_availability()
     if not browser_check.get('available'):
         error_msg = browser_check.get('error', 'Unknown error')
@@ -1709,127 +2303,293 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition", "Content-Type", "Content-Length"],
+    expose_headers=["Content-Disposition", "Content-Type", "Content-Length", "Server-Timing", "ETag"],
 )
 
+# Outermost: per-route latency histograms and the Server-Timing header
+app.add_middleware(RequestTimingMiddleware)
+
 
 # Background task for auto-fixing WhatsApp
 whatsapp_watcher_task = None
+# Background readiness wait after an auto-start
+gateway_ready_task = None
+# Startup steps still running in the background after the server accepts requests
+startup_graph = None
+startup_task = None
+
+async def check_whatsapp_registration():
+    """Apply the Baileys registered=false fix if needed and restart the gateway to pick it up."""
+    status = await WhatsAppStatusCache.refresh()
+    logger.info(f"[whatsapp-watcher] Check: linked={status['linked']}, registered={status['registered']}, phone={status['phone']}")
+    if status["linked"] and not status["registered"]:
+        # Every worker watches the file; only the lease holder fixes it and restarts the gateway
+        if not await claim_gateway_lease("whatsapp_watcher", WHATSAPP_WATCHER_LEASE, renew=True):
+            logger.info("[whatsapp-watcher] registered=false, left to the worker holding the watcher lease")
+            return
+        logger.info("[whatsapp-watcher] DETECTED registered=false, applying fix...")
+        if await fix_registered_flag():
+            await WhatsAppStatusCache.refresh()
+            # Stop before starting: two gateways must not share the Baileys credentials
+            logger.info("[whatsapp-watcher] Fix applied, restarting gateway...")
+            restarted = await restart_gateway(stop_first=True)
+            logger.info(f"[whatsapp-watcher] Gateway restart {'succeeded' if restarted else 'failed'}")
+
+
+async def check_pool_whatsapp_registrations():
+    """Apply the registered=false fix to each running pool gateway's credentials, restarting that gateway."""
+    if not await claim_gateway_lease("whatsapp_watcher", WHATSAPP_WATCHER_LEASE, renew=True):
+        return
+    for gateway in GatewayPool.running():
+        status = await get_whatsapp_status(gateway.creds_file)
+        if not (status["linked"] and not status["registered"]):
+            continue
+        logger.info(f"[whatsapp-watcher] DETECTED registered=false for {gateway.name}, applying fix...")
+        if await fix_registered_flag(gateway.creds_file):
+            # Stopped before it starts again, with the settings it runs with
+            await GatewayPool.restart(gateway.owner_user_id, provision_pool_gateway, pool_gateway_command)
+            logger.info(f"[whatsapp-watcher] Restarted {gateway.name}")
+
+
+async def pool_whatsapp_auto_fix_watcher():
+    """Auto-fix the Baileys registered=false bug for pool gateways, checked every sweep interval."""
+    logger.info("[whatsapp-watcher] Background watcher started for pool gateways")
+    while True:
+        try:
+            await check_pool_whatsapp_registrations()
+        except Exception as e:
+            logger.warning(f"[whatsapp-watcher] Error: {e}")
+        await asyncio.sleep(GATEWAY_POOL_SWEEP_INTERVAL)
+
 
 async def whatsapp_auto_fix_watcher():
-    """Auto-fix Baileys registered=false bug every 5 seconds."""
+    """Auto-fix Baileys registered=false bug whenever the credentials file changes."""
     logger.info("[whatsapp-watcher] Background watcher started")
-    while True:
-        await asyncio.sleep(5)
+    # The status endpoint serves the cached status while changes are being watched
+    WhatsAppStatusCache.watched = True
+    try:
         try:
-            status = get_whatsapp_status()
-            logger.info(f"[whatsapp-watcher] Check: linked={status['linked']}, registered={status['registered']}, phone={status['phone']}")
-            if status["linked"] and not status["registered"]:
-                logger.info("[whatsapp-watcher] DETECTED registered=false, applying fix...")
-                if fix_registered_flag():
-                    logger.info("[whatsapp-watcher] Fix applied, restarting gateway via supervisor...")
-                    result = subprocess.run(["supervisorctl", "restart", "clawdbot-gateway"], capture_output=True, text=True)
-                    logger.info(f"[whatsapp-watcher] Supervisor restart result: {result.stdout} {result.stderr}")
+            await check_whatsapp_registration()
         except Exception as e:
             logger.warning(f"[whatsapp-watcher] Error: {e}")
 
+        async for _ in watch_file(CREDS_FILE):
+            try:
+                await check_whatsapp_registration()
+            except Exception as e:
+                logger.warning(f"[whatsapp-watcher] Error: {e}")
+    finally:
+        WhatsAppStatusCache.watched = False
 
-@app.on_event("startup")
-async def startup_event():
-    """Run on server startup - ensure Moltbot dependencies are installed and auto-start gateway if needed"""
-    global whatsapp_watcher_task, gateway_state
 
-    logger.info("Server starting up...")
+async def startup_supervisor_config():
+    """Reload supervisor config to pick up any changes"""
+    await AsyncSupervisorClient.reload_config()
 
-    # Reload supervisor config to pick up any changes
-    SupervisorClient.reload_config()
 
-    # Check and install Moltbot dependencies if needed
-    clawdbot_cmd = get_clawdbot_command()
+async def startup_clawdbot_command():
+    """Check Moltbot dependencies (installed on first use if missing)"""
+    clawdbot_cmd = await asyncio.to_thread(get_clawdbot_command)
     if clawdbot_cmd:
         logger.info(f"Moltbot dependencies ready: {clawdbot_cmd}")
     else:
         logger.info("Moltbot dependencies not found, will install on first use")
+    return clawdbot_cmd
+
+
+async def startup_indexes():
+    """Create/verify the auth indexes (and the session TTL index)"""
+    await bootstrap_indexes(db)
 
-    # Check database for persistent gateway config
-    config_doc = None
+
+async def startup_gateway_config():
+    """Persistent gateway config from the database (None if unavailable)"""
     try:
-        config_doc = await db.moltbot_configs.find_one({"_id": "gateway_config"})
+        return await db.moltbot_configs.find_one({"_id": "gateway_config"})
     except Exception as e:
         logger.warning(f"Could not read gateway config from database: {e}")
+        return None
+
+
+async def startup_gateway_slot(gateway_config):
+    """Which gateway program served traffic last (blue/green switches alternate them)"""
+    if GATEWAY_BLUE_GREEN and gateway_config:
+        slot = GatewayUpstream.set_active(gateway_config.get("active_slot"))
+        logger.info(f"Active gateway slot: {slot.name} (port {gateway_port(slot)})")
+    return GatewayUpstream.active()
+
+
+async def startup_gateway_liveness(supervisor_config, gateway_slot):
+    """Prime the liveness cache, then keep it fresh in the background"""
+    running = await GatewayLiveness.refresh()
+    GatewayLiveness.start()
+    return running
+
+
+async def startup_gateway_pool(supervisor_config):
+    """Per-user gateways (GATEWAY_POOL): load allocations and supervisor state, then sweep for idle ones"""
+    if not GATEWAY_POOL:
+        return
+    GatewayPool.bind(db.gateway_pool)
+    await GatewayPool.sweep()
+    GatewayPool.start()
 
+
+async def startup_shared_state():
+    """Load the gateway state other workers published, then follow their changes"""
+    gateway_state.bind(db.moltbot_configs)
+    gateway_state.on_change = follow_gateway_config
+    await gateway_state.refresh(force=True)
+    gateway_state.start()
+
+
+# Seconds one worker holds the right to auto-start the gateway; the other workers starting with it skip auto-start
+GATEWAY_AUTOSTART_LEASE = float(os.environ.get('GATEWAY_AUTOSTART_LEASE', '60'))
+
+
+async def claim_gateway_autostart() -> bool:
+    """Take the auto-start lease on gateway_config; only the worker holding it auto-starts the gateway"""
+    return await claim_gateway_lease("autostart", GATEWAY_AUTOSTART_LEASE)
+
+
+async def startup_gateway_recovery(gateway_config, gateway_liveness, gateway_token, shared_state):
+    """Recover the state of a running gateway, or auto-start one that should be running"""
+    global gateway_ready_task
+
+    config_doc = gateway_config
     should_run = config_doc.get("should_run", False) if config_doc else False
     logger.info(f"Gateway should_run flag: {should_run}")
 
-    # Check if gateway is already running via supervisor
-    if SupervisorClient.status():
-        pid = SupervisorClient.get_pid()
+    if gateway_liveness:
+        pid = await GatewayLiveness.current_pid()
         logger.info(f"Gateway already running via supervisor (PID: {pid})")
 
-        gateway_state["provider"] = config_doc.get("provider", "emergent") if config_doc else "emergent"
+        recovered = {"provider": config_doc.get("provider", "emergent") if config_doc else "emergent"}
 
         # Recover token from config file
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-            gateway_state["token"] = config.get("gateway", {}).get("auth", {}).get("token")
+        recovered["token"] = gateway_token
+        if recovered["token"]:
             logger.info("Recovered gateway token from config file")
-        except Exception as e:
-            logger.warning(f"Could not recover gateway token: {e}")
+        else:
+            logger.warning(f"Could not recover gateway token from {CONFIG_FILE}")
 
         # Recover owner info from database
         if config_doc:
-            gateway_state["owner_user_id"] = config_doc.get("owner_user_id")
-            gateway_state["started_at"] = config_doc.get("started_at")
-            logger.info(f"Recovered gateway owner from database: {gateway_state['owner_user_id']}")
+            recovered["owner_user_id"] = config_doc.get("owner_user_id")
+            recovered["started_at"] = config_doc.get("started_at")
+            logger.info(f"Recovered gateway owner from database: {recovered['owner_user_id']}")
+
+        await gateway_state.publish(**recovered)
+
+        if GATEWAY_BLUE_GREEN:
+            # Stop an old gateway whose drain was cut short by a backend restart
+            GatewayUpstream.retire_inactive()
 
     elif should_run and config_doc:
-        # Gateway should be running but isn't - auto-start it!
+        # Gateway should be running but isn't - auto-start it (one worker only)!
+        if not await claim_gateway_autostart():
+            logger.info("Gateway should_run=True but not running - another worker is auto-starting it")
+            await gateway_state.refresh(force=True)
+            return
+
         logger.info("Gateway should_run=True but not running - auto-starting via supervisor...")
 
         # Recover token from config file or database
-        token = config_doc.get("token")
-        if not token:
-            try:
-                with open(CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
-                token = config.get("gateway", {}).get("auth", {}).get("token")
-            except:
-                token = generate_token()
+        token = config_doc.get("token") or gateway_token or generate_token()
 
         # Write env file for supervisor wrapper
-        write_gateway_env(token=token, provider=config_doc.get("provider", "emergent"))
+        await write_gateway_env(token=token, provider=config_doc.get("provider", "emergent"))
 
-        # Start via supervisor
-        if SupervisorClient.start():
+        # Start via supervisor (a fresh start always uses the primary program)
+        GatewayUpstream.set_active(GatewayUpstream.PRIMARY.name)
+        if await AsyncSupervisorClient.start():
             logger.info("Gateway auto-started successfully via supervisor")
+            GatewayLiveness.mark_running(True)
+
+            await gateway_state.publish(
+                token=token,
+                provider=config_doc.get("provider", "emergent"),
+                owner_user_id=config_doc.get("owner_user_id"),
+                started_at=config_doc.get("started_at"),
+                # Or the next restart would pick the slot this start replaced
+                active_slot=GatewayUpstream.PRIMARY.name,
+            )
 
-            # Wait briefly for it to be ready
-            await asyncio.sleep(3)
-
-            gateway_state["token"] = token
-            gateway_state["provider"] = config_doc.get("provider", "emergent")
-            gateway_state["owner_user_id"] = config_doc.get("owner_user_id")
-            gateway_state["started_at"] = config_doc.get("started_at")
+            # Measure time-to-ready in the background instead of delaying startup
+            gateway_ready_task = asyncio.create_task(
+                GatewayReadiness.wait(MOLTBOT_PORT, alive=GatewayLiveness.refresh)
+            )
         else:
             logger.error("Failed to auto-start gateway via supervisor")
 
-    # Start WhatsApp auto-fix background watcher
-    whatsapp_watcher_task = asyncio.create_task(whatsapp_auto_fix_watcher())
-    logger.info("[whatsapp-watcher] Background watcher task created (checks every 5s)")
+
+def build_startup_graph() -> StartupGraph:
+    """
+    Startup steps and what each one needs. Independent steps (supervisor
+    reload, dependency check, indexes, database and file reads) run
+    concurrently; gateway recovery runs once its inputs are in.
+    """
+    graph = StartupGraph()
+    graph.add("supervisor_config", startup_supervisor_config)
+    graph.add("clawdbot_command", startup_clawdbot_command)
+    graph.add("indexes", startup_indexes)
+    graph.add("gateway_config", startup_gateway_config)
+    graph.add("gateway_token", read_gateway_token)
+    graph.add("gateway_slot", startup_gateway_slot, after=("gateway_config",))
+    graph.add("gateway_liveness", startup_gateway_liveness, after=("supervisor_config", "gateway_slot"))
+    graph.add("shared_state", startup_shared_state)
+    graph.add("gateway_pool", startup_gateway_pool, after=("supervisor_config",))
+    graph.add("gateway_recovery", startup_gateway_recovery,
+              after=("gateway_config", "gateway_liveness", "gateway_token", "shared_state"))
+    return graph
+
+
+async def wait_for_gateway_recovery():
+    """Let startup finish recovering gateway state before acting on it (owner and liveness checks)."""
+    if startup_graph is not None:
+        await startup_graph.wait("gateway_recovery")
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Run on server startup - start the startup graph (gateway recovery, auto-start) in the background"""
+    global whatsapp_watcher_task, startup_graph, startup_task
+
+    logger.info("Server starting up...")
+
+    # Shared pooled client for the Control UI proxy (keep-alive to the gateway)
+    ProxyClient.open()
+
+    # Routes are ready: accept requests while the rest of startup finishes
+    startup_graph = build_startup_graph()
+    # start(), not run(): requests handled from here on wait for gateway recovery
+    startup_task = startup_graph.start()
+
+    # Start WhatsApp auto-fix background watcher (each pool gateway has credentials of its own)
+    whatsapp_watcher_task = asyncio.create_task(
+        pool_whatsapp_auto_fix_watcher() if GATEWAY_POOL else whatsapp_auto_fix_watcher()
+    )
+    logger.info("[whatsapp-watcher] Background watcher task created (checks on credential changes)")
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    global whatsapp_watcher_task
+    global whatsapp_watcher_task, gateway_ready_task, startup_task
 
-    # Stop WhatsApp watcher task
-    if whatsapp_watcher_task:
-        whatsapp_watcher_task.cancel()
-        try:
-            await whatsapp_watcher_task
-        except asyncio.CancelledError:
-            pass
+    # Stop unfinished startup steps, the WhatsApp watcher task and any pending readiness wait
+    for task in (startup_task, whatsapp_watcher_task, gateway_ready_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    await GatewayLiveness.stop()
+    await gateway_state.stop()
+    await GatewayPool.stop()
+    await GatewayUpstream.stop_draining()
+    await MuxPool.close_all()
 
     # NOTE: We do NOT stop the gateway on backend shutdown!
     # The gateway is managed by supervisor and should continue running
@@ -1837,4 +2597,5 @@ async def shutdown_db_client():
     # survive backend restarts.
     logger.info("Backend shutting down - gateway will continue running via supervisor")
 
+    await ProxyClient.close()
     client.close()
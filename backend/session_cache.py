@@ -0,0 +1,145 @@
+"""
+In-memory cache of resolved sessions for get_current_user.
+
+Every authenticated request (including each Control UI asset fetched through
+the proxy) used to cost two MongoDB round trips: the session, then its user.
+SessionCache keeps the resolved user per session token in a bounded LRU for up
+to SESSION_CACHE_TTL seconds (never past the session's own expiry), and
+coalesces concurrent lookups of the same token so a page load that fires
+dozens of asset requests at once still does a single lookup.
+
+A cached session outlives its deletion on logout by up to the TTL, so a
+logout is published through the shared gateway state and every worker
+drops its cached sessions when it sees one (see server.py).
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+# Seconds a resolved session is trusted before it is looked up again
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', '60'))
+# Maximum number of session tokens kept in memory
+SESSION_CACHE_MAX_ENTRIES = int(os.environ.get('SESSION_CACHE_MAX_ENTRIES', '1024'))
+
+# A loader resolves a token to (user, expires_at), or None when the session is invalid
+SessionLoader = Callable[[str], Awaitable[Optional[Tuple[Any, datetime]]]]
+
+
+class SessionCache:
+    """Bounded TTL/LRU cache of session token -> (user, expires_at)."""
+
+    # token -> (user, expires_at, cached_until monotonic)
+    _entries: "OrderedDict[str, tuple]" = OrderedDict()
+    _inflight: dict = {}
+
+    hits = 0
+    misses = 0
+    # Lookups that waited for another request's load of the same token
+    coalesced = 0
+
+    @classmethod
+    def get(cls, token: str):
+        """The cached user for a token, or None if absent, stale or expired."""
+        entry = cls._entries.get(token)
+        if entry is None:
+            return None
+        user, expires_at, cached_until = entry
+        if time.monotonic() > cached_until or expires_at < datetime.now(timezone.utc):
+            del cls._entries[token]
+            return None
+        cls._entries.move_to_end(token)
+        return user
+
+    @classmethod
+    def put(cls, token: str, user, expires_at: datetime) -> None:
+        cls._entries[token] = (user, expires_at, time.monotonic() + SESSION_CACHE_TTL)
+        cls._entries.move_to_end(token)
+        while len(cls._entries) > SESSION_CACHE_MAX_ENTRIES:
+            cls._entries.popitem(last=False)
+
+    @classmethod
+    async def get_or_load(cls, token: str, loader: SessionLoader):
+        """
+        The user for a token, from cache or via `loader`.
+
+        Concurrent misses for the same token share one loader call; if the
+        request making that call is cancelled, a waiter makes it instead.
+        Invalid sessions (loader returns None) are not cached.
+        """
+        while True:
+            user = cls.get(token)
+            if user is not None:
+                cls.hits += 1
+                return user
+
+            pending = cls._inflight.get(token)
+            if pending is None:
+                break
+            cls.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The request doing the lookup went away, not ours: look it up again
+
+        cls.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        cls._inflight[token] = future
+        try:
+            resolved = await loader(token)
+            user = None
+            if resolved is not None:
+                user, expires_at = resolved
+                if cls._inflight.get(token) is future:
+                    cls.put(token, user, expires_at)
+            future.set_result(user)
+            return user
+        except asyncio.CancelledError:
+            # Waiters retry instead of failing with our cancellation
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an un-awaited failure is not logged as lost
+            future.exception()
+            raise
+        finally:
+            if cls._inflight.get(token) is future:
+                del cls._inflight[token]
+
+    @classmethod
+    def invalidate(cls, token: str) -> None:
+        """Forget a session (e.g. on logout), including a lookup in progress."""
+        cls._entries.pop(token, None)
+        cls._inflight.pop(token, None)
+
+    @classmethod
+    def invalidate_user(cls, user_id: str) -> None:
+        """Forget every cached session of a user (e.g. after their profile changed)."""
+        for token, (user, _, _) in list(cls._entries.items()):
+            if getattr(user, "user_id", None) == user_id:
+                del cls._entries[token]
+
+    @classmethod
+    def invalidate_all(cls) -> None:
+        """Forget every session, including lookups in progress (e.g. after a logout on another worker)."""
+        cls._entries.clear()
+        cls._inflight.clear()
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"entries": len(cls._entries), "hits": cls.hits, "misses": cls.misses,
+                "coalesced": cls.coalesced}
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all cached sessions and reset the counters."""
+        cls.invalidate_all()
+        cls.hits = 0
+        cls.misses = 0
+        cls.coalesced = 0
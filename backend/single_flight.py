@@ -0,0 +1,70 @@
+"""
+Single-flight coalescing of identical concurrent work.
+
+When several tabs load the Control UI at once, or all reload together after a
+gateway restart, the proxy receives the same GET for the same path many times
+within a few milliseconds. A SingleFlight group lets the first caller for a
+key do the work (one upstream fetch) while every caller arriving before it
+finishes awaits the same result instead of issuing its own request.
+
+The work runs in its own task, so a leader whose client disconnects does not
+cancel the fetch the others are waiting on. Exceptions are shared like results.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """A group of in-flight calls keyed by what makes their results identical."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # Calls that did the work / calls that shared another call's result
+        self.leaders = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]],
+                 discard: Optional[Callable[[Any], Awaitable[None]]] = None) -> Tuple[Any, bool]:
+        """
+        Run `fn` for `key`, or join the call already running for it.
+
+        If the leader is cancelled before it takes the result, `discard` is
+        called with it (e.g. to close a stream only the leader would relay).
+
+        Returns:
+            (result, shared): shared is True if this caller joined another
+            caller's call, in which case the result object is the same one the
+            leader got and must not be consumed twice.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+
+        self.leaders += 1
+        task = asyncio.get_running_loop().create_task(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._forget(key, task))
+        try:
+            return await asyncio.shield(task), False
+        except asyncio.CancelledError:
+            if discard is not None:
+                task.add_done_callback(lambda _: self._discard(task, discard))
+            raise
+
+    @staticmethod
+    def _discard(task: asyncio.Task, discard: Callable[[Any], Awaitable[None]]) -> None:
+        if not task.cancelled() and task.exception() is None:
+            asyncio.ensure_future(discard(task.result()))
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Nobody may be left to retrieve it (every caller was cancelled)
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,199 @@
+"""
+Startup as a dependency graph of async steps.
+
+Each step declares the steps it needs; everything else runs concurrently, so
+startup takes as long as its slowest chain of dependent steps instead of the
+sum of all of them. The server starts the graph in the background and begins
+accepting requests right away; code that needs a step to have finished (e.g.
+the start/stop endpoints needing gateway recovery) awaits it with wait().
+
+A step that raises is logged and its dependents are skipped; independent
+steps carry on. When the graph finishes, a per-step timing report is logged
+and each step's duration is exported as a gauge on /api/metrics.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+STEP_SECONDS = metrics.gauge(
+    "openclaw_startup_step_seconds", "Duration of each startup step in the last startup", ("step",)
+)
+STARTUP_SECONDS = metrics.gauge(
+    "openclaw_startup_seconds", "Time from startup until every startup step had finished"
+)
+
+
+class StartupStep:
+    """One node of the graph, with its timing once it has run."""
+
+    def __init__(self, name: str, func: Callable[..., Awaitable[Any]], after: tuple):
+        self.name = name
+        self.func = func
+        self.after = after
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        # "pending", "ok", "failed", "skipped" or "cancelled"
+        self.status = "pending"
+        self.error: Optional[BaseException] = None
+
+    @property
+    def seconds(self) -> Optional[float]:
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+
+class StartupGraph:
+    """
+    Named async steps with dependencies, run as concurrently as they allow.
+
+    A step function receives the results of the steps it depends on as
+    keyword arguments:
+
+        graph = StartupGraph()
+
+        @graph.step("config")
+        async def load_config():
+            return await read_config()
+
+        @graph.step("gateway", after=("config",))
+        async def recover_gateway(config):
+            ...
+
+        await graph.run()
+    """
+
+    def __init__(self, name: str = "startup"):
+        self.name = name
+        self.steps: Dict[str, StartupStep] = {}
+        self.results: Dict[str, Any] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def step(self, name: str, after: tuple = ()):
+        """Decorator registering an async function as a step running after `after`."""
+
+        def register(func: Callable[..., Awaitable[Any]]):
+            self.add(name, func, after)
+            return func
+
+        return register
+
+    def add(self, name: str, func: Callable[..., Awaitable[Any]], after: tuple = ()) -> None:
+        if name in self.steps:
+            raise ValueError(f"Duplicate startup step: {name}")
+        self.steps[name] = StartupStep(name, func, tuple(after))
+
+    def _check(self) -> None:
+        """Reject unknown dependencies and cycles before anything runs."""
+        for step in self.steps.values():
+            for dep in step.after:
+                if dep not in self.steps:
+                    raise ValueError(f"Startup step {step.name!r} depends on unknown step {dep!r}")
+
+        visiting, done = set(), set()
+
+        def visit(name: str, path: List[str]) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Startup steps form a cycle: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dep in self.steps[name].after:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.steps:
+            visit(name, [])
+
+    async def _run_step(self, step: StartupStep) -> Any:
+        for dep in step.after:
+            # Never raises: failures are recorded on the step
+            await asyncio.wait([self._tasks[dep]])
+            if self.steps[dep].status != "ok":
+                step.status = "skipped"
+                logger.warning(f"[{self.name}] Skipping {step.name}: {dep} did not complete")
+                return None
+
+        step.started = time.perf_counter()
+        try:
+            result = await step.func(**{dep: self.results.get(dep) for dep in step.after})
+        except asyncio.CancelledError:
+            step.status = "cancelled"
+            raise
+        except Exception as e:
+            step.status = "failed"
+            step.error = e
+            logger.warning(f"[{self.name}] Step {step.name} failed: {e}")
+            return None
+        finally:
+            step.finished = time.perf_counter()
+            if step.seconds is not None:
+                STEP_SECONDS.set(step.seconds, step.name)
+
+        step.status = "ok"
+        self.results[step.name] = result
+        return result
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every step (each as soon as its dependencies are done); returns the results by name."""
+        return await self.start()
+
+    def start(self) -> asyncio.Task:
+        """
+        Start every step and return the task that run() awaits. The steps exist
+        once this returns, so wait() called right afterwards waits for them.
+        """
+        self._check()
+        self._started = time.perf_counter()
+        self._tasks = {name: asyncio.create_task(self._run_step(step), name=f"{self.name}:{name}")
+                       for name, step in self.steps.items()}
+        return asyncio.create_task(self._gather(), name=self.name)
+
+    async def _gather(self) -> Dict[str, Any]:
+        try:
+            await asyncio.gather(*self._tasks.values())
+        except asyncio.CancelledError:
+            for task in self._tasks.values():
+                task.cancel()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            raise
+        self._finished = time.perf_counter()
+        STARTUP_SECONDS.set(self._finished - self._started)
+        logger.info(self.report())
+        return self.results
+
+    async def wait(self, name: str) -> Any:
+        """
+        Wait until a step has finished (without cancelling it if the caller is
+        cancelled) and return its result, or None if it failed or was skipped.
+        Returns immediately when the graph has not been started.
+        """
+        task = self._tasks.get(name)
+        if task is None:
+            return self.results.get(name)
+        await asyncio.wait([task])
+        return self.results.get(name)
+
+    def report(self) -> str:
+        """Per-step start offset, duration and outcome, in the order the steps started."""
+        total = (self._finished or time.perf_counter()) - (self._started or time.perf_counter())
+        lines = [f"[{self.name}] Finished in {total * 1000:.0f}ms:"]
+        width = max((len(name) for name in self.steps), default=0)
+        ordered = sorted(self.steps.values(),
+                         key=lambda s: (s.started is None, s.started or 0.0, s.name))
+        for step in ordered:
+            if step.started is None:
+                lines.append(f"  {step.name:<{width}}  {'-':>7}  {'-':>7}  {step.status}")
+                continue
+            offset = (step.started - self._started) * 1000
+            lines.append(f"  {step.name:<{width}}  {offset:>5.0f}ms  {step.seconds * 1000:>5.0f}ms  {step.status}")
+        return "\n".join(lines)
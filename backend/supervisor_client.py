@@ -3,13 +3,43 @@ Supervisor client for managing the clawdbot gateway process.
 
 This module provides a clean interface for starting, stopping, and
 checking the status of the gateway process managed by supervisord.
+
+SupervisorClient is blocking; AsyncSupervisorClient offers the same surface
+for use on the asyncio event loop without stalling other requests.
+
+Two backends are available, selected with SUPERVISOR_BACKEND:
+    cli     - shell out to `supervisorctl` (default)
+    xmlrpc  - talk to supervisord's XML-RPC interface over its unix socket
+              (see supervisor_rpc.py)
 """
 
+import asyncio
+import os
 import subprocess
 import logging
 
+from supervisor_rpc import SupervisorRPC, AsyncSupervisorRPC
+from request_timing import PHASE_SUPERVISOR, timed
+
 logger = logging.getLogger(__name__)
 
+SUPERVISOR_BACKEND = os.environ.get('SUPERVISOR_BACKEND', 'cli').lower()
+
+
+def _use_rpc() -> bool:
+    return SUPERVISOR_BACKEND == "xmlrpc"
+
+
+def _parse_pid(status_output: str) -> int | None:
+    """Parse the PID from `supervisorctl status` output, None unless RUNNING."""
+    # Output format: "clawdbot-gateway            RUNNING   pid 12345, uptime 0:01:23"
+    if 'RUNNING' in status_output and 'pid' in status_output:
+        parts = status_output.split('pid')
+        if len(parts) > 1:
+            pid_part = parts[1].strip().split(',')[0].strip()
+            return int(pid_part)
+    return None
+
 
 class SupervisorClient:
     """Client for interacting with supervisord to manage the gateway process."""
@@ -24,6 +54,9 @@ class SupervisorClient:
         Returns:
             True if the start command succeeded, False otherwise.
         """
+        if _use_rpc():
+            return SupervisorRPC.start(cls.PROGRAM)
+
         try:
             result = subprocess.run(
                 ['supervisorctl', 'start', cls.PROGRAM],
@@ -52,6 +85,9 @@ class SupervisorClient:
         Returns:
             True if the stop command succeeded, False otherwise.
         """
+        if _use_rpc():
+            return SupervisorRPC.stop(cls.PROGRAM)
+
         try:
             result = subprocess.run(
                 ['supervisorctl', 'stop', cls.PROGRAM],
@@ -80,6 +116,9 @@ class SupervisorClient:
         Returns:
             True if the process is running (RUNNING state), False otherwise.
         """
+        if _use_rpc():
+            return SupervisorRPC.status(cls.PROGRAM)
+
         try:
             result = subprocess.run(
                 ['supervisorctl', 'status', cls.PROGRAM],
@@ -102,6 +141,9 @@ class SupervisorClient:
         Returns:
             The PID if running, None otherwise.
         """
+        if _use_rpc():
+            return SupervisorRPC.get_pid(cls.PROGRAM)
+
         try:
             result = subprocess.run(
                 ['supervisorctl', 'status', cls.PROGRAM],
@@ -109,14 +151,7 @@ class SupervisorClient:
                 text=True,
                 timeout=10
             )
-            # Parse PID from output like: "clawdbot-gateway            RUNNING   pid 12345, uptime 0:01:23"
-            if 'RUNNING' in result.stdout and 'pid' in result.stdout:
-                # Extract pid number
-                parts = result.stdout.split('pid')
-                if len(parts) > 1:
-                    pid_part = parts[1].strip().split(',')[0].strip()
-                    return int(pid_part)
-            return None
+            return _parse_pid(result.stdout)
         except Exception as e:
             logger.error(f"Error getting {cls.PROGRAM} PID: {e}")
             return None
@@ -129,6 +164,9 @@ class SupervisorClient:
         Returns:
             True if the restart command succeeded, False otherwise.
         """
+        if _use_rpc():
+            return SupervisorRPC.restart(cls.PROGRAM)
+
         try:
             result = subprocess.run(
                 ['supervisorctl', 'restart', cls.PROGRAM],
@@ -159,6 +197,9 @@ class SupervisorClient:
         Returns:
             True if reload succeeded, False otherwise.
         """
+        if _use_rpc():
+            return SupervisorRPC.reload_config()
+
         try:
             result = subprocess.run(
                 ['supervisorctl', 'reread'],
@@ -185,3 +226,149 @@ class SupervisorClient:
         except Exception as e:
             logger.error(f"Error reloading supervisor config: {e}")
             return False
+
+
+async def _run_supervisorctl(*args: str, timeout: float) -> tuple[int, str, str]:
+    """
+    Run `supervisorctl <args>` without blocking the event loop.
+
+    Returns:
+        (returncode, stdout, stderr)
+
+    Raises:
+        asyncio.TimeoutError: if the command did not finish in time (it is killed).
+    """
+    with timed(PHASE_SUPERVISOR):
+        process = await asyncio.create_subprocess_exec(
+            'supervisorctl', *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+    return process.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+
+
+class AsyncSupervisorClient:
+    """
+    Non-blocking counterpart of SupervisorClient.
+
+    Uses asyncio subprocesses for the CLI backend and AsyncSupervisorRPC for
+    the xmlrpc backend, so other requests and proxied WebSocket frames keep
+    flowing while supervisor works (start/stop can take up to 30 seconds).
+    """
+
+    PROGRAM = SupervisorClient.PROGRAM
+
+    @classmethod
+    async def start(cls) -> bool:
+        """Start the gateway via supervisor. Returns True on success."""
+        if _use_rpc():
+            return await AsyncSupervisorRPC.start(cls.PROGRAM)
+
+        try:
+            returncode, _, stderr = await _run_supervisorctl('start', cls.PROGRAM, timeout=30)
+            if returncode == 0:
+                logger.info(f"Started {cls.PROGRAM} via supervisor")
+                return True
+            logger.error(f"Failed to start {cls.PROGRAM}: {stderr}")
+            return False
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout starting {cls.PROGRAM}")
+            return False
+        except Exception as e:
+            logger.error(f"Error starting {cls.PROGRAM}: {e}")
+            return False
+
+    @classmethod
+    async def stop(cls) -> bool:
+        """Stop the gateway via supervisor. Returns True on success (or if not running)."""
+        if _use_rpc():
+            return await AsyncSupervisorRPC.stop(cls.PROGRAM)
+
+        try:
+            returncode, stdout, stderr = await _run_supervisorctl('stop', cls.PROGRAM, timeout=30)
+            if returncode == 0 or 'NOT RUNNING' in stdout:
+                logger.info(f"Stopped {cls.PROGRAM} via supervisor")
+                return True
+            logger.error(f"Failed to stop {cls.PROGRAM}: {stderr}")
+            return False
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout stopping {cls.PROGRAM}")
+            return False
+        except Exception as e:
+            logger.error(f"Error stopping {cls.PROGRAM}: {e}")
+            return False
+
+    @classmethod
+    async def status(cls) -> bool:
+        """True if the gateway is in the RUNNING state."""
+        if _use_rpc():
+            return await AsyncSupervisorRPC.status(cls.PROGRAM)
+
+        try:
+            _, stdout, _ = await _run_supervisorctl('status', cls.PROGRAM, timeout=10)
+            return 'RUNNING' in stdout
+        except Exception as e:
+            logger.error(f"Error checking {cls.PROGRAM} status: {e}")
+            return False
+
+    @classmethod
+    async def get_pid(cls) -> int | None:
+        """PID of the running gateway, None if not running."""
+        if _use_rpc():
+            return await AsyncSupervisorRPC.get_pid(cls.PROGRAM)
+
+        try:
+            _, stdout, _ = await _run_supervisorctl('status', cls.PROGRAM, timeout=10)
+            return _parse_pid(stdout)
+        except Exception as e:
+            logger.error(f"Error getting {cls.PROGRAM} PID: {e}")
+            return None
+
+    @classmethod
+    async def restart(cls) -> bool:
+        """Restart the gateway via supervisor. Returns True on success."""
+        if _use_rpc():
+            return await AsyncSupervisorRPC.restart(cls.PROGRAM)
+
+        try:
+            returncode, _, stderr = await _run_supervisorctl('restart', cls.PROGRAM, timeout=30)
+            if returncode == 0:
+                logger.info(f"Restarted {cls.PROGRAM} via supervisor")
+                return True
+            logger.error(f"Failed to restart {cls.PROGRAM}: {stderr}")
+            return False
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout restarting {cls.PROGRAM}")
+            return False
+        except Exception as e:
+            logger.error(f"Error restarting {cls.PROGRAM}: {e}")
+            return False
+
+    @classmethod
+    async def reload_config(cls) -> bool:
+        """Reread and apply supervisor configuration (reread + update)."""
+        if _use_rpc():
+            return await AsyncSupervisorRPC.reload_config()
+
+        try:
+            returncode, _, stderr = await _run_supervisorctl('reread', timeout=10)
+            if returncode != 0:
+                logger.error(f"Failed to reread supervisor config: {stderr}")
+                return False
+
+            returncode, _, stderr = await _run_supervisorctl('update', timeout=10)
+            if returncode != 0:
+                logger.error(f"Failed to update supervisor: {stderr}")
+                return False
+
+            logger.info("Supervisor configuration reloaded")
+            return True
+        except Exception as e:
+            logger.error(f"Error reloading supervisor config: {e}")
+            return False
@@ -0,0 +1,374 @@
+"""
+XML-RPC backend for talking to supervisord directly over its unix socket.
+
+SupervisorClient shells out to `supervisorctl` (a Python program) for every
+call. This module speaks supervisord's XML-RPC interface instead, over one
+persistent HTTP/1.1 connection, so a status check costs a socket round trip.
+It provides a blocking client (SupervisorRPC) and an asyncio one
+(AsyncSupervisorRPC) with the same start/stop/status/get_pid/restart/
+reload_config surface as SupervisorClient. Select it with
+SUPERVISOR_BACKEND=xmlrpc.
+"""
+
+import asyncio
+import http.client
+import logging
+import os
+import select
+import socket
+import threading
+import xmlrpc.client
+
+from request_timing import PHASE_SUPERVISOR, timed
+
+logger = logging.getLogger(__name__)
+
+# Unix socket from the [unix_http_server] section of supervisord.conf
+SUPERVISOR_SOCKET = os.environ.get('SUPERVISOR_SOCKET', '/var/run/supervisor.sock')
+SUPERVISOR_RPC_TIMEOUT = float(os.environ.get('SUPERVISOR_RPC_TIMEOUT', '30'))
+
+# supervisor.xmlrpc.Faults codes we treat as success
+FAULT_ALREADY_STARTED = 60
+FAULT_NOT_RUNNING = 70
+FAULT_ALREADY_ADDED = 90
+
+# Methods that change nothing in supervisord, so they can be sent again when the
+# connection drops before the reply arrives (a start/stop may already be applied)
+READ_ONLY_METHODS = frozenset({
+    "supervisor.getState",
+    "supervisor.getPID",
+    "supervisor.getProcessInfo",
+    "supervisor.getAllProcessInfo",
+    "supervisor.reloadConfig",
+})
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that connects to a unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class _UnixTransport(xmlrpc.client.Transport):
+    """xmlrpc Transport that keeps one HTTP/1.1 connection to the socket open."""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__()
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        if self._connection and host == self._connection[0]:
+            sock = self._connection[1].sock
+            # Readable while idle means supervisord closed it: reconnect before
+            # writing, so the request is not lost with it
+            if sock is None or not select.select([sock], [], [], 0)[0]:
+                return self._connection[1]
+            self.close()
+        self._connection = host, _UnixHTTPConnection(self.socket_path, self.timeout)
+        return self._connection[1]
+
+    def request(self, host, handler, request_body, verbose=False):
+        # One attempt: xmlrpc.client would resend any call once, and a start or
+        # stop may already have been applied (SupervisorRPC.call decides)
+        return self.single_request(host, handler, request_body, verbose)
+
+
+class SupervisorRPC:
+    """Blocking XML-RPC client for supervisord with a persistent connection."""
+
+    _proxy: xmlrpc.client.ServerProxy | None = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _server(cls) -> xmlrpc.client.ServerProxy:
+        if cls._proxy is None:
+            transport = _UnixTransport(SUPERVISOR_SOCKET, SUPERVISOR_RPC_TIMEOUT)
+            cls._proxy = xmlrpc.client.ServerProxy("http://localhost/RPC2", transport=transport, allow_none=True)
+        return cls._proxy
+
+    @classmethod
+    def call(cls, method: str, *params):
+        """
+        Invoke an XML-RPC method (e.g. "supervisor.getProcessInfo").
+
+        A connection that drops mid-call is retried once on a new one for
+        read-only methods only, as in AsyncSupervisorRPC.call.
+        """
+        with cls._lock, timed(PHASE_SUPERVISOR):
+            try:
+                return getattr(cls._server(), method)(*params)
+            except ConnectionError:
+                if method not in READ_ONLY_METHODS:
+                    raise
+                return getattr(cls._server(), method)(*params)
+
+    @classmethod
+    def close(cls) -> None:
+        """Drop the persistent connection (reopened on next call)."""
+        if cls._proxy is not None:
+            cls._proxy("close")()
+            cls._proxy = None
+
+    @classmethod
+    def start(cls, program: str) -> bool:
+        try:
+            cls.call("supervisor.startProcess", program, True)
+            logger.info(f"Started {program} via supervisor (xmlrpc)")
+            return True
+        except xmlrpc.client.Fault as fault:
+            if fault.faultCode == FAULT_ALREADY_STARTED:
+                return True
+            logger.error(f"Failed to start {program}: {fault.faultString}")
+            return False
+        except Exception as e:
+            logger.error(f"Error starting {program}: {e}")
+            return False
+
+    @classmethod
+    def stop(cls, program: str) -> bool:
+        try:
+            cls.call("supervisor.stopProcess", program, True)
+            logger.info(f"Stopped {program} via supervisor (xmlrpc)")
+            return True
+        except xmlrpc.client.Fault as fault:
+            if fault.faultCode == FAULT_NOT_RUNNING:
+                return True
+            logger.error(f"Failed to stop {program}: {fault.faultString}")
+            return False
+        except Exception as e:
+            logger.error(f"Error stopping {program}: {e}")
+            return False
+
+    @classmethod
+    def process_info(cls, program: str) -> dict | None:
+        try:
+            return cls.call("supervisor.getProcessInfo", program)
+        except Exception as e:
+            logger.error(f"Error checking {program} status: {e}")
+            return None
+
+    @classmethod
+    def status(cls, program: str) -> bool:
+        info = cls.process_info(program)
+        return bool(info) and info.get("statename") == "RUNNING"
+
+    @classmethod
+    def get_pid(cls, program: str) -> int | None:
+        info = cls.process_info(program)
+        if info and info.get("statename") == "RUNNING" and info.get("pid"):
+            return int(info["pid"])
+        return None
+
+    @classmethod
+    def restart(cls, program: str) -> bool:
+        if not cls.stop(program):
+            return False
+        return cls.start(program)
+
+    @classmethod
+    def reload_config(cls) -> bool:
+        try:
+            # reread, then apply the diff the way `supervisorctl update` does
+            added, changed, removed = cls.call("supervisor.reloadConfig")[0]
+            for group in removed + changed:
+                cls.call("supervisor.stopProcessGroup", group)
+                cls.call("supervisor.removeProcessGroup", group)
+            for group in changed + added:
+                try:
+                    cls.call("supervisor.addProcessGroup", group)
+                except xmlrpc.client.Fault as fault:
+                    if fault.faultCode != FAULT_ALREADY_ADDED:
+                        raise
+            logger.info("Supervisor configuration reloaded (xmlrpc)")
+            return True
+        except Exception as e:
+            logger.error(f"Error reloading supervisor config: {e}")
+            return False
+
+
+class AsyncSupervisorRPC:
+    """
+    asyncio XML-RPC client for supervisord.
+
+    Requests are serialized over one persistent unix-socket connection; the
+    payloads are built and parsed with xmlrpc.client.
+    """
+
+    _reader: asyncio.StreamReader | None = None
+    _writer: asyncio.StreamWriter | None = None
+    _lock: asyncio.Lock | None = None
+    _loop: asyncio.AbstractEventLoop | None = None
+
+    @classmethod
+    async def _connect(cls) -> None:
+        cls._reader, cls._writer = await asyncio.open_unix_connection(SUPERVISOR_SOCKET)
+
+    @classmethod
+    async def _roundtrip(cls, payload: bytes) -> bytes:
+        if cls._writer is None or cls._writer.is_closing() or cls._reader.at_eof():
+            # Not connected yet, or supervisord closed the idle connection:
+            # reconnect before writing, so the request is not lost with it
+            await cls.close()
+            await cls._connect()
+        cls._writer.write(
+            b"POST /RPC2 HTTP/1.1\r\nHost: localhost\r\nContent-Type: text/xml\r\n"
+            b"Content-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload
+        )
+        await cls._writer.drain()
+
+        head = await cls._reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int((await cls._reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+                chunk = await cls._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                body += chunk[:-2]
+            body = bytes(body)
+        elif "content-length" in headers:
+            body = await cls._reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await cls._reader.read()
+            keep_alive = False
+
+        if not keep_alive:
+            await cls.close()
+        if status != 200:
+            raise xmlrpc.client.ProtocolError("localhost/RPC2", status, lines[0], headers)
+        return body
+
+    @classmethod
+    async def call(cls, method: str, *params):
+        """
+        Invoke an XML-RPC method.
+
+        A connection that drops mid-call is retried once on a new one for
+        read-only methods only; anything else fails, since supervisord may
+        have applied it.
+        """
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            # Connection and lock belong to the loop that created them
+            cls._loop, cls._lock = loop, asyncio.Lock()
+            cls._reader = cls._writer = None
+        payload = xmlrpc.client.dumps(params, method, allow_none=True).encode("utf-8")
+        with timed(PHASE_SUPERVISOR):
+            async with cls._lock:
+                try:
+                    body = await asyncio.wait_for(cls._roundtrip(payload), SUPERVISOR_RPC_TIMEOUT)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    await cls.close()
+                    if method not in READ_ONLY_METHODS:
+                        raise
+                    body = await asyncio.wait_for(cls._roundtrip(payload), SUPERVISOR_RPC_TIMEOUT)
+                except BaseException:
+                    await cls.close()
+                    raise
+        result, _ = xmlrpc.client.loads(body)
+        return result[0]
+
+    @classmethod
+    async def close(cls) -> None:
+        """Close the persistent connection (reopened on next call)."""
+        writer, cls._reader, cls._writer = cls._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    @classmethod
+    async def start(cls, program: str) -> bool:
+        try:
+            await cls.call("supervisor.startProcess", program, True)
+            logger.info(f"Started {program} via supervisor (xmlrpc)")
+            return True
+        except xmlrpc.client.Fault as fault:
+            if fault.faultCode == FAULT_ALREADY_STARTED:
+                return True
+            logger.error(f"Failed to start {program}: {fault.faultString}")
+            return False
+        except Exception as e:
+            logger.error(f"Error starting {program}: {e}")
+            return False
+
+    @classmethod
+    async def stop(cls, program: str) -> bool:
+        try:
+            await cls.call("supervisor.stopProcess", program, True)
+            logger.info(f"Stopped {program} via supervisor (xmlrpc)")
+            return True
+        except xmlrpc.client.Fault as fault:
+            if fault.faultCode == FAULT_NOT_RUNNING:
+                return True
+            logger.error(f"Failed to stop {program}: {fault.faultString}")
+            return False
+        except Exception as e:
+            logger.error(f"Error stopping {program}: {e}")
+            return False
+
+    @classmethod
+    async def process_info(cls, program: str) -> dict | None:
+        try:
+            return await cls.call("supervisor.getProcessInfo", program)
+        except Exception as e:
+            logger.error(f"Error checking {program} status: {e}")
+            return None
+
+    @classmethod
+    async def status(cls, program: str) -> bool:
+        info = await cls.process_info(program)
+        return bool(info) and info.get("statename") == "RUNNING"
+
+    @classmethod
+    async def get_pid(cls, program: str) -> int | None:
+        info = await cls.process_info(program)
+        if info and info.get("statename") == "RUNNING" and info.get("pid"):
+            return int(info["pid"])
+        return None
+
+    @classmethod
+    async def restart(cls, program: str) -> bool:
+        if not await cls.stop(program):
+            return False
+        return await cls.start(program)
+
+    @classmethod
+    async def reload_config(cls) -> bool:
+        try:
+            # reread, then apply the diff the way `supervisorctl update` does
+            added, changed, removed = (await cls.call("supervisor.reloadConfig"))[0]
+            for group in removed + changed:
+                await cls.call("supervisor.stopProcessGroup", group)
+                await cls.call("supervisor.removeProcessGroup", group)
+            for group in changed + added:
+                try:
+                    await cls.call("supervisor.addProcessGroup", group)
+                except xmlrpc.client.Fault as fault:
+                    if fault.faultCode != FAULT_ALREADY_ADDED:
+                        raise
+            logger.info("Supervisor configuration reloaded (xmlrpc)")
+            return True
+        except Exception as e:
+            logger.error(f"Error reloading supervisor config: {e}")
+            return False
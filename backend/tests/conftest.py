@@ -0,0 +1,58 @@
+"""
+Shared pytest setup for the backend tests.
+
+Puts the backend directory on sys.path so modules can be imported directly and
+provides safe defaults so importing server.py does not touch the network.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault('MONGO_URL', 'mongodb://127.0.0.1:27017')
+os.environ.setdefault('ENSURE_PLAYWRIGHT_BROWSERS', 'false')
+
+
+@pytest.fixture
+def proxied_server(monkeypatch):
+    """
+    The server module with auth and gateway liveness patched out, so the
+    Control UI proxy routes can be driven in-process against a fake gateway.
+    Point it at a gateway with monkeypatch.setattr(server, "MOLTBOT_PORT", port).
+    """
+    import server
+
+    owner = server.User(user_id="user_test", email="owner@example.com", name="Owner")
+
+    async def fake_current_user(request):
+        return owner
+
+    async def gateway_running():
+        return True
+
+    monkeypatch.setattr(server, "get_current_user", fake_current_user)
+    monkeypatch.setattr(server, "check_gateway_running", gateway_running)
+    monkeypatch.setitem(server.gateway_state, "owner_user_id", owner.user_id)
+    monkeypatch.setitem(server.gateway_state, "token", "test-token")
+    return server
+
+
+@pytest.fixture
+def run_async():
+    """Run a coroutine function in a fresh loop, closing the shared proxy client afterwards."""
+    from proxy_client import ProxyClient
+
+    def runner(coro_fn):
+        async def wrapper():
+            try:
+                return await coro_fn()
+            finally:
+                await ProxyClient.close()
+        return asyncio.run(wrapper())
+
+    return runner
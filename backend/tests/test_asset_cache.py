@@ -0,0 +1,191 @@
+"""
+Tests for the immutable Control UI asset cache (asset_cache.AssetCache)
+Repeat loads of hashed assets are served from memory/disk without reaching the gateway
+"""
+import asyncio
+import gzip
+import os
+
+import httpx
+import pytest
+
+import asset_cache
+from asset_cache import AssetCache, AssetEntry, parse_accept_encoding
+from benchmarks.fake_gateway import FakeGateway
+
+ASSET = "/api/openclaw/ui/assets/index-BzX1aB2c.js"
+
+
+@pytest.fixture(autouse=True)
+def clean_cache(monkeypatch):
+    monkeypatch.setattr(asset_cache, "ASSET_CACHE_DIR", "")
+    AssetCache.clear()
+    yield
+    AssetCache.clear()
+
+
+def fetch_all(server, monkeypatch, gateway_kwargs, requests):
+    """Serve the app against a fake gateway; returns (responses, gateway request count)."""
+
+    async def scenario():
+        async with FakeGateway(**gateway_kwargs) as gateway:
+            monkeypatch.setattr(server, "MOLTBOT_PORT", gateway.port)
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = [await client.get(url, headers=headers) for url, headers in requests]
+            return responses, gateway.requests
+
+    return scenario
+
+
+class TestAssetCacheProxy:
+    """Content-hashed assets served through the proxy"""
+
+    def test_repeat_loads_served_from_memory(self, proxied_server, run_async, monkeypatch):
+        gzip_only = {"accept-encoding": "gzip"}
+        responses, upstream = run_async(fetch_all(proxied_server, monkeypatch, {"asset_size": 20000}, [
+            (ASSET, gzip_only), (ASSET, gzip_only), (ASSET, {"accept-encoding": "identity"}),
+        ]))
+        first, second, plain = responses
+
+        # Only the first load reached the gateway
+        assert upstream == 1
+        assert AssetCache.hits == 2 and AssetCache.misses == 1
+        for response in (first, second):
+            assert response.status_code == 200
+            assert response.headers["content-encoding"] == "gzip"
+            assert int(response.headers["content-length"]) < 20000
+            assert response.content == b"x" * 20000
+        assert first.headers["cache-control"] == f"public, max-age={asset_cache.ASSET_CACHE_MAX_AGE}, immutable"
+        assert first.headers["vary"] == "Accept-Encoding"
+        assert "content-encoding" not in plain.headers
+        assert plain.content == b"x" * 20000
+        assert plain.headers["etag"] != first.headers["etag"]
+        print("✓ Repeat asset loads served from the cache")
+
+    def test_if_none_match_gets_304(self, proxied_server, run_async, monkeypatch):
+        first, = run_async(fetch_all(proxied_server, monkeypatch, {}, [(ASSET, {"accept-encoding": "gzip"})]))[0]
+        etag = first.headers["etag"]
+        responses, upstream = run_async(fetch_all(proxied_server, monkeypatch, {}, [
+            (ASSET, {"accept-encoding": "gzip", "if-none-match": etag}),
+        ]))
+        assert responses[0].status_code == 304
+        assert responses[0].headers["etag"] == etag
+        assert upstream == 0
+        print("✓ Matching If-None-Match answered with 304")
+
+    @pytest.mark.parametrize("cache_control", ["no-store", "no-cache", "private, max-age=600", "max-age=0"])
+    def test_upstream_cache_headers_honoured(self, proxied_server, run_async, monkeypatch, cache_control):
+        gateway = {"asset_headers": {"Cache-Control": cache_control}}
+        responses, upstream = run_async(fetch_all(proxied_server, monkeypatch, gateway, [(ASSET, {}), (ASSET, {})]))
+        assert upstream == 2
+        assert all(r.status_code == 200 and r.headers["cache-control"] == cache_control for r in responses)
+        print(f"✓ Upstream {cache_control} response not cached")
+
+    def test_uncacheable_candidate_still_compressed(self, proxied_server, run_async, monkeypatch):
+        gateway = {"asset_size": 20000, "asset_headers": {"Cache-Control": "no-store"}}
+        responses, upstream = run_async(fetch_all(proxied_server, monkeypatch, gateway, [
+            (ASSET, {"accept-encoding": "gzip"}), (ASSET, {"accept-encoding": "identity"}),
+        ]))
+        compressed, plain = responses
+        assert upstream == 2 and AssetCache.size() == 0
+        # Fetched uncompressed to be cached, so compressed here instead
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert int(compressed.headers["content-length"]) < 20000
+        assert "Accept-Encoding" in compressed.headers["vary"]
+        assert compressed.content == b"x" * 20000
+        assert "content-encoding" not in plain.headers and plain.content == b"x" * 20000
+        print("✓ Uncacheable asset compressed for clients that accept it")
+
+    def test_upstream_max_age_bounds_entry(self, proxied_server, run_async, monkeypatch):
+        gateway = {"asset_headers": {"Cache-Control": "public, max-age=60"}}
+        responses, upstream = run_async(fetch_all(proxied_server, monkeypatch, gateway, [(ASSET, {}), (ASSET, {})]))
+        assert upstream == 1
+        max_age = int(responses[1].headers["cache-control"].split("max-age=")[1])
+        assert 0 < max_age <= 60
+        assert "immutable" not in responses[1].headers["cache-control"]
+        print("✓ Upstream max-age bounds the cache entry")
+
+    def test_unhashed_paths_not_cached(self, proxied_server, run_async, monkeypatch):
+        url = "/api/openclaw/ui/assets/app.js"
+        responses, upstream = run_async(fetch_all(proxied_server, monkeypatch, {}, [(url, {}), (url, {})]))
+        assert upstream == 2
+        assert all(r.status_code == 200 for r in responses)
+        assert AssetCache.size() == 0
+        print("✓ Unhashed paths always go to the gateway")
+
+
+class TestAssetCache:
+    """Cache policy, encoding negotiation and storage tiers"""
+
+    def test_policy_rejects_html_cookies_and_vary(self):
+        ok = httpx.Headers({"content-type": "application/javascript"})
+        assert AssetCache.policy(200, ok) == (asset_cache.ASSET_CACHE_MAX_AGE, True, None)
+        assert AssetCache.policy(404, ok) is None
+        assert AssetCache.policy(200, httpx.Headers({"content-type": "text/html"})) is None
+        assert AssetCache.policy(200, httpx.Headers({"set-cookie": "a=b"})) is None
+        assert AssetCache.policy(200, httpx.Headers({"vary": "Cookie"})) is None
+        assert AssetCache.policy(200, httpx.Headers({"vary": "Accept-Encoding"})) is not None
+        print("✓ HTML, cookies and Vary responses rejected by the policy")
+
+    def test_accept_encoding_negotiation(self):
+        body = b"a" * 4096
+        entry = AssetEntry("d", "text/css", asset_cache._compress(body, "text/css"), 60, True, None)
+        assert entry.negotiate(None)[0] == "identity"
+        assert entry.negotiate("gzip, deflate")[0] == "gzip"
+        assert entry.negotiate("gzip;q=0")[0] == "identity"
+        assert entry.negotiate("*")[0] == asset_cache.ENCODINGS[0]
+        assert gzip.decompress(entry.variants["gzip"]) == body
+        assert parse_accept_encoding("br;q=0.5, GZIP") == {"br": 0.5, "gzip": 1.0}
+        print("✓ Accept-Encoding negotiated against stored variants")
+
+    def test_expired_disk_entry_dropped_once(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(asset_cache, "ASSET_CACHE_DIR", str(tmp_path))
+        index_path = AssetCache._index_path("/a.js")
+
+        def expired_elsewhere(entry):
+            # Another worker drops the same expired entry between our read and unlink
+            os.unlink(index_path)
+            return True
+
+        async def scenario():
+            await AssetCache.put("/a.js", b"a" * 100, "text/javascript", (60, False, None))
+            AssetCache.clear()
+            monkeypatch.setattr(AssetEntry, "expired", expired_elsewhere)
+            return await AssetCache.get("/a.js")
+
+        assert asyncio.run(scenario()) is None
+        assert not os.path.exists(index_path)
+        print("✓ Expired disk entry dropped without failing when already gone")
+
+    def test_lru_eviction_within_budget(self, monkeypatch):
+        monkeypatch.setattr(asset_cache, "ASSET_CACHE_MAX_BYTES", 2500)
+        policy = (60, True, None)
+
+        async def scenario():
+            # Incompressible bodies of 1000 bytes each
+            for name in ("a", "b", "c"):
+                await AssetCache.put(name, bytes(range(250)) * 4, "image/png", policy)
+            return [await AssetCache.get(name) is not None for name in ("a", "b", "c")]
+
+        assert asyncio.run(scenario()) == [False, True, True]
+        assert AssetCache.size() == 2000
+        print("✓ Least recently used assets evicted within the budget")
+
+    def test_disk_tier_survives_memory_loss(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(asset_cache, "ASSET_CACHE_DIR", str(tmp_path))
+        body = b"body{color:red}" * 200
+
+        async def scenario():
+            stored = await AssetCache.put("assets/index-Ab12Cd34.css", body, "text/css", (60, True, None))
+            AssetCache.clear()  # e.g. a backend restart
+            loaded = await AssetCache.get("assets/index-Ab12Cd34.css")
+            return stored, loaded
+
+        stored, loaded = asyncio.run(scenario())
+        assert AssetCache.disk_hits == 1
+        assert loaded.digest == stored.digest
+        assert loaded.variants == stored.variants
+        # Bodies are stored under their content hash
+        assert (tmp_path / "blobs" / f"{stored.digest}.identity").read_bytes() == body
+        print("✓ Disk tier serves assets after the memory tier is lost")
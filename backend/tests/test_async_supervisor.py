@@ -0,0 +1,108 @@
+"""
+Tests for the non-blocking AsyncSupervisorClient
+Shows proxied traffic keeps flowing while a (slow) gateway restart is in progress
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import supervisor_client
+import supervisor_rpc
+from supervisor_client import AsyncSupervisorClient
+from supervisor_rpc import AsyncSupervisorRPC
+from benchmarks.fake_gateway import FakeGateway
+from benchmarks.fake_supervisord import FakeSupervisord, fake_supervisorctl
+
+RESTART_DELAY = 1.0
+
+
+async def proxy_during_restart(server, gateway_port):
+    """Fire proxied requests while a restart runs; return (restart_s, request_finish_times)"""
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        restart = asyncio.create_task(AsyncSupervisorClient.restart())
+        finish_times = []
+
+        async def fetch(i):
+            response = await client.get(f"/api/openclaw/ui/assets/{i}.js")
+            assert response.status_code == 200
+            finish_times.append(time.perf_counter() - start)
+
+        await asyncio.sleep(0.05)
+        await asyncio.gather(*(fetch(i) for i in range(20)))
+        restarted = await restart
+        return restarted, time.perf_counter() - start, finish_times
+
+
+class TestAsyncSupervisorClient:
+    """Supervisor calls must not stall the event loop"""
+
+    def test_cli_backend_surface(self, monkeypatch):
+        """Each method works through asyncio subprocesses"""
+        monkeypatch.setattr(supervisor_client, "SUPERVISOR_BACKEND", "cli")
+
+        async def scenario():
+            return (
+                await AsyncSupervisorClient.start(),
+                await AsyncSupervisorClient.status(),
+                await AsyncSupervisorClient.get_pid(),
+                await AsyncSupervisorClient.stop(),
+                await AsyncSupervisorClient.reload_config(),
+            )
+
+        with fake_supervisorctl():
+            started, running, pid, stopped, reloaded = asyncio.run(scenario())
+        assert started and running and stopped and reloaded
+        assert pid == 4242
+
+    def test_cli_timeout_kills_command(self, monkeypatch):
+        """A hung supervisorctl is killed and reported as failure"""
+        monkeypatch.setattr(supervisor_client, "SUPERVISOR_BACKEND", "cli")
+
+        async def scenario():
+            return await supervisor_client._run_supervisorctl('status', timeout=0.2)
+
+        with fake_supervisorctl(delay=5):
+            start = time.perf_counter()
+            with pytest.raises(asyncio.TimeoutError):
+                asyncio.run(scenario())
+            assert time.perf_counter() - start < 2
+
+    def test_proxy_flows_during_cli_restart(self, proxied_server, run_async, monkeypatch):
+        """Proxied requests complete while `supervisorctl restart` is still running"""
+        monkeypatch.setattr(supervisor_client, "SUPERVISOR_BACKEND", "cli")
+
+        async def scenario():
+            async with FakeGateway() as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                return await proxy_during_restart(proxied_server, gateway.port)
+
+        with fake_supervisorctl(delay=RESTART_DELAY):
+            restarted, restart_s, finish_times = run_async(scenario)
+        assert restarted
+        assert restart_s >= RESTART_DELAY
+        assert max(finish_times) < RESTART_DELAY, f"Requests stalled behind the restart: {max(finish_times):.2f}s"
+        print(f"✓ 20 proxied requests done in {max(finish_times)*1000:.0f}ms during a {restart_s:.2f}s restart")
+
+    def test_proxy_flows_during_rpc_restart(self, proxied_server, run_async, monkeypatch):
+        """Same guarantee with the XML-RPC backend"""
+        with FakeSupervisord(start_delay=RESTART_DELAY / 2) as fake:
+            fake.programs["clawdbot-gateway"]["state"] = "RUNNING"
+            monkeypatch.setattr(supervisor_rpc, "SUPERVISOR_SOCKET", fake.socket_path)
+            monkeypatch.setattr(supervisor_client, "SUPERVISOR_BACKEND", "xmlrpc")
+
+            async def scenario():
+                try:
+                    async with FakeGateway() as gateway:
+                        monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                        return await proxy_during_restart(proxied_server, gateway.port)
+                finally:
+                    await AsyncSupervisorRPC.close()
+
+            restarted, restart_s, finish_times = run_async(scenario)
+        assert restarted
+        assert max(finish_times) < restart_s
+        assert max(finish_times) < RESTART_DELAY / 2
@@ -0,0 +1,146 @@
+"""
+Tests for the async config store
+Repeat reads come from memory until the file changes on disk; writes are atomic
+"""
+import asyncio
+import json
+import os
+import stat
+
+import pytest
+
+import gateway_config
+import whatsapp_monitor
+from config_store import ConfigStore
+
+
+@pytest.fixture(autouse=True)
+def fresh_store():
+    ConfigStore.invalidate()
+    ConfigStore.hits = ConfigStore.misses = 0
+    yield
+    ConfigStore.invalidate()
+
+
+class TestConfigStore:
+    """Cached reads and atomic writes of JSON/env files"""
+
+    def test_repeat_reads_hit_the_cache(self, tmp_path):
+        path = tmp_path / "clawdbot.json"
+        path.write_text(json.dumps({"gateway": {"auth": {"token": "abc"}}}))
+
+        async def scenario():
+            first = await ConfigStore.read_json(path)
+            second = await ConfigStore.read_json(path)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert first == {"gateway": {"auth": {"token": "abc"}}}
+        assert second is first
+        assert (ConfigStore.misses, ConfigStore.hits) == (1, 1)
+        print("✓ Repeat reads served from the mtime cache")
+
+    def test_external_rewrite_is_picked_up(self, tmp_path):
+        path = tmp_path / "clawdbot.json"
+        path.write_text(json.dumps({"v": 1}))
+
+        async def scenario():
+            before = await ConfigStore.read_json(path)
+            # e.g. the gateway rewriting its own config
+            path.write_text(json.dumps({"v": 22}))
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            after = await ConfigStore.read_json(path)
+            return before, after
+
+        before, after = asyncio.run(scenario())
+        assert before == {"v": 1}
+        assert after == {"v": 22}
+        assert ConfigStore.misses == 2
+        print("✓ External rewrite picked up on the next read")
+
+    def test_missing_or_invalid_file_returns_default(self, tmp_path):
+        bad = tmp_path / "bad.json"
+        bad.write_text("{not json")
+
+        async def scenario():
+            return (
+                await ConfigStore.read_json(tmp_path / "missing.json", {}),
+                await ConfigStore.read_json(bad),
+            )
+
+        assert asyncio.run(scenario()) == ({}, None)
+        print("✓ Missing or invalid file returns the default")
+
+    def test_mutable_copy_does_not_touch_cache(self, tmp_path):
+        path = tmp_path / "creds.json"
+        path.write_text(json.dumps({"me": {"id": "1:2"}}))
+
+        async def scenario():
+            copy = await ConfigStore.read_json(path, mutable=True)
+            copy["me"]["id"] = "changed"
+            return await ConfigStore.read_json(path)
+
+        assert asyncio.run(scenario()) == {"me": {"id": "1:2"}}
+        print("✓ Mutable copy leaves the cached value alone")
+
+    def test_write_json_is_atomic_and_updates_cache(self, tmp_path):
+        path = tmp_path / "sub" / "clawdbot.json"
+
+        async def scenario():
+            await ConfigStore.write_json(path, {"a": 1}, indent=2)
+            return await ConfigStore.read_json(path)
+
+        assert asyncio.run(scenario()) == {"a": 1}
+        assert json.loads(path.read_text()) == {"a": 1}
+        assert ConfigStore.hits == 1 and ConfigStore.misses == 0
+        # No temporary files left behind
+        assert os.listdir(path.parent) == ["clawdbot.json"]
+        print("✓ JSON written atomically and cached")
+
+    def test_write_keeps_existing_permissions(self, tmp_path):
+        path = tmp_path / "creds.json"
+        path.write_text("{}")
+        os.chmod(path, 0o600)
+
+        asyncio.run(ConfigStore.write_json(path, {"registered": True}))
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        print("✓ Rewrite keeps the file's permissions")
+
+
+class TestConfigStoreCallers:
+    """Server code writing through the store"""
+
+    def test_gateway_env_written_owner_only_and_removed(self, tmp_path, monkeypatch):
+        env_file = tmp_path / "gateway.env"
+        monkeypatch.setattr(gateway_config, "GATEWAY_ENV_FILE", str(env_file))
+
+        asyncio.run(gateway_config.write_gateway_env(token="t0k", api_key="sk-ant-x", provider="anthropic"))
+        assert stat.S_IMODE(os.stat(env_file).st_mode) == 0o600
+        content = env_file.read_text()
+        assert 'export CLAWDBOT_GATEWAY_TOKEN="t0k"' in content
+        assert 'export ANTHROPIC_API_KEY="sk-ant-x"' in content
+
+        asyncio.run(gateway_config.clear_gateway_env())
+        assert not env_file.exists()
+        # Clearing again is a no-op
+        asyncio.run(gateway_config.clear_gateway_env())
+        print("✓ Gateway env file written owner-only and removed")
+
+    def test_whatsapp_fix_goes_through_store(self, tmp_path, monkeypatch):
+        creds_file = tmp_path / "creds.json"
+        creds_file.write_text(json.dumps({"account": {"x": 1}, "me": {"id": "15551234567:3@s.whatsapp.net"}, "registered": False}))
+        monkeypatch.setattr(whatsapp_monitor, "CREDS_FILE", creds_file)
+
+        async def scenario():
+            before = await whatsapp_monitor.get_whatsapp_status()
+            fixed = await whatsapp_monitor.fix_registered_flag()
+            after = await whatsapp_monitor.get_whatsapp_status()
+            return before, fixed, after
+
+        before, fixed, after = asyncio.run(scenario())
+        assert before == {"linked": True, "phone": "+15551234567", "registered": False}
+        assert fixed is True
+        assert after["registered"] is True
+        assert json.loads(creds_file.read_text())["registered"] is True
+        print("✓ WhatsApp registered fix written through the store")
@@ -0,0 +1,89 @@
+"""
+Tests for the startup index bootstrap
+"""
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+import db_indexes
+from db_indexes import INDEXES, bootstrap_indexes, check_indexes, ensure_indexes
+
+
+class FakeCollection:
+    """Records create_indexes calls and serves index_information/$indexStats"""
+
+    def __init__(self, fail=False):
+        self.indexes = {"_id_": {"key": [("_id", 1)]}}
+        self.ops = {}
+        self.fail = fail
+
+    async def create_indexes(self, models):
+        if self.fail:
+            raise OperationFailure("E11000 duplicate key error", code=11000)
+        names = []
+        for model in models:
+            doc = model.document
+            info = {"key": list(doc["key"].items())}
+            if "expireAfterSeconds" in doc:
+                info["expireAfterSeconds"] = doc["expireAfterSeconds"]
+            self.indexes[doc["name"]] = info
+            names.append(doc["name"])
+        return names
+
+    async def index_information(self):
+        return dict(self.indexes)
+
+    def aggregate(self, pipeline):
+        assert pipeline == [{"$indexStats": {}}]
+        collection = self
+
+        class Cursor:
+            async def to_list(self, length=None):
+                return [{"name": name, "accesses": {"ops": collection.ops.get(name, 0)}} for name in collection.indexes]
+
+        return Cursor()
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class TestIndexBootstrap:
+    """Index creation and reporting at startup"""
+
+    def test_creates_declared_indexes(self):
+        db = FakeDB()
+        created = asyncio.run(ensure_indexes(db))
+        assert set(created) == {"session_token_unique", "expires_at_ttl", "email_unique", "user_id_unique", "port_unique"}
+        assert db["user_sessions"].indexes["expires_at_ttl"]["expireAfterSeconds"] == 0
+
+    def test_reports_missing_and_unused(self):
+        db = FakeDB()
+        db["users"] = FakeCollection(fail=True)
+        asyncio.run(ensure_indexes(db))
+        db["user_sessions"].ops["session_token_unique"] = 12
+
+        report = asyncio.run(check_indexes(db))
+        assert report["users"]["missing"] == ["email_unique", "user_id_unique"]
+        # TTL index is never reported as unused; _id_ is ignored
+        assert report["user_sessions"] == {"missing": [], "unused": []}
+
+        db["user_sessions"].ops.clear()
+        report = asyncio.run(check_indexes(db))
+        assert report["user_sessions"]["unused"] == ["session_token_unique"]
+
+    def test_equivalent_index_under_other_name_counts(self):
+        db = FakeDB()
+        db["users"].indexes["email_1"] = {"key": [("email", 1)]}
+        db["users"].indexes["user_id_1"] = {"key": [("user_id", 1)]}
+        report = asyncio.run(check_indexes(db))
+        assert report["users"]["missing"] == []
+
+    def test_bootstrap_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(db_indexes, "DB_INDEX_BOOTSTRAP", False)
+        db = FakeDB()
+        report = asyncio.run(bootstrap_indexes(db))
+        assert sorted(report["user_sessions"]["missing"]) == ["expires_at_ttl", "session_token_unique"]
+        assert set(report) == set(INDEXES)
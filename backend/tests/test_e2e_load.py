@@ -0,0 +1,62 @@
+"""
+Tests for the end-to-end load harness (benchmarks/bench_e2e_load.py)
+A short run drives every operation through the real app without errors
+"""
+import asyncio
+import json
+
+from benchmarks.bench_e2e_load import build_parser, compare, run_load
+from benchmarks.fake_mongo import FakeMongoDatabase
+
+
+class TestLoadHarness:
+    """End-to-end load harness and its stand-ins"""
+
+    def test_short_run_reports_every_operation(self, tmp_path):
+        args = build_parser().parse_args([
+            "--duration", "0.5", "--warmup", "0.1", "--concurrency", "4",
+            "--mix", "asset=2,status=1,ws=1", "--assets", "4", "--asset-kb", "4",
+        ])
+        report = asyncio.run(run_load(args))
+
+        results = {row["name"]: row for row in report["results"]}
+        assert set(results) == {"asset", "status", "ws", "total"}
+        for row in results.values():
+            assert row["requests"] > 0 and row["errors"] == 0
+            assert row["p99_ms"] >= row["p50_ms"] > 0
+        assert report["upstream"]["ws_messages"] == results["ws"]["requests"]
+        assert report["rss"]["peak_mb"] > 0
+
+        # The JSON report is its own baseline; a much faster baseline is a regression
+        path = tmp_path / "baseline.json"
+        path.write_text(json.dumps(report))
+        baseline = json.loads(path.read_text())
+        assert not any(row["regressed"] for row in compare(report, baseline, tolerance=10))
+        for row in baseline["results"]:
+            row["req_per_s"] *= 2
+        assert all(row["regressed"] for row in compare(report, baseline, tolerance=10))
+        print("✓ Short load run reports every operation")
+
+    def test_fake_mongo_session_aggregation(self, proxied_server):
+        db = FakeMongoDatabase()
+
+        async def scenario():
+            await db.users.insert_one({"user_id": "u1", "email": "a@example.com", "name": "A"})
+            await db.user_sessions.insert_one({"user_id": "u1", "session_token": "t1", "expires_at": 1})
+            await db.instance_config.insert_one({"_id": "instance_owner", "user_id": "u1"})
+            pipeline = proxied_server.session_lookup_pipeline("t1", include_owner=True)
+            found = await db.user_sessions.aggregate(pipeline).to_list(length=1)
+            missing = await db.user_sessions.aggregate(
+                proxied_server.session_lookup_pipeline("nope", include_owner=False)).to_list(length=1)
+            await db.moltbot_configs.update_one({"_id": "gateway_config"}, {"$set": {"should_run": True}}, upsert=True)
+            config = await db.moltbot_configs.find_one({"_id": "gateway_config"}, {"_id": 0})
+            return found, missing, config
+
+        found, missing, config = asyncio.run(scenario())
+        assert missing == []
+        assert found[0]["expires_at"] == 1
+        assert found[0]["user"]["email"] == "a@example.com" and "_id" in found[0]["user"]
+        assert found[0]["owner"]["user_id"] == "u1"
+        assert "_id" not in found[0]
+        assert config == {"should_run": True}
+        print("✓ Fake Mongo resolves sessions through the aggregation")
@@ -0,0 +1,208 @@
+"""
+Tests for the credential file watcher
+Changes are reported once per burst of writes, without re-reading the file on a timer
+"""
+import asyncio
+import json
+
+import pytest
+
+import file_watcher
+import whatsapp_monitor
+from benchmarks.fake_mongo import FakeMongoDatabase
+from config_store import ConfigStore
+from file_watcher import watch_file
+
+BROKEN_CREDS = {"account": {"x": 1}, "me": {"id": "15551234567:3@s.whatsapp.net"}, "registered": False}
+
+
+async def collect_changes(path, action, settle=0.3, **kwargs):
+    """Run `action` while watching `path`; return how many changes were reported."""
+    changes = []
+
+    async def watch():
+        async for changed in watch_file(path, **kwargs):
+            changes.append(changed)
+
+    watcher = asyncio.create_task(watch())
+    await asyncio.sleep(0.1)
+    await action()
+    await asyncio.sleep(settle)
+    watcher.cancel()
+    try:
+        await watcher
+    except asyncio.CancelledError:
+        pass
+    return changes
+
+
+class TestPolling:
+    def test_burst_of_writes_is_reported_once(self, tmp_path):
+        path = tmp_path / "creds.json"
+        path.write_text("{}")
+
+        async def burst():
+            for i in range(5):
+                path.write_text(json.dumps({"i": i, "pad": "x" * i}))
+                await asyncio.sleep(0.01)
+
+        changes = asyncio.run(collect_changes(
+            path, burst, force_polling=True, poll_interval=0.02, debounce_ms=100,
+        ))
+        assert changes == [str(path)]
+
+    def test_file_created_in_missing_directory(self, tmp_path):
+        path = tmp_path / "whatsapp" / "default" / "creds.json"
+
+        async def create():
+            path.parent.mkdir(parents=True)
+            path.write_text("{}")
+
+        changes = asyncio.run(collect_changes(
+            path, create, force_polling=True, poll_interval=0.02, debounce_ms=20,
+        ))
+        assert changes == [str(path)]
+
+    def test_no_change_no_notification(self, tmp_path):
+        path = tmp_path / "creds.json"
+        path.write_text("{}")
+
+        async def nothing():
+            pass
+
+        assert asyncio.run(collect_changes(
+            path, nothing, force_polling=True, poll_interval=0.02, debounce_ms=20,
+        )) == []
+
+    def test_inotify_failure_falls_back_to_polling(self, tmp_path, monkeypatch):
+        path = tmp_path / "creds.json"
+        path.write_text("{}")
+
+        async def broken(path, debounce_ms):
+            raise ValueError("unexpected watcher failure")
+            yield
+
+        monkeypatch.setattr(file_watcher, "awatch", object())
+        monkeypatch.setattr(file_watcher, "_inotify", broken)
+
+        async def write():
+            path.write_text('{"registered": true}')
+
+        changes = asyncio.run(collect_changes(
+            path, write, force_polling=False, poll_interval=0.02, debounce_ms=20,
+        ))
+        assert changes == [str(path)]
+
+
+@pytest.mark.skipif(file_watcher.awatch is None, reason="watchfiles not installed")
+class TestInotify:
+    def test_change_is_reported(self, tmp_path):
+        path = tmp_path / "creds.json"
+        path.write_text("{}")
+
+        async def write():
+            path.write_text('{"registered": true}')
+
+        changes = asyncio.run(collect_changes(path, write, settle=0.5, debounce_ms=50))
+        assert changes == [str(path)]
+
+    def test_file_created_in_missing_directory(self, tmp_path):
+        path = tmp_path / "whatsapp" / "default" / "creds.json"
+
+        async def create():
+            path.parent.mkdir(parents=True)
+            await asyncio.sleep(0.1)
+            path.write_text("{}")
+
+        changes = asyncio.run(collect_changes(path, create, settle=0.8, debounce_ms=50))
+        assert str(path) in changes
+
+
+class TestAutoFixWatcher:
+    """The WhatsApp auto-fix watcher"""
+
+    def test_watcher_fixes_registered_flag_on_change(self, proxied_server, tmp_path, monkeypatch):
+        server = proxied_server
+        creds_file = tmp_path / "creds.json"
+        creds_file.write_text(json.dumps({**BROKEN_CREDS, "registered": True}))
+        monkeypatch.setattr(whatsapp_monitor, "CREDS_FILE", creds_file)
+        monkeypatch.setattr(server, "CREDS_FILE", creds_file)
+        monkeypatch.setattr(file_watcher, "FILE_WATCH_FORCE_POLLING", True)
+        monkeypatch.setattr(file_watcher, "FILE_WATCH_POLL_INTERVAL", 0.02)
+        monkeypatch.setattr(file_watcher, "FILE_WATCH_DEBOUNCE_MS", 20)
+        monkeypatch.setattr(server, "db", FakeMongoDatabase())
+        ConfigStore.invalidate()
+        whatsapp_monitor.WhatsAppStatusCache.invalidate()
+
+        restarts = []
+
+        async def fake_stop():
+            restarts.append("stop")
+            return True
+
+        async def fake_start():
+            restarts.append("start")
+            return True
+
+        monkeypatch.setattr(server.AsyncSupervisorClient, "stop", fake_stop)
+        monkeypatch.setattr(server.AsyncSupervisorClient, "start", fake_start)
+
+        async def scenario():
+            watcher = asyncio.create_task(server.whatsapp_auto_fix_watcher())
+            await asyncio.sleep(0.1)
+            assert restarts == []
+            # The gateway re-saves its credentials with the bug
+            creds_file.write_text(json.dumps(BROKEN_CREDS))
+            for _ in range(50):
+                await asyncio.sleep(0.02)
+                if "start" in restarts:
+                    break
+            watcher.cancel()
+            try:
+                await watcher
+            except asyncio.CancelledError:
+                pass
+
+        asyncio.run(scenario())
+        # Stopped before starting again, never two gateways on one set of credentials
+        assert restarts == ["stop", "start"]
+        assert json.loads(creds_file.read_text())["registered"] is True
+        print("✓ Watcher fixed the registered flag on change")
+
+    def test_only_lease_holder_fixes_credentials(self, proxied_server, tmp_path, monkeypatch, run_async):
+        server = proxied_server
+        creds_file = tmp_path / "creds.json"
+        creds_file.write_text(json.dumps(BROKEN_CREDS))
+        monkeypatch.setattr(whatsapp_monitor, "CREDS_FILE", creds_file)
+        monkeypatch.setattr(server, "CREDS_FILE", creds_file)
+        db = FakeMongoDatabase()
+        monkeypatch.setattr(server, "db", db)
+        ConfigStore.invalidate()
+        whatsapp_monitor.WhatsAppStatusCache.invalidate()
+        restarts = []
+
+        async def fake_restart(**kwargs):
+            restarts.append(kwargs)
+            return True
+
+        monkeypatch.setattr(server, "restart_gateway", fake_restart)
+
+        async def scenario():
+            # Another worker's watcher holds the lease
+            await db.moltbot_configs.insert_one({
+                "_id": "gateway_config", "whatsapp_watcher_holder": "other-worker",
+                "whatsapp_watcher_until": server.datetime.now(server.timezone.utc) + server.timedelta(minutes=5),
+            })
+            await server.check_whatsapp_registration()
+            skipped = (list(restarts), json.loads(creds_file.read_text())["registered"])
+            await db.moltbot_configs.update_one({"_id": "gateway_config"},
+                                                {"$unset": {"whatsapp_watcher_until": ""}})
+            ConfigStore.invalidate()
+            await server.check_whatsapp_registration()
+            return skipped
+
+        assert run_async(scenario) == ([], False)
+        # Once the lease was free this worker took it, fixed the file and restarted
+        assert restarts == [{"stop_first": True}]
+        assert json.loads(creds_file.read_text())["registered"] is True
+        print("✓ Only the watcher holding the lease fixes the credentials")
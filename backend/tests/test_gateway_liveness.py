@@ -0,0 +1,90 @@
+"""
+Tests for the cached gateway liveness state (gateway_liveness.GatewayLiveness)
+"""
+import asyncio
+
+import pytest
+
+import gateway_liveness
+import supervisor_client
+from gateway_liveness import GatewayLiveness
+
+
+@pytest.fixture
+def fake_supervisor(monkeypatch):
+    """Count supervisor queries and control the reported PID"""
+    state = {"pid": 4242, "calls": 0}
+
+    async def fake_get_pid():
+        state["calls"] += 1
+        return state["pid"]
+
+    monkeypatch.setattr(supervisor_client.AsyncSupervisorClient, "get_pid", fake_get_pid)
+    monkeypatch.setattr(GatewayLiveness, "_running", False)
+    monkeypatch.setattr(GatewayLiveness, "_pid", None)
+    monkeypatch.setattr(GatewayLiveness, "_checked_at", None)
+    monkeypatch.setattr(GatewayLiveness, "_task", None)
+    return state
+
+
+class TestGatewayLivenessCache:
+    """Hot-path reads come from memory"""
+
+    def test_reads_within_ttl_do_not_query_supervisor(self, fake_supervisor, monkeypatch):
+        """Only the first read queries supervisor while the cache is fresh"""
+        monkeypatch.setattr(gateway_liveness, "GATEWAY_LIVENESS_TTL", 60)
+
+        async def scenario():
+            for _ in range(100):
+                assert await GatewayLiveness.check() is True
+            return await GatewayLiveness.current_pid()
+
+        assert asyncio.run(scenario()) == 4242
+        assert GatewayLiveness.is_running() is True and GatewayLiveness.get_pid() == 4242
+        assert fake_supervisor["calls"] == 1, f"Expected 1 supervisor call, got {fake_supervisor['calls']}"
+        print("✓ 100 liveness reads cost a single supervisor query")
+
+    def test_stale_cache_refreshes_without_background_task(self, fake_supervisor, monkeypatch):
+        """With no refresher running, a stale cache is refreshed on an awaited read"""
+        monkeypatch.setattr(gateway_liveness, "GATEWAY_LIVENESS_TTL", 0)
+
+        async def scenario():
+            await GatewayLiveness.check()
+            fake_supervisor["pid"] = None
+            return await GatewayLiveness.check(), await GatewayLiveness.current_pid()
+
+        assert asyncio.run(scenario()) == (False, None)
+        assert fake_supervisor["calls"] == 3
+
+    def test_sync_reads_never_query_supervisor(self, fake_supervisor):
+        """is_running/get_pid answer from the cache even when it is empty"""
+        assert GatewayLiveness.is_running() is False
+        assert GatewayLiveness.get_pid() is None
+        assert fake_supervisor["calls"] == 0
+        print("✓ Sync liveness reads never block on supervisor")
+
+    def test_mark_running_updates_immediately(self, fake_supervisor, monkeypatch):
+        """start/stop actions update the cached state without a query"""
+        monkeypatch.setattr(gateway_liveness, "GATEWAY_LIVENESS_TTL", 60)
+        GatewayLiveness.mark_running(False)
+        assert GatewayLiveness.is_running() is False
+        assert GatewayLiveness.get_pid() is None
+        assert fake_supervisor["calls"] == 0
+
+    def test_background_refresher_keeps_state_fresh(self, fake_supervisor, monkeypatch):
+        """The refresher picks up state changes; reads never query supervisor"""
+        monkeypatch.setattr(gateway_liveness, "GATEWAY_LIVENESS_TTL", 0.01)
+
+        async def scenario():
+            GatewayLiveness.start()
+            await asyncio.sleep(0.03)
+            before = GatewayLiveness.is_running()
+            fake_supervisor["pid"] = None
+            await asyncio.sleep(0.05)
+            after = GatewayLiveness.is_running()
+            await GatewayLiveness.stop()
+            return before, after
+
+        before, after = asyncio.run(scenario())
+        assert before is True and after is False
+        print("✓ Background refresher tracked the gateway going down")
@@ -0,0 +1,373 @@
+"""
+Tests for the per-user gateway pool (gateway_pool.GatewayPool)
+Gateways are allocated and started on first use, evicted when idle, and the
+proxy routes each user to their own
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+
+import httpx
+import pytest
+
+import gateway_pool
+import metrics
+from benchmarks.fake_gateway import FakeGateway
+from benchmarks.fake_mongo import FakeMongoDatabase
+from gateway_pool import GatewayPool, GatewayPoolFull, PoolGateway
+from supervisor_client import AsyncSupervisorClient
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeSupervisor:
+    """Runs each pool gateway's program as a FakeGateway on the gateway's port"""
+
+    def __init__(self):
+        self.programs = {}
+        self.starts = 0
+        self.reloads = 0
+
+    def install(self, monkeypatch):
+        fake = self
+
+        async def start(cls):
+            gateway = next(g for g in GatewayPool.gateways() if g.name == cls.PROGRAM)
+            fake.programs[cls.PROGRAM] = await FakeGateway(port=gateway.port).start()
+            fake.starts += 1
+            return True
+
+        async def stop(cls):
+            program = fake.programs.pop(cls.PROGRAM, None)
+            if program is not None:
+                await program.stop()
+            return True
+
+        async def status(cls):
+            return cls.PROGRAM in fake.programs
+
+        async def get_pid(cls):
+            # The fake gateways run in this process
+            return os.getpid() if cls.PROGRAM in fake.programs else None
+
+        async def reload_config(cls):
+            fake.reloads += 1
+            return True
+
+        for name, fn in [("start", start), ("stop", stop), ("status", status),
+                         ("get_pid", get_pid), ("reload_config", reload_config)]:
+            monkeypatch.setattr(AsyncSupervisorClient, name, classmethod(fn))
+
+    async def stop_all(self):
+        for program in self.programs.values():
+            await program.stop()
+        self.programs.clear()
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    """An empty, unbound pool over free ports whose programs are fake gateways"""
+    ports = [free_port() for _ in range(3)]
+    monkeypatch.setattr(gateway_pool, "pool_ports", lambda: ports)
+    monkeypatch.setattr(gateway_pool, "GATEWAY_POOL_DIR", str(tmp_path / "pool"))
+    monkeypatch.setattr(gateway_pool, "GATEWAY_POOL_SUPERVISOR_DIR", str(tmp_path / "conf.d"))
+    monkeypatch.setattr(GatewayPool, "_gateways", {})
+    monkeypatch.setattr(GatewayPool, "_collection", None)
+    monkeypatch.setattr(GatewayPool, "_reload_lock", None)
+    supervisor = FakeSupervisor()
+    supervisor.install(monkeypatch)
+    return supervisor
+
+
+async def provision(gateway):
+    return f"token-{gateway.owner_user_id}", "emergent"
+
+
+async def resolve_command():
+    return "/usr/bin/clawdbot"
+
+
+class TestGatewayPool:
+    """Per-user gateways started on demand and evicted when idle"""
+
+    def test_gateways_allocated_and_started_on_first_use(self, pool, run_async):
+        async def scenario():
+            try:
+                first = await GatewayPool.ensure_running("u1", provision, resolve_command)
+                second = await GatewayPool.ensure_running("u2", provision, resolve_command)
+                again = await GatewayPool.ensure_running("u1", provision, resolve_command)
+                return first, second, again
+            finally:
+                await pool.stop_all()
+
+        first, second, again = run_async(scenario)
+        assert again is first and pool.starts == 2
+        assert first.port != second.port and first.name != second.name
+        assert first.token == "token-u1" and first.running and first.should_run
+        with open(first.program_file) as f:
+            program = f.read()
+        assert f"[program:{first.name}]" in program and f'HOME="{first.home}"' in program
+        assert "/usr/bin/clawdbot gateway" in program
+        assert pool.reloads == 2
+        print("✓ Gateways allocated and started on first use")
+
+    def test_least_recently_used_idle_gateway_evicted(self, pool, run_async, monkeypatch):
+        monkeypatch.setattr(gateway_pool, "GATEWAY_POOL_MAX_RUNNING", 2)
+
+        async def scenario():
+            try:
+                busy = await GatewayPool.ensure_running("busy", provision, resolve_command)
+                idle = await GatewayPool.ensure_running("idle", provision, resolve_command)
+                # The busy gateway was used longest ago, but has a WebSocket open
+                busy.last_used -= 60
+                busy.acquire()
+                third = await GatewayPool.ensure_running("third", provision, resolve_command)
+                evicted = not idle.running
+                # Nothing idle is left to make room for another restart of "idle"
+                third.acquire()
+                with pytest.raises(GatewayPoolFull):
+                    await GatewayPool.ensure_running("idle", provision, resolve_command)
+                return evicted, busy.running, third.running
+            finally:
+                await pool.stop_all()
+
+        assert run_async(scenario) == (True, True, True)
+        print("✓ Least recently used idle gateway evicted")
+
+    def test_sweep_evicts_idle_gateways_and_reads_memory(self, pool, run_async, monkeypatch):
+        monkeypatch.setattr(gateway_pool, "GATEWAY_POOL_IDLE_TIMEOUT", 30)
+
+        async def scenario():
+            try:
+                stale = await GatewayPool.ensure_running("stale", provision, resolve_command)
+                fresh = await GatewayPool.ensure_running("fresh", provision, resolve_command)
+                stale.last_used = time.time() - 60
+                await GatewayPool.sweep()
+                return stale, fresh, metrics.render()
+            finally:
+                await pool.stop_all()
+
+        stale, fresh, rendered = run_async(scenario)
+        assert not stale.running and fresh.running
+        assert fresh.rss_bytes > 0
+        assert 'openclaw_gateway_pool_gateways{state="running"} 1' in rendered
+        assert f'openclaw_gateway_pool_memory_bytes{{gateway="{fresh.name}"}}' in rendered
+        assert 'openclaw_gateway_pool_evictions_total{reason="idle"}' in rendered
+        print("✓ Sweep evicted the idle gateway and read memory")
+
+    def test_allocations_shared_through_database(self, pool, monkeypatch):
+        collection = FakeMongoDatabase().gateway_pool
+        monkeypatch.setattr(GatewayPool, "_collection", collection)
+
+        async def scenario():
+            first = await GatewayPool.allocate("u1")
+            # Another worker (or this one after a restart) starts with nothing in memory
+            GatewayPool.clear()
+            second = await GatewayPool.allocate("u2")
+            recovered = await GatewayPool.lookup("u1")
+            return first, second, recovered, await GatewayPool.lookup("nobody")
+
+        first, second, recovered, missing = asyncio.run(scenario())
+        assert recovered.port == first.port and second.port != first.port
+        assert missing is None
+        print("✓ Allocations shared through the database")
+
+    def test_gateway_evicted_by_another_worker_started_again(self, pool, run_async, monkeypatch):
+        monkeypatch.setattr(gateway_pool, "GATEWAY_POOL_RUNNING_TTL", 0)
+        collection = FakeMongoDatabase().gateway_pool
+        GatewayPool.bind(collection)
+
+        async def scenario():
+            try:
+                gateway = await GatewayPool.ensure_running("u1", provision, resolve_command)
+                # Another worker's sweep stops it; this worker still thinks it runs
+                await gateway.client.stop()
+                await collection.update_one({"_id": "u1"}, {"$set": {"running": False}})
+                again = await GatewayPool.ensure_running("u1", provision, resolve_command)
+                return again is gateway, gateway.running, gateway.name in pool.programs
+            finally:
+                await pool.stop_all()
+
+        assert run_async(scenario) == (True, True, True)
+        assert pool.starts == 2
+        print("✓ Gateway evicted by another worker started again")
+
+    def test_running_state_reread_at_most_once_per_ttl(self, pool, run_async, monkeypatch):
+        monkeypatch.setattr(gateway_pool, "GATEWAY_POOL_RUNNING_TTL", 60)
+        database = FakeMongoDatabase()
+        GatewayPool.bind(database.gateway_pool)
+
+        async def scenario():
+            try:
+                await GatewayPool.ensure_running("u1", provision, resolve_command)
+                before = database.operations()
+                for _ in range(20):
+                    await GatewayPool.ensure_running("u1", provision, resolve_command)
+                return database.operations() - before
+            finally:
+                await pool.stop_all()
+
+        # Proxied requests within the TTL trust this worker's view
+        assert run_async(scenario) == 0
+        print("✓ Running state re-read at most once per TTL")
+
+    def test_restart_skipped_when_settings_unchanged(self, pool, run_async):
+        digest = gateway_pool.settings_digest
+
+        async def scenario():
+            try:
+                await GatewayPool.restart("u1", provision, resolve_command, settings=digest("openai", "sk-1"))
+                await GatewayPool.restart("u1", provision, resolve_command, settings=digest("openai", "sk-1"))
+                unchanged = pool.starts
+                await GatewayPool.restart("u1", provision, resolve_command, settings=digest("openai", "sk-2"))
+                return unchanged, pool.starts
+            finally:
+                await pool.stop_all()
+
+        assert run_async(scenario) == (1, 2)
+        print("✓ Restart skipped while the settings are unchanged")
+
+    def test_running_limit_counts_other_workers_gateways(self, pool, run_async, monkeypatch):
+        monkeypatch.setattr(gateway_pool, "GATEWAY_POOL_MAX_RUNNING", 2)
+        collection = FakeMongoDatabase().gateway_pool
+        GatewayPool.bind(collection)
+
+        async def scenario():
+            try:
+                older = await GatewayPool.ensure_running("older", provision, resolve_command)
+                older.last_used -= 60
+                await GatewayPool.sweep()
+                await GatewayPool.ensure_running("newer", provision, resolve_command)
+                # A worker that never served either of them starts a third
+                GatewayPool.clear()
+                await GatewayPool.ensure_running("third", provision, resolve_command)
+                docs = {doc["_id"]: doc.get("running") async for doc in collection.find({})}
+                return sorted(g.owner_user_id for g in GatewayPool.running()), docs, len(pool.programs)
+            finally:
+                await pool.stop_all()
+
+        running, docs, programs = run_async(scenario)
+        # The least recently used gateway, by its activity shared through the database
+        assert running == ["newer", "third"] and programs == 2
+        assert docs == {"older": False, "newer": True, "third": True}
+        print("✓ Running limit counts other workers' gateways")
+
+
+class TestServerGatewayPool:
+    """Server routes in pool mode"""
+
+    def test_proxy_routes_each_user_to_their_gateway(self, proxied_server, pool, run_async, monkeypatch):
+        server = proxied_server
+        monkeypatch.setattr(server, "GATEWAY_POOL", True)
+
+        async def session_user(request):
+            user_id = request.cookies.get("session_token")
+            return server.User(user_id=user_id, email=f"{user_id}@example.com", name=user_id) if user_id else None
+
+        async def pool_provision(gateway, api_key=None, provider=None):
+            return await provision(gateway)
+
+        monkeypatch.setattr(server, "get_current_user", session_user)
+        monkeypatch.setattr(server, "provision_pool_gateway", pool_provision)
+        monkeypatch.setattr(server, "pool_gateway_command", resolve_command)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=server.app)
+            try:
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    pages = {}
+                    for user_id in ("alice", "bob"):
+                        client.cookies.set("session_token", user_id)
+                        pages[user_id] = await client.get("/api/openclaw/ui/")
+                    requests = {g.owner_user_id: pool.programs[g.name].requests for g in GatewayPool.gateways()}
+
+                    await GatewayPool.stop_gateway("bob")
+                    client.cookies.set("session_token", "bob")
+                    stopped = await client.get("/api/openclaw/ui/")
+                    status = (await client.get("/api/openclaw/status")).json()
+                    client.cookies.clear()
+                    anonymous = await client.get("/api/openclaw/ui/")
+                return pages, requests, stopped, status, anonymous
+            finally:
+                await pool.stop_all()
+
+        pages, requests, stopped, status, anonymous = run_async(scenario)
+        assert {r.status_code for r in pages.values()} == {200}
+        # The readiness probe, then the page
+        assert requests == {"alice": 2, "bob": 2}
+        # Each page carries its own gateway's token
+        assert b"token-alice" in pages["alice"].content and b"token-bob" not in pages["alice"].content
+        assert b"token-bob" in pages["bob"].content
+        assert stopped.status_code == 503 and status["running"] is False
+        assert anonymous.status_code == 403
+        print("✓ Proxy routed each user to their own gateway")
+
+    def test_whatsapp_link_is_per_gateway(self, proxied_server, pool, run_async, monkeypatch):
+        server = proxied_server
+        monkeypatch.setattr(server, "GATEWAY_POOL", True)
+        monkeypatch.setattr(server, "db", FakeMongoDatabase())
+        broken = {"account": {"x": 1}, "me": {"id": "15551234567:3@s.whatsapp.net"}, "registered": False}
+
+        async def session_user(request):
+            user_id = request.cookies.get("session_token")
+            return server.User(user_id=user_id, email=f"{user_id}@example.com", name=user_id) if user_id else None
+
+        async def pool_provision(gateway, api_key=None, provider=None):
+            return await provision(gateway)
+
+        monkeypatch.setattr(server, "get_current_user", session_user)
+        monkeypatch.setattr(server, "provision_pool_gateway", pool_provision)
+        monkeypatch.setattr(server, "pool_gateway_command", resolve_command)
+
+        async def scenario():
+            try:
+                alice = await GatewayPool.ensure_running("alice", provision, resolve_command)
+                await GatewayPool.ensure_running("bob", provision, resolve_command)
+                os.makedirs(os.path.dirname(alice.creds_file))
+                with open(alice.creds_file, "w") as f:
+                    json.dump(broken, f)
+                transport = httpx.ASGITransport(app=server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    statuses = {}
+                    for user_id in ("alice", "bob"):
+                        client.cookies.set("session_token", user_id)
+                        statuses[user_id] = (await client.get("/api/openclaw/whatsapp/status")).json()
+                starts = pool.starts
+                await server.check_pool_whatsapp_registrations()
+                with open(alice.creds_file) as f:
+                    return statuses, pool.starts - starts, json.load(f)["registered"]
+            finally:
+                await pool.stop_all()
+
+        statuses, restarts, registered = run_async(scenario)
+        assert statuses["alice"] == {"linked": True, "phone": "+15551234567", "registered": False}
+        assert statuses["bob"]["linked"] is False
+        # Only alice's gateway was fixed and restarted
+        assert restarts == 1 and registered is True
+        print("✓ WhatsApp link status and auto-fix are per gateway")
+
+    def test_provisioned_config_is_per_gateway(self, pool, proxied_server):
+        gateway = PoolGateway("u1", 19010)
+
+        async def scenario():
+            first = await proxied_server.provision_pool_gateway(gateway)
+            gateway.token, gateway.provider = first
+            # A lazy restart keeps the existing config and token
+            again = await proxied_server.provision_pool_gateway(gateway)
+            with open(gateway.env_file) as f:
+                return first, again, f.read()
+
+        (token, provider), again, env = asyncio.run(scenario())
+        assert provider == "emergent" and again == (token, "emergent")
+        with open(gateway.config_file) as f:
+            config = json.load(f)
+        assert config["gateway"]["port"] == 19010 and config["gateway"]["auth"]["token"] == token
+        assert config["agents"]["defaults"]["workspace"] == gateway.workspace_dir
+        assert 'CLAWDBOT_GATEWAY_PORT="19010"' in env
+        print("✓ Provisioned config is per gateway")
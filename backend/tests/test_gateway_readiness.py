@@ -0,0 +1,109 @@
+"""
+Tests for the backoff-based gateway readiness wait
+Readiness is detected within milliseconds of the port opening, not on a 1s tick
+"""
+import asyncio
+import socket
+
+import gateway_readiness
+from benchmarks.fake_gateway import FakeGateway
+from gateway_readiness import GatewayReadiness
+from proxy_client import ProxyClient
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(coro_fn):
+    async def wrapper():
+        try:
+            return await coro_fn()
+        finally:
+            await ProxyClient.close()
+    return asyncio.run(wrapper())
+
+
+class TestGatewayReadiness:
+    """Backoff probes until the gateway answers"""
+
+    def test_ready_soon_after_port_opens(self):
+        port = free_port()
+
+        async def scenario():
+            gateway = FakeGateway(port=port)
+
+            async def boot():
+                await asyncio.sleep(0.15)
+                await gateway.start()
+
+            booting = asyncio.create_task(boot())
+            try:
+                return await GatewayReadiness.wait(port, timeout=5)
+            finally:
+                await booting
+                await gateway.stop()
+
+        seconds = run(scenario)
+        assert seconds is not None
+        assert 0.15 <= seconds < 0.6
+        assert GatewayReadiness.last_outcome == "ready"
+        print("✓ Gateway detected ready soon after its port opens")
+
+    def test_already_running_gateway_is_ready_immediately(self):
+        async def scenario():
+            async with FakeGateway() as gateway:
+                return await GatewayReadiness.wait(gateway.port, timeout=5)
+
+        assert run(scenario) < 0.1
+        print("✓ Running gateway ready on the first probe")
+
+    def test_timeout_when_port_never_opens(self):
+        async def scenario():
+            return await GatewayReadiness.wait(free_port(), timeout=0.2)
+
+        assert run(scenario) is None
+        assert GatewayReadiness.last_outcome == "timeout"
+        print("✓ Wait times out when the port never opens")
+
+    def test_exited_process_stops_the_wait_early(self, monkeypatch):
+        monkeypatch.setattr(gateway_readiness, "GATEWAY_READY_SUPERVISOR_INTERVAL", 0.05)
+        checks = []
+
+        async def alive():
+            checks.append(True)
+            return False
+
+        async def scenario():
+            return await GatewayReadiness.wait(free_port(), timeout=10, alive=alive)
+
+        assert run(scenario) is None
+        assert GatewayReadiness.last_outcome == "exited"
+        assert GatewayReadiness.last_seconds < 1
+        assert checks == [True]
+        print("✓ Exited gateway process ends the wait early")
+
+    def test_backoff_is_exponential_and_capped(self, monkeypatch):
+        monkeypatch.setattr(gateway_readiness, "GATEWAY_READY_INITIAL_DELAY", 0.001)
+        monkeypatch.setattr(gateway_readiness, "GATEWAY_READY_MAX_DELAY", 0.008)
+        sleeps = []
+        real_sleep = asyncio.sleep
+
+        async def recording_sleep(delay):
+            sleeps.append(delay)
+            await real_sleep(0)
+
+        async def closed(host, port):
+            return False
+
+        monkeypatch.setattr(gateway_readiness, "port_open", closed)
+        monkeypatch.setattr(gateway_readiness.asyncio, "sleep", recording_sleep)
+
+        async def scenario():
+            return await GatewayReadiness.wait(1, timeout=0.05)
+
+        run(scenario)
+        assert sleeps[:5] == [0.001, 0.002, 0.004, 0.008, 0.008]
+        print("✓ Probe backoff is exponential and capped")
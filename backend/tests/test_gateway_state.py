@@ -0,0 +1,276 @@
+"""
+Tests for gateway state shared between backend workers (gateway_state.SharedGatewayState)
+Workers sharing one store see each other's changes; denied checks read through
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from pymongo.errors import OperationFailure
+
+import gateway_state as gateway_state_module
+from benchmarks.fake_gateway import FakeGateway
+from benchmarks.fake_mongo import FakeMongoDatabase
+from gateway_state import SharedGatewayState
+from session_cache import SessionCache
+
+
+def workers(count=2):
+    collection = FakeMongoDatabase().moltbot_configs
+    states = [SharedGatewayState() for _ in range(count)]
+    for state in states:
+        state.bind(collection)
+    return collection, states
+
+
+class FakeChangeStream:
+    def __init__(self):
+        self.events = asyncio.Queue()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.events.get()
+
+
+class TestSharedGatewayState:
+    """State published and followed between workers"""
+
+    def test_workers_share_published_state(self):
+        collection, (first, second) = workers()
+
+        async def scenario():
+            await collection.insert_one({"_id": "gateway_config", "should_run": True})
+            await first.publish(token="t1", provider="openai", owner_user_id="u1")
+            seen = await second.refresh(force=True), dict(second)
+            await second.publish(token=None, provider=None, started_at=None, owner_user_id=None)
+            await first.refresh(force=True)
+            return seen, await collection.find_one({"_id": "gateway_config"})
+
+        (changed, seen), doc = asyncio.run(scenario())
+        assert changed
+        assert seen == {"token": "t1", "provider": "openai", "started_at": None, "owner_user_id": "u1"}
+        assert first["owner_user_id"] is None and first.version == second.version == 2
+        # Persistent config fields are left alone
+        assert doc["should_run"] is True and doc["state_version"] == 2
+        print("✓ Workers share published state")
+
+    def test_older_state_ignored(self):
+        state = SharedGatewayState()
+        assert state._apply({"state_version": 2, "state": {"owner_user_id": "new"}})
+        assert not state._apply({"state_version": 1, "state": {"owner_user_id": "old"}})
+        assert state["owner_user_id"] == "new" and state.remote_updates == 1
+        print("✓ Older state versions ignored")
+
+    def test_unbound_state_stays_local(self):
+        state = SharedGatewayState()
+
+        async def scenario():
+            await state.publish(owner_user_id="u1")
+            return await state.refresh(force=True)
+
+        assert asyncio.run(scenario()) is False
+        assert state["owner_user_id"] == "u1" and state.version == 0
+        print("✓ Unbound state stays local")
+
+    def test_polls_when_change_streams_unavailable(self, monkeypatch):
+        collection, (first, second) = workers()
+        monkeypatch.setattr(gateway_state_module, "GATEWAY_STATE_POLL_INTERVAL", 0.01)
+
+        def watch(*args, **kwargs):
+            raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+        monkeypatch.setattr(collection, "watch", watch, raising=False)
+
+        async def scenario():
+            second.start()
+            await first.publish(owner_user_id="u1", token="t1")
+            for _ in range(100):
+                if second["owner_user_id"] == "u1":
+                    break
+                await asyncio.sleep(0.01)
+            await second.stop()
+            return dict(second)
+
+        assert asyncio.run(scenario())["owner_user_id"] == "u1"
+        print("✓ State polled when change streams are unavailable")
+
+    def test_change_stream_applies_changes(self, monkeypatch):
+        collection, (first, second) = workers()
+        slots = []
+        second.on_change = lambda doc: slots.append(doc.get("active_slot"))
+
+        async def scenario():
+            stream = FakeChangeStream()
+            monkeypatch.setattr(collection, "watch", lambda *args, **kwargs: stream, raising=False)
+            second.start()
+            await first.publish(owner_user_id="u1")
+            await collection.update_one({"_id": "gateway_config"},
+                                        {"$set": {"active_slot": "standby"}, "$inc": {"state_version": 1}})
+            await stream.events.put({"fullDocument": await collection.find_one({"_id": "gateway_config"})})
+            for _ in range(100):
+                if second.version == 2:
+                    break
+                await asyncio.sleep(0.01)
+            await second.stop()
+
+        asyncio.run(scenario())
+        assert second["owner_user_id"] == "u1" and second.version == 2
+        assert slots[-1] == "standby"
+        print("✓ Change stream applied another worker's changes")
+
+    def test_active_slot_published_with_state(self):
+        collection, (first, second) = workers()
+        slots = []
+        second.on_change = lambda doc: slots.append(doc.get("active_slot"))
+
+        async def scenario():
+            await collection.insert_one({"_id": "gateway_config", "active_slot": "standby"})
+            await first.publish(owner_user_id="u1", active_slot="primary")
+            await second.refresh(force=True)
+            return await collection.find_one({"_id": "gateway_config"})
+
+        doc = asyncio.run(scenario())
+        # One version bump carried both, so the worker following the state followed the slot
+        assert doc["active_slot"] == "primary" and doc["state_version"] == 1
+        assert slots == ["primary"] and second["owner_user_id"] == "u1"
+        print("✓ Active slot published with the state")
+
+
+class TestServerSharedState:
+    """Server routes reading the shared state"""
+
+    def test_owner_check_reads_through_to_shared_state(self, proxied_server, run_async, monkeypatch):
+        server = proxied_server
+        collection, (other_worker,) = workers(1)
+        monkeypatch.setattr(server.gateway_state, "_collection", collection)
+        monkeypatch.setattr(server.gateway_state, "version", 0)
+        monkeypatch.setattr(server.gateway_state, "_refreshed_at", None)
+        # This worker has not heard that user_test started the gateway on another worker
+        monkeypatch.setitem(server.gateway_state, "owner_user_id", None)
+        monkeypatch.setitem(server.gateway_state, "token", None)
+
+        async def scenario():
+            await other_worker.publish(owner_user_id="user_test", token="shared-token")
+            async with FakeGateway() as gateway:
+                monkeypatch.setattr(server, "MOLTBOT_PORT", gateway.port)
+                transport = httpx.ASGITransport(app=server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await client.get("/api/openclaw/ui/assets/app.js")
+
+        response = run_async(scenario)
+        assert response.status_code == 200
+        assert server.gateway_state["token"] == "shared-token"
+        print("✓ Denied owner check read through to the shared state")
+
+    def test_one_worker_auto_starts_the_gateway(self, proxied_server, run_async, monkeypatch):
+        server = proxied_server
+        db = FakeMongoDatabase()
+        monkeypatch.setattr(server, "db", db)
+        monkeypatch.setattr(server.gateway_state, "_collection", db.moltbot_configs)
+        monkeypatch.setattr(server.gateway_state, "version", 0)
+        monkeypatch.setattr(server.GatewayUpstream, "_active", server.GatewayUpstream.PRIMARY)
+        monkeypatch.setattr(server.GatewayLiveness, "mark_running", classmethod(lambda cls, running: None))
+        starts, env_tokens = [], []
+
+        async def start():
+            starts.append(True)
+            return True
+
+        async def write_env(token, **kwargs):
+            env_tokens.append(token)
+
+        async def ready(port, alive=None):
+            return 0.0
+
+        monkeypatch.setattr(server.AsyncSupervisorClient, "start", start)
+        monkeypatch.setattr(server, "write_gateway_env", write_env)
+        monkeypatch.setattr(server.GatewayReadiness, "wait", ready)
+
+        async def scenario():
+            config = {"_id": "gateway_config", "should_run": True, "owner_user_id": "u1", "provider": "openai",
+                      "active_slot": "standby"}
+            await db.moltbot_configs.insert_one(dict(config))
+            # Three workers starting together, none of which sees a running gateway
+            await asyncio.gather(*(
+                server.startup_gateway_recovery(config, False, None, None) for _ in range(3)
+            ))
+            await server.gateway_ready_task
+            return await db.moltbot_configs.find_one({"_id": "gateway_config"})
+
+        doc = run_async(scenario)
+        assert starts == [True] and len(env_tokens) == 1
+        # A fresh start runs the primary program; the next restart must not pick the standby
+        assert doc["active_slot"] == "primary" and doc["state_version"] == 1
+        assert server.gateway_state["owner_user_id"] == "u1"
+        print("✓ One worker auto-started the gateway")
+
+    def test_logout_clears_sessions_cached_by_other_workers(self, proxied_server, run_async, monkeypatch):
+        server = proxied_server
+        db = FakeMongoDatabase()
+        monkeypatch.setattr(server, "db", db)
+        monkeypatch.setattr(server.gateway_state, "_collection", db.moltbot_configs)
+        monkeypatch.setattr(server.gateway_state, "version", 0)
+        monkeypatch.setattr(server.gateway_state, "on_change", server.follow_gateway_config)
+        monkeypatch.setattr(server, "sessions_revoked_at", None)
+        expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+        SessionCache.clear()
+
+        async def scenario():
+            await server.gateway_state.refresh(force=True)
+            SessionCache.put("logged-out", "user_1", expires_at)
+            # The logout is handled by another worker
+            await server.publish_session_revocation()
+            await server.gateway_state.refresh(force=True)
+            forgotten = SessionCache.get("logged-out")
+            SessionCache.put("other", "user_2", expires_at)
+            # A later change that is not a logout keeps the cache
+            await server.gateway_state.publish(owner_user_id="user_2")
+            await db.moltbot_configs.update_one({"_id": "gateway_config"}, {"$inc": {"state_version": 1}})
+            await server.gateway_state.refresh(force=True)
+            return forgotten, SessionCache.get("other")
+
+        try:
+            assert run_async(scenario) == (None, "user_2")
+        finally:
+            SessionCache.clear()
+        print("✓ A logout on one worker cleared the session cache of the others")
+
+    def test_one_worker_restarts_at_a_time(self, proxied_server, run_async, monkeypatch):
+        server = proxied_server
+        db = FakeMongoDatabase()
+        monkeypatch.setattr(server, "db", db)
+        monkeypatch.setattr(server, "GATEWAY_BLUE_GREEN", False)
+        monkeypatch.setattr(server.GatewayUpstream, "_active", server.GatewayUpstream.PRIMARY)
+        restarts = []
+
+        async def restart():
+            restarts.append(True)
+            return True
+
+        monkeypatch.setattr(server.AsyncSupervisorClient, "restart", restart)
+
+        async def scenario():
+            await db.moltbot_configs.insert_one({
+                "_id": "gateway_config", "restart_holder": "other-worker",
+                "restart_until": datetime.now(timezone.utc) + timedelta(minutes=2),
+            })
+            skipped = await server.restart_gateway()
+            await db.moltbot_configs.update_one({"_id": "gateway_config"},
+                                                {"$unset": {"restart_until": "", "restart_holder": ""}})
+            restarted = await server.restart_gateway()
+            return skipped, restarted, await db.moltbot_configs.find_one({"_id": "gateway_config"})
+
+        skipped, restarted, doc = run_async(scenario)
+        assert skipped is False and restarted is True
+        assert restarts == [True]
+        # Released once the restart was done
+        assert "restart_holder" not in doc and "restart_until" not in doc
+        print("✓ Restarts are serialized across workers by the restart lease")
@@ -0,0 +1,304 @@
+"""
+Tests for blue/green gateway restarts (gateway_upstream.GatewayUpstream)
+The proxy keeps answering while traffic moves to the standby gateway
+"""
+import asyncio
+import socket
+
+import httpx
+import pytest
+
+import gateway_readiness
+import gateway_upstream
+from benchmarks.fake_gateway import FakeGateway
+from benchmarks.fake_mongo import FakeMongoDatabase
+from gateway_config import copy_gateway_env, write_gateway_env
+from gateway_upstream import GatewaySlot, GatewayUpstream
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def fake_program(port: int, **gateway_kwargs):
+    """A supervisor client stand-in whose program is a FakeGateway on `port`"""
+
+    class FakeProgram:
+        gateway = None
+        starts = 0
+        stops = 0
+
+        @classmethod
+        async def start(cls):
+            cls.starts += 1
+            cls.gateway = await FakeGateway(port=port, **gateway_kwargs).start()
+            return True
+
+        @classmethod
+        async def stop(cls):
+            if cls.gateway is not None:
+                cls.stops += 1
+                await cls.gateway.stop()
+                cls.gateway = None
+            return True
+
+        @classmethod
+        async def status(cls):
+            return cls.gateway is not None
+
+        @classmethod
+        async def get_pid(cls):
+            return 4242 if cls.gateway is not None else None
+
+    return FakeProgram
+
+
+@pytest.fixture
+def slots(tmp_path, monkeypatch):
+    """Primary and standby slots backed by fake programs on free ports"""
+    primary_port, standby_port = free_port(), free_port()
+    primary = GatewaySlot("primary", primary_port, str(tmp_path / "gateway.env"),
+                          None, fake_program(primary_port, latency=0.2))
+    standby = GatewaySlot("standby", standby_port, str(tmp_path / "gateway-standby.env"),
+                          None, fake_program(standby_port))
+    monkeypatch.setattr(GatewayUpstream, "PRIMARY", primary)
+    monkeypatch.setattr(GatewayUpstream, "STANDBY", standby)
+    monkeypatch.setattr(GatewayUpstream, "_active", primary)
+    monkeypatch.setattr(GatewayUpstream, "_drain_task", None)
+    monkeypatch.setattr(gateway_upstream, "GATEWAY_DRAIN_TIMEOUT", 5)
+    return primary, standby
+
+
+class TestGatewayEnv:
+    """Environment files for the two slots"""
+
+    def test_copy_gateway_env_sets_port(self, tmp_path):
+        source, target = str(tmp_path / "a.env"), str(tmp_path / "b.env")
+
+        async def scenario():
+            await write_gateway_env(token="t0k", api_key="sk-x", provider="openai", env_file=source, port=1)
+            copied = await copy_gateway_env(source, target, port=18790)
+            missing = await copy_gateway_env(str(tmp_path / "none.env"), target)
+            return copied, missing
+
+        assert asyncio.run(scenario()) == (True, False)
+        lines = open(target).read().splitlines()
+        assert lines == [
+            'export CLAWDBOT_GATEWAY_TOKEN="t0k"',
+            'export OPENAI_API_KEY="sk-x"',
+            'export CLAWDBOT_GATEWAY_PORT="18790"',
+        ]
+        print("✓ Standby env file copied with its own port")
+
+
+class TestSwitchOver:
+    """Blue/green restarts between the primary and standby slots"""
+
+    def test_switch_over_without_dropping_requests(self, proxied_server, slots, run_async, monkeypatch):
+        primary, standby = slots
+        monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", primary.port)
+
+        async def scenario():
+            await write_gateway_env(token="test-token", env_file=primary.env_file)
+            await primary.client.start()
+            old_gateway = primary.client.gateway
+            transport = httpx.ASGITransport(app=proxied_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                async def load(stop):
+                    statuses = []
+                    while not stop.is_set():
+                        response = await client.get("/api/openclaw/ui/assets/app.js")
+                        statuses.append(response.status_code)
+                    return statuses
+
+                stop = asyncio.Event()
+                loaders = [asyncio.create_task(load(stop)) for _ in range(4)]
+                await asyncio.sleep(0.3)
+                switched = await GatewayUpstream.switch_over()
+                await asyncio.sleep(0.3)
+                stop.set()
+                statuses = [s for result in await asyncio.gather(*loaders) for s in result]
+                await GatewayUpstream._drain_task
+                served_by_new = standby.client.gateway.requests
+                await standby.client.stop()
+            return switched, statuses, old_gateway.requests, served_by_new
+
+        switched, statuses, served_by_old, served_by_new = run_async(scenario)
+        assert switched
+        assert statuses and set(statuses) == {200}
+        assert served_by_old > 0 and served_by_new > 0
+        assert GatewayUpstream.active() is standby
+        # The old process was stopped once its requests had finished
+        assert primary.client.stops == 1 and primary.client.gateway is None
+        assert primary.in_flight == 0
+        assert 'CLAWDBOT_GATEWAY_PORT="%d"' % standby.port in open(standby.env_file).read()
+        print("✓ Switch-over completed without dropped requests")
+
+    def test_old_gateway_kept_until_in_flight_request_finishes(self, proxied_server, slots, run_async, monkeypatch):
+        primary, standby = slots
+        monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", primary.port)
+
+        async def scenario():
+            await write_gateway_env(token="test-token", env_file=primary.env_file)
+            await primary.client.start()
+            transport = httpx.ASGITransport(app=proxied_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                slow = asyncio.create_task(client.get("/api/openclaw/ui/assets/slow.js"))
+                await asyncio.sleep(0.05)
+                assert primary.in_flight == 1
+                await GatewayUpstream.switch_over(token="new-token")
+                running_during_drain = primary.client.gateway is not None
+                response = await slow
+                await GatewayUpstream._drain_task
+            await standby.client.stop()
+            return running_during_drain, response.status_code
+
+        running_during_drain, status = run_async(scenario)
+        assert running_during_drain
+        assert status == 200
+        assert primary.client.gateway is None
+        assert 'CLAWDBOT_GATEWAY_TOKEN="new-token"' in open(standby.env_file).read()
+        print("✓ Old gateway kept until its in-flight request finished")
+
+    def test_standby_that_never_answers_keeps_current_gateway(self, slots, monkeypatch, run_async):
+        primary, standby = slots
+        monkeypatch.setattr(gateway_readiness, "GATEWAY_READY_TIMEOUT", 0.2)
+
+        async def no_listen():
+            standby.client.starts += 1
+            standby.client.gateway = object()  # "RUNNING" but never binds its port
+            return True
+
+        monkeypatch.setattr(standby.client, "start", no_listen)
+        stops = []
+
+        async def record_stop():
+            stops.append(True)
+            standby.client.gateway = None
+            return True
+
+        monkeypatch.setattr(standby.client, "stop", record_stop)
+
+        async def scenario():
+            return await GatewayUpstream.switch_over(token="t")
+
+        assert run_async(scenario) is False
+        assert GatewayUpstream.active() is primary
+        # Stopped before the attempt (stale process) and after it failed
+        assert len(stops) == 2 and standby.client.gateway is None
+        print("✓ Unready standby leaves the current gateway in place")
+
+    def test_restart_falls_back_in_place_when_disabled(self, proxied_server, slots, run_async, monkeypatch):
+        primary, _ = slots
+        monkeypatch.setattr(proxied_server, "GATEWAY_BLUE_GREEN", False)
+        monkeypatch.setattr(proxied_server, "db", FakeMongoDatabase())
+        restarts = []
+
+        async def restart():
+            restarts.append(True)
+            return True
+
+        monkeypatch.setattr(primary.client, "restart", restart, raising=False)
+
+        assert run_async(proxied_server.restart_gateway) is True
+        assert restarts == [True]
+        assert GatewayUpstream.active() is primary
+        print("✓ Restart happens in place when blue/green is disabled")
+
+    def test_provider_switch_uses_standby(self, proxied_server, slots, run_async, monkeypatch):
+        server = proxied_server
+        primary, standby = slots
+        monkeypatch.setattr(server, "GATEWAY_BLUE_GREEN", True)
+        monkeypatch.setattr(server, "db", FakeMongoDatabase())
+        monkeypatch.setattr(server.gateway_state, "_collection", None)
+        monkeypatch.setitem(server.gateway_state, "provider", "emergent")
+        monkeypatch.setitem(server.gateway_state, "started_at", None)
+        monkeypatch.setattr(server.GatewayLiveness, "refresh", classmethod(lambda cls: primary.client.status()))
+        restarts, configs = [], []
+
+        async def restart():
+            restarts.append(True)
+            return True
+
+        async def token(config_file=None):
+            return "test-token"
+
+        async def create_config(**kwargs):
+            configs.append(kwargs["provider"])
+
+        monkeypatch.setattr(primary.client, "restart", restart, raising=False)
+        monkeypatch.setattr(server, "read_gateway_token", token)
+        monkeypatch.setattr(server, "create_moltbot_config", create_config)
+
+        async def scenario():
+            await primary.client.start()
+            try:
+                result = await server.start_gateway_process("sk-new", "openai", "user_test")
+                await GatewayUpstream._drain_task
+                return result
+            finally:
+                await standby.client.stop()
+
+        assert run_async(scenario) == "test-token"
+        assert restarts == [] and standby.client.starts == 1
+        assert GatewayUpstream.active() is standby and configs == ["openai"]
+        assert primary.client.gateway is None
+        assert 'OPENAI_API_KEY="sk-new"' in open(standby.env_file).read()
+        assert server.gateway_state["provider"] == "openai"
+        print("✓ Provider switch starts the standby with the new settings")
+
+    def test_stop_first_never_runs_two_gateways(self, proxied_server, slots, run_async, monkeypatch):
+        primary, standby = slots
+        monkeypatch.setattr(proxied_server, "GATEWAY_BLUE_GREEN", True)
+        monkeypatch.setattr(proxied_server, "db", FakeMongoDatabase())
+        running = []
+
+        def track(client):
+            start = client.start
+
+            async def tracked_start():
+                result = await start()
+                running.append([slot.name for slot in (primary, standby) if slot.client.gateway is not None])
+                return result
+
+            monkeypatch.setattr(client, "start", tracked_start)
+
+        track(primary.client)
+        track(standby.client)
+
+        async def scenario():
+            await standby.client.start()  # e.g. an old process still draining
+            running.clear()
+            await primary.client.start()
+            running.clear()
+            try:
+                return await proxied_server.restart_gateway(stop_first=True)
+            finally:
+                await primary.client.stop()
+
+        assert run_async(scenario) is True
+        # The draining standby and the old primary were both stopped before the start
+        assert running == [["primary"]]
+        assert standby.client.stops == 1
+        assert GatewayUpstream.active() is primary
+        print("✓ A stop-first restart never runs two gateways at once")
+
+    def test_switch_over_keeps_in_flight_count(self, slots, run_async):
+        primary, standby = slots
+
+        async def scenario():
+            await primary.client.start()
+            # A connection still counted against the slot, e.g. one not yet released
+            standby.acquire()
+            await GatewayUpstream.switch_over(token="t")
+            counted = standby.in_flight
+            standby.release()
+            await GatewayUpstream._drain_task
+            await standby.client.stop()
+            return counted
+
+        assert run_async(scenario) == 1
+        assert standby.in_flight == 0
+        print("✓ Switch-over leaves in-flight counting to acquire/release")
@@ -0,0 +1,109 @@
+"""
+Tests for the cached WebSocket-override injection (html_injection.WsOverrideInjector)
+"""
+import httpx
+import pytest
+
+import html_injection
+from html_injection import WsOverrideInjector, find_injection_offset
+from benchmarks.fake_gateway import FakeGateway
+
+
+@pytest.fixture(autouse=True)
+def clean_injector():
+    WsOverrideInjector.clear()
+    yield
+    WsOverrideInjector.clear()
+
+
+class TestSplice:
+    """Byte-level splicing of the override script"""
+
+    def test_offset_prefers_head_then_body(self):
+        """Script goes before </head>, else after <body>, else at the start"""
+        assert find_injection_offset(b"<html><head></head><body>") == len(b"<html><head>")
+        assert find_injection_offset(b"<html><body><p>") == len(b"<html><body>")
+        assert find_injection_offset(b"<p>fragment</p>") == 0
+
+    def test_inject_keeps_page_bytes(self):
+        """Injection only adds the snippet; non-UTF-8 bytes survive untouched"""
+        page = b"<html><head>\xff\xfe</head><body></body></html>"
+        result = WsOverrideInjector.inject(page, "tok")
+        snippet = WsOverrideInjector.snippet("tok")
+        assert result.replace(snippet, b"") == page
+        assert result.index(snippet) < result.index(b"</head>")
+
+    def test_snippet_built_once_per_token(self):
+        """Alternating tokens (pool gateways) each reuse their own snippet"""
+        first = WsOverrideInjector.snippet("one")
+        second = WsOverrideInjector.snippet("two")
+        assert second is not first
+        assert b'__MOLTBOT_PROXY_TOKEN__ = "two"' in second
+        assert WsOverrideInjector.snippet("one") is first
+        assert WsOverrideInjector.snippet("two") is second
+
+    def test_snippets_bounded(self, monkeypatch):
+        """The least recently used token's snippet is dropped past the limit"""
+        monkeypatch.setattr(html_injection, "HTML_SNIPPET_MAX_ENTRIES", 2)
+        first = WsOverrideInjector.snippet("one")
+        WsOverrideInjector.snippet("two")
+        WsOverrideInjector.snippet("one")
+        WsOverrideInjector.snippet("three")
+        assert WsOverrideInjector.snippet("one") is first
+        assert list(WsOverrideInjector._snippets) == ["three", "one"]
+
+    def test_pages_cached_per_token(self):
+        """Two pool users loading the same path keep a cached page each"""
+        for token in ("one", "two"):
+            WsOverrideInjector.transform("/", b"<head></head>", token, {}, '"v1"')
+        body, _ = WsOverrideInjector.cached("/", "one", '"v1"')
+        assert b'"one"' in body
+        assert WsOverrideInjector.cached("/", "two", '"v1"') is not None
+
+
+class TestValidatorCache:
+    """Transformed pages are reused by upstream ETag"""
+
+    def test_repeat_load_revalidates_and_serves_cache(self, proxied_server, run_async, monkeypatch):
+        """Second load sends If-None-Match upstream and serves the cached transform on 304"""
+        async def scenario():
+            async with FakeGateway(html_etag='"v1"') as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                transport = httpx.ASGITransport(app=proxied_server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    first = await client.get("/api/openclaw/ui/")
+                    second = await client.get("/api/openclaw/ui/")
+                return first, second, gateway.not_modified
+
+        first, second, not_modified = run_async(scenario)
+        assert first.status_code == 200 and second.status_code == 200
+        assert first.content == second.content
+        assert b"__MOLTBOT_PROXY_WS_URL__" in second.content
+        assert not_modified == 1, "Second load should have been revalidated upstream"
+        assert WsOverrideInjector.hits == 1
+        print("✓ Repeat HTML load served from the transformed-page cache")
+
+    def test_token_change_invalidates_cached_page(self, proxied_server, run_async, monkeypatch):
+        """A new gateway token must not be served a page carrying the old one"""
+        async def scenario():
+            async with FakeGateway(html_etag='"v1"') as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                transport = httpx.ASGITransport(app=proxied_server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    await client.get("/api/openclaw/ui/")
+                    proxied_server.gateway_state["token"] = "rotated-token"
+                    return await client.get("/api/openclaw/ui/")
+
+        response = run_async(scenario)
+        assert b'__MOLTBOT_PROXY_TOKEN__ = "rotated-token"' in response.content
+        assert b"test-token" not in response.content
+        print("✓ Token rotation rebuilds the injected page")
+
+    def test_cached_page_keeps_only_validators_and_content_headers(self):
+        """Per-response headers are not replayed from the page cache"""
+        headers = {"content-type": "text/html", "etag": '"v1"', "date": "Mon, 01 Jan 2024 00:00:00 GMT",
+                   "set-cookie": "session=abc", "cache-control": "no-cache"}
+        WsOverrideInjector.transform("/", b"<html><head></head></html>", "tok", headers, 'etag:"v1"')
+        _, cached_headers = WsOverrideInjector.cached("/", "tok")
+        assert cached_headers == {"content-type": "text/html", "etag": '"v1"', "cache-control": "no-cache"}
+        print("✓ Cached page replays only validators and content headers")
@@ -0,0 +1,59 @@
+"""
+Tests for lazy loading of the scraping stack
+Importing server.py (gateway hosting) must not import Playwright or run browser installs
+"""
+import asyncio
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestLazyImports:
+    """Scraping stack loaded on first use instead of at import"""
+
+    def test_server_import_does_not_load_scraper(self):
+        env = {**os.environ, "ENSURE_PLAYWRIGHT_BROWSERS": "true"}
+        env.setdefault("MONGO_URL", "mongodb://127.0.0.1:27017")
+        code = (
+            "import server, sys;"
+            "print(sorted(m for m in ('fb_scraper', 'playwright') if m in sys.modules));"
+            "print(server.playwright_browsers_task)"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+        # Nothing loaded and no browser install started, even with the check enabled
+        assert result.stdout.split() == ["[]", "None"]
+        print("✓ Server import leaves the scraper unloaded")
+
+    def test_browser_check_runs_once_on_first_use(self, proxied_server, monkeypatch):
+        server = proxied_server
+        calls = []
+
+        def fake_ensure():
+            calls.append(True)
+            return True
+
+        monkeypatch.setattr(server, "ENSURE_PLAYWRIGHT_BROWSERS", True)
+        monkeypatch.setattr(server, "ensure_playwright_browsers", fake_ensure)
+        monkeypatch.setattr(server, "playwright_browsers_task", None)
+
+        async def scenario():
+            await asyncio.gather(*(server.ensure_scraper_browsers() for _ in range(5)))
+            await server.ensure_scraper_browsers()
+
+        asyncio.run(scenario())
+        assert calls == [True]
+        print("✓ Browser check runs once on first use")
+
+    def test_browser_check_skipped_when_disabled(self, proxied_server, monkeypatch):
+        server = proxied_server
+        monkeypatch.setattr(server, "ENSURE_PLAYWRIGHT_BROWSERS", False)
+        monkeypatch.setattr(server, "ensure_playwright_browsers", lambda: 1 / 0)
+        monkeypatch.setattr(server, "playwright_browsers_task", None)
+
+        asyncio.run(server.ensure_scraper_browsers())
+        assert server.playwright_browsers_task is None
+        print("✓ Browser check skipped when disabled")
@@ -0,0 +1,125 @@
+"""
+Tests for the metrics registry and the /api/metrics endpoint
+"""
+import asyncio
+import re
+
+import httpx
+from websockets.asyncio.client import connect
+
+from metrics import Counter, Gauge, Histogram
+from benchmarks.app_harness import serve_app
+from benchmarks.fake_ws_gateway import FakeWsGateway
+
+
+def sample(text: str, name: str, labels: str = "") -> float:
+    """Value of one sample line in exposition text"""
+    match = re.search(rf"^{re.escape(name + labels)} (\S+)$", text, re.MULTILINE)
+    assert match, f"{name}{labels} not found"
+    return float(match.group(1))
+
+
+class TestMetricTypes:
+    """Prometheus text rendering"""
+
+    def test_counter_and_gauge(self):
+        c = Counter("t_requests_total", "Requests", ("route",))
+        c.inc(1, "/a")
+        c.inc(2, "/a")
+        g = Gauge("t_depth", "Depth", callback=lambda: 7)
+        text = "\n".join(c.render() + g.render())
+        assert "# TYPE t_requests_total counter" in text
+        assert sample(text, "t_requests_total", '{route="/a"}') == 3
+        assert sample(text, "t_depth") == 7
+
+    def test_histogram_buckets_are_cumulative(self):
+        h = Histogram("t_latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            h.observe(value)
+        text = "\n".join(h.render())
+        assert sample(text, "t_latency_seconds_bucket", '{le="0.1"}') == 2
+        assert sample(text, "t_latency_seconds_bucket", '{le="1"}') == 3
+        assert sample(text, "t_latency_seconds_bucket", '{le="+Inf"}') == 4
+        assert sample(text, "t_latency_seconds_count") == 4
+        assert sample(text, "t_latency_seconds_sum") == 3.65
+
+    def test_label_values_are_escaped(self):
+        c = Counter("t_escape_total", "Escaping", ("value",))
+        c.inc(1, 'a"b\\c')
+        assert 't_escape_total{value="a\\"b\\\\c"} 1' in c.render()
+
+
+class TestMetricsEndpoint:
+    """/api/metrics after relaying WebSocket traffic"""
+
+    def test_relay_traffic_is_reported(self, proxied_server, run_async, monkeypatch):
+        monkeypatch.setattr(proxied_server, "METRICS_TOKEN", "s3cret")
+
+        async def scenario():
+            async with FakeWsGateway() as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(proxied_server.app) as base_url:
+                    before = await fetch(base_url)
+                    async with connect(base_url.replace("http://", "ws://") + "/api/openclaw/ws") as ws:
+                        for _ in range(10):
+                            await ws.send("x" * 100)
+                            await ws.recv()
+                        during = await fetch(base_url)
+                    await asyncio.sleep(0.1)
+                    after = await fetch(base_url)
+            return before, during, after
+
+        async def fetch(base_url):
+            async with httpx.AsyncClient() as client:
+                response = await client.get(f"{base_url}/api/metrics", headers={"Authorization": "Bearer s3cret"})
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("text/plain")
+                return response.text
+
+        before, during, after = run_async(scenario)
+        up = '{direction="client->gateway"}'
+        down = '{direction="gateway->client"}'
+
+        assert sample(during, "openclaw_ws_active_connections") == sample(before, "openclaw_ws_active_connections") + 1
+        assert sample(during, "openclaw_ws_relays_active") >= 1
+        assert re.search(r'^openclaw_ws_connection_frames\{connection="\d+",direction="gateway->client"\} 10$', during, re.M)
+        assert sample(after, "openclaw_ws_active_connections") == sample(before, "openclaw_ws_active_connections")
+
+        def delta(name, labels=""):
+            try:
+                start = sample(before, name, labels)
+            except AssertionError:
+                start = 0
+            return sample(after, name, labels) - start
+
+        assert delta("openclaw_ws_frames_total", up) == 10
+        assert delta("openclaw_ws_bytes_total", down) == 1000
+        assert delta("openclaw_ws_relay_latency_seconds_count", down) == 10
+        assert delta("openclaw_ws_upstream_connect_seconds_count") == 1
+        assert delta("openclaw_ws_close_total", '{side="client",code="1000"}') == 1
+
+    def test_token_protects_endpoint(self, proxied_server, run_async, monkeypatch):
+        monkeypatch.setattr(proxied_server, "METRICS_TOKEN", "s3cret")
+        transport = httpx.ASGITransport(app=proxied_server.app)
+
+        async def scenario():
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                denied = await client.get("/api/metrics")
+                allowed = await client.get("/api/metrics", headers={"Authorization": "Bearer s3cret"})
+                return denied.status_code, allowed.status_code, allowed.text
+
+        denied, allowed, text = run_async(scenario)
+        assert (denied, allowed) == (401, 200)
+        assert "# TYPE openclaw_session_cache_lookups_total counter" in text
+
+    def test_disabled_without_token(self, proxied_server, run_async, monkeypatch):
+        monkeypatch.setattr(proxied_server, "METRICS_TOKEN", None)
+        transport = httpx.ASGITransport(app=proxied_server.app)
+
+        async def scenario():
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                anonymous = await client.get("/api/metrics")
+                guessed = await client.get("/api/metrics", headers={"Authorization": "Bearer "})
+                return anonymous.status_code, guessed.status_code
+
+        assert run_async(scenario) == (403, 403)
@@ -0,0 +1,45 @@
+"""
+Unit tests for the shared pooled proxy client (proxy_client.ProxyClient)
+Runs fully offline against the local fake gateway from benchmarks/
+"""
+import asyncio
+
+from proxy_client import ProxyClient
+from benchmarks.fake_gateway import FakeGateway
+
+
+class TestProxyClientLifecycle:
+    """Test open/get/close of the shared client"""
+
+    def test_get_returns_same_client(self):
+        """ProxyClient.get() should hand out one shared client until closed"""
+        async def scenario():
+            first = ProxyClient.open()
+            second = ProxyClient.get()
+            assert first is second, "Expected the same pooled client instance"
+            await ProxyClient.close()
+            assert first.is_closed, "Client should be closed after ProxyClient.close()"
+            third = ProxyClient.get()
+            assert third is not first, "A new client should be created lazily after close"
+            await ProxyClient.close()
+
+        asyncio.run(scenario())
+        print("✓ ProxyClient shares one client and recreates it after close")
+
+    def test_keepalive_reuses_upstream_connection(self):
+        """Sequential requests through the shared client should reuse one TCP connection"""
+        async def scenario():
+            async with FakeGateway() as gateway:
+                client = ProxyClient.open()
+                try:
+                    for i in range(10):
+                        response = await client.get(f"{gateway.base_url}/assets/{i}.js")
+                        assert response.status_code == 200
+                finally:
+                    await ProxyClient.close()
+                return gateway.connections, gateway.requests
+
+        connections, requests_served = asyncio.run(scenario())
+        assert requests_served == 10
+        assert connections == 1, f"Expected 1 upstream connection, got {connections}"
+        print(f"✓ 10 requests served over {connections} keep-alive connection")
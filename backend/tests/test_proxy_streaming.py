@@ -0,0 +1,76 @@
+"""
+Tests for the streaming Control UI proxy (/api/openclaw/ui/*)
+Drives server.app in-process against the local fake gateway
+"""
+import httpx
+
+from benchmarks.fake_gateway import FakeGateway
+
+
+def asgi_client(server):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+
+
+class TestStreamingPassThrough:
+    """Non-HTML responses are relayed as-is, HTML is still rewritten"""
+
+    def test_asset_relayed_byte_for_byte(self, proxied_server, run_async, monkeypatch):
+        """GET of a JS asset should return the exact upstream bytes and length"""
+        async def scenario():
+            async with FakeGateway(asset_size=300_000) as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                async with asgi_client(proxied_server) as client:
+                    return await client.get("/api/openclaw/ui/assets/index.js")
+
+        response = run_async(scenario)
+        assert response.status_code == 200
+        assert response.content == b"x" * 300_000
+        assert response.headers["content-length"] == "300000"
+        assert response.headers["content-type"] == "application/javascript"
+        print("✓ 300KB asset relayed through the streaming proxy")
+
+    def test_request_body_streamed_upstream(self, proxied_server, run_async, monkeypatch):
+        """POST bodies should reach the gateway intact"""
+        payload = bytes(range(256)) * 1024
+
+        async def scenario():
+            async with FakeGateway() as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                async with asgi_client(proxied_server) as client:
+                    return await client.post("/api/openclaw/ui/echo", content=payload)
+
+        response = run_async(scenario)
+        assert response.status_code == 200
+        assert response.content == payload, "Echoed body should match what was sent"
+        print("✓ Request body streamed upstream and echoed back")
+
+    def test_html_still_gets_ws_override(self, proxied_server, run_async, monkeypatch):
+        """HTML responses are buffered and get the WebSocket override script"""
+        async def scenario():
+            async with FakeGateway() as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                async with asgi_client(proxied_server) as client:
+                    return await client.get("/api/openclaw/ui/")
+
+        response = run_async(scenario)
+        assert response.status_code == 200
+        body = response.text
+        assert 'window.__MOLTBOT_PROXY_TOKEN__ = "test-token"' in body
+        assert body.index("__MOLTBOT_PROXY_WS_URL__") < body.index("</head>")
+        assert int(response.headers["content-length"]) == len(response.content)
+        print("✓ HTML response rewritten with WebSocket override")
+
+    def test_buffered_mode_still_works(self, proxied_server, run_async, monkeypatch):
+        """With streaming disabled, assets are buffered and relayed intact"""
+        monkeypatch.setattr(proxied_server, "PROXY_STREAMING", False)
+
+        async def scenario():
+            async with FakeGateway(asset_size=1000) as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                async with asgi_client(proxied_server) as client:
+                    return await client.get("/api/openclaw/ui/assets/app.css")
+
+        response = run_async(scenario)
+        assert response.status_code == 200
+        assert response.content == b"x" * 1000
+        print("✓ Buffered proxy mode relays assets")
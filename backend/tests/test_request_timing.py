@@ -0,0 +1,104 @@
+"""
+Tests for the request timing middleware and Server-Timing header
+"""
+import asyncio
+import re
+
+import httpx
+
+import request_timing
+from request_timing import PHASE_MONGO, TimedDatabase, server_timing_value, timed
+from benchmarks.fake_gateway import FakeGateway
+
+
+def parse_server_timing(value: str) -> dict:
+    return {name: float(dur) for name, dur in re.findall(r"(\w+);dur=([\d.]+)", value)}
+
+
+class FakeCollection:
+    async def find_one(self, query):
+        await asyncio.sleep(0.02)
+        return {"ok": True}
+
+    def find(self, query):
+        collection = self
+
+        class Cursor:
+            def sort(self, *args):
+                return self
+
+            async def to_list(self, length):
+                await asyncio.sleep(0.01)
+                return []
+
+        return Cursor()
+
+
+class TestRequestTiming:
+    """Per-request phase accounting"""
+
+    def test_proxied_asset_has_upstream_breakdown(self, proxied_server, run_async, monkeypatch):
+        async def scenario():
+            async with FakeGateway(latency=0.03) as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                transport = httpx.ASGITransport(app=proxied_server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    before = request_timing.PHASE_DURATION.count("/api/openclaw/ui/{path:path}", "upstream")
+                    response = await client.get("/api/openclaw/ui/assets/app.js")
+                    after = request_timing.PHASE_DURATION.count("/api/openclaw/ui/{path:path}", "upstream")
+                    return response, after - before
+
+        response, observed = run_async(scenario)
+        assert response.status_code == 200
+        timing = parse_server_timing(response.headers["server-timing"])
+        assert timing["upstream"] >= 30
+        assert timing["app"] >= timing["upstream"]
+        assert observed == 1
+
+    def test_route_histogram_uses_route_template(self, proxied_server, run_async):
+        transport = httpx.ASGITransport(app=proxied_server.app)
+
+        async def scenario():
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                before = request_timing.REQUEST_DURATION.count("GET", "/api/", 200)
+                await client.get("/api/")
+                await client.get("/api/")
+                missing_before = request_timing.REQUEST_DURATION.count("GET", "unmatched", 404)
+                await client.get("/api/definitely-not-a-route")
+                return (request_timing.REQUEST_DURATION.count("GET", "/api/", 200) - before,
+                        request_timing.REQUEST_DURATION.count("GET", "unmatched", 404) - missing_before)
+
+        assert run_async(scenario) == (2, 1)
+
+    def test_timed_database_accumulates_mongo_time(self):
+        db = TimedDatabase({"users": FakeCollection()})
+
+        async def handler():
+            token = request_timing._phases.set({})
+            try:
+                await db.users.find_one({})
+                await db["users"].find({}).sort("x", 1).to_list(10)
+                return request_timing.current_phases()
+            finally:
+                request_timing._phases.reset(token)
+
+        phases = asyncio.run(handler())
+        assert phases[PHASE_MONGO] >= 0.03
+
+    def test_timed_is_noop_outside_requests(self):
+        with timed(PHASE_MONGO):
+            pass
+        assert request_timing.current_phases() == {}
+
+    def test_header_can_be_disabled(self, proxied_server, run_async, monkeypatch):
+        monkeypatch.setattr(request_timing, "SERVER_TIMING_HEADER", False)
+        transport = httpx.ASGITransport(app=proxied_server.app)
+
+        async def scenario():
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/api/")
+
+        assert "server-timing" not in run_async(scenario).headers
+
+    def test_server_timing_format(self):
+        assert server_timing_value({"mongo": 0.0012}, 0.0051) == "mongo;dur=1.2, app;dur=5.1"
@@ -0,0 +1,232 @@
+"""
+Tests for the get_current_user session cache
+A page load with many concurrent authenticated requests does at most one DB lookup
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import session_cache
+from session_cache import SessionCache
+
+TOKEN = "tok_" + "a" * 60
+
+
+class FakeCollection:
+    """Just enough of a motor collection for session lookups"""
+
+    def __init__(self, docs, key, db=None):
+        self.docs = {doc[key]: doc for doc in docs}
+        self.key = key
+        self.db = db
+        self.finds = 0
+        self.aggregates = 0
+
+    async def find_one(self, query, projection=None):
+        self.finds += 1
+        await asyncio.sleep(0.01)
+        doc = self.docs.get(query[self.key])
+        return dict(doc) if doc else None
+
+    async def update_one(self, query, update, upsert=False):
+        if query[self.key] not in self.docs and upsert:
+            self.docs[query[self.key]] = {self.key: query[self.key], **update["$setOnInsert"]}
+
+    async def delete_one(self, query):
+        self.docs.pop(query[self.key], None)
+
+    def aggregate(self, pipeline):
+        """Evaluates the session lookup pipeline: $match on the key, then $lookup joins"""
+        self.aggregates += 1
+        collection = self
+
+        class Cursor:
+            async def to_list(self, length=None):
+                await asyncio.sleep(0.01)
+                doc = collection.docs.get(pipeline[0]["$match"][collection.key])
+                if not doc:
+                    return []
+                result = {"expires_at": doc["expires_at"]}
+                for stage in pipeline:
+                    lookup = stage.get("$lookup")
+                    if lookup and lookup["from"] == "users":
+                        result["user"] = collection.db.users.docs.get(doc["user_id"])
+                    elif lookup and lookup["from"] == "instance_config":
+                        result["owner"] = collection.db.instance_config.docs.get("instance_owner")
+                return [{k: v for k, v in result.items() if v is not None}]
+
+        return Cursor()
+
+
+class FakeDB:
+    def __init__(self, expires_at):
+        self.user_sessions = FakeCollection(
+            [{"session_token": TOKEN, "user_id": "user_1", "expires_at": expires_at}], "session_token", self
+        )
+        self.users = FakeCollection(
+            [{"user_id": "user_1", "email": "owner@example.com", "name": "Owner"}], "user_id"
+        )
+        self.instance_config = FakeCollection([], "_id")
+
+
+@pytest.fixture
+def auth_server(monkeypatch):
+    import server
+
+    SessionCache.clear()
+    fake_db = FakeDB(datetime.now(timezone.utc) + timedelta(days=1))
+    monkeypatch.setattr(server, "db", fake_db)
+    monkeypatch.setitem(server.instance_owner_memo, "doc", None)
+    yield server, fake_db
+    SessionCache.clear()
+
+
+def request_with_cookie(server, token=TOKEN):
+    scope = {"type": "http", "headers": [(b"cookie", f"session_token={token}".encode())]}
+    return server.Request(scope)
+
+
+class TestSessionCache:
+    """Cached resolution of session tokens"""
+
+    def test_concurrent_requests_share_one_lookup(self, auth_server):
+        server, fake_db = auth_server
+
+        async def scenario():
+            return await asyncio.gather(
+                *(server.get_current_user(request_with_cookie(server)) for _ in range(40))
+            )
+
+        users = asyncio.run(scenario())
+        assert all(user.user_id == "user_1" for user in users)
+        assert fake_db.user_sessions.aggregates == 1
+        assert fake_db.user_sessions.finds == fake_db.users.finds == 0
+        assert SessionCache.misses == 1
+        # Nothing was cached yet: the others waited for the one lookup
+        assert SessionCache.hits == 0
+        assert SessionCache.coalesced == 39
+
+    def test_cancelled_lookup_retried_by_waiters(self):
+        SessionCache.clear()
+        expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+        loads = []
+
+        async def loader(token):
+            loads.append(token)
+            await asyncio.sleep(0.05)
+            return "user_1", expires_at
+
+        async def scenario():
+            leader = asyncio.create_task(SessionCache.get_or_load(TOKEN, loader))
+            await asyncio.sleep(0.01)
+            waiters = [asyncio.create_task(SessionCache.get_or_load(TOKEN, loader)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            # The request doing the lookup disconnects
+            leader.cancel()
+            return await asyncio.gather(*waiters)
+
+        assert asyncio.run(scenario()) == ["user_1"] * 3
+        # One waiter took over the lookup, the other two waited for it
+        assert len(loads) == 2
+        assert SessionCache.get(TOKEN) == "user_1"
+        SessionCache.clear()
+
+    def test_logout_invalidates(self, auth_server):
+        server, fake_db = auth_server
+        transport = httpx.ASGITransport(app=server.app)
+
+        async def scenario():
+            async with httpx.AsyncClient(transport=transport, base_url="https://test") as client:
+                client.cookies.set("session_token", TOKEN)
+                first = await client.get("/api/auth/me")
+                await client.post("/api/auth/logout")
+                client.cookies.set("session_token", TOKEN)
+                second = await client.get("/api/auth/me")
+                return first.status_code, second.status_code
+
+        assert asyncio.run(scenario()) == (200, 401)
+        assert SessionCache.stats()["entries"] == 0
+
+    def test_unknown_token_not_cached(self, auth_server):
+        server, fake_db = auth_server
+
+        async def scenario():
+            for _ in range(3):
+                assert await server.get_current_user(request_with_cookie(server, "nope")) is None
+
+        asyncio.run(scenario())
+        assert fake_db.user_sessions.aggregates == 3
+
+    def test_ttl_and_session_expiry(self, auth_server, monkeypatch):
+        server, fake_db = auth_server
+        SessionCache.put("short", object(), datetime.now(timezone.utc) - timedelta(seconds=1))
+        assert SessionCache.get("short") is None
+
+        monkeypatch.setattr(session_cache, "SESSION_CACHE_TTL", 0)
+        SessionCache.put("ttl", object(), datetime.now(timezone.utc) + timedelta(days=1))
+        assert SessionCache.get("ttl") is None
+
+    def test_lru_bound(self, monkeypatch):
+        SessionCache.clear()
+        monkeypatch.setattr(session_cache, "SESSION_CACHE_MAX_ENTRIES", 3)
+        expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+        for i in range(5):
+            SessionCache.put(f"t{i}", i, expires_at)
+        assert SessionCache.get("t0") is None
+        assert SessionCache.get("t4") == 4
+        assert SessionCache.stats()["entries"] == 3
+        SessionCache.clear()
+
+
+class TestSessionLookup:
+    """Single-round-trip session resolution and the instance owner memo"""
+
+    def test_pipeline_shape(self, auth_server):
+        server, _ = auth_server
+        pipeline = server.session_lookup_pipeline(TOKEN, include_owner=True)
+        assert pipeline[0] == {"$match": {"session_token": TOKEN}}
+        assert [stage["$lookup"]["from"] for stage in pipeline if "$lookup" in stage] == ["users", "instance_config"]
+        assert "owner" in pipeline[-1]["$project"]
+
+        pipeline = server.session_lookup_pipeline(TOKEN, include_owner=False)
+        assert [stage["$lookup"]["from"] for stage in pipeline if "$lookup" in stage] == ["users"]
+
+    def test_require_auth_is_one_round_trip(self, auth_server):
+        server, fake_db = auth_server
+        fake_db.instance_config.docs["instance_owner"] = {"_id": "instance_owner", "user_id": "user_1"}
+
+        async def scenario():
+            for _ in range(5):
+                user = await server.require_auth(request_with_cookie(server))
+                assert user.user_id == "user_1"
+
+        asyncio.run(scenario())
+        assert fake_db.user_sessions.aggregates == 1
+        assert fake_db.instance_config.finds == 0
+        assert server.instance_owner_memo["doc"]["user_id"] == "user_1"
+
+    def test_non_owner_rejected_from_memo(self, auth_server):
+        server, fake_db = auth_server
+        server.instance_owner_memo["doc"] = {"_id": "instance_owner", "user_id": "someone_else", "email": "x@example.com"}
+
+        async def scenario():
+            with pytest.raises(server.HTTPException) as exc:
+                await server.require_auth(request_with_cookie(server))
+            return exc.value.status_code
+
+        assert asyncio.run(scenario()) == 403
+        assert fake_db.instance_config.finds == 0
+
+    def test_locking_refreshes_memo(self, auth_server):
+        server, fake_db = auth_server
+        user = server.User(user_id="user_1", email="owner@example.com", name="Owner")
+
+        async def scenario():
+            assert await server.get_instance_owner() is None
+            await server.set_instance_owner(user)
+            return await server.get_instance_owner()
+
+        owner = asyncio.run(scenario())
+        assert owner["user_id"] == "user_1"
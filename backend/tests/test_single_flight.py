@@ -0,0 +1,180 @@
+"""
+Tests for single-flight coalescing (single_flight.SingleFlight) and its use in the UI proxy
+Identical concurrent GETs share one upstream fetch
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.fake_gateway import FakeGateway
+from single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Concurrent calls for one key share one execution"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        group = SingleFlight("test")
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return value * 2
+
+        async def scenario():
+            same = await asyncio.gather(*(group.do("a", lambda: work(1)) for _ in range(10)))
+            other = await group.do("b", lambda: work(5))
+            again = await group.do("a", lambda: work(1))
+            return same, other, again
+
+        same, other, again = asyncio.run(scenario())
+        assert [result for result, _ in same] == [2] * 10
+        assert sorted(shared for _, shared in same) == [False] + [True] * 9
+        assert other == (10, False)
+        # Finished calls are not cached
+        assert again == (2, False)
+        assert calls == [1, 5, 1]
+        assert (group.leaders, group.coalesced) == (3, 9)
+        assert group.in_flight() == 0
+        print("✓ Concurrent calls shared one execution")
+
+    def test_exception_shared_and_leader_cancel_does_not_cancel_work(self):
+        group = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.02)
+            raise ValueError("upstream down")
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def scenario():
+            failures = await asyncio.gather(*(group.do("f", fail) for _ in range(3)), return_exceptions=True)
+
+            leader = asyncio.create_task(group.do("s", slow))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(group.do("s", slow))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return failures, await follower
+
+        failures, follower = asyncio.run(scenario())
+        assert all(isinstance(e, ValueError) for e in failures)
+        assert follower == ("done", True)
+        print("✓ Exception shared, leader cancel left the work running")
+
+
+    def test_result_discarded_when_leader_cancelled(self):
+        group = SingleFlight("test")
+        discarded = []
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "stream"
+
+        async def discard(result):
+            discarded.append(result)
+
+        async def scenario():
+            taken = await group.do("k", slow, discard=discard)
+            leader = asyncio.create_task(group.do("k", slow, discard=discard))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            await asyncio.sleep(0.1)
+            return taken
+
+        assert asyncio.run(scenario()) == ("stream", False)
+        # Only the result nobody took was discarded
+        assert discarded == ["stream"]
+        print("✓ Result discarded when the leader was cancelled")
+
+
+class TestProxyCoalescing:
+    """Identical concurrent Control UI GETs through the proxy"""
+
+    @pytest.mark.parametrize("path", ["/api/openclaw/ui/", "/api/openclaw/ui/assets/app.js"])
+    def test_proxy_coalesces_duplicate_gets(self, proxied_server, run_async, monkeypatch, path):
+        flights = proxied_server.proxy_flights
+        coalesced_before = flights.coalesced
+
+        async def scenario():
+            async with FakeGateway(latency=0.1) as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                transport = httpx.ASGITransport(app=proxied_server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    same = await asyncio.gather(*(client.get(path) for _ in range(5)))
+                    upstream_same = gateway.requests
+                    # A different Accept-Encoding is a different response: not shared
+                    await asyncio.gather(client.get(path, headers={"accept-encoding": "gzip"}),
+                                         client.get(path, headers={"accept-encoding": "identity"}))
+                return same, upstream_same, gateway.requests
+
+        responses, upstream_same, upstream_total = run_async(scenario)
+        assert upstream_same == 1
+        assert upstream_total == 3
+        assert {r.status_code for r in responses} == {200}
+        assert len({r.content for r in responses}) == 1
+        assert flights.coalesced - coalesced_before == 4
+        assert flights.in_flight() == 0
+        print(f"✓ Duplicate GETs of {path} coalesced")
+
+    def test_proxy_coalescing_disabled(self, proxied_server, run_async, monkeypatch):
+        monkeypatch.setattr(proxied_server, "PROXY_COALESCE", False)
+
+        async def scenario():
+            async with FakeGateway(latency=0.05) as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                transport = httpx.ASGITransport(app=proxied_server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    await asyncio.gather(*(client.get("/api/openclaw/ui/assets/app.js") for _ in range(4)))
+                return gateway.requests
+
+        assert run_async(scenario) == 4
+        print("✓ Every GET forwarded with coalescing disabled")
+
+    def test_large_streamed_bodies_fetched_per_caller(self, proxied_server, run_async, monkeypatch):
+        monkeypatch.setattr(proxied_server, "PROXY_COALESCE_MAX_BYTES", 1024)
+
+        async def scenario():
+            async with FakeGateway(latency=0.05, asset_size=4096) as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                transport = httpx.ASGITransport(app=proxied_server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    responses = await asyncio.gather(*(client.get("/api/openclaw/ui/assets/big.js") for _ in range(3)))
+                return responses, gateway.requests
+
+        responses, upstream = run_async(scenario)
+        assert upstream == 3
+        assert all(r.content == b"x" * 4096 for r in responses)
+        print("✓ Large streamed bodies fetched per caller")
+
+    def test_cancelled_leader_releases_streamed_response(self, proxied_server, run_async, monkeypatch):
+        monkeypatch.setattr(proxied_server, "PROXY_COALESCE_MAX_BYTES", 1024)
+        slot = proxied_server.GatewayUpstream.PRIMARY
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def scenario():
+            async with FakeGateway(latency=0.05, asset_size=4096) as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                scope = {"type": "http", "method": "GET", "path": "/api/openclaw/ui/assets/big.js",
+                         "query_string": b"", "headers": []}
+                request = proxied_server.Request(scope, receive)
+                before = slot.in_flight
+                # The client goes away while the response is being fetched
+                leader = asyncio.create_task(proxied_server.forward_to_gateway(request, "assets/big.js", slot))
+                await asyncio.sleep(0.01)
+                leader.cancel()
+                while proxied_server.proxy_flights.in_flight():
+                    await asyncio.sleep(0.01)
+                await asyncio.sleep(0.1)
+                return gateway.requests, slot.in_flight - before
+
+        requests, held = run_async(scenario)
+        # The stream was fetched, then closed and its slot released
+        assert requests == 1 and held == 0
+        print("✓ Streamed response of a cancelled leader released")
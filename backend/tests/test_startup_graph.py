@@ -0,0 +1,188 @@
+"""
+Tests for the startup dependency graph (startup_graph.StartupGraph)
+Independent steps run concurrently and the server accepts requests before recovery finishes
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from startup_graph import StartupGraph
+
+
+class TestStartupGraph:
+    """Startup steps run as a dependency graph"""
+
+    def test_independent_steps_run_concurrently(self):
+        graph = StartupGraph()
+        order = []
+
+        async def slow(name, value):
+            order.append(name)
+            await asyncio.sleep(0.1)
+            return value
+
+        graph.add("a", lambda: slow("a", 1))
+        graph.add("b", lambda: slow("b", 2))
+        graph.add("c", lambda: slow("c", 3))
+
+        @graph.step("total", after=("a", "b", "c"))
+        async def total(a, b, c):
+            order.append("total")
+            return a + b + c
+
+        start = time.perf_counter()
+        results = asyncio.run(graph.run())
+        elapsed = time.perf_counter() - start
+
+        assert results["total"] == 6
+        assert order[-1] == "total"
+        # Three 100ms steps side by side, not one after another
+        assert elapsed < 0.25
+        assert all(step.status == "ok" for step in graph.steps.values())
+        print("✓ Independent startup steps ran concurrently")
+
+    def test_failed_step_skips_dependents_only(self):
+        graph = StartupGraph()
+
+        @graph.step("broken")
+        async def broken():
+            raise RuntimeError("no database")
+
+        @graph.step("needs_broken", after=("broken",))
+        async def needs_broken(broken):
+            raise AssertionError("must not run")
+
+        @graph.step("independent")
+        async def independent():
+            return "fine"
+
+        results = asyncio.run(graph.run())
+
+        assert results == {"independent": "fine"}
+        assert graph.steps["broken"].status == "failed"
+        assert graph.steps["needs_broken"].status == "skipped"
+        report = graph.report()
+        assert "broken" in report and "failed" in report and "skipped" in report
+        print("✓ Failed step skipped only its dependents")
+
+    def test_invalid_graphs_rejected(self):
+        async def noop(**_):
+            return None
+
+        unknown = StartupGraph()
+        unknown.add("a", noop, after=("missing",))
+        with pytest.raises(ValueError, match="unknown step"):
+            asyncio.run(unknown.run())
+
+        cycle = StartupGraph()
+        cycle.add("a", noop, after=("b",))
+        cycle.add("b", noop, after=("a",))
+        with pytest.raises(ValueError, match="cycle"):
+            asyncio.run(cycle.run())
+
+        with pytest.raises(ValueError, match="Duplicate"):
+            cycle.add("a", noop)
+        print("✓ Unknown dependencies and cycles rejected")
+
+
+def slow_startup(server, monkeypatch):
+    """Startup steps that take 200ms, recovering a running gateway owned by user_1"""
+    monkeypatch.setitem(server.gateway_state, "token", None)
+    monkeypatch.setitem(server.gateway_state, "owner_user_id", None)
+    monkeypatch.setitem(server.gateway_state, "provider", None)
+    monkeypatch.setitem(server.gateway_state, "started_at", None)
+
+    async def slow(result=None):
+        await asyncio.sleep(0.2)
+        return result
+
+    async def gateway_config():
+        return {"should_run": True, "owner_user_id": "user_1", "provider": "openai"}
+
+    async def liveness(supervisor_config, gateway_slot):
+        return True
+
+    async def token():
+        return await slow("recovered-token")
+
+    async def watcher():
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(server, "startup_supervisor_config", slow)
+    monkeypatch.setattr(server, "startup_clawdbot_command", slow)
+    monkeypatch.setattr(server, "startup_indexes", slow)
+    monkeypatch.setattr(server, "startup_shared_state", slow)
+    monkeypatch.setattr(server, "startup_gateway_config", gateway_config)
+    monkeypatch.setattr(server, "startup_gateway_liveness", liveness)
+    monkeypatch.setattr(server, "read_gateway_token", token)
+    monkeypatch.setattr(server, "whatsapp_auto_fix_watcher", watcher)
+    monkeypatch.setattr(server.GatewayLiveness, "_pid", 4242)
+    monkeypatch.setattr(server.GatewayLiveness, "_checked_at", time.monotonic())
+    monkeypatch.setattr(server, "startup_graph", None)
+    monkeypatch.setattr(server, "startup_task", None)
+    monkeypatch.setattr(server, "whatsapp_watcher_task", None)
+
+
+class TestServerStartup:
+    """The server's startup graph in the background"""
+
+    def test_server_accepts_requests_while_recovery_runs(self, proxied_server, run_async, monkeypatch):
+        server = proxied_server
+        slow_startup(server, monkeypatch)
+
+        async def scenario():
+            start = time.perf_counter()
+            await server.startup_event()
+            returned_after = time.perf_counter() - start
+            token_before = server.gateway_state["token"]
+
+            await server.wait_for_gateway_recovery()
+            recovered_after = time.perf_counter() - start
+
+            await server.startup_task
+            server.whatsapp_watcher_task.cancel()
+            return returned_after, token_before, recovered_after
+
+        returned_after, token_before, recovered_after = run_async(scenario)
+
+        # Startup returned before any 200ms step finished; those steps overlapped
+        assert returned_after < 0.1
+        assert token_before is None
+        assert recovered_after < 0.35
+        assert server.gateway_state["token"] == "recovered-token"
+        assert server.gateway_state["owner_user_id"] == "user_1"
+        assert server.gateway_state["provider"] == "openai"
+        assert server.startup_graph.steps["gateway_recovery"].status == "ok"
+        print("✓ Requests served while gateway recovery runs")
+
+    def test_owner_recognised_while_recovery_runs(self, run_async, monkeypatch):
+        # Not proxied_server: the real owner and liveness checks are under test
+        import server
+        slow_startup(server, monkeypatch)
+        owner = server.User(user_id="user_1", email="owner@example.com", name="Owner")
+
+        async def current_user(request):
+            return owner
+
+        async def running():
+            return True
+
+        monkeypatch.setattr(server, "get_current_user", current_user)
+        monkeypatch.setattr(server.GatewayLiveness, "check", classmethod(lambda cls: running()))
+
+        async def scenario():
+            await server.startup_event()
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                # Sent before the 200ms token step lets recovery run
+                status = await client.get("/api/openclaw/status")
+            await server.startup_task
+            server.whatsapp_watcher_task.cancel()
+            return status.json()
+
+        status = run_async(scenario)
+        assert status["running"] is True
+        assert status["owner_user_id"] == "user_1" and status["is_owner"] is True
+        print("✓ Owner recognised by requests made during gateway recovery")
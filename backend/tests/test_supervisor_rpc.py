@@ -0,0 +1,173 @@
+"""
+Tests for the XML-RPC supervisor backend (supervisor_rpc) against the local fake supervisord
+"""
+import asyncio
+
+import pytest
+
+import supervisor_client
+import supervisor_rpc
+from supervisor_client import SupervisorClient
+from supervisor_rpc import AsyncSupervisorRPC, SupervisorRPC
+from benchmarks.fake_supervisord import FakeSupervisord
+
+
+@pytest.fixture
+def supervisord(monkeypatch):
+    """A fake supervisord with SupervisorClient switched to the xmlrpc backend"""
+    with FakeSupervisord() as fake:
+        monkeypatch.setattr(supervisor_rpc, "SUPERVISOR_SOCKET", fake.socket_path)
+        monkeypatch.setattr(supervisor_client, "SUPERVISOR_BACKEND", "xmlrpc")
+        SupervisorRPC.close()
+        yield fake
+        SupervisorRPC.close()
+
+
+class TestSupervisorClientXmlRpc:
+    """SupervisorClient classmethods routed through XML-RPC"""
+
+    def test_start_status_pid_stop(self, supervisord):
+        """Lifecycle calls should map onto supervisor.* RPC methods"""
+        assert SupervisorClient.status() is False
+        assert SupervisorClient.get_pid() is None
+        assert SupervisorClient.start() is True
+        assert SupervisorClient.status() is True
+        pid = SupervisorClient.get_pid()
+        assert isinstance(pid, int) and pid > 0
+        assert SupervisorClient.stop() is True
+        assert SupervisorClient.status() is False
+        print(f"✓ start/status/get_pid/stop over XML-RPC (pid was {pid})")
+
+    def test_idempotent_start_and_stop(self, supervisord):
+        """ALREADY_STARTED / NOT_RUNNING faults count as success, like the CLI"""
+        assert SupervisorClient.stop() is True
+        assert SupervisorClient.start() is True
+        assert SupervisorClient.start() is True
+
+    def test_restart_changes_pid(self, supervisord):
+        """restart() stops and starts the program"""
+        SupervisorClient.start()
+        before = SupervisorClient.get_pid()
+        assert SupervisorClient.restart() is True
+        assert SupervisorClient.get_pid() != before
+
+    def test_unknown_program_reports_not_running(self, supervisord, monkeypatch):
+        """BAD_NAME faults are handled, not raised"""
+        monkeypatch.setattr(SupervisorClient, "PROGRAM", "missing-program")
+        assert SupervisorClient.status() is False
+        assert SupervisorClient.start() is False
+
+    def test_connection_is_persistent(self, supervisord):
+        """Many calls should share one unix-socket connection"""
+        for _ in range(50):
+            SupervisorClient.status()
+        assert supervisord.connections == 1, f"Expected 1 connection, got {supervisord.connections}"
+        print("✓ 50 status calls over one persistent connection")
+
+    def test_reload_config_applies_update(self, supervisord):
+        """reload_config() rereads and adds/removes groups like `supervisorctl update`"""
+        supervisord.programs["old-program"] = {"state": "RUNNING", "pid": 7}
+        supervisord.pending_config = [["new-program"], [], ["old-program"]]
+        assert SupervisorClient.reload_config() is True
+        assert "new-program" in supervisord.programs
+        assert "old-program" not in supervisord.programs
+
+    def test_only_read_only_calls_retried(self, supervisord, monkeypatch):
+        """A dropped connection is retried for status reads, never for start/stop"""
+        attempts = []
+        single_request = supervisor_rpc._UnixTransport.single_request
+
+        def dropping(self, host, handler, request_body, verbose=False):
+            attempts.append(request_body)
+            if len(attempts) % 2:
+                self.close()
+                raise ConnectionResetError("connection dropped")
+            return single_request(self, host, handler, request_body, verbose)
+
+        monkeypatch.setattr(supervisor_rpc._UnixTransport, "single_request", dropping)
+
+        assert SupervisorClient.start() is False and len(attempts) == 1
+        assert supervisord.programs[SupervisorClient.PROGRAM]["state"] == "STOPPED"
+        attempts.clear()
+        assert SupervisorClient.status() is False and len(attempts) == 2
+        print("✓ startProcess not resent after a dropped connection, getProcessInfo retried")
+
+    def test_reconnects_after_idle_close(self, supervisord):
+        """A connection supervisord closed is replaced before the next request is written"""
+        SupervisorClient.status()
+        supervisord.drop_connections()
+        assert SupervisorClient.start() is True
+        assert supervisord.connections == 2
+        print("✓ Closed connection replaced before sending startProcess")
+
+
+class TestAsyncSupervisorRpc:
+    """asyncio variant of the XML-RPC backend"""
+
+    def test_async_lifecycle(self, supervisord):
+        """Async calls should behave like the blocking ones"""
+        program = SupervisorClient.PROGRAM
+
+        async def scenario():
+            try:
+                started = await AsyncSupervisorRPC.start(program)
+                running = await AsyncSupervisorRPC.status(program)
+                pid = await AsyncSupervisorRPC.get_pid(program)
+                results = await asyncio.gather(*(AsyncSupervisorRPC.status(program) for _ in range(20)))
+                stopped = await AsyncSupervisorRPC.stop(program)
+                return started, running, pid, results, stopped
+            finally:
+                await AsyncSupervisorRPC.close()
+
+        started, running, pid, results, stopped = asyncio.run(scenario())
+        assert started and running and stopped
+        assert pid and all(results)
+        assert supervisord.connections == 1
+        print("✓ Async XML-RPC lifecycle over one connection")
+
+    def test_only_read_only_calls_retried(self, supervisord, monkeypatch):
+        """A dropped connection is retried for status reads, never for start/stop"""
+        program = SupervisorClient.PROGRAM
+        attempts = []
+        roundtrip = AsyncSupervisorRPC._roundtrip.__func__
+
+        async def dropping(cls, payload):
+            attempts.append(payload)
+            if len(attempts) % 2:
+                raise ConnectionResetError("connection dropped")
+            return await roundtrip(cls, payload)
+
+        monkeypatch.setattr(AsyncSupervisorRPC, "_roundtrip", classmethod(dropping))
+
+        async def scenario():
+            try:
+                started = await AsyncSupervisorRPC.start(program)
+                start_attempts = len(attempts)
+                attempts.clear()
+                running = await AsyncSupervisorRPC.status(program)
+                return started, start_attempts, running, len(attempts)
+            finally:
+                await AsyncSupervisorRPC.close()
+
+        started, start_attempts, running, status_attempts = asyncio.run(scenario())
+        assert (started, start_attempts) == (False, 1)
+        assert supervisord.programs[program]["state"] == "STOPPED"
+        assert (running, status_attempts) == (False, 2)
+        print("✓ startProcess not resent after a dropped connection, getProcessInfo retried")
+
+    def test_reconnects_after_idle_close(self, supervisord):
+        """A connection supervisord closed is replaced before the next request is written"""
+        program = SupervisorClient.PROGRAM
+
+        async def scenario():
+            try:
+                await AsyncSupervisorRPC.status(program)
+                # supervisord drops the idle connection
+                AsyncSupervisorRPC._reader.feed_eof()
+                return await AsyncSupervisorRPC.start(program)
+            finally:
+                await AsyncSupervisorRPC.close()
+
+        assert asyncio.run(scenario()) is True
+        assert supervisord.connections == 2
+        print("✓ Closed connection replaced before sending startProcess")
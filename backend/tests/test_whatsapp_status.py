@@ -0,0 +1,108 @@
+"""
+Tests for the cached /openclaw/whatsapp/status endpoint
+Polling clients get 304s and the credentials file is only read when it changes
+"""
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+import whatsapp_monitor
+from config_store import ConfigStore
+from whatsapp_monitor import WhatsAppStatusCache, etag_matches
+
+CREDS = {"account": {"x": 1}, "me": {"id": "15551234567:3@s.whatsapp.net"}, "registered": True}
+
+
+@pytest.fixture
+def creds_file(tmp_path, monkeypatch):
+    path = tmp_path / "creds.json"
+    path.write_text(json.dumps(CREDS))
+    monkeypatch.setattr(whatsapp_monitor, "CREDS_FILE", path)
+    ConfigStore.invalidate()
+    WhatsAppStatusCache.invalidate()
+    yield path
+    WhatsAppStatusCache.invalidate()
+    WhatsAppStatusCache.watched = False
+
+
+def count_reads(monkeypatch):
+    reads = []
+    original = whatsapp_monitor.get_whatsapp_status
+
+    async def counting():
+        reads.append(True)
+        return await original()
+
+    monkeypatch.setattr(whatsapp_monitor, "get_whatsapp_status", counting)
+    return reads
+
+
+def bump(path, creds):
+    """Rewrite the file with a guaranteed-new mtime."""
+    path.write_text(json.dumps(creds))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+class TestWhatsAppStatus:
+    """WhatsApp status served from memory with ETags"""
+
+    def test_etag_matching(self):
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('W/"abc"', '"abc"')
+        assert etag_matches('"x", "abc"', '"abc"')
+        assert etag_matches("*", '"abc"')
+        assert not etag_matches('"abd"', '"abc"')
+        assert not etag_matches(None, '"abc"')
+        print("✓ ETag matching handles lists, weak tags and *")
+
+    def test_endpoint_serves_304_to_polling_clients(self, proxied_server, creds_file, monkeypatch, run_async):
+        reads = count_reads(monkeypatch)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=proxied_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = await client.get("/api/openclaw/whatsapp/status")
+                etag = first.headers["etag"]
+                polls = [
+                    await client.get("/api/openclaw/whatsapp/status", headers={"If-None-Match": etag})
+                    for _ in range(5)
+                ]
+                bump(creds_file, {**CREDS, "registered": False})
+                changed = await client.get("/api/openclaw/whatsapp/status", headers={"If-None-Match": etag})
+                return first, polls, changed
+
+        first, polls, changed = run_async(scenario)
+        assert first.status_code == 200
+        assert first.json() == {"linked": True, "phone": "+15551234567", "registered": True}
+        assert first.headers["cache-control"] == "no-cache"
+        assert [r.status_code for r in polls] == [304] * 5
+        assert all(r.content == b"" and r.headers["etag"] == first.headers["etag"] for r in polls)
+        # Unchanged file: no re-read; changed file: new body and ETag
+        assert changed.status_code == 200
+        assert changed.json()["registered"] is False
+        assert changed.headers["etag"] != first.headers["etag"]
+        assert len(reads) == 2
+        print("✓ Polling clients get 304 until the status changes")
+
+    def test_watched_cache_does_not_touch_disk(self, creds_file, monkeypatch):
+        reads = count_reads(monkeypatch)
+
+        async def scenario():
+            await WhatsAppStatusCache.refresh()
+            WhatsAppStatusCache.watched = True
+            # The watcher has not reported the change yet: the cached status stands
+            bump(creds_file, {**CREDS, "registered": False})
+            stale, _ = await WhatsAppStatusCache.get()
+            await WhatsAppStatusCache.refresh()
+            fresh, _ = await WhatsAppStatusCache.get()
+            return stale, fresh
+
+        stale, fresh = asyncio.run(scenario())
+        assert stale["registered"] is True
+        assert fresh["registered"] is False
+        assert len(reads) == 2
+        print("✓ Watched status cache does not touch the disk")
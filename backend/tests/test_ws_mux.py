@@ -0,0 +1,254 @@
+"""
+Tests for optional WebSocket multiplexing (WS_MULTIPLEX)
+Several tabs share one gateway connection; responses are routed by request id
+"""
+import asyncio
+import json
+
+import pytest
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+import ws_mux
+from ws_mux import MuxPool, parse_frame
+from benchmarks.app_harness import serve_app
+from benchmarks.fake_ws_gateway import FakeWsGateway
+
+
+def ws_url(base_url: str) -> str:
+    return base_url.replace("http://", "ws://") + "/api/openclaw/ws"
+
+
+def req(request_id, method, params=None, auth="secret"):
+    if method == "connect":
+        params = {"auth": {"token": auth}}
+    return json.dumps({"type": "req", "id": request_id, "method": method, "params": params})
+
+
+async def recv_json(ws):
+    return json.loads(await asyncio.wait_for(ws.recv(), 5))
+
+
+@pytest.fixture
+def mux_server(proxied_server, monkeypatch):
+    monkeypatch.setattr(proxied_server, "WS_MULTIPLEX", True)
+    monkeypatch.setattr(ws_mux, "WS_MUX_FIRST_FRAME_TIMEOUT", 0.2)
+    return proxied_server
+
+
+class TestMultiplexing:
+    """Shared upstream connections behind /api/openclaw/ws"""
+
+    def test_tabs_share_one_upstream(self, mux_server, run_async, monkeypatch):
+        async def scenario():
+            async with FakeWsGateway(protocol=True) as gateway:
+                monkeypatch.setattr(mux_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(mux_server.app) as base_url:
+                    tabs = [await connect(ws_url(base_url)) for _ in range(3)]
+                    hellos = []
+                    for tab in tabs:
+                        await tab.send(req("1", "connect"))
+                        hellos.append(await recv_json(tab))
+
+                    # Every tab reuses request id "2"; each must get its own answer
+                    for i, tab in enumerate(tabs):
+                        await tab.send(req("2", "chat.send", {"tab": i}))
+                    answers = [await recv_json(tab) for tab in tabs]
+                    stats = MuxPool.stats()
+
+                    await gateway.broadcast("tick", {"n": 1})
+                    events = [await recv_json(tab) for tab in tabs]
+                    for tab in tabs:
+                        await tab.close()
+                    await asyncio.sleep(0.1)
+                    return gateway.connections, hellos, answers, stats, events, MuxPool.stats()
+
+        connections, hellos, answers, stats, events, after = run_async(scenario)
+        assert connections == 1
+        assert all(h["id"] == "1" and h["payload"]["type"] == "hello-ok" for h in hellos)
+        assert [a["payload"]["echo"]["tab"] for a in answers] == [0, 1, 2]
+        assert all(a["id"] == "2" for a in answers)
+        assert stats == [{"upstream": stats[0]["upstream"], "clients": 3, "waiting": 0, "pending_requests": 0,
+                          "frames_up": 4, "frames_down": 4}]
+        assert all(e["event"] == "tick" for e in events)
+        assert after == []
+
+    def test_different_credentials_are_not_shared(self, mux_server, run_async, monkeypatch):
+        async def scenario():
+            async with FakeWsGateway(protocol=True) as gateway:
+                monkeypatch.setattr(mux_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(mux_server.app) as base_url:
+                    async with connect(ws_url(base_url)) as a, connect(ws_url(base_url)) as b:
+                        await a.send(req("1", "connect", auth="alice"))
+                        await recv_json(a)
+                        await b.send(req("1", "connect", auth="bob"))
+                        await recv_json(b)
+                        return gateway.connections
+
+        assert run_async(scenario) == 2
+
+    def test_pool_opens_more_upstreams_when_full(self, mux_server, run_async, monkeypatch):
+        monkeypatch.setattr(ws_mux, "WS_MUX_CLIENTS_PER_UPSTREAM", 2)
+        monkeypatch.setattr(ws_mux, "WS_MUX_POOL_SIZE", 2)
+
+        async def scenario():
+            async with FakeWsGateway(protocol=True) as gateway:
+                monkeypatch.setattr(mux_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(mux_server.app) as base_url:
+                    tabs = [await connect(ws_url(base_url)) for _ in range(5)]
+                    for tab in tabs:
+                        await tab.send(req("1", "connect"))
+                        await recv_json(tab)
+                    stats = MuxPool.stats()
+                    for tab in tabs:
+                        await tab.close()
+                    return gateway.connections, sorted(s["clients"] for s in stats)
+
+        connections, clients = run_async(scenario)
+        assert connections == 2
+        assert clients == [2, 3]
+
+    def test_non_protocol_client_falls_back_to_dedicated_relay(self, mux_server, run_async, monkeypatch):
+        async def scenario():
+            async with FakeWsGateway(protocol=True) as gateway:
+                monkeypatch.setattr(mux_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(mux_server.app) as base_url:
+                    async with connect(ws_url(base_url)) as raw:
+                        await raw.send(b"\x01binary-first")
+                        first = await asyncio.wait_for(raw.recv(), 5)
+                    async with connect(ws_url(base_url)) as silent:
+                        # Sends nothing within the timeout, then speaks
+                        await asyncio.sleep(0.3)
+                        await silent.send("ping")
+                        second = await asyncio.wait_for(silent.recv(), 5)
+                    await asyncio.sleep(0.1)
+                    return first, second, MuxPool.stats()
+
+        first, second, shared = run_async(scenario)
+        assert first == b"\x01binary-first"
+        assert second == "ping"
+        # The shared connections opened for them were closed again
+        assert shared == []
+
+    def test_gateway_speaks_first(self, mux_server, run_async, monkeypatch):
+        async def scenario():
+            async with FakeWsGateway(protocol=True, challenge=True) as gateway:
+                monkeypatch.setattr(mux_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(mux_server.app) as base_url:
+                    loop = asyncio.get_running_loop()
+                    tabs, waits = [], []
+                    for _ in range(2):
+                        tab = await connect(ws_url(base_url))
+                        started = loop.time()
+                        # The tab waits for the challenge before sending connect
+                        challenge = await recv_json(tab)
+                        waits.append(loop.time() - started)
+                        await tab.send(req("1", "connect"))
+                        hello = await recv_json(tab)
+                        tabs.append((tab, challenge, hello))
+                    for tab, _, _ in tabs:
+                        await tab.close()
+                    return gateway.connections, waits, [(c, h) for _, c, h in tabs]
+
+        connections, waits, exchanges = run_async(scenario)
+        assert connections == 1
+        assert max(waits) < ws_mux.WS_MUX_FIRST_FRAME_TIMEOUT
+        for challenge, hello in exchanges:
+            assert challenge["event"] == "connect.challenge"
+            assert hello["ok"] and hello["id"] == "1"
+
+    def test_failed_hello_not_replayed(self, mux_server, run_async, monkeypatch):
+        async def scenario():
+            async with FakeWsGateway(protocol=True) as gateway:
+                monkeypatch.setattr(mux_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(mux_server.app) as base_url:
+                    async with connect(ws_url(base_url)) as first, connect(ws_url(base_url)) as second:
+                        gateway.hello_ok = False
+                        await first.send(req("1", "connect"))
+                        rejected = await recv_json(first)
+                        gateway.hello_ok = True
+                        await second.send(req("1", "connect"))
+                        accepted = await recv_json(second)
+                        return rejected, accepted, gateway.received
+
+        rejected, accepted, received = run_async(scenario)
+        assert rejected["ok"] is False
+        # The second tab's connect reached the gateway instead of getting the cached error
+        assert accepted["ok"] is True and received == 2
+
+    def test_unauthenticated_tab_gets_no_events(self, mux_server, run_async, monkeypatch):
+        async def scenario():
+            async with FakeWsGateway(protocol=True) as gateway:
+                monkeypatch.setattr(mux_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(mux_server.app) as base_url:
+                    async with connect(ws_url(base_url)) as rejected, connect(ws_url(base_url)) as accepted:
+                        gateway.hello_ok = False
+                        await rejected.send(req("1", "connect"))
+                        refusal = await recv_json(rejected)
+                        gateway.hello_ok = True
+                        await accepted.send(req("1", "connect"))
+                        await recv_json(accepted)
+                        async with connect(ws_url(base_url)) as silent:
+                            await gateway.broadcast("chat", {"text": "private"})
+                            event = await recv_json(accepted)
+                            leaked = []
+                            for tab in (rejected, silent):
+                                try:
+                                    leaked.append(await asyncio.wait_for(tab.recv(), 0.1))
+                                except asyncio.TimeoutError:
+                                    pass
+                            return refusal, event, leaked
+
+        refusal, event, leaked = run_async(scenario)
+        assert refusal["ok"] is False
+        assert event["payload"] == {"text": "private"}
+        # Neither the tab whose connect failed nor the one that has not sent it sees the event
+        assert leaked == []
+
+    def test_failed_upstream_closes_tab_with_1011(self, mux_server, run_async, monkeypatch):
+        async def scenario():
+            gateway = await FakeWsGateway(protocol=True).start()
+            monkeypatch.setattr(mux_server, "MOLTBOT_PORT", gateway.port)
+            async with serve_app(mux_server.app) as base_url:
+                async with connect(ws_url(base_url)) as tab:
+                    await tab.send(req("1", "connect"))
+                    await recv_json(tab)
+                    for connection in list(gateway.open_connections):
+                        await connection.close(1011, "gateway crashed")
+                    await gateway.stop()
+                    try:
+                        await asyncio.wait_for(tab.recv(), 5)
+                    except ConnectionClosed as e:
+                        return e.rcvd.code if e.rcvd else None
+
+        assert run_async(scenario) == 1011
+
+    def test_unreachable_gateway_closes_tab_with_1011(self, mux_server, run_async, monkeypatch):
+        async def scenario():
+            gateway = await FakeWsGateway().start()
+            await gateway.stop()
+            monkeypatch.setattr(mux_server, "MOLTBOT_PORT", gateway.port)
+            async with serve_app(mux_server.app) as base_url:
+                async with connect(ws_url(base_url)) as tab:
+                    try:
+                        await asyncio.wait_for(tab.recv(), 5)
+                    except ConnectionClosed as e:
+                        return e.rcvd.code if e.rcvd else None
+
+        assert run_async(scenario) == 1011
+
+    def test_parse_frame(self):
+        assert parse_frame('{"type": "event"}') == {"type": "event"}
+        assert parse_frame('{"no_type": 1}') is None
+        assert parse_frame("not json") is None
+        assert parse_frame(b'{"type": "req"}') is None
+
+    def test_slow_client_is_disconnected_not_buffered(self):
+        async def scenario():
+            client = ws_mux.MuxClient(websocket=None, client_id="c0", max_buffer=1000)
+            delivered = [client.deliver(b"x" * 300) for _ in range(4)]
+            return delivered, client.close_code
+
+        delivered, code = asyncio.run(scenario())
+        assert delivered == [True, True, True, False]
+        assert code == 1013
@@ -0,0 +1,146 @@
+"""
+Tests for the WebSocket relay behind /api/openclaw/ws
+Frame types are preserved, buffers stay bounded when the browser is slow
+"""
+import asyncio
+
+from websockets.asyncio.client import connect
+
+import ws_relay
+from ws_relay import RelayPipe, WebSocketRelay
+from benchmarks.app_harness import serve_app
+from benchmarks.fake_ws_gateway import FakeWsGateway
+
+
+def ws_url(base_url: str) -> str:
+    return base_url.replace("http://", "ws://") + "/api/openclaw/ws"
+
+
+class TestRelayPipe:
+    """Queue, watermark and batching mechanics of one direction"""
+
+    def test_batches_and_flushes_on_close(self):
+        frames = [b"a" * 10] * 50 + ["text"]
+        sent = []
+
+        async def scenario():
+            pipe = RelayPipe("test", high_watermark=10_000, low_watermark=100, max_batch=8)
+            source = iter(frames)
+
+            async def receive():
+                return next(source, None)
+
+            async def send(frame):
+                sent.append(frame)
+
+            reader = asyncio.create_task(pipe.pump_in(receive))
+            await pipe.pump_out(send)
+            await reader
+            return pipe
+
+        pipe = asyncio.run(scenario())
+        assert sent == frames
+        assert pipe.frames == 51
+        assert pipe.buffered == 0
+        assert pipe.batches < pipe.frames
+
+    def test_reading_pauses_at_high_watermark(self):
+        async def scenario():
+            pipe = RelayPipe("test", high_watermark=1000, low_watermark=200, max_batch=4)
+            reads = 0
+
+            async def receive():
+                nonlocal reads
+                reads += 1
+                return b"x" * 100
+
+            reader = asyncio.create_task(pipe.pump_in(receive))
+            await asyncio.sleep(0.05)
+            paused_reads = reads
+            reader.cancel()
+            return pipe, paused_reads
+
+        pipe, reads = asyncio.run(scenario())
+        # Stops reading as soon as 1000 bytes are queued
+        assert reads == 10
+        assert pipe.buffered == 1000
+        assert pipe.pauses == 1
+
+    def test_text_frames_counted_in_characters(self):
+        async def scenario():
+            pipe = RelayPipe("test", high_watermark=1000, low_watermark=200, max_batch=4)
+            reads = 0
+
+            async def receive():
+                nonlocal reads
+                reads += 1
+                # 50 characters (100 bytes in UTF-8), measured without encoding
+                return "é" * 50
+
+            reader = asyncio.create_task(pipe.pump_in(receive))
+            await asyncio.sleep(0.05)
+            reader.cancel()
+            return pipe, reads
+
+        pipe, reads = asyncio.run(scenario())
+        assert reads == 20
+        assert pipe.buffered == 1000
+
+
+class TestWebSocketRelay:
+    """End-to-end relay through the app"""
+
+    def test_echo_preserves_frame_types(self, proxied_server, run_async, monkeypatch):
+        async def scenario():
+            async with FakeWsGateway() as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(proxied_server.app) as base_url:
+                    async with connect(ws_url(base_url)) as ws:
+                        await ws.send("hello")
+                        text = await ws.recv()
+                        await ws.send(b"\x00\xff")
+                        binary = await ws.recv()
+                return text, binary, gateway.headers[0].get("X-Auth-Token")
+
+        text, binary, token = run_async(scenario)
+        assert text == "hello"
+        assert binary == b"\x00\xff"
+        assert token == "test-token"
+
+    def test_slow_client_bounds_buffering(self, proxied_server, run_async, monkeypatch):
+        """A gateway flooding a slow browser is throttled instead of buffered"""
+        count, size = 300, 64 * 1024
+        high, low = 256 * 1024, 64 * 1024
+        relays = []
+
+        class RecordingRelay(WebSocketRelay):
+            def __init__(self, client, upstream):
+                super().__init__(client, upstream, high_watermark=high, low_watermark=low)
+                relays.append(self)
+
+        monkeypatch.setattr(proxied_server, "WebSocketRelay", RecordingRelay)
+
+        async def scenario():
+            async with FakeWsGateway(flood=(count, size)) as gateway:
+                monkeypatch.setattr(proxied_server, "MOLTBOT_PORT", gateway.port)
+                async with serve_app(proxied_server.app) as base_url:
+                    async with connect(ws_url(base_url), max_size=None, max_queue=4) as ws:
+                        received = 0
+                        while received < count:
+                            frame = await ws.recv()
+                            assert len(frame) == size
+                            received += 1
+                            if received < 40:
+                                await asyncio.sleep(0.01)
+                return received
+
+        assert run_async(scenario) == count
+        stats = relays[0].to_client.stats()
+        assert stats["frames"] == count
+        assert stats["pauses"] > 0
+        assert stats["peak_buffered"] <= high + size, stats
+
+    def test_watermarks_from_environment_defaults(self):
+        relay = WebSocketRelay(client=None, upstream=None)
+        assert relay.to_client.high_watermark == ws_relay.WS_RELAY_HIGH_WATERMARK
+        assert relay.to_upstream.low_watermark == ws_relay.WS_RELAY_LOW_WATERMARK
@@ -1,26 +1,32 @@
 """WhatsApp Fix - Handles Baileys registered=false bug"""
 
+import hashlib
 import json
 import logging
 from pathlib import Path
+from typing import Optional, Tuple
+
+from config_store import ConfigStore, stat_key
 
 logger = logging.getLogger(__name__)
 
 CREDS_FILE = Path.home() / ".clawdbot/credentials/whatsapp/default/creds.json"
 
-def fix_registered_flag() -> bool:
-    """Fix Baileys registered=false bug. Returns True if fix applied."""
+async def fix_registered_flag(creds_file=None) -> bool:
+    """Fix Baileys registered=false bug (in CREDS_FILE by default). Returns True if fix applied."""
+    creds_file = Path(creds_file or CREDS_FILE)
     logger.info(f"[WhatsApp Monitor] Starting fix_registered_flag check...")
-    logger.info(f"[WhatsApp Monitor] Checking credentials file: {CREDS_FILE}")
+    logger.info(f"[WhatsApp Monitor] Checking credentials file: {creds_file}")
 
-    if not CREDS_FILE.exists():
+    if not creds_file.exists():
         logger.info(f"[WhatsApp Monitor] Credentials file does not exist - no WhatsApp linked yet")
         return False
 
     try:
         logger.info(f"[WhatsApp Monitor] Reading credentials file...")
-        with open(CREDS_FILE, 'r') as f:
-            creds = json.load(f)
+        creds = await ConfigStore.read_json(creds_file, mutable=True)
+        if creds is None:
+            raise ValueError("credentials file is missing or not valid JSON")
 
         has_account = bool(creds.get("account"))
         has_me = bool(creds.get("me", {}).get("id"))
@@ -35,8 +41,7 @@ def fix_registered_flag() -> bool:
             if not registered:
                 logger.info(f"[WhatsApp Monitor] DETECTED registered=false bug! Fixing...")
                 creds["registered"] = True
-                with open(CREDS_FILE, 'w') as f:
-                    json.dump(creds, f)
+                await ConfigStore.write_json(creds_file, creds)
                 logger.info(f"[WhatsApp Monitor] SUCCESS: Fixed registered=false for {phone_id}")
                 return True
             else:
@@ -49,17 +54,19 @@ def fix_registered_flag() -> bool:
 
     return False
 
-def get_whatsapp_status() -> dict:
-    """Get basic WhatsApp status."""
+async def get_whatsapp_status(creds_file=None) -> dict:
+    """Get basic WhatsApp status (of CREDS_FILE by default)."""
+    creds_file = Path(creds_file or CREDS_FILE)
     logger.info(f"[WhatsApp Monitor] Getting WhatsApp status...")
 
-    if not CREDS_FILE.exists():
+    if not creds_file.exists():
         logger.info(f"[WhatsApp Monitor] No credentials file - WhatsApp not linked")
         return {"linked": False, "phone": None, "registered": False}
 
     try:
-        with open(CREDS_FILE, 'r') as f:
-            creds = json.load(f)
+        creds = await ConfigStore.read_json(creds_file)
+        if creds is None:
+            raise ValueError("credentials file is missing or not valid JSON")
 
         jid = creds.get("me", {}).get("id", "")
         phone = "+" + jid.split(":")[0] if ":" in jid else None
@@ -76,3 +83,51 @@ def get_whatsapp_status() -> dict:
     except Exception as e:
         logger.error(f"[WhatsApp Monitor] ERROR getting status: {e}")
         return {"linked": False, "phone": None, "registered": False}
+
+
+def status_etag(status: dict) -> str:
+    """ETag of a WhatsApp status."""
+    digest = hashlib.sha1(json.dumps(status, sort_keys=True).encode()).hexdigest()[:16]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class WhatsAppStatusCache:
+    """
+    Last known WhatsApp status and its ETag, for the polled status endpoint.
+
+    While the credentials watcher runs (watched=True) it calls refresh() on
+    every change, so get() never touches the disk. Without it, get() re-reads
+    only when the file's mtime/size changed.
+    """
+
+    _status: Optional[dict] = None
+    _etag: Optional[str] = None
+    _key = None
+    watched = False
+
+    @classmethod
+    async def refresh(cls) -> dict:
+        """Re-read the credentials file and update the cached status."""
+        key = stat_key(str(CREDS_FILE))
+        status = await get_whatsapp_status()
+        cls._status, cls._etag, cls._key = status, status_etag(status), key
+        return status
+
+    @classmethod
+    async def get(cls) -> Tuple[dict, str]:
+        """The current status and its ETag."""
+        if cls._status is None or (not cls.watched and stat_key(str(CREDS_FILE)) != cls._key):
+            await cls.refresh()
+        return cls._status, cls._etag
+
+    @classmethod
+    def invalidate(cls) -> None:
+        cls._status = cls._etag = cls._key = None
@@ -0,0 +1,423 @@
+"""
+Optional multiplexing of Control UI WebSockets onto shared gateway connections.
+
+By default every browser tab gets its own gateway connection (WebSocketRelay).
+With WS_MULTIPLEX=true, tabs presenting the same credentials share a small
+pool of upstream connections instead, so N dashboards cost one upstream
+socket and one ping loop rather than N.
+
+This relies on the gateway's JSON framing:
+    {"type": "req", "id": ..., "method": ..., "params": ...}   client -> gateway
+    {"type": "res", "id": ..., "ok": ..., "payload": ...}      gateway -> client
+    {"type": "event", "event": ..., "payload": ...}            gateway -> client
+Request ids are rewritten per client on the way up and restored on the way
+down, so each response reaches the tab that asked. Events are fanned out to
+every client on the connection. The upstream `connect` handshake happens once;
+later tabs get the cached hello response (and any events the gateway sent
+before it, e.g. a connect challenge). A failed handshake is not cached: the
+next tab sends its own. Tabs are only pooled together when their connect
+`auth` params are identical.
+
+A tab joins a shared upstream (opened if needed) as soon as it is accepted,
+but only receives the gateway's events once its own `connect` has succeeded
+(upstream, or from the cached hello for identical `auth`). Until then it gets
+the preamble, the frames the gateway sends any socket before authenticating
+(e.g. a connect challenge), and the responses to its own requests; the live
+event stream never reaches a tab that has not authenticated. A tab whose
+first frame is not a JSON `connect` request with the upstream's `auth` (or
+that sends nothing within WS_MUX_FIRST_FRAME_TIMEOUT seconds) falls back to a
+dedicated relay. A tab that cannot keep up with the shared stream is
+disconnected once WS_RELAY_HIGH_WATERMARK (len of frames) is waiting for it, rather
+than stalling the others; when the gateway connection fails, tabs are closed
+with 1011.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from itertools import count
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.websockets import WebSocket
+from websockets.exceptions import ConnectionClosed
+
+import metrics
+from ws_relay import WS_RELAY_HIGH_WATERMARK, Frame
+
+logger = logging.getLogger(__name__)
+
+WS_MULTIPLEX = os.environ.get('WS_MULTIPLEX', 'false').lower() == 'true'
+# Upstream connections per credential set, and clients per connection before another is opened
+WS_MUX_POOL_SIZE = int(os.environ.get('WS_MUX_POOL_SIZE', '2'))
+WS_MUX_CLIENTS_PER_UPSTREAM = int(os.environ.get('WS_MUX_CLIENTS_PER_UPSTREAM', '16'))
+# How long to wait for a tab's connect request before giving it a dedicated relay
+WS_MUX_FIRST_FRAME_TIMEOUT = float(os.environ.get('WS_MUX_FIRST_FRAME_TIMEOUT', '1.0'))
+
+# Events received before the hello that are replayed to tabs joining later
+_MAX_PREAMBLE_FRAMES = 16
+
+UpstreamOpener = Callable[[], Awaitable[Any]]
+
+
+def auth_key(connect: dict) -> str:
+    """The credentials of a connect request, for telling tabs that may share apart."""
+    return json.dumps((connect.get("params") or {}).get("auth"), sort_keys=True, default=str)
+
+
+def parse_frame(frame: Frame) -> Optional[dict]:
+    """The decoded JSON object of a protocol text frame, or None for anything else."""
+    if not isinstance(frame, str) or not frame.startswith("{"):
+        return None
+    try:
+        message = json.loads(frame)
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) and "type" in message else None
+
+
+class MuxClient:
+    """One browser tab attached to a shared upstream, with its own bounded outbox."""
+
+    def __init__(self, websocket: WebSocket, client_id: str, max_buffer: int):
+        self.websocket = websocket
+        self.id = client_id
+        self.max_buffer = max_buffer
+        self.close_code: Optional[int] = None
+        self.close_reason = ""
+        self._outbox: deque = deque()
+        self._buffered = 0
+        self._wakeup = asyncio.Event()
+
+    @property
+    def closed(self) -> bool:
+        return self.close_code is not None
+
+    def deliver(self, frame: Frame) -> bool:
+        """Queue a frame for the tab; disconnects it if its outbox overflows."""
+        if self.closed:
+            return False
+        size = len(frame)
+        if self._buffered + size > self.max_buffer:
+            logger.warning(f"[ws-mux] Client {self.id} too slow, disconnecting")
+            self.close(1013, "Client too slow")
+            return False
+        self._outbox.append((frame, size))
+        self._buffered += size
+        self._wakeup.set()
+        return True
+
+    def close(self, code: int, reason: str) -> None:
+        if not self.closed:
+            self.close_code, self.close_reason = code, reason
+            self._wakeup.set()
+
+    async def run_writer(self) -> None:
+        """Send queued frames to the browser until the client is closed."""
+        outbox, send = self._outbox, self.websocket.send
+        while not self.closed:
+            if not outbox:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            frame, size = outbox.popleft()
+            self._buffered -= size
+            if isinstance(frame, str):
+                await send({"type": "websocket.send", "text": frame})
+            else:
+                await send({"type": "websocket.send", "bytes": frame})
+
+
+class MuxUpstream:
+    """A gateway connection shared by several clients."""
+
+    _ids = count(1)
+
+    def __init__(self, key: str):
+        self.key = key
+        self.id = next(self._ids)
+        self.ws = None
+        # Tabs whose connect succeeded: they receive the gateway's events
+        self.clients: Dict[str, MuxClient] = {}
+        # Tabs served but not authenticated yet: only their own responses
+        self.waiting: Dict[str, MuxClient] = {}
+        # upstream request id -> (client, original id, is the connect handshake)
+        self.pending: Dict[str, Tuple[MuxClient, Any, bool]] = {}
+        self.hello: Optional[asyncio.Future] = None
+        # The connect `auth` the hello was (or is being) obtained with
+        self.auth: Optional[str] = None
+        self.preamble: List[Frame] = []
+        self.closed = False
+        self.frames_up = 0
+        self.frames_down = 0
+        self._reader: Optional[asyncio.Task] = None
+        self._done = asyncio.Event()
+
+    async def open(self, open_upstream: UpstreamOpener) -> "MuxUpstream":
+        self.ws = await open_upstream()
+        self._reader = asyncio.create_task(self._read_loop())
+        logger.info(f"[ws-mux] Opened shared upstream #{self.id}")
+        return self
+
+    async def close(self) -> None:
+        self.closed = True
+        self._done.set()
+        for client in [*self.clients.values(), *self.waiting.values()]:
+            client.close(1011, "Gateway connection closed")
+        if self._reader is not None and self._reader is not asyncio.current_task():
+            self._reader.cancel()
+        if self.ws is not None:
+            await self.ws.close()
+        logger.info(f"[ws-mux] Closed shared upstream #{self.id}")
+
+    # ---- gateway -> clients ----
+
+    async def _read_loop(self) -> None:
+        try:
+            async for frame in self.ws:
+                self.frames_down += 1
+                self._dispatch(frame)
+        except ConnectionClosed as e:
+            logger.info(f"[ws-mux] Upstream #{self.id} closed: {e}")
+        except Exception as e:
+            logger.error(f"[ws-mux] Upstream #{self.id} read error: {e}")
+        finally:
+            if not self.closed:
+                await self.close()
+
+    def _dispatch(self, frame: Frame) -> None:
+        message = parse_frame(frame)
+        if message is not None and message["type"] == "res":
+            route = self.pending.pop(message.get("id"), None)
+            if route is not None:
+                client, original_id, is_connect = route
+                if is_connect and self.hello is not None and not self.hello.done():
+                    self.hello.set_result(message)
+                    if not message.get("ok"):
+                        # Answer only the tab that sent it; the next connect goes upstream
+                        self.hello = None
+                        self.auth = None
+                client.deliver(json.dumps({**message, "id": original_id}))
+                if is_connect and message.get("ok"):
+                    self._attach(client)
+                return
+        if message is not None and message["type"] == "event" and (self.hello is None or not self.hello.done()):
+            if len(self.preamble) < _MAX_PREAMBLE_FRAMES:
+                self.preamble.append(frame)
+                # Sent before any authentication, so tabs still connecting get it too
+                for client in list(self.waiting.values()):
+                    client.deliver(frame)
+        for client in list(self.clients.values()):
+            client.deliver(frame)
+
+    # ---- clients -> gateway ----
+
+    async def forward(self, client: MuxClient, frame: Frame) -> None:
+        """Send a client's frame upstream, answering repeat connect handshakes from cache."""
+        message = parse_frame(frame)
+        if message is None or message["type"] != "req":
+            await self.ws.send(frame)
+            self.frames_up += 1
+            return
+
+        is_connect = message.get("method") == "connect"
+        if is_connect:
+            while self.hello is not None:
+                hello = await asyncio.shield(self.hello)
+                if hello.get("ok"):
+                    client.deliver(json.dumps({**hello, "id": message.get("id")}))
+                    self._attach(client)
+                    return
+            self.hello = asyncio.get_running_loop().create_future()
+
+        upstream_id = f"{client.id}:{message.get('id')}"
+        self.pending[upstream_id] = (client, message.get("id"), is_connect)
+        await self.ws.send(json.dumps({**message, "id": upstream_id}))
+        self.frames_up += 1
+
+    def _attach(self, client: MuxClient) -> None:
+        """Start sending the gateway's events to a tab whose connect succeeded."""
+        if self.waiting.pop(client.id, None) is not None:
+            self.clients[client.id] = client
+
+    @property
+    def members(self) -> int:
+        """Tabs served by this upstream, authenticated or not."""
+        return len(self.clients) + len(self.waiting)
+
+    async def _read_client(self, client: MuxClient) -> Tuple[bool, Optional[Frame]]:
+        """Forward a client's frames until it disconnects; (False, first_frame) if it cannot share."""
+        receive = client.websocket.receive
+        try:
+            message = await asyncio.wait_for(receive(), WS_MUX_FIRST_FRAME_TIMEOUT)
+        except asyncio.TimeoutError:
+            return False, None
+        if message["type"] != "websocket.receive":
+            return True, None
+        text = message.get("text")
+        first_frame = text if text is not None else message.get("bytes")
+
+        connect = parse_frame(first_frame)
+        if connect is None or connect["type"] != "req" or connect.get("method") != "connect":
+            return False, first_frame
+        auth = auth_key(connect)
+        if self.auth is None:
+            self.auth = auth
+        elif self.auth != auth:
+            # Other credentials than this connection was opened with
+            return False, first_frame
+
+        await self.forward(client, first_frame)
+        while True:
+            message = await receive()
+            if message["type"] != "websocket.receive":
+                return True, None
+            text = message.get("text")
+            await self.forward(client, text if text is not None else message.get("bytes"))
+
+    async def serve(self, client: MuxClient) -> Tuple[bool, Optional[Frame]]:
+        """
+        Attach a client until it disconnects, overflows, or the upstream closes.
+
+        The client gets the preamble right away, before its first frame, and
+        live events once its connect has succeeded. Returns (handled,
+        first_frame) like MuxPool.serve.
+        """
+        self.waiting[client.id] = client
+        for frame in self.preamble:
+            client.deliver(frame)
+        writer = asyncio.create_task(client.run_writer())
+        reader = asyncio.create_task(self._read_client(client))
+        closed = asyncio.create_task(self._done.wait())
+        try:
+            await asyncio.wait([writer, reader, closed], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (writer, reader, closed):
+                task.cancel()
+            await asyncio.gather(writer, reader, closed, return_exceptions=True)
+            self.clients.pop(client.id, None)
+            self.waiting.pop(client.id, None)
+            # Keep a pending connect so the hello still resolves for the other clients
+            for upstream_id in [uid for uid, route in self.pending.items() if route[0] is client and not route[2]]:
+                del self.pending[upstream_id]
+        if reader.cancelled() or reader.exception() is not None:
+            return True, None
+        return reader.result()
+
+    def stats(self) -> dict:
+        return {
+            "upstream": self.id,
+            "clients": len(self.clients),
+            "waiting": len(self.waiting),
+            "pending_requests": len(self.pending),
+            "frames_up": self.frames_up,
+            "frames_down": self.frames_down,
+        }
+
+
+class MuxPool:
+    """Shared upstream connections, grouped by credential set."""
+
+    _upstreams: Dict[str, List[MuxUpstream]] = {}
+    _client_ids = count(1)
+    _lock: Optional[asyncio.Lock] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def _get_lock(cls) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            # Connections and lock belong to the loop that created them
+            cls._loop, cls._lock = loop, asyncio.Lock()
+            cls._upstreams = {}
+        return cls._lock
+
+    @staticmethod
+    def pool_key(gateway_token: Optional[str], gateway: str = "") -> str:
+        return json.dumps([gateway, gateway_token])
+
+    @classmethod
+    async def acquire(cls, key: str, open_upstream: UpstreamOpener) -> MuxUpstream:
+        """The least-loaded live upstream for a key, opening another while under the pool size."""
+        async with cls._get_lock():
+            upstreams = [u for u in cls._upstreams.get(key, []) if not u.closed]
+            upstreams.sort(key=lambda u: u.members)
+            if upstreams and (upstreams[0].members < WS_MUX_CLIENTS_PER_UPSTREAM
+                              or len(upstreams) >= WS_MUX_POOL_SIZE):
+                cls._upstreams[key] = upstreams
+                return upstreams[0]
+            upstream = await MuxUpstream(key).open(open_upstream)
+            cls._upstreams[key] = upstreams + [upstream]
+            return upstream
+
+    @classmethod
+    async def release(cls, upstream: MuxUpstream) -> None:
+        """Close an upstream once its last client has left."""
+        async with cls._get_lock():
+            if upstream.members or upstream.closed:
+                return
+            remaining = [u for u in cls._upstreams.get(upstream.key, []) if u is not upstream]
+            if remaining:
+                cls._upstreams[upstream.key] = remaining
+            else:
+                cls._upstreams.pop(upstream.key, None)
+        await upstream.close()
+
+    @classmethod
+    async def serve(cls, websocket: WebSocket, gateway_token: Optional[str],
+                    open_upstream: UpstreamOpener, gateway: str = "") -> Tuple[bool, Optional[Frame]]:
+        """
+        Serve an accepted tab over a shared upstream.
+
+        `gateway` names the gateway process open_upstream connects to, so
+        tabs opened after a blue/green switch do not join the old process.
+
+        Returns (handled, first_frame). When handled is False the tab is not
+        multiplexable and the caller should give it a dedicated relay,
+        forwarding first_frame (if any) before relaying the rest.
+        """
+        try:
+            upstream = await cls.acquire(cls.pool_key(gateway_token, gateway), open_upstream)
+        except Exception as e:
+            logger.error(f"[ws-mux] Could not open a gateway connection: {e}")
+            await cls._close_client(websocket, 1011, "Gateway connection failed")
+            return True, None
+        client = MuxClient(websocket, f"c{next(cls._client_ids)}", WS_RELAY_HIGH_WATERMARK)
+        try:
+            handled, first_frame = await upstream.serve(client)
+        finally:
+            await cls.release(upstream)
+        if client.closed:
+            await cls._close_client(websocket, client.close_code, client.close_reason)
+        return handled, first_frame
+
+    @staticmethod
+    async def _close_client(websocket: WebSocket, code: int, reason: str) -> None:
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception:
+            # Already gone
+            pass
+
+    @classmethod
+    def stats(cls) -> List[dict]:
+        """Active clients and traffic per shared upstream socket."""
+        return [u.stats() for upstreams in cls._upstreams.values() for u in upstreams if not u.closed]
+
+    @classmethod
+    async def close_all(cls) -> None:
+        upstreams = [u for group in cls._upstreams.values() for u in group]
+        cls._upstreams = {}
+        for upstream in upstreams:
+            await upstream.close()
+
+
+metrics.gauge(
+    "openclaw_ws_mux_clients", "Clients attached per shared gateway connection",
+    ("upstream",), callback=lambda: [((s["upstream"],), s["clients"]) for s in MuxPool.stats()],
+)
+metrics.gauge(
+    "openclaw_ws_mux_pending_requests", "Requests awaiting a response per shared gateway connection",
+    ("upstream",), callback=lambda: [((s["upstream"],), s["pending_requests"]) for s in MuxPool.stats()],
+)
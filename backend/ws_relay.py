@@ -0,0 +1,258 @@
+"""
+Bidirectional WebSocket relay between the browser and the gateway.
+
+Each direction runs a reader that pulls frames from its source into a bounded
+queue and a writer that drains the queue into the other side. When a queue
+holds WS_RELAY_HIGH_WATERMARK bytes the reader stops reading until the writer
+has drained it below WS_RELAY_LOW_WATERMARK, so a slow browser throttles the
+gateway (through TCP) instead of growing the proxy's memory without bound.
+Sizes are len(frame): bytes for binary frames, characters for text frames
+(a text frame is never encoded again just to be measured; UTF-8 is at most
+4 bytes per character, and the Control UI's JSON is nearly all ASCII).
+
+Frames are relayed as the objects received (str for text, bytes for binary):
+no re-encoding and no per-frame connection-state checks. WebSocket messages
+cannot be merged on the wire without changing what the other side receives,
+so batching happens at the scheduling level: a writer wakes once and sends
+every frame queued so far (up to WS_RELAY_MAX_BATCH) before yielding again.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from itertools import count
+from typing import Awaitable, Callable, Optional, Union
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from websockets.exceptions import ConnectionClosed
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-direction buffered size (len of each frame) at which reading pauses / resumes
+WS_RELAY_HIGH_WATERMARK = int(os.environ.get('WS_RELAY_HIGH_WATERMARK', str(1024 * 1024)))
+WS_RELAY_LOW_WATERMARK = int(os.environ.get('WS_RELAY_LOW_WATERMARK', str(256 * 1024)))
+# Maximum frames sent per writer wake-up
+WS_RELAY_MAX_BATCH = int(os.environ.get('WS_RELAY_MAX_BATCH', '64'))
+
+Frame = Union[str, bytes]
+FrameSource = Callable[[], Awaitable[Optional[Frame]]]
+FrameSink = Callable[[Frame], Awaitable[None]]
+
+
+FRAMES_TOTAL = metrics.counter("openclaw_ws_frames_total", "WebSocket frames relayed", ("direction",))
+BYTES_TOTAL = metrics.counter("openclaw_ws_bytes_total", "WebSocket payload bytes relayed", ("direction",))
+PAUSES_TOTAL = metrics.counter(
+    "openclaw_ws_backpressure_pauses_total", "Times a relay stopped reading at the high watermark", ("direction",)
+)
+RELAY_LATENCY = metrics.histogram(
+    "openclaw_ws_relay_latency_seconds", "Time a frame spent queued in the proxy before being sent", ("direction",)
+)
+CLOSE_TOTAL = metrics.counter("openclaw_ws_close_total", "WebSocket closes seen by the relay", ("side", "code"))
+CONNECTION_DURATION = metrics.histogram(
+    "openclaw_ws_connection_duration_seconds", "Lifetime of relayed WebSocket connections",
+    buckets=(1, 5, 15, 60, 300, 900, 3600, 14400, 86400),
+)
+
+
+class RelayPipe:
+    """One direction of the relay: a byte-bounded frame queue with watermarks."""
+
+    def __init__(self, name: str, high_watermark: int, low_watermark: int, max_batch: int):
+        self.name = name
+        self.high_watermark = high_watermark
+        self.low_watermark = min(low_watermark, high_watermark)
+        self.max_batch = max(1, max_batch)
+        self._frames: deque = deque()
+        self._not_empty = asyncio.Event()
+        self._below_high = asyncio.Event()
+        self._below_high.set()
+        self._eof = False
+        self.buffered = 0
+        self.frames = 0
+        self.bytes = 0
+        self.batches = 0
+        self.pauses = 0
+        self.peak_buffered = 0
+
+    async def pump_in(self, receive: FrameSource) -> None:
+        """Read frames from the source until it closes, pausing above the high watermark."""
+        try:
+            while True:
+                if not self._below_high.is_set():
+                    await self._below_high.wait()
+                frame = await receive()
+                if frame is None:
+                    return
+                size = len(frame)
+                self._frames.append((frame, size, time.perf_counter()))
+                self.buffered += size
+                if self.buffered > self.peak_buffered:
+                    self.peak_buffered = self.buffered
+                self._not_empty.set()
+                if self.buffered >= self.high_watermark:
+                    self._below_high.clear()
+                    self.pauses += 1
+                    PAUSES_TOTAL.inc(1, self.name)
+        finally:
+            self._eof = True
+            self._not_empty.set()
+
+    async def pump_out(self, send: FrameSink) -> None:
+        """Send queued frames in batches until the source has closed and the queue is empty."""
+        frames = self._frames
+        while True:
+            if not frames:
+                if self._eof:
+                    return
+                self._not_empty.clear()
+                await self._not_empty.wait()
+                continue
+
+            batch = min(len(frames), self.max_batch)
+            batch_bytes = 0
+            for _ in range(batch):
+                frame, size, enqueued_at = frames.popleft()
+                await send(frame)
+                RELAY_LATENCY.observe(time.perf_counter() - enqueued_at, self.name)
+                batch_bytes += size
+                self.buffered -= size
+                if self.buffered <= self.low_watermark and not self._below_high.is_set():
+                    self._below_high.set()
+            self.frames += batch
+            self.bytes += batch_bytes
+            self.batches += 1
+            FRAMES_TOTAL.inc(batch, self.name)
+            BYTES_TOTAL.inc(batch_bytes, self.name)
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "batches": self.batches,
+            "pauses": self.pauses,
+            "buffered": self.buffered,
+            "peak_buffered": self.peak_buffered,
+        }
+
+
+class WebSocketRelay:
+    """Relays frames between an accepted Starlette WebSocket and a websockets client connection."""
+
+    # Relays currently running, for the per-connection gauges
+    active: set = set()
+    _ids = count(1)
+
+    def __init__(self, client: WebSocket, upstream,
+                 high_watermark: int = None, low_watermark: int = None, max_batch: int = None):
+        self.id = next(self._ids)
+        self.client = client
+        self.upstream = upstream
+        self.client_close_code: Optional[int] = None
+        self.upstream_close_code: Optional[int] = None
+        high = WS_RELAY_HIGH_WATERMARK if high_watermark is None else high_watermark
+        low = WS_RELAY_LOW_WATERMARK if low_watermark is None else low_watermark
+        batch = WS_RELAY_MAX_BATCH if max_batch is None else max_batch
+        self.to_upstream = RelayPipe("client->gateway", high, low, batch)
+        self.to_client = RelayPipe("gateway->client", high, low, batch)
+
+    # ---- endpoint adapters ----
+
+    async def _receive_client(self) -> Optional[Frame]:
+        message = await self.client.receive()
+        if message["type"] != "websocket.receive":
+            self.client_close_code = message.get("code", 1000)
+            CLOSE_TOTAL.inc(1, "client", self.client_close_code)
+            return None
+        text = message.get("text")
+        return text if text is not None else message.get("bytes")
+
+    async def _send_client(self, frame: Frame) -> None:
+        if isinstance(frame, str):
+            await self.client.send({"type": "websocket.send", "text": frame})
+        else:
+            await self.client.send({"type": "websocket.send", "bytes": frame})
+
+    async def _receive_upstream(self) -> Optional[Frame]:
+        try:
+            return await self.upstream.recv()
+        except ConnectionClosed as e:
+            logger.info(f"Moltbot WebSocket closed: {e}")
+            self.upstream_close_code = e.rcvd.code if e.rcvd else 1006
+            CLOSE_TOTAL.inc(1, "gateway", self.upstream_close_code)
+            return None
+
+    # ---- relay ----
+
+    @staticmethod
+    async def _direction(pipe: RelayPipe, receive: FrameSource, send: FrameSink) -> None:
+        reader = asyncio.create_task(pipe.pump_in(receive))
+        try:
+            await pipe.pump_out(send)
+        finally:
+            reader.cancel()
+            try:
+                await reader
+            except (asyncio.CancelledError, WebSocketDisconnect, ConnectionClosed):
+                pass
+            except Exception as e:
+                logger.error(f"WebSocket relay {pipe.name} read error: {e}")
+
+    async def run(self) -> None:
+        """Relay until either side closes; frames already read are flushed first."""
+        started = time.monotonic()
+        self.active.add(self)
+        directions = [
+            asyncio.create_task(self._direction(self.to_upstream, self._receive_client, self.upstream.send)),
+            asyncio.create_task(self._direction(self.to_client, self._receive_upstream, self._send_client)),
+        ]
+        try:
+            await asyncio.wait(directions, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in directions:
+                task.cancel()
+            results = await asyncio.gather(*directions, return_exceptions=True)
+            self.active.discard(self)
+            CONNECTION_DURATION.observe(time.monotonic() - started)
+            logger.info(f"WebSocket relay #{self.id} ended: {self.stats()}")
+        for pipe, result in zip((self.to_upstream, self.to_client), results):
+            if isinstance(result, (WebSocketDisconnect, ConnectionClosed)):
+                logger.info(f"WebSocket relay {pipe.name} closed: {result}")
+            elif isinstance(result, Exception):
+                logger.error(f"WebSocket relay {pipe.name} error: {result}")
+
+    def stats(self) -> dict:
+        return {
+            self.to_upstream.name: self.to_upstream.stats(),
+            self.to_client.name: self.to_client.stats(),
+            "client_close_code": self.client_close_code,
+            "gateway_close_code": self.upstream_close_code,
+        }
+
+
+def _per_connection(attribute: str):
+    def collect():
+        return [
+            ((relay.id, pipe.name), getattr(pipe, attribute))
+            for relay in list(WebSocketRelay.active)
+            for pipe in (relay.to_upstream, relay.to_client)
+        ]
+    return collect
+
+
+metrics.gauge("openclaw_ws_relays_active", "Dedicated WebSocket relays running", callback=lambda: len(WebSocketRelay.active))
+metrics.gauge(
+    "openclaw_ws_queue_bytes", "Bytes queued in the proxy per relay direction",
+    ("connection", "direction"), callback=_per_connection("buffered"),
+)
+metrics.gauge(
+    "openclaw_ws_connection_frames", "Frames relayed so far per active connection and direction",
+    ("connection", "direction"), callback=_per_connection("frames"),
+)
+metrics.gauge(
+    "openclaw_ws_connection_bytes", "Bytes relayed so far per active connection and direction",
+    ("connection", "direction"), callback=_per_connection("bytes"),
+)